@@ -106,6 +106,9 @@ class AiChat:
         self._history = []
         self._lock = threading.Lock()
 
+        # keep-alive で接続を使い回す（翻訳エンジンとして連続で呼ばれるため）
+        self._session = requests.Session()
+
         print(f"[AiChat] base_url={self.base_url}")
         print(f"[AiChat] model={self.model}")
         print(f"[AiChat] response_language={self.response_language}")
@@ -169,27 +172,87 @@ class AiChat:
 
             return response
 
-    def _call_api(self, messages: list) -> str:
-        """OpenAI 互換 API を呼び出す"""
-        url = f"{self.base_url}/chat/completions"
+    def complete(self, messages: list, temperature: float = None, max_tokens: int = None) -> str:
+        """
+        会話履歴を使わずに1回だけ補完を実行する（翻訳エンジン等からの利用向け）
+
+        Args:
+            messages: OpenAI 形式のメッセージリスト（system を含めて呼び出し側で組み立てる）
+            temperature: 生成の多様性（None ならインスタンスの設定値）
+            max_tokens: 最大トークン数（None ならインスタンスの設定値）
+        """
+        return self._call_api(messages, temperature=temperature, max_tokens=max_tokens, verbose=False)
+
+    def stream(self, messages: list, temperature: float = None, max_tokens: int = None):
+        """
+        ストリーミングで補完を実行し、テキストの断片を届いた順に返す（SSE）
+
+        Yields:
+            応答テキストの断片（delta.content）
+        """
+        resp = self._session.post(
+            f"{self.base_url}/chat/completions",
+            headers=self._headers(),
+            json=self._payload(messages, temperature, max_tokens, stream=True),
+            timeout=self.timeout,
+            stream=True,
+        )
+        resp.raise_for_status()
+        try:
+            # chunk_size=None: 受信したチャンクをバッファせずすぐに処理する
+            # SSE は UTF-8 固定（charset なしの text/event-stream を requests は ISO-8859-1 と推測するため自分でデコードする）
+            for raw in resp.iter_lines(chunk_size=None):
+                line = raw.decode("utf-8", errors="replace")
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    chunk = json.loads(data)
+                except json.JSONDecodeError:
+                    continue
+                choices = chunk.get("choices") or []
+                if not choices:
+                    continue
+                delta = choices[0].get("delta") or choices[0].get("message") or {}
+                content = delta.get("content")
+                if content:
+                    yield content
+        finally:
+            resp.close()
+
+    def _headers(self) -> dict:
         headers = {
             "Content-Type": "application/json",
         }
         if self.api_key:
             headers["Authorization"] = f"Bearer {self.api_key}"
+        return headers
 
+    def _payload(self, messages: list, temperature: float = None, max_tokens: int = None,
+                 stream: bool = False) -> dict:
         payload = {
             "model": self.model,
             "messages": messages,
-            "max_tokens": self.max_tokens,
-            "temperature": self.temperature,
+            "max_tokens": self.max_tokens if max_tokens is None else max_tokens,
+            "temperature": self.temperature if temperature is None else temperature,
         }
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    def _call_api(self, messages: list, temperature: float = None, max_tokens: int = None,
+                  verbose: bool = True) -> str:
+        """OpenAI 互換 API を呼び出す"""
+        url = f"{self.base_url}/chat/completions"
 
-        print(f"[AiChat] リクエスト送信中... ({self.model})")
-        resp = requests.post(
+        if verbose:
+            print(f"[AiChat] リクエスト送信中... ({self.model})")
+        resp = self._session.post(
             url,
-            headers=headers,
-            json=payload,
+            headers=self._headers(),
+            json=self._payload(messages, temperature, max_tokens),
             timeout=self.timeout,
         )
         resp.raise_for_status()
@@ -197,7 +260,8 @@ class AiChat:
         data = resp.json()
 
         # デバッグ: レスポンス構造を表示
-        print(f"[AiChat] ステータス: {resp.status_code}")
+        if verbose:
+            print(f"[AiChat] ステータス: {resp.status_code}")
         if "choices" not in data:
             print(f"[AiChat] 想定外のレスポンス: {json.dumps(data, ensure_ascii=False)[:500]}")
             # Z.AI 等で output / result キーの場合
@@ -221,7 +285,8 @@ class AiChat:
         if message.get("reasoning_content"):
             print(f"[AiChat] reasoning_content あり ({len(message['reasoning_content'])}文字, ログのみ)")
 
-        print(f"[AiChat] 応答受信 ({len(content)}文字, finish_reason={finish_reason})")
+        if verbose:
+            print(f"[AiChat] 応答受信 ({len(content)}文字, finish_reason={finish_reason})")
         if not content and finish_reason == "length":
             print(f"[AiChat] ⚠ トークン上限で応答が切れています。max_tokens を増やしてください")
         if not content:
@@ -0,0 +1,127 @@
+"""
+ASR のまとめ処理モジュール
+複数のセッション（接続）から届いた認識要求を、少しだけ待ってまとめて1回の認識で処理する
+
+  batcher = AsrBatcher(run_batch, max_batch=8, max_wait=0.02)
+  future = batcher.submit("en", audio)      # concurrent.futures.Future（結果は認識したテキスト）
+
+  - 処理の枠（workers 個）が空いたら、届いている要求を最初の1件から max_wait 秒・max_batch 件まで集め、
+    言語ごとに run_batch(language, audios) を1回呼ぶ（結果は audios と同じ順のテキストのリスト）
+  - 枠が埋まっている間に届いた要求は次のまとまりに入る（負荷が高いほど大きなまとまりになる）
+  - 要求は届いた順に処理する（特定のセッションだけが待たされない）
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+_CLOSE = object()
+
+
+class AsrBatcher:
+    """ASR の要求をセッションをまたいでまとめる（スレッドセーフ）"""
+
+    def __init__(self, run_batch, max_batch: int = 8, max_wait: float = 0.02, workers: int = 1):
+        """
+        Args:
+            run_batch: (language, audios) → テキストのリスト（同じ言語の音声をまとめて認識する）
+            max_batch: 1回にまとめる要求の上限
+            max_wait: 最初の要求から、ほかの要求を待つ最大秒数
+            workers: 同時に処理するまとまりの数（モデルを共有して並行に認識できる数）
+        """
+        self._run_batch = run_batch
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait
+        self._requests: queue.Queue = queue.Queue()
+        self._slots = threading.Semaphore(max(1, workers))
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="asr-batch")
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._largest = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._collect, name="asr-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, language: str, audio) -> Future:
+        """認識を要求する（待たない）"""
+        future = Future()
+        if self._closed:
+            future.set_exception(RuntimeError("AsrBatcher は停止しています"))
+            return future
+        self._requests.put((language, audio, future))
+        return future
+
+    def _collect(self):
+        while True:
+            self._slots.acquire()  # 処理の枠が空くまで、届いた要求はキューに溜めておく
+            first = self._requests.get()
+            if first is _CLOSE:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                try:
+                    request = self._requests.get_nowait()
+                except queue.Empty:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        request = self._requests.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                if request is _CLOSE:
+                    self._requests.put(_CLOSE)  # まとめた分を処理してから止まる
+                    break
+                batch.append(request)
+            self._executor.submit(self._run, batch)
+
+    def _run(self, batch: list):
+        try:
+            groups: dict[str, list] = {}
+            for request in batch:
+                groups.setdefault(request[0], []).append(request)
+            for language, requests in groups.items():
+                # 取り消された要求（切断したセッション）は認識しない
+                requests = [request for request in requests if request[2].set_running_or_notify_cancel()]
+                if not requests:
+                    continue
+                try:
+                    texts = list(self._run_batch(language, [audio for _, audio, _ in requests]))
+                except Exception as e:
+                    for _, _, future in requests:
+                        future.set_exception(e)
+                    continue
+                for (_, _, future), text in zip(requests, texts):
+                    future.set_result(text)
+                if len(texts) != len(requests):
+                    # 結果が足りない要求を待たせたままにしない（多すぎる結果は捨てる）
+                    error = RuntimeError(f"認識結果の数が合いません: {len(requests)}件に対して {len(texts)}件")
+                    print(f"[AsrBatcher] {error}")
+                    for _, _, future in requests[len(texts):]:
+                        future.set_exception(error)
+            with self._lock:
+                self._batches += 1
+                self._items += len(batch)
+                self._largest = max(self._largest, len(batch))
+        finally:
+            self._slots.release()
+
+    def stats(self) -> dict:
+        """まとめた回数・要求数・1回あたりの平均件数・最大件数"""
+        with self._lock:
+            return {
+                "batches": self._batches,
+                "items": self._items,
+                "mean_batch": self._items / self._batches if self._batches else 0.0,
+                "max_batch": self._largest,
+            }
+
+    def close(self):
+        """受け付けを止め、届いている要求を処理してから止まる"""
+        self._closed = True
+        self._requests.put(_CLOSE)
+        self._thread.join(timeout=5.0)
+        self._executor.shutdown(wait=True)
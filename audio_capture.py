@@ -5,6 +5,7 @@ BlackHole経由でmacOSのシステム音声をキャプチャする
 
 import threading
 import queue
+import time
 import numpy as np
 
 try:
@@ -28,7 +29,7 @@ class AudioCapture:
         self.chunk_duration = chunk_duration
         self.silence_threshold = silence_threshold
 
-        self.audio_queue: queue.Queue = queue.Queue()
+        self.audio_queue: queue.Queue = queue.Queue()  # (音声チャンク, 揃った時刻 perf_counter_ns)
         self._buffer: list = []
         self._buffer_samples = 0
         self._running = False
@@ -39,6 +40,8 @@ class AudioCapture:
 
         # RMS レベルコールバック (rms: float, is_above_threshold: bool)
         self.on_level = None
+        # 閾値を超える音を検出したときのコールバック（引数なし。チャンクが揃うのを待たずにブロックごとに呼ぶ）
+        self.on_sound = None
 
     @staticmethod
     def list_devices() -> list[dict]:
@@ -71,6 +74,8 @@ class AudioCapture:
         audio_data = indata[:, 0].copy()  # モノラルに変換
         self._buffer.append(audio_data)
         self._buffer_samples += len(audio_data)
+        if self.on_sound and np.sqrt(np.mean(audio_data**2)) > self.silence_threshold:
+            self.on_sound()
 
         # チャンクサイズに達したらキューに投入
         if self._buffer_samples >= self.chunk_samples:
@@ -84,7 +89,7 @@ class AudioCapture:
             if self.on_level:
                 self.on_level(rms, rms > self.silence_threshold)
             if rms > self.silence_threshold:
-                self.audio_queue.put(audio_chunk)
+                self.audio_queue.put((audio_chunk, time.perf_counter_ns()))
 
             # 残りをバッファに戻す
             self._buffer = [remaining] if len(remaining) > 0 else []
@@ -128,17 +133,27 @@ class AudioCapture:
             chunk = np.concatenate(self._buffer)
             rms = np.sqrt(np.mean(chunk**2))
             if rms > self.silence_threshold and len(chunk) > self.sample_rate * 0.5:
-                self.audio_queue.put(chunk)
+                self.audio_queue.put((chunk, time.perf_counter_ns()))
             self._buffer = []
             self._buffer_samples = 0
         print("[AudioCapture] キャプチャ停止")
 
     def get_chunk(self, timeout: float = 1.0) -> np.ndarray | None:
         """キューから音声チャンクを取得（ブロッキング）"""
+        chunk, _ = self.get_chunk_timed(timeout)
+        return chunk
+
+    def get_chunk_timed(self, timeout: float = 1.0) -> tuple[np.ndarray | None, int | None]:
+        """
+        キューから音声チャンクと、チャンクが揃った時刻（time.perf_counter_ns）を取得（ブロッキング）
+
+        Returns:
+            (音声チャンク, 時刻)。タイムアウトなら (None, None)
+        """
         try:
             return self.audio_queue.get(timeout=timeout)
         except queue.Empty:
-            return None
+            return None, None
 
     @property
     def is_running(self) -> bool:
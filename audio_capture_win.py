@@ -7,6 +7,7 @@ PyAudioWPatch の WASAPI ループバックを使って Windows のシステム
 
 import threading
 import queue
+import time
 import numpy as np
 
 try:
@@ -33,7 +34,7 @@ class WindowsAudioCapture:
         self.chunk_duration = chunk_duration
         self.silence_threshold = silence_threshold
 
-        self.audio_queue: queue.Queue = queue.Queue()
+        self.audio_queue: queue.Queue = queue.Queue()  # (音声チャンク, 揃った時刻 perf_counter_ns)
         self._buffer: list = []
         self._buffer_samples = 0
         self._running = False
@@ -45,6 +46,8 @@ class WindowsAudioCapture:
 
         # RMS レベルコールバック (rms: float, is_above_threshold: bool)
         self.on_level = None
+        # 閾値を超える音を検出したときのコールバック（引数なし。チャンクが揃うのを待たずにブロックごとに呼ぶ）
+        self.on_sound = None
 
         # デバイスのネイティブ設定（start 時に決定）
         self._device_sample_rate = None
@@ -159,6 +162,8 @@ class WindowsAudioCapture:
             # バッファに追加
             self._buffer.append(audio_data)
             self._buffer_samples += len(audio_data)
+            if self.on_sound and np.sqrt(np.mean(audio_data**2)) > self.silence_threshold:
+                self.on_sound()
 
             # チャンクサイズに達したらキューに投入
             if self._buffer_samples >= self.chunk_samples:
@@ -171,7 +176,7 @@ class WindowsAudioCapture:
                 if self.on_level:
                     self.on_level(rms, rms > self.silence_threshold)
                 if rms > self.silence_threshold:
-                    self.audio_queue.put(audio_chunk)
+                    self.audio_queue.put((audio_chunk, time.perf_counter_ns()))
 
                 self._buffer = [remaining] if len(remaining) > 0 else []
                 self._buffer_samples = len(remaining)
@@ -210,7 +215,7 @@ class WindowsAudioCapture:
             chunk = np.concatenate(self._buffer)
             rms = np.sqrt(np.mean(chunk**2))
             if rms > self.silence_threshold and len(chunk) > self.sample_rate * 0.5:
-                self.audio_queue.put(chunk)
+                self.audio_queue.put((chunk, time.perf_counter_ns()))
             self._buffer = []
             self._buffer_samples = 0
 
@@ -218,10 +223,20 @@ class WindowsAudioCapture:
 
     def get_chunk(self, timeout: float = 1.0) -> np.ndarray | None:
         """キューから音声チャンクを取得（ブロッキング）"""
+        chunk, _ = self.get_chunk_timed(timeout)
+        return chunk
+
+    def get_chunk_timed(self, timeout: float = 1.0) -> tuple[np.ndarray | None, int | None]:
+        """
+        キューから音声チャンクと、チャンクが揃った時刻（time.perf_counter_ns）を取得（ブロッキング）
+
+        Returns:
+            (音声チャンク, 時刻)。タイムアウトなら (None, None)
+        """
         try:
             return self.audio_queue.get(timeout=timeout)
         except queue.Empty:
-            return None
+            return None, None
 
     @property
     def is_running(self) -> bool:
@@ -0,0 +1,344 @@
+"""
+音声デコードモジュール
+PyAV（faster-whisper の依存で導入済み）で mp3 / wav のバイト列を PCM にデコードする
+
+  - AudioClip: メモリ上の音声（符号化済みバイト列 or float32 のサンプル配列）
+  - StreamDecoder: 届いた分のバイト列から順次デコードする（ストリーミング再生用）
+  - decode_bytes: バイト列全体を一括でデコードする
+  - decode_clip: AudioClip を再生形式の PCM に変換する（wav / ndarray は PyAV なしで処理）
+
+出力は再生側（pygame.mixer）の形式に合わせて int16 インターリーブ・指定のサンプルレートに変換する。
+"""
+
+import io
+import queue
+import threading
+import time
+import wave
+from importlib.util import find_spec
+
+import numpy as np
+
+# PyAV は最初にデコードするときに読み込む（読み込みに時間がかかるので、起動時には読まない）
+_av = None
+
+
+# edge-tts の出力形式（audio-24khz-48kbitrate-mono-mp3）の1秒あたりのバイト数
+MP3_BYTES_PER_SECOND = 48000 / 8
+
+
+def estimate_speech_seconds(text: str) -> float:
+    """テキストを読み上げたときのおおよその秒数（合成前の見積もり用）"""
+    cjk = sum(1 for c in text if "　" <= c <= "鿿" or "＀" <= c <= "￯")
+    return cjk * 0.14 + (len(text) - cjk) * 0.065
+
+
+def _import_av():
+    """PyAV を読み込む（2回目からは読み込み済みのものを返す）"""
+    global _av
+    if _av is None:
+        try:
+            import av
+        except ImportError:
+            raise ImportError("PyAV が必要です: pip install av") from None
+        _av = av
+    return _av
+
+
+def is_available() -> bool:
+    """PyAV が使えるか（読み込まずに確かめる。なければストリーミング再生は使わず、ファイル再生にフォールバック）"""
+    return _av is not None or find_spec("av") is not None
+
+
+class AudioClip:
+    """
+    メモリ上の音声1つ分（TTS → AudioPlayer の受け渡し用。一時ファイルを使わない）
+
+    data + codec（"mp3" / "wav"）か、samples（float32, -1.0〜1.0）+ sample_rate のどちらかを持つ。
+    """
+
+    def __init__(self, data: bytes = None, codec: str = "mp3", samples: np.ndarray = None,
+                 sample_rate: int = None, text: str = ""):
+        if data is None and samples is None:
+            raise ValueError("data か samples のどちらかが必要です")
+        if samples is not None and not sample_rate:
+            raise ValueError("samples には sample_rate が必要です")
+        self.data = data
+        self.codec = codec
+        self.samples = samples
+        self.sample_rate = sample_rate
+        self.text = text
+
+    @classmethod
+    def from_samples(cls, samples: np.ndarray, sample_rate: int, text: str = "") -> "AudioClip":
+        return cls(samples=np.asarray(samples, dtype=np.float32), sample_rate=sample_rate, text=text)
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.data) if self.data is not None else self.samples.nbytes
+
+    @property
+    def duration(self) -> float:
+        """再生時間（秒）。mp3 はビットレートからの推定値"""
+        if self.samples is not None:
+            return len(self.samples) / self.sample_rate
+        if self.codec == "wav":
+            try:
+                with wave.open(io.BytesIO(self.data), "rb") as wf:
+                    return wf.getnframes() / wf.getframerate()
+            except (wave.Error, EOFError):
+                return 0.0
+        return len(self.data) / MP3_BYTES_PER_SECOND
+
+
+class AudioStream:
+    """
+    符号化された音声（mp3 など）をチャンク単位で受け渡すストリーム（スレッドセーフ）
+
+    生成側（TTS）が put() / close() し、再生側が for chunk in stream で受け取る。
+    """
+
+    def __init__(self, codec: str = "mp3", text: str = ""):
+        self.codec = codec
+        self.text = text
+        self.created_at = time.monotonic()  # 合成開始時刻（初回音声までの時間の基準）
+        self.first_chunk_at = None  # 最初のチャンクが届いた時刻
+        self.error = None
+        self._queue: queue.Queue = queue.Queue()
+        self._first_chunk = threading.Event()
+        self._cancelled = False
+        self._closed = False
+        self._received = 0
+
+    def put(self, data: bytes):
+        if data and not self._cancelled:
+            if self.first_chunk_at is None:
+                self.first_chunk_at = time.monotonic()
+                self._first_chunk.set()
+            self._received += len(data)
+            self._queue.put(data)
+
+    @property
+    def duration(self) -> float:
+        """再生時間の見積もり（秒）。合成完了後は受信バイト数から、それまではテキストから"""
+        received = self._received / MP3_BYTES_PER_SECOND
+        if self._closed:
+            return received
+        return max(received, estimate_speech_seconds(self.text))
+
+    def close(self, error: Exception = None):
+        """生成完了（error があれば失敗として終了）"""
+        self.error = error
+        self._closed = True
+        self._first_chunk.set()
+        self._queue.put(None)
+
+    def wait_first_chunk(self, timeout: float = None) -> float | None:
+        """最初のチャンクが届くまで待ち、合成開始からの秒数を返す（届かなければ None）"""
+        self._first_chunk.wait(timeout)
+        if self.first_chunk_at is None:
+            return None
+        return self.first_chunk_at - self.created_at
+
+    def cancel(self):
+        """再生側が不要になったことを通知（以降の put は捨てる）"""
+        self._cancelled = True
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def __iter__(self):
+        while True:
+            data = self._queue.get()
+            if data is None:
+                return
+            yield data
+
+
+def _strip_id3(data: bytes) -> bytes:
+    """先頭の ID3v2 タグを取り除く（パーサーが不正データとして扱うため）"""
+    if len(data) < 10 or not data.startswith(b"ID3"):
+        return data
+    size = 0
+    for b in data[6:10]:
+        size = (size << 7) | (b & 0x7F)
+    return data[10 + size:]
+
+
+class StreamDecoder:
+    """届いた順にバイト列を受け取り、デコード済みの PCM を返す"""
+
+    def __init__(self, codec: str = "mp3", sample_rate: int = 24000, channels: int = 2):
+        """
+        Args:
+            codec: 入力のコーデック名（edge-tts は "mp3"）
+            sample_rate: 出力サンプルレート
+            channels: 出力チャンネル数（1 or 2）
+        """
+        av = _import_av()
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self._codec = av.CodecContext.create(codec, "r")
+        self._resampler = av.AudioResampler(
+            format="s16",
+            layout="stereo" if channels == 2 else "mono",
+            rate=sample_rate,
+        )
+        self._errors = av.error
+        self._head = b""  # ID3 判定用に先頭を溜める
+        self._started = False
+        self.errors = 0
+
+    def feed(self, data: bytes) -> np.ndarray:
+        """
+        バイト列を追加し、新たにデコードできた PCM を返す
+
+        Returns:
+            int16 のインターリーブ配列（まだフレームが揃っていなければ空）
+        """
+        if not self._started:
+            self._head += data
+            if len(self._head) < 10:
+                return np.zeros(0, dtype=np.int16)
+            data = _strip_id3(self._head)
+            if self._head.startswith(b"ID3") and not data and len(self._head) < 10 + 1024 * 1024:
+                return np.zeros(0, dtype=np.int16)  # タグの途中
+            self._head = b""
+            self._started = True
+        return self._decode_packets(self._codec.parse(data))
+
+    def flush(self) -> np.ndarray:
+        """残りをすべてデコードして返す"""
+        if not self._started and self._head:
+            self._started = True
+            pcm = self._decode_packets(self._codec.parse(_strip_id3(self._head)))
+        else:
+            pcm = np.zeros(0, dtype=np.int16)
+        parts = [pcm, self._decode_packets(self._codec.parse(b"")), self._decode(None)]
+        for frame in self._resampler.resample(None):
+            parts.append(frame.to_ndarray().reshape(-1))
+        return np.concatenate(parts)
+
+    def _decode_packets(self, packets) -> np.ndarray:
+        parts = [self._decode(packet) for packet in packets]
+        if not parts:
+            return np.zeros(0, dtype=np.int16)
+        return np.concatenate(parts)
+
+    def _decode(self, packet) -> np.ndarray:
+        parts = []
+        try:
+            for frame in self._codec.decode(packet):
+                for out in self._resampler.resample(frame):
+                    parts.append(out.to_ndarray().reshape(-1))
+        except self._errors.InvalidDataError:
+            self.errors += 1  # 壊れたフレームは読み飛ばす
+        except self._errors.EOFError:
+            pass
+        if not parts:
+            return np.zeros(0, dtype=np.int16)
+        return np.concatenate(parts)
+
+
+def decode_bytes(data: bytes, codec: str = "mp3", sample_rate: int = 24000, channels: int = 2) -> np.ndarray:
+    """バイト列全体を int16 インターリーブの PCM にデコードする"""
+    decoder = StreamDecoder(codec=codec, sample_rate=sample_rate, channels=channels)
+    return np.concatenate([decoder.feed(data), decoder.flush()])
+
+
+def _read_wav(data: bytes) -> tuple[np.ndarray, int]:
+    """wav のバイト列を float32（モノラル化済み）とサンプルレートにする"""
+    with wave.open(io.BytesIO(data), "rb") as wf:
+        sample_rate = wf.getframerate()
+        channels = wf.getnchannels()
+        width = wf.getsampwidth()
+        frames = wf.readframes(wf.getnframes())
+    if width == 2:
+        samples = np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32768.0
+    elif width == 4:
+        samples = np.frombuffer(frames, dtype=np.int32).astype(np.float32) / 2147483648.0
+    elif width == 1:
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    else:
+        raise ValueError(f"非対応の wav 形式: {width * 8}bit")
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples, sample_rate
+
+
+def to_pcm16(samples: np.ndarray, sample_rate: int, target_rate: int, channels: int = 2) -> np.ndarray:
+    """float32 モノラルを target_rate に線形補間でリサンプルし、int16 インターリーブにする"""
+    samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+    if sample_rate != target_rate and len(samples):
+        n_out = int(round(len(samples) * target_rate / sample_rate))
+        positions = np.arange(n_out, dtype=np.float64) * (sample_rate / target_rate)
+        samples = np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767.0).astype(np.int16)
+    if channels > 1:
+        pcm = np.repeat(pcm, channels)
+    return pcm
+
+
+def decode_clip(clip: AudioClip, sample_rate: int = 24000, channels: int = 2) -> np.ndarray:
+    """AudioClip を int16 インターリーブの PCM に変換する"""
+    if clip.samples is not None:
+        return to_pcm16(clip.samples, clip.sample_rate, sample_rate, channels)
+    if clip.codec == "wav":
+        samples, source_rate = _read_wav(clip.data)
+        return to_pcm16(samples, source_rate, sample_rate, channels)
+    return decode_bytes(clip.data, codec=clip.codec, sample_rate=sample_rate, channels=channels)
+
+
+def time_stretch(pcm: np.ndarray, factor: float, sample_rate: int = 24000, channels: int = 2,
+                 frame_seconds: float = 0.02) -> np.ndarray:
+    """
+    WSOLA で音程を変えずに再生速度を変える（factor > 1 で速く・短くなる）
+
+    フレームごとに、前フレームの自然な続きと最も波形が揃う位置を ±1/4 フレームの範囲で探し、
+    Hann 窓で重ね合わせる。探索（相互相関）と重ね合わせは numpy でまとめて計算する。
+
+    Args:
+        pcm: int16 インターリーブ（channels 本）
+        factor: 速度倍率（1.0 ならそのまま返す）
+
+    Returns:
+        int16 インターリーブの PCM（長さはおよそ 1/factor）
+    """
+    if abs(factor - 1.0) < 1e-3 or not len(pcm):
+        return pcm
+    frames = pcm.reshape(-1, channels).astype(np.float32)
+    size = max(16, int(sample_rate * frame_seconds)) & ~1
+    hop_out = size // 2
+    hop_in = hop_out * factor
+    tol = size // 4
+    if len(frames) < size * 2:
+        return pcm  # 短すぎる音声は伸縮しない
+
+    mono = frames.mean(axis=1)
+    padded = np.concatenate([np.zeros(tol, np.float32), mono, np.zeros(size + tol, np.float32)])
+    count = int((len(mono) - size) / hop_in) + 1
+    window = np.hanning(size + 1)[:size].astype(np.float32)  # 50% 重なりで和が1になる周期 Hann
+
+    # 各フレームの読み出し位置（元音声上）を決める
+    positions = np.zeros(count, dtype=np.int64)
+    for k in range(1, count):
+        natural = positions[k - 1] + hop_out  # 前フレームの自然な続き
+        template = padded[natural + tol:natural + tol + size]
+        nominal = int(round(k * hop_in))
+        region = padded[nominal:nominal + size + 2 * tol]
+        candidates = np.lib.stride_tricks.sliding_window_view(region, size)
+        best = int(np.argmax(candidates @ template))
+        positions[k] = min(max(nominal + best - tol, 0), len(mono) - 1)
+
+    # 重ね合わせ（窓の和で割って音量を一定に保つ）
+    index = np.minimum(positions[:, None] + np.arange(size), len(frames) - 1)
+    grains = frames[index] * window[None, :, None]
+    out_len = (count - 1) * hop_out + size
+    out_index = (np.arange(count)[:, None] * hop_out + np.arange(size)).reshape(-1)
+    out = np.zeros((out_len, channels), dtype=np.float32)
+    np.add.at(out, out_index, grains.reshape(-1, channels))
+    weight = np.zeros(out_len, dtype=np.float32)
+    np.add.at(weight, out_index, np.tile(window, count))
+    out /= np.maximum(weight, 1e-3)[:, None]
+    return np.clip(out, -32768, 32767).astype(np.int16).reshape(-1)
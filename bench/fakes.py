@@ -0,0 +1,481 @@
+"""
+ベンチマーク用の偽バックエンド
+ネットワークに接続せずに VoiceBridge を動かすための代役（遅延とゆらぎを指定できる）
+
+  - FakeGoogle: Google Translate / MyMemory の代わり（translate(text)）
+  - FakeCommunicate: edge_tts.Communicate の代わり（mp3 のチャンクを少しずつ返す）
+  - FakeVoicevoxServer: VOICEVOX エンジンの代わり（/audio_query と /synthesis を持つ HTTP サーバー）
+  - FakeOpenAIServer: OpenAI 互換 API の代わり（/v1/chat/completions。ストリーミング対応）
+  - FakeTranscriber: ASR の代わり（コーパスの書き起こしを返し、音声の長さ × rtf 秒かかる）
+  - ReplayCapture: AudioCapture の代わり（WAV コーパスを実時間の speed 倍で流す）
+  - FakeBatchTranscriber: まとめて認識する ASR の代わり（実際に CPU を使う。サーバーモードの負荷試験用）
+"""
+
+import asyncio
+import io
+import json
+import os
+import queue
+import random
+import threading
+import time
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+try:
+    import av
+except ImportError:
+    av = None
+
+ASR_SAMPLE_RATE = 16000
+
+
+class Latency:
+    """遅延の分布: base ± jitter 秒（一様分布、0 未満にはしない）"""
+
+    def __init__(self, base: float, jitter: float = 0.0, seed: int = 0):
+        self.base = base
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        with self._lock:
+            return max(0.0, self.base + self._rng.uniform(-self.jitter, self.jitter))
+
+    def sleep(self):
+        time.sleep(self.sample())
+
+
+# ── 翻訳 ─────────────────────────────────────────
+
+
+class FakeGoogle:
+    """translate(text) を持つ翻訳エンジンの代役（"訳:" を付けて返す）"""
+
+    def __init__(self, latency: Latency, prefix: str = "訳:"):
+        self.latency = latency
+        self.prefix = prefix
+        self.calls = 0
+
+    def translate(self, text: str) -> str:
+        self.calls += 1
+        self.latency.sleep()
+        return f"{self.prefix}{text}"
+
+
+# ── 音声合成 ─────────────────────────────────────
+
+
+class SilentMp3:
+    """読み上げ時間ぶんの mp3（無音）。長さごとにキャッシュする"""
+
+    CHARS_PER_SECOND = 8.0
+
+    def __init__(self, sample_rate: int = 24000):
+        if av is None:
+            raise ImportError("偽の音声合成には PyAV が必要です: pip install av")
+        self.sample_rate = sample_rate
+        self._cache: dict[int, bytes] = {}
+        self._lock = threading.Lock()
+
+    def for_text(self, text: str) -> bytes:
+        tenths = max(2, int(len(text) / self.CHARS_PER_SECOND * 10))  # 0.1 秒単位
+        with self._lock:
+            data = self._cache.get(tenths)
+            if data is None:
+                data = self._cache[tenths] = self._encode(tenths / 10)
+        return data
+
+    def _encode(self, seconds: float) -> bytes:
+        encoder = av.CodecContext.create("libmp3lame", "w")
+        encoder.sample_rate = self.sample_rate
+        encoder.layout = "mono"
+        encoder.format = "s16p"
+        samples = np.zeros(int(seconds * self.sample_rate), dtype=np.int16)
+        data = b""
+        for i in range(0, len(samples), 1152):
+            frame = av.AudioFrame.from_ndarray(samples[None, i:i + 1152], format="s16p", layout="mono")
+            frame.sample_rate = self.sample_rate
+            data += b"".join(bytes(p) for p in encoder.encode(frame))
+        data += b"".join(bytes(p) for p in encoder.encode(None))
+        return data
+
+
+class FakeCommunicate:
+    """
+    edge_tts.Communicate の代役（install() で差し替える）
+
+    最初のチャンクまで latency、以降は chunk_interval ごとに mp3 を chunks 分割で返す。
+    """
+
+    latency = Latency(0.3)
+    chunk_interval = 0.02
+    chunks = 4
+    mp3 = None
+    calls = 0
+
+    def __init__(self, text: str, voice: str, rate: str = "+0%", volume: str = "+0%"):
+        self.text = text
+
+    @classmethod
+    def install(cls, latency: Latency, sample_rate: int = 24000):
+        import edge_tts
+        cls.latency = latency
+        cls.mp3 = SilentMp3(sample_rate)
+        edge_tts.Communicate = cls
+
+    async def stream(self):
+        type(self).calls += 1
+        data = self.mp3.for_text(self.text)
+        await asyncio.sleep(self.latency.sample())
+        size = -(-len(data) // self.chunks)
+        for i in range(0, len(data), size):
+            if i:
+                await asyncio.sleep(self.chunk_interval)
+            yield {"type": "audio", "data": data[i:i + size]}
+
+
+class _Server:
+    """ThreadingHTTPServer をバックグラウンドで動かす"""
+
+    def __init__(self, handler):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class FakeVoicevoxServer(_Server):
+    """VOICEVOX エンジンの代役（/version /speakers /audio_query /synthesis）"""
+
+    def __init__(self, latency: Latency, sample_rate: int = 24000):
+        self.latency = latency
+        self.calls = 0
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def reply(self, data: bytes, content_type: str = "application/json"):
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path.startswith("/speakers"):
+                    self.reply(json.dumps([{"name": "ベンチ", "styles": [{"name": "ノーマル", "id": 3}]}]).encode())
+                else:
+                    self.reply(b'"0.0.0-bench"')
+
+            def do_POST(self):
+                from urllib.parse import parse_qs, urlparse
+                url = urlparse(self.path)
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if url.path == "/audio_query":
+                    text = parse_qs(url.query)["text"][0]
+                    self.reply(json.dumps({"text": text, "speedScale": 1.0}).encode())
+                    return
+                fake.calls += 1
+                fake.latency.sleep()
+                text = json.loads(body).get("text", "")
+                self.reply(fake.wav(text, sample_rate), "audio/wav")
+
+        super().__init__(Handler)
+
+    @staticmethod
+    def wav(text: str, sample_rate: int) -> bytes:
+        seconds = max(0.2, len(text) / SilentMp3.CHARS_PER_SECOND)
+        buf = io.BytesIO()
+        with wave.open(buf, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(sample_rate)
+            wf.writeframes(b"\x00\x00" * int(seconds * sample_rate))
+        return buf.getvalue()
+
+    @property
+    def host(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+
+class FakeOpenAIServer(_Server):
+    """
+    OpenAI 互換 API の代役（/v1/chat/completions）
+
+    最後の user メッセージが番号付きの行（LLM 翻訳）なら行ごとに "訳:" を付けて、
+    それ以外（AI チャット）は短い応答を返す。最初のトークンまで latency、以降は1行ごとに line_delay。
+    """
+
+    def __init__(self, latency: Latency, line_delay: float = 0.05):
+        self.latency = latency
+        self.line_delay = line_delay
+        self.calls = 0
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def write_chunk(self, data: bytes):
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                fake.calls += 1
+                lines = fake.answer(body["messages"][-1]["content"])
+                fake.latency.sleep()
+                if not body.get("stream"):
+                    data = json.dumps({"choices": [{"message": {"content": "\n".join(lines)}}]}).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for i, line in enumerate(lines):
+                    if i:
+                        time.sleep(fake.line_delay)
+                    chunk = {"choices": [{"delta": {"content": line + "\n"}}]}
+                    self.write_chunk(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode())
+                self.write_chunk(b"data: [DONE]\n\n")
+                self.write_chunk(b"")
+
+        super().__init__(Handler)
+
+    @staticmethod
+    def answer(content: str) -> list[str]:
+        lines = content.splitlines()
+        numbered = [line.split(". ", 1) for line in lines]
+        if lines and all(len(parts) == 2 and parts[0].isdigit() for parts in numbered):
+            return [f"{number}. 訳:{text}" for number, text in numbered]
+        return [f"了解しました。{content[:40]}"]
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/v1"
+
+
+# ── 音声認識・キャプチャ ──────────────────────────────
+
+
+class Utterance:
+    """コーパスの1ファイル（16 kHz モノラルの音声と書き起こし）"""
+
+    def __init__(self, audio: np.ndarray, text: str, name: str = ""):
+        self.audio = audio
+        self.text = text
+        self.name = name
+
+    @property
+    def seconds(self) -> float:
+        return len(self.audio) / ASR_SAMPLE_RATE
+
+
+def load_corpus(path: str) -> list[Utterance]:
+    """
+    WAV コーパスを読み込む（フォルダなら中の *.wav を名前順に）
+
+    同名の .txt があれば書き起こしとして使う（偽の ASR が返す）。16 kHz モノラルに変換する。
+    """
+    if os.path.isdir(path):
+        files = sorted(os.path.join(path, f) for f in os.listdir(path) if f.lower().endswith(".wav"))
+    else:
+        files = [path]
+    corpus = []
+    for file in files:
+        with wave.open(file, "rb") as wf:
+            rate, channels, width = wf.getframerate(), wf.getnchannels(), wf.getsampwidth()
+            raw = wf.readframes(wf.getnframes())
+        if width != 2:
+            raise ValueError(f"16bit の WAV のみ対応: {file}")
+        audio = np.frombuffer(raw, dtype=np.int16).reshape(-1, channels).mean(axis=1) / 32768.0
+        if rate != ASR_SAMPLE_RATE:
+            n = int(len(audio) * ASR_SAMPLE_RATE / rate)
+            audio = np.interp(np.linspace(0, len(audio) - 1, n), np.arange(len(audio)), audio)
+        text = ""
+        transcript = os.path.splitext(file)[0] + ".txt"
+        if os.path.exists(transcript):
+            with open(transcript, encoding="utf-8") as f:
+                text = f.read().strip()
+        corpus.append(Utterance(audio.astype(np.float32), text, os.path.basename(file)))
+    return corpus
+
+
+def synthetic_corpus(seconds: float, seed: int = 0, words_per_second: float = 2.5) -> list[Utterance]:
+    """音声ファイルがないとき用の合成コーパス（ノイズ + 決まった文の書き起こし。偽の ASR 専用）"""
+    rng = np.random.default_rng(seed)
+    topics = ["the weather", "our next release", "the build server", "machine learning", "the quarterly report"]
+    corpus = []
+    total = 0.0
+    index = 0
+    while total < seconds:
+        words = []
+        for _ in range(rng.integers(2, 5)):
+            index += 1
+            words += f"Sentence number {index} is about {topics[index % len(topics)]} today.".split()
+        duration = len(words) / words_per_second
+        audio = (0.1 * rng.standard_normal(int(duration * ASR_SAMPLE_RATE))).astype(np.float32)
+        corpus.append(Utterance(audio, " ".join(words), f"synthetic-{len(corpus)}"))
+        total += duration
+    return corpus
+
+
+class ReplayCapture:
+    """
+    AudioCapture の代役: コーパスを chunk_duration 秒のチャンクに分け、実時間の speed 倍で流す
+
+    各チャンクの書き起こし（ファイルの書き起こしを時間で按分した単語）を transcript_for() で返す。
+    """
+
+    def __init__(self, corpus: list[Utterance], chunk_duration: float = 4.0, speed: float = 4.0):
+        self.sample_rate = ASR_SAMPLE_RATE
+        self.chunk_duration = chunk_duration
+        self.chunk_samples = int(ASR_SAMPLE_RATE * chunk_duration)
+        self.speed = speed
+        self.audio_queue: queue.Queue = queue.Queue()
+        self.on_level = None
+        self.done = threading.Event()
+        self.chunks = 0
+        self.audio_seconds = 0.0
+        self._corpus = corpus
+        self._transcripts: dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._replay, daemon=True, name="replay-capture")
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self.done.set()
+
+    def _replay(self):
+        t_next = time.monotonic()
+        for utterance in self._corpus:
+            words = utterance.text.split()
+            n = len(utterance.audio)
+            for start in range(0, n, self.chunk_samples):
+                if not self._running:
+                    return
+                chunk = utterance.audio[start:start + self.chunk_samples]
+                t_next += len(chunk) / ASR_SAMPLE_RATE / self.speed
+                time.sleep(max(0.0, t_next - time.monotonic()))
+                w0, w1 = len(words) * start // n, len(words) * min(n, start + self.chunk_samples) // n
+                with self._lock:
+                    self._transcripts[id(chunk)] = " ".join(words[w0:w1])
+                self.chunks += 1
+                self.audio_seconds += len(chunk) / ASR_SAMPLE_RATE
+                self.audio_queue.put((chunk, time.perf_counter_ns()))
+        self.done.set()
+
+    def transcript_for(self, chunk: np.ndarray) -> str:
+        with self._lock:
+            return self._transcripts.pop(id(chunk), "")
+
+    def get_chunk(self, timeout: float = 1.0) -> np.ndarray | None:
+        chunk, _ = self.get_chunk_timed(timeout)
+        return chunk
+
+    def get_chunk_timed(self, timeout: float = 1.0):
+        try:
+            return self.audio_queue.get(timeout=timeout)
+        except queue.Empty:
+            return None, None
+
+    @property
+    def is_running(self) -> bool:
+        return self._running
+
+
+class FakeTranscriber:
+    """ASR の代役: ReplayCapture の書き起こしを返す（音声の長さ × rtf 秒かかる。モデルの読み込みは load_seconds 秒）"""
+
+    def __init__(self, capture: ReplayCapture, rtf: float = 0.1, load_seconds: float = 0.0):
+        self.capture = capture
+        self.rtf = rtf
+        self.load_seconds = load_seconds
+        self._loaded = False
+
+    def load_model(self):
+        if not self._loaded:
+            time.sleep(self.load_seconds)
+            self._loaded = True
+
+    def with_language(self, language: str):
+        return self  # 書き起こしは言語によらない
+
+    def release(self):
+        pass
+
+    def transcribe(self, audio: np.ndarray) -> str:
+        time.sleep(len(audio) / ASR_SAMPLE_RATE * self.rtf)
+        return self.capture.transcript_for(audio)
+
+
+class FakeBatchTranscriber:
+    """
+    まとめて認識する ASR の代役: 1回の認識に base + 音声の秒数 × per_second 秒の CPU を使う
+
+    まとめた分だけ1件あたりの費用が下がる（base はまとめても1回分）。どの音声にも決まった文を1つ返す。
+    """
+
+    def __init__(self, base: float = 0.05, per_second: float = 0.01, language: str = "en"):
+        self.base = base
+        self.per_second = per_second
+        self.language = language
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def load_model(self):
+        pass
+
+    def with_language(self, language: str):
+        return self
+
+    def release(self):
+        pass
+
+    def transcribe(self, audio: np.ndarray) -> str:
+        return self.transcribe_batch([audio])[0]
+
+    def transcribe_batch(self, audios: list) -> list[str]:
+        seconds = sum(len(audio) for audio in audios) / ASR_SAMPLE_RATE
+        _burn_cpu(self.base + seconds * self.per_second)
+        texts = []
+        with self._lock:
+            for _ in audios:
+                self._count += 1
+                texts.append(f"Sentence number {self._count} is about the build server today.")
+        return texts
+
+
+def _burn_cpu(seconds: float):
+    """このスレッドの CPU 時間で seconds 秒ぶん計算する（GIL を放す numpy の行列積）"""
+    a = np.random.default_rng(0).standard_normal((96, 96)).astype(np.float32)
+    t_end = time.thread_time() + seconds
+    while time.thread_time() < t_end:
+        a = np.tanh(a @ a)
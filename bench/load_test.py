@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+サーバーモードの負荷試験
+同時セッション数を 1, 2, 4, ... と増やしながら、各セッションから PCM を実時間で送り、
+最初の音声が返るまでの遅延（クライアント側で測る）がレイテンシ SLO を満たす最大のセッション数と、
+CPU 1コアあたりのセッション数を報告する
+
+遅延は「結果のもとになった音声の末尾（audio_end）を送った時刻」から「その文の最初の音声を受け取った時刻」まで。
+チャンクが揃うまでの待ちは含まない（チャンク長は --chunk）。
+
+使い方:
+  python bench/load_test.py                              # 偽バックエンドのサーバーをこのプロセスで起動して測る
+  python bench/load_test.py --url ws://127.0.0.1:8765/ws  # 起動済みのサーバー（python main.py --serve）を測る
+  python bench/load_test.py --slo 2.5 --max-sessions 64 --out load.json
+
+偽バックエンドでは ASR が実際に CPU を使い（--asr-base / --asr-per-second）、翻訳・音声合成は遅延だけの代役。
+--url のときの CPU 数はサーバーが ready で知らせる値を使う。
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from latency_trace import percentile  # noqa: E402
+from fakes import FakeBatchTranscriber, FakeCommunicate, FakeGoogle, Latency  # noqa: E402
+
+try:
+    import aiohttp
+except ImportError:
+    raise SystemExit("aiohttp が必要です: pip install aiohttp")
+
+FRAME_SECONDS = 0.1  # 1回に送る PCM の長さ
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Voice Bridge サーバーモードの負荷試験")
+    parser.add_argument("--url", default=None, help="測るサーバー（省略時は偽バックエンドのサーバーを起動）")
+    parser.add_argument("--source", default="en")
+    parser.add_argument("--target", default="ja")
+    parser.add_argument("--sample-rate", type=int, default=16000, help="送る PCM のサンプルレート")
+    parser.add_argument("--seconds", type=float, default=20.0, help="1段あたり各セッションが送る音声の秒数")
+    parser.add_argument("--slo", type=float, default=3.0, help="最初の音声までの遅延の p95 の上限（秒）")
+    parser.add_argument("--max-sessions", type=int, default=64, help="増やすセッション数の上限")
+    parser.add_argument("--chunk", type=float, default=4.0, help="偽サーバーのチャンク長（秒）")
+    parser.add_argument("--max-batch", type=int, default=8, help="偽サーバーの ASR のまとめる上限")
+    parser.add_argument("--batch-wait", type=float, default=0.02)
+    parser.add_argument("--asr-workers", type=int, default=1)
+    parser.add_argument("--asr-base", type=float, default=0.15, help="偽 ASR の1回あたりの CPU 秒")
+    parser.add_argument("--asr-per-second", type=float, default=0.02, help="偽 ASR の音声1秒あたりの CPU 秒")
+    parser.add_argument("--translate-latency", type=float, default=0.25)
+    parser.add_argument("--tts-latency", type=float, default=0.35)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="結果の JSON の保存先")
+    parser.add_argument("--verbose", action="store_true", help="サーバーのログも表示する")
+    return parser.parse_args(argv)
+
+
+class FakeServer:
+    """偽バックエンドの BridgeServer を別スレッドのイベントループで動かす"""
+
+    def __init__(self, args):
+        from session_server import BridgeServer, SharedEngines
+
+        class FakeEngines(SharedEngines):
+            def _new_transcriber(self, language):
+                return FakeBatchTranscriber(base=args.asr_base, per_second=args.asr_per_second, language=language)
+
+            def _new_translator(self, source, target):
+                from translator import Translator
+                translator = Translator(source=source, target=target, log_dir=os.path.join(self.workdir, "logs"))
+                translator.set_engine("google", self.google)
+                translator.set_engine("mymemory", self.google)
+                return translator
+
+        FakeCommunicate.install(Latency(args.tts_latency, args.tts_latency * 0.3, seed=args.seed))
+        engines = FakeEngines(translation_memory=False, max_batch=args.max_batch, batch_wait=args.batch_wait,
+                              asr_workers=args.asr_workers, translate_workers=32)
+        engines.workdir = tempfile.mkdtemp(prefix="voice_bridge_load_")
+        engines.google = FakeGoogle(Latency(args.translate_latency, args.translate_latency * 0.3, seed=args.seed))
+        self.engines = engines
+        self.server = BridgeServer(engines, chunk_duration=args.chunk)
+        self._loop = asyncio.new_event_loop()
+        self._started = threading.Event()
+        self.port = None
+        threading.Thread(target=self._serve, name="load-test-server", daemon=True).start()
+        if not self._started.wait(10.0):
+            raise RuntimeError("偽サーバーが起動しません")
+
+    def _serve(self):
+        from aiohttp import web
+
+        asyncio.set_event_loop(self._loop)
+        self._runner = web.AppRunner(self.server.app())
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        self._loop.run_until_complete(site.start())
+        self.port = site._server.sockets[0].getsockname()[1]
+        self._started.set()
+        self._loop.run_forever()
+
+    @property
+    def url(self) -> str:
+        return f"ws://127.0.0.1:{self.port}/ws"
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(10.0)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self.engines.close()
+
+
+async def run_session(http, url: str, args, rng: np.random.Generator) -> dict:
+    """1セッション: PCM を実時間で送り、最初の音声ごとの遅延を集める"""
+    query = f"?source={args.source}&target={args.target}&sample_rate={args.sample_rate}"
+    frame = int(args.sample_rate * FRAME_SECONDS)
+    total = int(args.sample_rate * args.seconds)
+    sent_at = {}  # 送ったサンプル数 → 送った時刻
+    latencies, server_latencies = [], []
+    seen_segments = set()
+    ready = {}
+    async with http.ws_connect(url + query, max_msg_size=16 * 1024 * 1024) as ws:
+        receiver = asyncio.get_running_loop().create_task(
+            _receive(ws, sent_at, latencies, server_latencies, seen_segments, ready))
+        t_next = time.monotonic()
+        sent = 0
+        while sent < total:
+            samples = (0.1 * rng.standard_normal(frame) * 32767).astype("<i2")
+            await ws.send_bytes(samples.tobytes())
+            sent += frame
+            sent_at[sent] = time.monotonic()
+            t_next += FRAME_SECONDS
+            await asyncio.sleep(max(0.0, t_next - time.monotonic()))
+        await ws.send_json({"type": "end"})
+        await receiver
+    return {"latencies": latencies, "server_latencies": server_latencies, "ready": ready}
+
+
+async def _receive(ws, sent_at, latencies, server_latencies, seen_segments, ready):
+    async for message in ws:
+        if message.type != aiohttp.WSMsgType.TEXT:
+            continue
+        data = message.json()
+        kind = data.get("type")
+        if kind == "ready":
+            ready.update(data)
+        elif kind == "audio" and data["segment"] not in seen_segments:
+            seen_segments.add(data["segment"])
+            t_sent = _sent_time(sent_at, data["audio_end"])
+            if t_sent is not None:
+                latencies.append(time.monotonic() - t_sent)
+            server_latencies.append(data["latency"])
+        elif kind in ("done", "error"):
+            break
+
+
+def _sent_time(sent_at: dict, audio_end: int) -> float | None:
+    """audio_end サンプル目までを送り終えた時刻（フレームの切れ目に合わないときはその後のフレーム）"""
+    if audio_end in sent_at:
+        return sent_at[audio_end]
+    later = [n for n in sent_at if n >= audio_end]
+    return sent_at[min(later)] if later else None
+
+
+async def run_step(url: str, sessions: int, args) -> dict:
+    """sessions 個のセッションを同時に流して、遅延を集計する"""
+    async with aiohttp.ClientSession() as http:
+        results = await asyncio.gather(
+            *(run_session(http, url, args, np.random.default_rng(args.seed + i)) for i in range(sessions)),
+            return_exceptions=True)
+    errors = [r for r in results if isinstance(r, Exception)]
+    ok = [r for r in results if not isinstance(r, Exception)]
+    latencies = sorted(v for r in ok for v in r["latencies"])
+    server = sorted(v for r in ok for v in r["server_latencies"])
+    cpu_count = next((r["ready"].get("cpu_count") for r in ok if r["ready"].get("cpu_count")), None)
+    return {
+        "sessions": sessions,
+        "errors": len(errors),
+        "count": len(latencies),
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "server_p95": percentile(server, 95),
+        "cpu_count": cpu_count,
+        "error_messages": sorted({f"{type(e).__name__}: {e}" for e in errors}),
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    fake = None
+    log = io.StringIO()
+    with contextlib.ExitStack() as stack:
+        if not args.verbose:
+            stack.enter_context(contextlib.redirect_stdout(log))
+        if args.url is None:
+            fake = FakeServer(args)
+        url = args.url or fake.url
+
+        steps = []
+        sessions = 1
+        best = 0
+        while sessions <= args.max_sessions:
+            before = fake.engines.asr.stats() if fake else None
+            step = asyncio.run(run_step(url, sessions, args))
+            if fake:
+                after = fake.engines.asr.stats()
+                batches, items = after["batches"] - before["batches"], after["items"] - before["items"]
+                step["asr"] = {"batches": batches, "items": items, "mean_batch": items / batches if batches else 0.0}
+            steps.append(step)
+            met = step["errors"] == 0 and step["count"] > 0 and step["p95"] <= args.slo
+            print(f"sessions={sessions:3d}  p50={step['p50']:.2f}s  p95={step['p95']:.2f}s  "
+                  f"({step['count']}件, エラー {step['errors']})  {'OK' if met else 'NG'}", file=sys.stderr)
+            if not met:
+                break
+            best = sessions
+            sessions *= 2
+        if fake:
+            fake.close()
+
+    cpu_count = next((s["cpu_count"] for s in steps if s["cpu_count"]), None) or os.cpu_count()
+    result = {
+        "url": args.url or "fake",
+        "slo_p95": args.slo,
+        "chunk": args.chunk,
+        "cpu_count": cpu_count,
+        "max_sessions": best,
+        "sessions_per_core": best / cpu_count,
+        "steps": steps,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    print(f"p95 ≤ {args.slo:.1f}s を満たす最大セッション数: {best}（{cpu_count} コア, "
+          f"{best / cpu_count:.2f} セッション/コア）", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+オフラインのエンドツーエンド・ベンチマーク
+WAV コーパスを実時間より速く VoiceBridge に流し、翻訳・音声合成は偽バックエンド（bench/fakes.py）で
+置き換えて、再現できる条件でパイプラインの性能を測る（ネットワーク・音声デバイスは使わない）
+
+測るもの（JSON で出力）:
+  - ASR の RTF（認識にかかった秒数 / 音声の秒数）
+  - 段ごとの遅延の p50 / p95 / p99（latency_trace の段。capture_to_audio はチャンクが揃ってから最初の音まで）
+  - スループット（音声の秒数 / 経過時間、チャンク・セグメント数）
+  - CPU 使用率と最大 RSS
+
+使い方:
+  python bench/run_bench.py                              # 合成コーパス 120 秒・偽 ASR
+  python bench/run_bench.py --corpus samples/ --asr whisper --model small
+  python bench/run_bench.py --out base.json               # 結果を保存
+  python bench/run_bench.py --baseline base.json          # 保存した結果と比べて悪化を報告（悪化なら終了コード 1）
+
+注意: キャプチャを speed 倍で流すので、capture 段と total は音声の長さ（実時間）を含む。
+処理の遅延は capture_to_audio を見る。
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from latency_trace import percentile  # noqa: E402
+from fakes import (  # noqa: E402
+    FakeCommunicate, FakeGoogle, FakeOpenAIServer, FakeTranscriber, FakeVoicevoxServer, Latency,
+    ReplayCapture, load_corpus, synthetic_corpus,
+)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# 比較する指標: (パス, 大きいほど悪いか, 無視する差の絶対値)
+COMPARED_METRICS = [
+    ("asr.rtf", True, 0.01),
+    ("latency.capture_to_audio.p50", True, 20.0),
+    ("latency.capture_to_audio.p95", True, 20.0),
+    ("latency.asr.p95", True, 10.0),
+    ("latency.translate.p95", True, 10.0),
+    ("latency.tts.p95", True, 10.0),
+    ("latency.player_queue.p95", True, 10.0),
+    ("throughput.realtime_factor", False, 0.05),
+    ("cpu.utilization", True, 0.05),
+    ("peak_rss_mb", True, 20.0),
+]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Voice Bridge オフライン・ベンチマーク")
+    parser.add_argument("--corpus", default=None, help="WAV ファイル or フォルダ（同名の .txt を書き起こしとして使う）")
+    parser.add_argument("--seconds", type=float, default=120.0, help="合成コーパスの長さ（--corpus なしのとき）")
+    parser.add_argument("--speed", type=float, default=4.0, help="キャプチャを流す速さ（実時間の何倍か）")
+    parser.add_argument("--chunk", type=float, default=4.0, help="チャンク長（秒）")
+    parser.add_argument("--asr", default="fake", choices=["fake", "whisper", "moonshine"],
+                        help="fake は書き起こしを返す代役（--corpus の .txt か合成コーパスの文）")
+    parser.add_argument("--asr-rtf", type=float, default=0.1, help="偽 ASR の RTF")
+    parser.add_argument("--model", default="small", help="ASR のモデルサイズ（whisper / moonshine）")
+    parser.add_argument("--translator", default="google", choices=["google", "llm"])
+    parser.add_argument("--tts", default="edge", choices=["edge", "voicevox"])
+    parser.add_argument("--orchestrator", default="asyncio", choices=["asyncio", "threads"])
+    parser.add_argument("--translate-latency", type=float, default=0.25, help="偽 Google / MyMemory の遅延（秒）")
+    parser.add_argument("--tts-latency", type=float, default=0.35, help="偽 edge-tts / VOICEVOX の最初の音声までの遅延（秒）")
+    parser.add_argument("--llm-latency", type=float, default=0.4, help="偽 OpenAI API の最初のトークンまでの遅延（秒）")
+    parser.add_argument("--jitter", type=float, default=0.3, help="遅延のゆらぎ（遅延に対する割合。±）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--settle", type=float, default=1.5, help="コーパスを流し終えてから処理が落ち着くまで待つ秒数")
+    parser.add_argument("--timeout", type=float, default=120.0, help="流し終えてから待つ最大秒数")
+    parser.add_argument("--out", default=None, help="結果の JSON を保存するファイル")
+    parser.add_argument("--baseline", default=None, help="比べる結果の JSON（悪化があれば終了コード 1）")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="悪化とみなす割合 (default: 0.15 = 15%%)")
+    parser.add_argument("--verbose", action="store_true", help="パイプラインのログを表示する")
+    return parser.parse_args(argv)
+
+
+def _latency(base: float, args) -> Latency:
+    return Latency(base, base * args.jitter, seed=args.seed)
+
+
+def _cpu_seconds() -> tuple[float, float]:
+    if resource is None:
+        times = os.times()
+        return times.user, times.system
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime, usage.ru_stime
+
+
+def _peak_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if platform.system() == "Darwin" else peak / 1024  # macOS はバイト、Linux は KB
+
+
+def _stats_ms(values: list[float]) -> dict:
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50) * 1000,
+        "p95": percentile(values, 95) * 1000,
+        "p99": percentile(values, 99) * 1000,
+    }
+
+
+def run(args) -> dict:
+    """ベンチマークを1回実行して結果を返す"""
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus(args.seconds, seed=args.seed)
+    if args.asr == "fake" and not any(u.text for u in corpus):
+        raise SystemExit("偽 ASR には書き起こし（WAV と同名の .txt）が必要です")
+
+    FakeCommunicate.install(_latency(args.tts_latency, args))
+    google = FakeGoogle(_latency(args.translate_latency, args))
+    openai = FakeOpenAIServer(_latency(args.llm_latency, args)) if args.translator == "llm" else None
+    voicevox = FakeVoicevoxServer(_latency(args.tts_latency, args)) if args.tts == "voicevox" else None
+
+    # ログ・翻訳メモリは一時フォルダに書く（前回の実行の結果を使わない）
+    workdir = tempfile.mkdtemp(prefix="voice_bridge_bench_")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    log = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(sys.stdout if args.verbose else log):
+            from main import VoiceBridge
+
+            bridge = VoiceBridge(
+                model_size=args.model,
+                chunk_duration=args.chunk,
+                asr_engine="moonshine" if args.asr == "moonshine" else "whisper",
+                use_voicevox=args.tts == "voicevox",
+                translate_engine=args.translator,
+                ai_base_url=openai.base_url if openai else "http://127.0.0.1:9/v1",
+                ai_api_key="bench",
+                ai_model="bench",
+                translation_memory=False,
+                player_backend="null",
+                orchestrator=args.orchestrator,
+            )
+            # ネットワークの段を偽バックエンドへ
+            bridge.translator.set_engine("google", google)
+            bridge.translator.set_engine("mymemory", google)
+            if voicevox:
+                bridge.tts.host = voicevox.host
+            # キャプチャ・ASR
+            capture = ReplayCapture(corpus, chunk_duration=args.chunk, speed=args.speed)
+            bridge.capture = capture
+            if args.asr == "fake":
+                bridge.transcriber = FakeTranscriber(capture, rtf=args.asr_rtf)
+            asr = {"seconds": 0.0, "audio_seconds": 0.0, "calls": 0}
+            transcribe = bridge.transcriber.transcribe
+
+            def timed_transcribe(audio, *rest, **kwargs):
+                t_start = time.perf_counter()
+                try:
+                    return transcribe(audio, *rest, **kwargs)
+                finally:
+                    asr["seconds"] += time.perf_counter() - t_start
+                    asr["audio_seconds"] += len(audio) / capture.sample_rate
+                    asr["calls"] += 1
+
+            bridge.transcriber.transcribe = timed_transcribe
+            # モデルの読み込みは測らない
+            bridge.transcriber.load_model()
+
+            cpu_start = _cpu_seconds()
+            t_start = time.perf_counter()
+            bridge.start()
+            capture.done.wait()
+            _wait_idle(bridge, capture, google, args.settle, args.timeout)
+            wall = time.perf_counter() - t_start
+            cpu_end = _cpu_seconds()
+            stitch = bridge.stitcher.stats()
+            queue_stats = bridge.player.queue_stats()
+            bridge.close()
+    finally:
+        os.chdir(cwd)
+        if openai:
+            openai.close()
+        if voicevox:
+            voicevox.close()
+
+    traces = bridge.tracer.traces()
+    latency = {stage: {key: (value * 1000 if key != "count" else value) for key, value in stats.items()}
+               for stage, stats in bridge.tracer.percentiles().items()}
+    latency["capture_to_audio"] = _stats_ms(
+        [s for s in (t.span("captured", "first_audio") for t in traces) if s is not None])
+    user, system = cpu_end[0] - cpu_start[0], cpu_end[1] - cpu_start[1]
+    return {
+        "config": {key: value for key, value in vars(args).items() if key not in ("out", "baseline", "verbose")},
+        "wall_seconds": wall,
+        "audio_seconds": capture.audio_seconds,
+        "asr": {
+            "calls": asr["calls"],
+            "seconds": asr["seconds"],
+            "rtf": asr["seconds"] / asr["audio_seconds"] if asr["audio_seconds"] else None,
+        },
+        "latency": latency,
+        "throughput": {
+            "realtime_factor": capture.audio_seconds / wall,
+            "chunks": capture.chunks,
+            "segments": stitch["segments_out"],
+            "translate_calls": google.calls + (openai.calls if openai else 0),
+            "tts_calls": FakeCommunicate.calls + (voicevox.calls if voicevox else 0),
+            "spoken": bridge.tracer.completed,
+            "dropped_audio": queue_stats["dropped"],
+        },
+        "cpu": {"user_seconds": user, "system_seconds": system, "utilization": (user + system) / wall},
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def _wait_idle(bridge, capture: ReplayCapture, google: FakeGoogle, settle: float, timeout: float):
+    """キャプチャのキュー・保持中の断片・再生待ちが空になり、処理の件数が settle 秒変わらなくなるまで待つ"""
+    end = time.monotonic() + timeout
+    last, stable_since = None, time.monotonic()
+    while time.monotonic() < end:
+        busy = bool(not capture.audio_queue.empty() or bridge.stitcher.pending_text
+                    or bridge.player.queue_duration > 0 or bridge.orchestrator.active_scopes)
+        state = (bridge.tracer.completed, bridge.stitcher.stats()["segments_out"], google.calls, busy)
+        if state != last:
+            last, stable_since = state, time.monotonic()
+        elif not busy and time.monotonic() - stable_since >= settle:
+            return
+        time.sleep(0.05)
+    print(f"[Bench] {timeout:.0f} 秒待っても処理が終わらないため打ち切ります", file=sys.stderr)
+
+
+def _lookup(result: dict, path: str):
+    value = result
+    for key in path.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def compare(result: dict, baseline: dict, tolerance: float, metrics: list = None) -> list[dict]:
+    """
+    基準の結果と比べる（metrics は (パス, 大きいほど悪いか, 無視する差) のリスト。省略時は COMPARED_METRICS）
+
+    Returns:
+        指標ごとの {"metric", "baseline", "current", "change", "regression"}
+    """
+    rows = []
+    for path, higher_is_worse, noise in metrics or COMPARED_METRICS:
+        base, current = _lookup(baseline, path), _lookup(result, path)
+        if base is None or current is None:
+            continue
+        worse = current - base if higher_is_worse else base - current
+        change = (current - base) / base if base else 0.0
+        rows.append({
+            "metric": path,
+            "baseline": base,
+            "current": current,
+            "change": change,
+            "regression": worse > noise and worse > abs(base) * tolerance,
+        })
+    return rows
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    result = run(args)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    if not args.baseline:
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        rows = compare(result, json.load(f), args.tolerance)
+    return report_comparison(rows)
+
+
+def report_comparison(rows: list[dict]) -> int:
+    """比較の結果を表示する。悪化があれば 1"""
+    print(f"\n{'metric':<32} {'baseline':>10} {'current':>10} {'change':>8}")
+    for row in rows:
+        mark = "  ✗ 悪化" if row["regression"] else ""
+        print(f"{row['metric']:<32} {row['baseline']:>10.3f} {row['current']:>10.3f} {row['change']:>+7.1%}{mark}")
+    regressions = [row["metric"] for row in rows if row["regression"]]
+    if regressions:
+        print(f"\n[Bench] 基準より悪化: {', '.join(regressions)}")
+        return 1
+    print("\n[Bench] 基準からの悪化なし")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+起動時間のベンチマーク
+新しいプロセスで main を起動し、起動から次の時点までの秒数を測る（runs 回の中央値）
+
+  - import_main: main の読み込み（エンジンのモジュールは使うときに読み込むので、ここには含まれない）
+  - window: GUI のウィンドウが表示されるまで（--gui のとき）
+  - bridge: パイプラインの準備（エンジンの読み込み・再生デバイスの確認・VOICEVOX の確認）が終わるまで
+  - first_translation: すぐに開始して、最初の訳文が出るまで（最初のチャンクの長さを含む）
+
+翻訳・音声合成は偽バックエンド（bench/fakes.py）で置き換え、キャプチャは合成コーパスを実時間で流す。
+--asr fake ではモデルの読み込みに --model-load 秒かかる偽 ASR を使う。
+VOICEVOX の確認は実際の localhost:50021 に対して行う（起動していなければ Edge TTS の代役）。
+
+使い方:
+  python bench/startup_bench.py                        # CLI の起動経路（ウィンドウなし）
+  python bench/startup_bench.py --gui                  # ウィンドウ表示まで含める（ディスプレイが必要）
+  python bench/startup_bench.py --out startup.json     # 結果を保存
+  python bench/startup_bench.py --baseline startup.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH = os.path.dirname(os.path.abspath(__file__))
+
+METRICS = ("import_main", "window", "bridge", "first_translation")
+
+# 比較する指標: (パス, 大きいほど悪いか, 無視する差の絶対値)
+COMPARED_METRICS = [
+    ("median.import_main", True, 0.05),
+    ("median.window", True, 0.05),
+    ("median.bridge", True, 0.1),
+    ("median.first_translation", True, 0.2),
+]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Voice Bridge 起動時間ベンチマーク")
+    parser.add_argument("--runs", type=int, default=5, help="起動する回数")
+    parser.add_argument("--gui", action="store_true", help="GUI で起動してウィンドウ表示までを測る")
+    parser.add_argument("--asr", default="fake", choices=["fake", "whisper", "moonshine"],
+                        help="fake はモデルの読み込みに --model-load 秒かかる代役")
+    parser.add_argument("--model", default="tiny", help="ASR のモデルサイズ（whisper）")
+    parser.add_argument("--model-load", type=float, default=1.0, help="偽 ASR のモデルの読み込み時間（秒）")
+    parser.add_argument("--asr-rtf", type=float, default=0.1, help="偽 ASR の RTF")
+    parser.add_argument("--chunk", type=float, default=2.0, help="チャンク長（秒）")
+    parser.add_argument("--translate-latency", type=float, default=0.25, help="偽 Google の遅延（秒）")
+    parser.add_argument("--tts-latency", type=float, default=0.35, help="偽 edge-tts の最初の音声までの遅延（秒）")
+    parser.add_argument("--timeout", type=float, default=60.0, help="1回の起動で最初の訳文を待つ最大秒数")
+    parser.add_argument("--out", default=None, help="結果の JSON を保存するファイル")
+    parser.add_argument("--baseline", default=None, help="比べる結果の JSON（悪化があれば終了コード 1）")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="悪化とみなす割合 (default: 0.15 = 15%%)")
+    parser.add_argument("--verbose", action="store_true", help="起動したプロセスのログを表示する")
+    # 内部用: 測られる側のプロセス
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--spawned-at", type=float, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", default=None, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+# ── 測られる側（新しいプロセス） ─────────────────────────
+
+
+def child(args) -> dict:
+    """main を読み込んで起動し、起動からの各時点の秒数を返す（プロセスを起動した時刻から）"""
+    sys.path.insert(0, ROOT)
+    wall_before, perf_before = time.time(), time.perf_counter()
+    import main
+    import startup
+    import_main = time.perf_counter() - perf_before
+    # startup の経過時間（読み込んだ時刻から）を、プロセスを起動した時刻からの秒数にする
+    offset = wall_before + (startup._T0 - perf_before) - args.spawned_at
+
+    sys.path.insert(0, BENCH)
+    from fakes import FakeCommunicate, FakeGoogle, FakeTranscriber, Latency, ReplayCapture, synthetic_corpus
+
+    FakeCommunicate.install(Latency(args.tts_latency))
+    google = FakeGoogle(Latency(args.translate_latency))
+    capture = ReplayCapture(synthetic_corpus(args.chunk * 4), chunk_duration=args.chunk, speed=1.0)
+    if args.asr == "fake":
+        # main が読み込む ASR のモジュールを代役にする（起動時のモデルの先読みもそのまま通る）
+        import types
+        sys.modules["transcriber"] = types.SimpleNamespace(
+            Transcriber=lambda **kwargs: FakeTranscriber(capture, rtf=args.asr_rtf, load_seconds=args.model_load))
+
+    argv = ["--no-tm", "--chunk", str(args.chunk), "--model", args.model,
+            "--asr", "moonshine" if args.asr == "moonshine" else "whisper"]
+    bridge_args = main.build_parser().parse_args(argv)
+    bridge_args.player = "null"  # 音を出さない（コマンドラインからは選べない）
+    bridge_args.ai_base_url = "http://127.0.0.1:9/v1"
+    bridge_args.ai_model = "bench"
+
+    def begin(bridge):
+        """パイプラインの準備ができたらすぐに開始する（キャプチャ・翻訳は代役）"""
+        bridge.capture = capture
+        bridge.translator.set_engine("google", google)
+        bridge.translator.set_engine("mymemory", google)
+        bridge.start()
+
+    deadline = time.monotonic() + args.timeout
+    if args.gui:
+        gui, probes = main.start_gui(bridge_args)
+        started = []
+
+        def poll():
+            bridge = probes.result("bridge", timeout=0)
+            if bridge is not None and not started:
+                started.append(bridge)
+                begin(bridge)
+            if "first_translation" in startup.marks() or time.monotonic() > deadline:
+                gui.root.destroy()
+                return
+            gui.root.after(20, poll)
+
+        gui.root.after(20, poll)
+        gui.run()
+        bridge = started[0] if started else None
+    else:
+        probes = main.StartupProbes()
+        probes.submit("voicevox", main.probe_voicevox)
+        bridge = main.prepare_bridge(bridge_args, probes)
+        begin(bridge)
+        while "first_translation" not in startup.marks() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    marks = startup.marks()
+    probes.wait(timeout=5.0)
+    probe_timings = probes.timings()
+    if bridge is not None:
+        bridge.stop()
+    probes.shutdown()
+
+    result = {"import_main": wall_before - args.spawned_at + import_main}
+    for name in ("window", "bridge", "first_translation"):
+        result[name] = offset + marks[name] if name in marks else None
+    result["probes"] = probe_timings
+    return result
+
+
+# ── 測る側 ─────────────────────────────────────
+
+
+def run_once(args) -> dict:
+    """新しいプロセスで1回起動して測る"""
+    fd, result_file = tempfile.mkstemp(prefix="voice_bridge_startup_", suffix=".json")
+    os.close(fd)
+    workdir = tempfile.mkdtemp(prefix="voice_bridge_startup_")  # ログは一時フォルダに書く
+    forwarded = ["--asr", args.asr, "--model", args.model, "--model-load", str(args.model_load),
+                 "--asr-rtf", str(args.asr_rtf), "--chunk", str(args.chunk),
+                 "--translate-latency", str(args.translate_latency), "--tts-latency", str(args.tts_latency),
+                 "--timeout", str(args.timeout)]
+    if args.gui:
+        forwarded.append("--gui")
+    try:
+        command = [sys.executable, os.path.abspath(__file__), "--child", "--result-file", result_file,
+                   "--spawned-at", repr(time.time())] + forwarded
+        output = None if args.verbose else subprocess.DEVNULL
+        subprocess.run(command, cwd=workdir, stdout=output, stderr=output, check=True,
+                       timeout=args.timeout + 30)
+        with open(result_file, encoding="utf-8") as f:
+            return json.load(f)
+    finally:
+        os.remove(result_file)
+
+
+def summarize(runs: list[dict]) -> dict:
+    """指標ごとの中央値・最小・最大（測れなかった回は除く）"""
+    median, spread = {}, {}
+    for name in METRICS:
+        values = [run[name] for run in runs if run.get(name) is not None]
+        if values:
+            median[name] = statistics.median(values)
+            spread[name] = {"min": min(values), "max": max(values), "count": len(values)}
+    probes = {}
+    for name in sorted({name for run in runs for name in run.get("probes", {})}):
+        probes[name] = statistics.median(run["probes"][name] for run in runs if name in run.get("probes", {}))
+    return {"median": median, "spread": spread, "probes": probes}
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.child:
+        result = child(args)
+        with open(args.result_file, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        return 0
+
+    runs = []
+    for i in range(args.runs):
+        run = run_once(args)
+        runs.append(run)
+        detail = " ".join(f"{name}={run[name]:.2f}s" for name in METRICS if run.get(name) is not None)
+        print(f"[Startup] {i + 1}/{args.runs}: {detail}", file=sys.stderr)
+
+    result = {
+        "config": {key: value for key, value in vars(args).items()
+                   if key not in ("out", "baseline", "verbose", "child", "spawned_at", "result_file")},
+        **summarize(runs),
+        "runs": runs,
+    }
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    if not args.baseline:
+        return 0
+
+    sys.path.insert(0, BENCH)
+    from run_bench import compare, report_comparison
+
+    with open(args.baseline, encoding="utf-8") as f:
+        rows = compare(result, json.load(f), args.tolerance, COMPARED_METRICS)
+    return report_comparison(rows)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
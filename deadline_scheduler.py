@@ -0,0 +1,133 @@
+"""
+期限つきスケジューラーモジュール
+キャプチャから取り出したチャンクを、待った時間と各段の見積もりから扱いを決める
+
+  - PROCESS:   そのまま処理する（見込みで遅延予算に間に合う）
+  - MERGE:     次のチャンクが待っていれば結合して1回の ASR で処理する（ASR の呼び出し回数を減らして追いつく）
+  - TEXT_ONLY: 字幕だけ出して読み上げない（音声は間に合わない）
+  - DROP:      捨てる（取り出した時点で遅延予算を過ぎている。または訳文も間に合わず、
+               後ろに新しいチャンクが待っている）
+
+見込み:
+  訳文まで = 待った時間 + 処理待ち + ASR + 翻訳（段ごとの見積もり）
+  音声まで = 訳文まで + TTS + 再生待ち（再生キューと合成中の音声の秒数）
+
+見積もりは完了したトレース（latency_trace）の段の時間の指数移動平均。新しい記録がない間は
+半減期 half_life 秒でこれまでの最小値に戻していくので、一時的に遅くなっても（読み上げを止めて
+記録が増えなくても）数秒で通常の処理に戻る。
+"""
+
+import threading
+import time
+
+PROCESS = "process"
+MERGE = "merge"
+TEXT_ONLY = "text_only"
+DROP = "drop"
+
+ACTIONS = (PROCESS, MERGE, TEXT_ONLY, DROP)
+
+
+class _Estimate:
+    """1つの段の所要時間の見積もり（指数移動平均。記録がない間は最小値へ減衰する）"""
+
+    def __init__(self, alpha: float, half_life: float):
+        self.alpha = alpha
+        self.half_life = half_life
+        self.value = None
+        self.floor = None
+        self.updated_at = 0.0
+
+    def observe(self, seconds: float, now: float):
+        if self.value is None:
+            self.value = self.floor = seconds
+        else:
+            self.value = self.get(now) * (1 - self.alpha) + seconds * self.alpha
+            self.floor = min(self.floor, seconds)
+        self.updated_at = now
+
+    def get(self, now: float) -> float:
+        if self.value is None:
+            return 0.0
+        decay = 0.5 ** ((now - self.updated_at) / self.half_life)
+        return self.floor + (self.value - self.floor) * decay
+
+
+class Decision:
+    """チャンク1つの扱いと、その根拠の見込み（秒）"""
+
+    def __init__(self, action: str, age: float, text_eta: float, audio_eta: float):
+        self.action = action
+        self.age = age
+        self.text_eta = text_eta
+        self.audio_eta = audio_eta
+
+    def __repr__(self):
+        return (f"Decision({self.action}, age={self.age:.2f}s, text={self.text_eta:.2f}s, "
+                f"audio={self.audio_eta:.2f}s)")
+
+
+class DeadlineScheduler:
+    """チャンクの待ち時間と段の見積もりから、処理・結合・字幕のみ・破棄を決める（スレッドセーフ）"""
+
+    TEXT_STAGES = ("pipeline_queue", "asr", "translate")
+    AUDIO_STAGES = ("tts",)
+
+    def __init__(self, budget: float = 10.0, max_merge: int = 3, alpha: float = 0.3, half_life: float = 5.0):
+        """
+        Args:
+            budget: 遅延予算（チャンクが揃ってから訳文・音声が出るまでの秒数）
+            max_merge: 1回の ASR に結合するチャンク数の上限（1 なら結合しない）
+            alpha: 見積もりの指数移動平均の重み（大きいほど直近の記録に追従する）
+            half_life: 記録がない間に見積もりを最小値に戻す半減期（秒）
+        """
+        self.budget = budget
+        self.max_merge = max(1, max_merge)
+        self._estimates = {stage: _Estimate(alpha, half_life) for stage in self.TEXT_STAGES + self.AUDIO_STAGES}
+        self._counts = {action: 0 for action in ACTIONS}
+        self._lock = threading.Lock()
+
+    def observe(self, trace):
+        """完了したトレースの段の時間で見積もりを更新する"""
+        spans = trace.spans()
+        now = time.monotonic()
+        with self._lock:
+            for stage, estimate in self._estimates.items():
+                if stage in spans:
+                    estimate.observe(spans[stage], now)
+
+    def estimate(self, stage: str) -> float:
+        with self._lock:
+            return self._estimates[stage].get(time.monotonic())
+
+    def decide(self, age: float, waiting: int = 0, playback_wait: float = 0.0, merged: int = 1) -> Decision:
+        """
+        チャンクの扱いを決める（決定は数える。MERGE の後は結合したチャンクで改めて呼ぶ）
+
+        Args:
+            age: チャンクが揃ってから取り出すまでに待った秒数（結合したなら最も古いチャンク）
+            waiting: キャプチャのキューで待っているチャンク数
+            playback_wait: 今から入れた音声が再生されるまでの秒数（再生待ち + 合成中）
+            merged: 結合済みのチャンク数
+        """
+        now = time.monotonic()
+        with self._lock:
+            text_eta = age + sum(self._estimates[s].get(now) for s in self.TEXT_STAGES)
+            audio_eta = text_eta + sum(self._estimates[s].get(now) for s in self.AUDIO_STAGES) + playback_wait
+            if age > self.budget:
+                action = DROP
+            elif audio_eta <= self.budget:
+                action = PROCESS
+            elif waiting and merged < self.max_merge:
+                action = MERGE
+            elif text_eta > self.budget and waiting:
+                action = DROP  # 訳文も間に合わない。後ろで待っている新しいチャンクを先に処理する
+            else:
+                action = TEXT_ONLY
+            self._counts[action] += 1
+        return Decision(action, age, text_eta, audio_eta)
+
+    def stats(self) -> dict:
+        """扱いごとの件数"""
+        with self._lock:
+            return dict(self._counts)
@@ -0,0 +1,167 @@
+"""
+先読みデコードモジュール
+再生キューに入った音声を、再生スレッドとは別のワーカーで先に PCM へデコードしておく
+
+  - DecodePool: 再生側の形式（サンプルレート・チャンネル数）で AudioClip / 音声ファイルを
+    スレッドプールでデコードし、Future で PCM（int16 インターリーブ）を返す
+  - PCMCache: デコード済み PCM を内容のハッシュで保持する（合計バイト数に上限のある LRU）
+
+同じ文を繰り返し読み上げたとき（TTSCache のヒットなど）はデコードもせずに返す。
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+
+import audio_decode
+from audio_decode import AudioClip, decode_clip
+
+
+class PCMCache:
+    """デコード済み PCM のキャッシュ（スレッドセーフ）"""
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024):
+        """
+        Args:
+            max_bytes: 保持する PCM の合計サイズ上限（バイト）
+        """
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict = OrderedDict()  # key → PCM（LRU 順）
+        self._total = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._total
+
+    def get(self, key: str) -> np.ndarray | None:
+        with self._lock:
+            pcm = self._entries.get(key)
+            if pcm is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return pcm
+
+    def put(self, key: str, pcm: np.ndarray):
+        """PCM を登録（上限を超えたら古いものから削除）。登録した配列は書き換え不可にする"""
+        if not len(pcm) or pcm.nbytes > self.max_bytes:
+            return
+        pcm.flags.writeable = False
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total -= old.nbytes
+            self._entries[key] = pcm
+            self._total += pcm.nbytes
+            while self._total > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._total -= evicted.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, total = len(self._entries), self._total
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": total,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def load_clip(audio) -> AudioClip:
+    """AudioClip はそのまま、音声ファイルのパスは読み込んで AudioClip にする（ファイルは消さない）"""
+    if isinstance(audio, AudioClip):
+        return audio
+    with open(audio, "rb") as f:
+        data = f.read()
+    return AudioClip(data=data, codec=os.path.splitext(audio)[1].lstrip(".") or "mp3")
+
+
+def can_decode(clip: AudioClip) -> bool:
+    """PCM にデコードできるか（mp3 などは PyAV が必要）"""
+    return clip.samples is not None or clip.codec == "wav" or audio_decode.is_available()
+
+
+class DecodePool:
+    """再生キューの音声を先にデコードしておくワーカープール"""
+
+    def __init__(self, sample_rate: int = 24000, channels: int = 2, workers: int = 2, cache: PCMCache = None):
+        """
+        Args:
+            sample_rate: 出力サンプルレート（再生側の形式）
+            channels: 出力チャンネル数
+            workers: デコードを並行して行うスレッド数
+            cache: デコード済み PCM のキャッシュ（None なら新規作成）
+        """
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.cache = cache if cache is not None else PCMCache()
+        self._workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def make_key(self, clip: AudioClip) -> str:
+        """キャッシュキー（SHA-256）: 音声の内容と出力形式から作る"""
+        h = hashlib.sha256(f"{self.sample_rate}\x1f{self.channels}\x1f".encode())
+        if clip.samples is not None:
+            h.update(f"pcm\x1f{clip.sample_rate}\x1f".encode())
+            h.update(np.ascontiguousarray(clip.samples, dtype=np.float32).tobytes())
+        else:
+            h.update(f"{clip.codec}\x1f".encode())
+            h.update(clip.data)
+        return h.hexdigest()
+
+    def decode(self, audio) -> np.ndarray | None:
+        """
+        音声を PCM にデコードする（呼び出したスレッドで実行。キャッシュにあればそれを返す）
+
+        Args:
+            audio: AudioClip or 音声ファイルのパス
+
+        Returns:
+            int16 インターリーブの PCM（書き換え不可）。PyAV がなく mp3 をデコードできなければ None
+        """
+        clip = load_clip(audio)
+        if not can_decode(clip):
+            return None
+        key = self.make_key(clip)
+        pcm = self.cache.get(key)
+        if pcm is None:
+            pcm = decode_clip(clip, sample_rate=self.sample_rate, channels=self.channels)
+            self.cache.put(key, pcm)
+        return pcm
+
+    def submit(self, audio) -> Future:
+        """デコードをワーカーに依頼する（結果は decode() と同じ）"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="decode")
+            return self._executor.submit(self.decode, audio)
+
+    def shutdown(self):
+        """ワーカーを止める（未着手のデコードは取り消す。再度 submit すれば作り直す）"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,117 @@
+"""
+イベントループスレッドモジュール
+専用スレッドで1つの asyncio イベントループを動かし続け、
+任意のスレッドからコルーチンを投入して concurrent.futures.Future で結果を受け取る
+
+  - スレッドごとにイベントループを作って run_until_complete する代わりに、
+    ループは起動時に1回だけ作って使い回す
+  - 同時実行数はセマフォで制限する（edge-tts への同時接続数など）
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+
+# プロセスで共有する既定のループ名（edge-tts と Orchestrator が同じループを使う）
+DEFAULT_LOOP = "voice-bridge"
+
+
+class EventLoopThread:
+    """常駐するイベントループ（スレッドセーフ）"""
+
+    _shared: dict = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, name: str = "asyncio", max_concurrent: int = 4):
+        """
+        Args:
+            name: スレッド名（ログ表示用）
+            max_concurrent: 同時に実行するコルーチンの上限
+        """
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        self._thread: threading.Thread | None = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, name: str, max_concurrent: int = 4) -> "EventLoopThread":
+        """名前ごとにプロセスで1つのインスタンスを返す（初回呼び出し時に起動）"""
+        with cls._shared_lock:
+            worker = cls._shared.get(name)
+            if worker is None:
+                worker = cls(name=name, max_concurrent=max_concurrent)
+                cls._shared[name] = worker
+        worker.start()
+        return worker
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop | None:
+        return self._loop
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """ループスレッドを起動（起動済みなら何もしない。どちらでもループができるまで待つ）"""
+        with self._lock:
+            if not self.is_running:
+                self._ready.clear()
+                self._thread = threading.Thread(target=self._run, name=f"{self.name}-loop", daemon=True)
+                self._thread.start()
+        # 別スレッドが起動した直後でも、_run が _loop を作るまで待ってから返す
+        self._ready.wait()
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            # 残っているタスクを片付けてから閉じる
+            pending = asyncio.all_tasks(loop)
+            for task in pending:
+                task.cancel()
+            if pending:
+                loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            loop.close()
+            self._loop = None
+
+    async def _guarded(self, coro):
+        async with self._semaphore:
+            return await coro
+
+    def submit(self, coro) -> Future:
+        """
+        コルーチンをループに投入する（どのスレッドからでも呼べる）
+
+        Returns:
+            結果を受け取る concurrent.futures.Future
+        """
+        self.start()
+        return asyncio.run_coroutine_threadsafe(self._guarded(coro), self._loop)
+
+    def run(self, coro, timeout: float = None):
+        """コルーチンを投入して結果を待つ"""
+        return self.submit(coro).result(timeout=timeout)
+
+    def call_soon(self, callback, *args):
+        """ループスレッドでコールバックを実行する"""
+        self.start()
+        self._loop.call_soon_threadsafe(callback, *args)
+
+    def stop(self, timeout: float = 2.0):
+        """ループを停止してスレッドを終了する"""
+        with self._lock:
+            thread, loop = self._thread, self._loop
+            self._thread = None
+        if thread is None or loop is None:
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=timeout)
@@ -116,12 +116,12 @@ class VoiceBridgeGUI:
         voice_default = default_voice or voice_list[0]
         ttk.Label(settings_frame, text="声:").grid(row=1, column=0, sticky=tk.W, padx=(0, 8), pady=(8, 0))
         self.voice_var = tk.StringVar(value=voice_default)
-        voice_combo = ttk.Combobox(
+        self.voice_combo = ttk.Combobox(
             settings_frame, textvariable=self.voice_var,
             values=voice_list, width=30, state="readonly"
         )
-        voice_combo.grid(row=1, column=1, columnspan=5, sticky=tk.W, pady=(8, 0))
-        voice_combo.bind("<<ComboboxSelected>>", self._on_voice_changed)
+        self.voice_combo.grid(row=1, column=1, columnspan=5, sticky=tk.W, pady=(8, 0))
+        self.voice_combo.bind("<<ComboboxSelected>>", self._on_voice_changed)
 
         # 言語選択（3行目に配置）
         ttk.Label(settings_frame, text="言語:").grid(row=2, column=0, sticky=tk.W, padx=(0, 8), pady=(8, 0))
@@ -321,6 +321,19 @@ class VoiceBridgeGUI:
                     latency, stage = data
                     self._latency_var.set(f"遅延: {latency:.1f}s")
                     self._latency_detail_var.set(f"({stage})")
+                elif msg_type == "devices":
+                    self.device_combo.configure(values=data)
+                    if self.device_var.get() not in data:
+                        self.device_var.set(data[0])
+                elif msg_type == "voices":
+                    voices, default_voice = data
+                    self.voice_combo.configure(values=voices)
+                    self.voice_var.set(default_voice)
+                elif msg_type == "ready":
+                    if not self._running:
+                        self.start_btn.configure(state=tk.NORMAL if data else tk.DISABLED)
+                elif msg_type == "credit":
+                    self._credit_var.set(data)
             except queue.Empty:
                 break
         if self.root:
@@ -382,9 +395,20 @@ class VoiceBridgeGUI:
         self._message_queue.put(("latency", (latency, stage)))
 
     def set_credit(self, text: str):
-        """クレジット表記を設定"""
-        if self._credit_var:
-            self._credit_var.set(text)
+        """クレジット表記を設定（スレッドセーフ）"""
+        self._message_queue.put(("credit", text))
+
+    def set_devices(self, devices: list[str]):
+        """入力デバイスの選択肢を更新（スレッドセーフ。起動時の確認が終わってから）"""
+        self._message_queue.put(("devices", devices))
+
+    def set_voices(self, voices: list[str], default_voice: str):
+        """声の選択肢を更新（スレッドセーフ。VOICEVOX が見つかったとき）"""
+        self._message_queue.put(("voices", (voices, default_voice)))
+
+    def set_ready(self, ready: bool):
+        """開始ボタンを有効・無効にする（スレッドセーフ。パイプラインの準備ができるまで無効）"""
+        self._message_queue.put(("ready", ready))
 
     def run(self):
         """GUI メインループを開始"""
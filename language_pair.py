@@ -0,0 +1,110 @@
+"""
+言語ペアモジュール
+翻訳中の言語ペアの切り替えを、パイプラインを止めずに行う
+
+  - 新しいペアの部品（ASR・翻訳・TTS）は裏のスレッドで作り、モデルも読み込んでおく
+  - パイプラインは発話の切れ目で take() を呼び、用意のできたペアにまとめて差し替える
+    （ASR・翻訳・TTS が別々のペアを指す瞬間がない）
+  - 発話は開始時のペアを持ち回り、差し替え後に届いた前のペアの結果は読み上げずに捨てる
+  - 用意している間に次の切り替えが来たら、最後に頼まれたペアだけを使う
+
+  switcher = PairSwitcher(build=make_pair)
+  switcher.request("ja", "en")     # すぐ戻る
+  ...
+  pair = switcher.take()           # 発話の切れ目で（用意ができていなければ None）
+"""
+
+import threading
+
+
+class LanguagePair:
+    """1つの言語ペアで使う部品一式（差し替えはペアごと。発話はどのペアで始めたかをこれで持ち回る）"""
+
+    def __init__(self, source: str, target: str, tts_language: str = None,
+                 transcriber=None, translator=None, tts=None):
+        self.source = source
+        self.target = target
+        self.tts_language = tts_language or target
+        self.transcriber = transcriber
+        self.translator = translator  # チャットモードでは None
+        self.tts = tts
+
+    def __repr__(self):
+        return f"LanguagePair({self.source}→{self.target}, tts={self.tts_language})"
+
+
+class PairSwitcher:
+    """言語ペアを裏で用意し、発話の切れ目で渡す（スレッドセーフ。最後に頼まれたペアだけを使う）"""
+
+    def __init__(self, build, on_ready=None, discard=None):
+        """
+        Args:
+            build: (source, target) から LanguagePair を作る関数（裏のスレッドで呼ぶ。作れなければ None か例外）
+            on_ready: ペアの用意ができたら呼ぶ関数（引数なし。停止中ならその場で差し替えるため）
+            discard: 使われなかった（後から別のペアを頼まれた）ペアを渡して片付ける関数
+        """
+        self._build = build
+        self.on_ready = on_ready
+        self._discard = discard
+        self._latest = 0     # 最後に頼まれた番号
+        self._finished = 0   # 最後に頼まれたペアの準備が終わったらその番号
+        self._ready = None
+        self._lock = threading.Lock()
+        self._idle = threading.Event()
+        self._idle.set()
+
+    @property
+    def pending(self) -> bool:
+        """準備中か、用意のできたペアが差し替えを待っているか"""
+        with self._lock:
+            return self._finished != self._latest or self._ready is not None
+
+    def request(self, source: str, target: str) -> int:
+        """ペアの準備を始める（待たない）。前に頼んだペアはまだ差し替えていなければ使わない"""
+        with self._lock:
+            self._latest += 1
+            number = self._latest
+            stale, self._ready = self._ready, None
+            self._idle.clear()
+        if stale is not None:
+            self._release(stale)
+        threading.Thread(target=self._run, args=(number, source, target),
+                         name=f"language-pair-{number}", daemon=True).start()
+        return number
+
+    def _run(self, number: int, source: str, target: str):
+        try:
+            pair = self._build(source, target)
+        except Exception as e:
+            print(f"[PairSwitcher] {source}→{target} の準備に失敗: {type(e).__name__}: {e}")
+            pair = None
+        with self._lock:
+            latest = number == self._latest
+            if latest:
+                self._ready = pair
+                self._finished = number
+                self._idle.set()
+        if not latest:
+            # 準備している間に別のペアを頼まれた
+            if pair is not None:
+                self._release(pair)
+            return
+        if pair is not None and self.on_ready:
+            self.on_ready()
+
+    def take(self) -> LanguagePair | None:
+        """用意のできたペアを受け取る（発話の切れ目で呼ぶ。なければ None）"""
+        with self._lock:
+            pair, self._ready = self._ready, None
+        return pair
+
+    def wait(self, timeout: float = None) -> bool:
+        """最後に頼んだペアの準備が終わるまで待つ。時間内に終わったか"""
+        return self._idle.wait(timeout)
+
+    def _release(self, pair: LanguagePair):
+        if self._discard:
+            try:
+                self._discard(pair)
+            except Exception as e:
+                print(f"[PairSwitcher] {pair} の片付けに失敗: {type(e).__name__}: {e}")
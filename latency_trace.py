@@ -0,0 +1,251 @@
+"""
+遅延トレースモジュール
+音声チャンク1つ（発話）ごとに、キャプチャから最初の音が出るまでの各段の時刻を記録する
+
+  - 時刻は time.perf_counter_ns（単調増加・ナノ秒）。time.monotonic 基準の時刻（再生側）も換算して記録できる
+  - Trace: 1つのチャンクの時刻の記録（mark(名前) は最初の1回だけ有効）。段の時間は2つの時刻の差
+  - LatencyTracer: 完了したトレースから段ごとの直近 N 件の p50 / p95 / p99 を出す。
+    JSONL（1トレース1行）と Chrome トレース形式（chrome://tracing / Perfetto で開ける）に書き出す
+
+段（STAGES）:
+  capture       チャンクの先頭の音 → チャンクが揃った（チャンク長ぶん溜める時間）
+  capture_queue チャンクが揃った → パイプラインが取り出した
+  pipeline_queue 取り出した → ASR 開始（処理中の発話が溜まっていると待つ）
+  asr           ASR
+  stitch        ASR 終了 → 翻訳開始（文の結合・前の発話の順番待ち）
+  translate     翻訳開始 → 最初の訳文
+  speak_wait    最初の訳文 → 合成の投入（前の発話の読み上げの順番待ち）
+  tts           合成の投入 → 音声ができた（ストリーミングなら最初のチャンクが届いた）
+  player_queue  音声ができた → 最初の音が出た（前の音声の再生待ち・デコード）
+  total         チャンクの先頭の音 → 最初の音が出た
+"""
+
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# time.monotonic → perf_counter_ns の換算（起動時に1回だけ測る）
+_MONO_TO_PERF_NS = time.perf_counter_ns() - time.monotonic_ns()
+
+STAGES = [
+    ("capture", "capture_start", "captured"),
+    ("capture_queue", "captured", "dequeued"),
+    ("pipeline_queue", "dequeued", "asr_start"),
+    ("asr", "asr_start", "asr_end"),
+    ("stitch", "asr_end", "translate_start"),
+    ("translate", "translate_start", "translate_first"),
+    ("speak_wait", "translate_first", "speak"),
+    ("tts", "speak", "tts_ready"),
+    ("player_queue", "tts_ready", "first_audio"),
+    ("total", "capture_start", "first_audio"),
+]
+
+
+def now_ns() -> int:
+    return time.perf_counter_ns()
+
+
+def monotonic_to_ns(t: float) -> int:
+    """time.monotonic() の値を perf_counter_ns 基準に換算する"""
+    return int(t * 1e9) + _MONO_TO_PERF_NS
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    """昇順に並んだ値の q パーセンタイル（最近傍順位法）"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(-(-q * len(sorted_values) // 100)))  # ceil(q/100 * n)
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class Trace:
+    """1つの音声チャンク（発話）の時刻の記録（スレッドセーフ）"""
+
+    def __init__(self, tracer: "LatencyTracer" = None, trace_id: int = 0, text: str = ""):
+        self.id = trace_id
+        self.text = text
+        self.marks: dict[str, int] = {}
+        self.finished = False
+        self._tracer = tracer
+        self._lock = threading.Lock()
+
+    def mark(self, name: str, at_ns: int = None):
+        """時刻を記録する（同じ名前は最初の1回だけ）。first_audio を記録したら完了"""
+        with self._lock:
+            if self.finished or name in self.marks:
+                return
+            self.marks[name] = now_ns() if at_ns is None else at_ns
+        if name == "first_audio":
+            self.finish()
+
+    def mark_monotonic(self, name: str, t: float):
+        """time.monotonic 基準の時刻で記録する（再生側の時刻）"""
+        self.mark(name, monotonic_to_ns(t))
+
+    def finish(self):
+        """完了（最初の音が出た・読み上げなしで終わった）。以降の mark は無視する"""
+        with self._lock:
+            if self.finished:
+                return
+            self.finished = True
+        if self._tracer is not None:
+            self._tracer._complete(self)
+
+    def abandon(self):
+        """途中で打ち切る（認識エラーなど）。統計・書き出しには入れず、以降の mark と finish は無視する"""
+        with self._lock:
+            self.finished = True
+
+    def age(self, since: str = "captured") -> float:
+        """since の時刻から今までの秒数（記録がなければ 0）"""
+        start = self.marks.get(since)
+        return 0.0 if start is None else (now_ns() - start) / 1e9
+
+    def span(self, start: str, end: str) -> float | None:
+        """2つの時刻の差（秒）。どちらかがなければ None"""
+        a, b = self.marks.get(start), self.marks.get(end)
+        if a is None or b is None:
+            return None
+        return (b - a) / 1e9
+
+    def spans(self) -> dict[str, float]:
+        """段ごとの時間（秒）。記録のない段は含めない"""
+        result = {}
+        for stage, start, end in STAGES:
+            seconds = self.span(start, end)
+            if seconds is not None:
+                result[stage] = seconds
+        return result
+
+    def to_dict(self) -> dict:
+        origin = min(self.marks.values()) if self.marks else 0
+        return {
+            "id": self.id,
+            "text": self.text,
+            "marks_ms": {name: (ns - origin) / 1e6 for name, ns in sorted(self.marks.items(), key=lambda kv: kv[1])},
+            "spans_ms": {stage: seconds * 1000 for stage, seconds in self.spans().items()},
+        }
+
+
+class LatencyTracer:
+    """トレースの収集と集計（スレッドセーフ）"""
+
+    def __init__(self, window: int = 200, jsonl_path: str = None, keep: int = 1000):
+        """
+        Args:
+            window: パーセンタイルを計算する直近の件数（段ごと）
+            jsonl_path: 完了したトレースを1行ずつ追記するファイル（None なら書かない）
+            keep: Chrome トレース形式で書き出すために保持する件数
+        """
+        self.window = window
+        self.jsonl_path = jsonl_path
+        self.on_complete = None  # (trace: Trace) トレースが完了した
+        self._samples: dict[str, deque] = {}
+        self._traces: deque = deque(maxlen=keep)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._jsonl = None
+        self.completed = 0
+
+    def start(self, captured_ns: int = None, chunk_seconds: float = 0.0, text: str = "") -> Trace:
+        """
+        新しいトレースを始める
+
+        Args:
+            captured_ns: チャンクが揃った時刻（perf_counter_ns。None ならキャプチャの記録なし）
+            chunk_seconds: チャンクの長さ（先頭の音の時刻 = captured_ns - chunk_seconds）
+        """
+        trace = Trace(self, next(self._ids), text)
+        if captured_ns is not None:
+            trace.mark("capture_start", captured_ns - int(chunk_seconds * 1e9))
+            trace.mark("captured", captured_ns)
+        return trace
+
+    def _complete(self, trace: Trace):
+        spans = trace.spans()
+        with self._lock:
+            self.completed += 1
+            for stage, seconds in spans.items():
+                samples = self._samples.get(stage)
+                if samples is None:
+                    samples = self._samples[stage] = deque(maxlen=self.window)
+                samples.append(seconds)
+            self._traces.append(trace)
+            if self.jsonl_path:
+                self._write_jsonl(trace)
+        if self.on_complete:
+            self.on_complete(trace)
+
+    def _write_jsonl(self, trace: Trace):
+        """ロック取得済み前提"""
+        try:
+            if self._jsonl is None:
+                os.makedirs(os.path.dirname(self.jsonl_path) or ".", exist_ok=True)
+                self._jsonl = open(self.jsonl_path, "a", encoding="utf-8")
+            self._jsonl.write(json.dumps(trace.to_dict(), ensure_ascii=False) + "\n")
+            self._jsonl.flush()
+        except OSError as e:
+            print(f"[LatencyTracer] 書き込みエラー: {e}")
+
+    def traces(self) -> list[Trace]:
+        """保持している完了済みのトレース（古い順）"""
+        with self._lock:
+            return list(self._traces)
+
+    def percentiles(self) -> dict[str, dict]:
+        """段ごとの直近 window 件の p50 / p95 / p99（秒）と件数"""
+        with self._lock:
+            samples = {stage: sorted(values) for stage, values in self._samples.items()}
+        order = [stage for stage, _, _ in STAGES]
+        return {
+            stage: {
+                "count": len(values),
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "p99": percentile(values, 99),
+            }
+            for stage, values in sorted(samples.items(), key=lambda kv: order.index(kv[0]) if kv[0] in order else 99)
+        }
+
+    def report(self) -> str:
+        """段ごとのパーセンタイルを表にした文字列"""
+        lines = [f"{'stage':<14} {'count':>5} {'p50':>7} {'p95':>7} {'p99':>7}"]
+        for stage, st in self.percentiles().items():
+            lines.append(f"{stage:<14} {st['count']:>5} {st['p50']:>6.2f}s {st['p95']:>6.2f}s {st['p99']:>6.2f}s")
+        return "\n".join(lines)
+
+    def export_chrome(self, path: str) -> int:
+        """
+        保持しているトレースを Chrome トレース形式（JSON）で書き出す
+
+        トレースごとに1行（tid）を使い、各段を区間イベント（ph: "X"）にする。
+
+        Returns:
+            書き出したトレースの件数
+        """
+        traces = self.traces()
+        events = []
+        for trace in traces:
+            events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": trace.id,
+                           "args": {"name": f"#{trace.id} {trace.text[:30]}"}})
+            for stage, start, end in STAGES:
+                if stage == "total":
+                    continue
+                a, b = trace.marks.get(start), trace.marks.get(end)
+                if a is None or b is None:
+                    continue
+                events.append({"name": stage, "cat": "latency", "ph": "X", "pid": 1, "tid": trace.id,
+                               "ts": a / 1000, "dur": max(0, b - a) / 1000})
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+        return len(traces)
+
+    def close(self):
+        with self._lock:
+            if self._jsonl is not None:
+                self._jsonl.close()
+                self._jsonl = None
@@ -11,13 +11,21 @@ YouTubeの英語音声をリアルタイムで日本語音声に翻訳する
 """
 
 import argparse
+import asyncio
+import itertools
 import os
 import platform
+import queue
 import sys
 import threading
 import signal
 import time
 
+import startup  # 起動からの経過時間の基準（最初に読み込む）
+from startup import StartupProbes
+
+import numpy as np
+
 # OS に応じた AudioCapture を選択
 IS_WINDOWS = platform.system() == "Windows"
 
@@ -28,23 +36,40 @@ else:
     from audio_capture import AudioCapture
     DEFAULT_DEVICE = "BlackHole 2ch"
 
-# ASR エンジンは --asr オプションで選択（デフォルト: whisper）
-# main() の argparse で切り替え、VoiceBridge に注入する
-from transcriber import Transcriber as WhisperTranscriber
-from translator import Translator
-from tts_engine import TTSEngine
-from tts_voicevox import VoicevoxTTS
-from player import AudioPlayer
+# エンジンのモジュール（ASR・翻訳・TTS・再生・AI チャット）は使うときに読み込む
+# （faster-whisper・pygame・edge-tts 等の読み込みは重いので、--list-devices や使わないエンジンでは読み込まない）
+from tts_cache import TTSCache
+from play_queue import URGENT
+from rate_controller import RateController
+from tts_pipeline import SentencePipeline
 from translation_logger import TranslationLogger
-from ai_chat import AiChat, load_dotenv
+from latency_trace import LatencyTracer
+from deadline_scheduler import DeadlineScheduler, DROP, MERGE, TEXT_ONLY
+from segment_stitcher import SegmentStitcher
+from stage_pipeline import Stage, StagedPipeline
+from orchestrator import Orchestrator, OrderedGate
+from language_pair import LanguagePair, PairSwitcher
+from model_registry import ModelRegistry
+from model_residency import ResidencyMonitor
 
-# .env から環境変数をロード
-load_dotenv()
+
+def _pair_component(name: str) -> property:
+    """今の言語ペア（VoiceBridge.pair）の部品を読み書きする属性"""
+    return property(lambda self: getattr(self.pair, name),
+                    lambda self, value: setattr(self.pair, name, value))
 
 
 class VoiceBridge:
     """メインアプリケーションクラス"""
 
+    # 今の言語ペアの部品（切り替えるときは self.pair ごと差し替える。発話は開始時のペアを持ち回る）
+    source_language = _pair_component("source")
+    target_language = _pair_component("target")
+    tts_language = _pair_component("tts_language")
+    transcriber = _pair_component("transcriber")
+    translator = _pair_component("translator")
+    tts = _pair_component("tts")
+
     def __init__(
         self,
         device_name: str = DEFAULT_DEVICE,
@@ -61,14 +86,29 @@ class VoiceBridge:
         ai_base_url: str = "https://api.openai.com/v1",
         ai_api_key: str = None,
         ai_model: str = "gpt-4o-mini",
+        stitch_budget: float = None,
+        speculative: bool = False,
+        translation_memory: bool = True,
+        translate_engine: str = "google",
+        tts_cache_dir: str = None,
+        rate_control: str = None,
+        max_rate: float = 1.5,
+        player_backend: str = "sounddevice",
+        max_audio_age: float = 20.0,
+        translate_workers: int = 2,
+        pipeline_queue_size: int = 4,
+        orchestrator: str = "asyncio",
+        latency_log: str = None,
+        chrome_trace: str = None,
+        latency_budget: float = 10.0,
+        idle_unload: float = 600.0,
+        rss_budget_mb: float = None,
     ):
         # TTS言語はデフォルトで翻訳言語と同じ
         if tts_language is None:
             tts_language = target_language
 
-        self.source_language = source_language
-        self.target_language = target_language
-        self.tts_language = tts_language
+        self.pair = LanguagePair(source_language, target_language, tts_language)
 
         self.asr_engine = asr_engine
         self.capture = AudioCapture(
@@ -82,33 +122,96 @@ class VoiceBridge:
             self.transcriber = MoonshineTranscriber(model_size=model_size, language=source_language)
             print(f"[VoiceBridge] ASR: Moonshine (language={source_language})")
         else:
+            from transcriber import Transcriber as WhisperTranscriber
             self.transcriber = WhisperTranscriber(model_size=model_size, language=source_language)
             print(f"[VoiceBridge] ASR: faster-whisper (model={model_size}, language={source_language})")
+        # 先行翻訳: ストリーミング ASR の途中経過を確定前に翻訳しておく
+        self.speculative = speculative and mode != "chat"
+        if self.speculative and asr_engine != "moonshine":
+            print("[VoiceBridge] 先行翻訳はストリーミング ASR（--asr moonshine）でのみ有効です")
+            self.speculative = False
+
+        # 翻訳エンジンの設定（言語ペアを切り替えたときも同じ設定で作り直す）
+        self.translate_engine = translate_engine
+        self.translation_memory = translation_memory
+        self._ai_config = {"base_url": ai_base_url, "api_key": ai_api_key, "model": ai_model}
         # チャットモードでは翻訳不要
-        if mode != "chat":
-            self.translator = Translator(source=source_language, target=target_language)
-        else:
-            self.translator = None
+        self.translator = self._make_translator(source_language, target_language) if mode != "chat" else None
+        if self.translator is not None and translate_engine == "llm":
+            print(f"[VoiceBridge] 翻訳: LLM ({ai_model}) → Google にフェイルオーバー")
+        if self.speculative:
+            print("[VoiceBridge] 先行翻訳: 有効（ストリーミング ASR）")
+
+        # 通信の段（翻訳・edge-tts・AI チャット）は1つのイベントループ上のコルーチンで動かす
+        # LLM 翻訳は直前の文脈を使うので、順番どおりに1件ずつ訳す
+        self.translate_workers = 1 if translate_engine == "llm" else max(1, translate_workers)
+        self.orchestrator = Orchestrator(limits={"translate": self.translate_workers})
+        self.pipeline_mode = orchestrator  # "asyncio"（Orchestrator）or "threads"（StagedPipeline）
+
+        # 合成済み音声のキャッシュ（TTS エンジンを切り替えても共有する）
+        self.tts_cache = TTSCache(cache_dir=tts_cache_dir)
 
         # TTS エンジン: VOICEVOX が利用可能ならそちらを使う（ただし日本語のみ対応）
         self.use_voicevox = use_voicevox
         self._voicevox_speaker_id = voicevox_speaker_id
+        self.tts = self._make_tts(tts_language, voice)
         if use_voicevox and tts_language == "ja":
-            self.tts = VoicevoxTTS(speaker_id=voicevox_speaker_id)
             print(f"[VoiceBridge] TTS: VOICEVOX (speaker_id={voicevox_speaker_id})")
         else:
             if use_voicevox and tts_language != "ja":
                 print(f"[VoiceBridge] VOICEVOX は日本語のみ対応のため、Edge TTS にフォールバック")
-            self.tts = TTSEngine(language=tts_language, voice=voice)
             print(f"[VoiceBridge] TTS: Edge TTS (language={tts_language})")
 
-        self.player = AudioPlayer()
+        # 再生: sounddevice のコールバックで隙間なく再生（出力デバイスがなければ pygame）
+        # "null" は音を出さずに即座に再生済みにする（ベンチマーク用）
+        from player_callback import CallbackPlayer
+        if player_backend == "null":
+            self.player = CallbackPlayer(null_output=True, realtime=False)
+        elif player_backend == "sounddevice" and CallbackPlayer.is_available():
+            self.player = CallbackPlayer()
+        else:
+            if player_backend == "sounddevice":
+                print("[VoiceBridge] sounddevice の出力デバイスが使えないため pygame で再生します")
+            from player import AudioPlayer
+            self.player = AudioPlayer()
+        self.player.on_first_audio = self._on_first_audio
+        # 元の発話からこの秒数以上遅れた訳文は読み上げない（少しの遅れなら早回しで取り戻す）
+        self.max_audio_age = max_audio_age or None
+        # 長いテキストは文に分けて、1文目から順に合成・再生キューへ
+        self.speech = SentencePipeline(self.tts, self.player)
+        # 話速制御: 再生待ちが溜まったら話速を上げて、元の音声からの遅れを一定以内に保つ
+        self.rate_control = None
+        if rate_control:
+            self.rate_control = RateController(self.player, self.speech, max_rate=max_rate, mode=rate_control)
+            print(f"[VoiceBridge] 話速制御: {rate_control} (最大 {max_rate:.2f}x)")
         self.logger = TranslationLogger(log_dir="logs")
+        # 遅延トレース: チャンクごとにキャプチャ → 最初の音が出るまでの各段の時刻を記録する
+        self.tracer = LatencyTracer(jsonl_path=latency_log)
+        self.tracer.on_complete = self._on_trace_complete
+        self.chrome_trace_path = chrome_trace  # 停止時に Chrome トレース形式で書き出す
+        # 期限つきスケジューラー: 待ちすぎたチャンクは結合・字幕のみ・破棄して遅れを溜めない（0 で無効）
+        self.scheduler = DeadlineScheduler(budget=latency_budget) if latency_budget else None
+        # 音声が idle_unload 秒ない・RSS が予算を超えたら ASR モデルをメモリから外し、音を検出したら裏で読み込み直す
+        self.residency = None
+        if idle_unload or rss_budget_mb:
+            self.residency = ResidencyMonitor(ModelRegistry.shared(), idle_seconds=idle_unload,
+                                              rss_budget_mb=rss_budget_mb)
+            self.residency.start()
+            self.capture.on_sound = self.residency.note_sound
+
+        # ASR 断片を文単位にまとめてから翻訳する（デフォルト: 1チャンク分 + 0.5秒まで保持）
+        if stitch_budget is None:
+            stitch_budget = chunk_duration + 0.5
+        self.stitcher = SegmentStitcher(
+            latency_budget=stitch_budget,
+            pause_after=chunk_duration + 1.0,
+        )
 
         # モード: "translate"（翻訳）or "chat"（AI会話）
         self.mode = mode
         self.ai_chat = None
         if mode == "chat":
+            from ai_chat import AiChat
             self.ai_chat = AiChat(
                 base_url=ai_base_url,
                 api_key=ai_api_key,
@@ -119,9 +222,20 @@ class VoiceBridge:
         else:
             print(f"[VoiceBridge] モード: 翻訳")
 
+        # 発話の処理を重ねて進める: ASR → 文の結合 → 翻訳 → 読み上げ → 記録
+        # （asyncio: Orchestrator のコルーチン / threads: 段ごとのスレッド）
+        self.pipeline_queue_size = pipeline_queue_size  # 処理中の発話・段の間のキューの上限（背圧）
+        self.stages = None
+
         self._running = False
         self._pipeline_thread = None
+        self._model_lock = threading.Lock()  # 起動時の先読みとパイプラインでモデルを二重に読み込まない
+        # 言語ペアの切り替え: 新しいペアは裏で用意し、発話の切れ目で差し替える
+        self.switcher = PairSwitcher(self._build_pair, on_ready=self._on_pair_ready, discard=self._discard_pair)
+        self._swap_lock = threading.Lock()
+        self._stitch_pair = self.pair  # 文の結合に保持中の断片がどのペアのものか
         self._is_playing = False  # TTS再生中フラグ（フィードバックループ防止）
+        self.last_first_audio = None  # 直近の初回音声までの時間（秒）
 
         # GUI コールバック用
         self.on_english_text = None
@@ -133,15 +247,21 @@ class VoiceBridge:
         # 音声レベルコールバックを AudioCapture に接続
         self.capture.on_level = self._on_capture_level
 
-        # 再生状態のコールバックを AudioPlayer に接続（フィードバックループ防止）
-        self.player.on_play_start = self._on_play_start
-        self.player.on_play_end = self._on_play_end
+        # 再生状態のコールバックを AudioPlayer に接続（フィードバックループ防止。音を出さないなら不要）
+        if player_backend != "null":
+            self.player.on_play_start = self._on_play_start
+            self.player.on_play_end = self._on_play_end
 
     def _on_capture_level(self, rms: float, is_active: bool):
         """AudioCapture からのレベル通知を中継"""
         if self.on_level:
             self.on_level(rms, is_active)
 
+    def _on_first_audio(self, seconds: float):
+        """ストリーミング再生で最初の音が出た — 合成開始からの時間を独立した遅延段階として報告"""
+        self.last_first_audio = seconds
+        print(f"[Latency] 初回音声={seconds:.2f}s（合成開始→再生開始）")
+
     def _on_play_start(self):
         """TTS 再生開始時 — キャプチャを抑制"""
         self._is_playing = True
@@ -165,23 +285,93 @@ class VoiceBridge:
         if self.on_latency:
             self.on_latency(latency, stage)
 
+    def _on_trace_complete(self, trace):
+        """チャンクの最初の音が出た — キャプチャからの実測遅延と段ごとの内訳を報告"""
+        if self.scheduler:
+            self.scheduler.observe(trace)
+        spans = trace.spans()
+        total = spans.pop("total", None)
+        if total is None:
+            return
+        detail = " ".join(f"{stage}={seconds:.2f}s" for stage, seconds in spans.items())
+        print(f"[Trace] #{trace.id} 発話→音声={total:.2f}s ({detail})")
+        self._notify_latency(total,
+            f"認識{spans.get('asr', 0.0):.1f}s+翻訳{spans.get('translate', 0.0):.1f}s"
+            f"+TTS{spans.get('tts', 0.0):.1f}s+再生待ち{spans.get('player_queue', 0.0):.1f}s")
+
+    def _next_chunk(self, timeout: float):
+        """キャプチャから音声チャンクを取り出し、そのチャンクのトレースを始める（なければ (None, None)）"""
+        audio_chunk, captured_ns = self.capture.get_chunk_timed(timeout=timeout)
+        if audio_chunk is None:
+            return None, None
+        trace = self.tracer.start(captured_ns, len(audio_chunk) / self.capture.sample_rate)
+        trace.mark("dequeued")
+        return audio_chunk, trace
+
+    def _schedule(self, audio_chunk, trace):
+        """
+        取り出したチャンクの扱いを期限から決める
+
+        Returns:
+            (処理する音声, トレース, 読み上げるか)。破棄なら音声は None
+        """
+        if self.scheduler is None:
+            return audio_chunk, trace, True
+        chunks = [audio_chunk]
+        playback_wait = self.player.queue_duration + self.speech.pending_seconds
+        while True:
+            decision = self.scheduler.decide(trace.age(), self.capture.audio_queue.qsize(), playback_wait,
+                                             merged=len(chunks))
+            if decision.action != MERGE:
+                break
+            # 待っている次のチャンクを結合して1回の ASR で処理する（トレースは最も古いチャンクのもの）
+            next_chunk, _ = self.capture.get_chunk_timed(timeout=0.01)
+            if next_chunk is not None:
+                chunks.append(next_chunk)
+
+        if len(chunks) > 1:
+            audio_chunk = np.concatenate(chunks)
+            print(f"[Scheduler] {len(chunks)}チャンクを結合 (遅れ {decision.age:.1f}s)")
+        if decision.action == DROP:
+            print(f"[Scheduler] 破棄 (遅れ {decision.age:.1f}s, 訳文まで {decision.text_eta:.1f}s 見込み, "
+                  f"予算 {self.scheduler.budget:.1f}s)")
+            trace.finish()
+            return None, None, False
+        if decision.action == TEXT_ONLY:
+            print(f"[Scheduler] 字幕のみ (音声まで {decision.audio_eta:.1f}s 見込み, 予算 {self.scheduler.budget:.1f}s)")
+        else:
+            print(f"[Scheduler] 処理 (遅れ {decision.age:.1f}s, 音声まで {decision.audio_eta:.1f}s 見込み, "
+                  f"予算 {self.scheduler.budget:.1f}s)")
+        return audio_chunk, trace, decision.action != TEXT_ONLY
+
     def _pipeline_loop(self):
         """メインパイプラインループ（モードに応じて分岐）"""
         if self.mode == "chat":
             self._chat_pipeline_loop()
-        else:
+        elif self.speculative:
+            self._streaming_translate_loop()
+        elif self.pipeline_mode == "threads":
             self._translate_pipeline_loop()
+        else:
+            self._async_translate_loop()
 
     def _translate_pipeline_loop(self):
-        """翻訳パイプラインループ"""
+        """翻訳パイプラインループ（キャプチャ。以降の処理は段階並行パイプラインへ渡す）"""
         self._notify_status("モデルロード中...")
-        self.transcriber.load_model()
+        self.preload_model()
         self._notify_status("キャプチャ中...")
 
+        self.stages = self._build_translate_stages()
+        self.stages.start()
+
         while self._running:
+            # 言語ペアの用意ができていれば、チャンクの切れ目で差し替える
+            self._apply_pending_pair()
             # 1. 音声チャンクを取得
-            audio_chunk = self.capture.get_chunk(timeout=1.0)
+            audio_chunk, trace = self._next_chunk(timeout=1.0)
             if audio_chunk is None:
+                # 保持中の断片が遅延予算・ポーズ判定を超えていれば送出
+                self.stages.submit(("poll",))
                 continue
 
             # TTS 再生中はキャプチャしたチャンクを捨てる（フィードバックループ防止）
@@ -189,81 +379,462 @@ class VoiceBridge:
                 print("[Pipeline] TTS再生中のため音声チャンクをスキップ")
                 continue
 
+            # 待ちすぎたチャンクは結合・字幕のみ・破棄
+            audio_chunk, trace, speak = self._schedule(audio_chunk, trace)
+            if audio_chunk is None:
+                continue
+
+            # 下流が詰まっていれば空くまで待つ（背圧。その間のチャンクはキャプチャ側に溜まる）
             t_start = time.time()
-            self._notify_status("認識中...")
+            item = ("chunk", audio_chunk, t_start, trace, speak, self.pair)
+            while self._running and not self.stages.submit(item, timeout=0.5):
+                pass
+
+        # 保持中の断片も訳しておき（読み上げはしない）、処理中のものを流し切ってから止める
+        self.stages.submit(("flush",))
+        if not self.stages.stop(drain=True, timeout=5.0):
+            print("[Pipeline] 処理中のセグメントを残して停止")
+        self._print_stitcher_stats()
+        bottleneck = self.stages.bottleneck()
+        if bottleneck:
+            busy = {name: f"{st['busy_seconds'] / max(st['processed'], 1):.2f}s"
+                    for name, st in self.stages.stats().items()}
+            print(f"[Pipeline] 1件あたりの処理時間 {busy}（律速: {bottleneck}）")
+
+    def _build_translate_stages(self) -> StagedPipeline:
+        """ASR → 文の結合 → 翻訳（並列） → 読み上げ → 記録 の段をつなぐ"""
+        size = self.pipeline_queue_size
+        return StagedPipeline([
+            Stage("asr", self._stage_transcribe, maxsize=size),
+            Stage("stitch", self._stage_stitch, maxsize=size),
+            Stage("translate", self._stage_translate, workers=self.translate_workers, maxsize=size),
+            Stage("speak", self._stage_speak, maxsize=size),
+            Stage("report", self._stage_report, maxsize=size),
+        ])
+
+    def _stage_transcribe(self, item, emit):
+        """2. 音声認識（1スレッド。モデルは共有しない）"""
+        if item[0] != "chunk":
+            emit(item)  # poll / flush はそのまま結合段へ
+            return
+        _, audio_chunk, t_start, trace, speak, pair = item
+        self._notify_status("認識中...")
+        t_step = time.time()
+        try:
+            english_text = self._transcribe(audio_chunk, trace, pair)
+        except Exception as e:
+            print(f"[Pipeline] 音声認識エラー: {e}")
+            return
+        t_transcribe = time.time() - t_step
+        self._notify_status("キャプチャ中...")
 
-            # 2. 音声認識（英語テキスト化）
-            t_step = time.time()
-            try:
-                english_text = self.transcriber.transcribe(audio_chunk)
-            except Exception as e:
-                print(f"[Pipeline] 音声認識エラー: {e}")
+        if not english_text.strip():
+            emit(("pause", t_start, t_transcribe, trace, speak, pair))
+            return
+        emit(("text", english_text, t_start, t_transcribe, trace, speak, pair))
+
+    def _stage_stitch(self, item, emit):
+        """文が完結した分だけ翻訳段へ（未完の末尾は次のチャンクと結合。状態を持つので1スレッド）"""
+        kind = item[0]
+        if kind in ("poll", "flush"):
+            segments = self._stitch(kind, None, 0.0, 0.0, pair=self.pair)
+        elif kind == "pause":
+            _, t_start, t_transcribe, trace, speak, pair = item
+            segments = self._stitch(kind, "", t_start, t_transcribe, trace, speak, pair)
+        else:
+            _, text, t_start, t_transcribe, trace, speak, pair = item
+            segments = self._stitch(kind, text, t_start, t_transcribe, trace, speak, pair)
+        for segment in segments:
+            emit(segment)
+
+    def _stage_translate(self, segment, emit):
+        """3. 翻訳（複数スレッド。ストリーミング対応エンジンなら届いた文から読み上げ段へ）"""
+        self._notify_status("翻訳中...")
+        t_step = time.time()
+        parts = []
+        t_translate = None
+        try:
+            for translated_part in self._traced_translation(segment["source"], segment["trace"], segment["pair"]):
+                if not translated_part.strip():
+                    continue
+                if t_translate is None:
+                    t_translate = time.time() - t_step  # 最初の文が届くまで
+                    segment["trace"].mark("translate_first")
+                parts.append(translated_part)
+                emit(("part", segment, translated_part))
+        except Exception as e:
+            print(f"[Pipeline] 翻訳エラー: {e}")
+        emit(("done", segment, parts, t_translate))
+
+    def _stage_speak(self, item, emit):
+        """4. 音声合成（セグメントの順に投入。合成・再生は SentencePipeline が先回りして行う）"""
+        kind, segment = item[0], item[1]
+        if kind == "part":
+            if segment["speak"] and self._running and segment["pair"] is self.pair:
+                job = self._speak_part(item[2], self._audio_deadline(segment["t_start"]), segment["trace"],
+                                       segment["pair"])
+                segment.setdefault("first_job", job)
+            return
+        _, _, parts, t_translate = item
+        emit((segment, parts, t_translate))
+
+    def _stage_report(self, item, emit):
+        """5. 表示・ログ保存・遅延の報告（最初の音声ができるのを待つので、読み上げ段とは分ける）"""
+        segment, parts, t_translate = item
+        self._report_translation(segment["source"], parts, segment["t_start"], segment["t_transcribe"],
+                                 t_translate, segment.get("first_job"), speak=segment["speak"],
+                                 trace=segment["trace"], pair=segment["pair"])
+
+    def _async_translate_loop(self):
+        """翻訳パイプラインループ（キャプチャ。発話ごとの処理は Orchestrator のコルーチンで重ねて進める）"""
+        self._notify_status("モデルロード中...")
+        self.preload_model()
+        self._notify_status("キャプチャ中...")
+
+        # 文の結合・読み上げ・記録は発話の順に通す（認識・翻訳は並行）
+        gates = (OrderedGate(), OrderedGate(), OrderedGate())
+        seq = itertools.count()
+
+        while self._running:
+            # 言語ペアの用意ができていれば、発話の切れ目で差し替える（以降の発話は新しいペアで処理する）
+            self._apply_pending_pair()
+            # 1. 音声チャンクを取得
+            audio_chunk, trace = self._next_chunk(timeout=1.0)
+            if audio_chunk is None:
+                # 保持中の断片が遅延予算・ポーズ判定を超えていれば送出
+                self._spawn_utterance(next(seq), gates, "poll")
                 continue
-            t_transcribe = time.time() - t_step
 
-            if not english_text.strip():
-                self._notify_status("キャプチャ中...")
+            # TTS 再生中はキャプチャしたチャンクを捨てる（フィードバックループ防止）
+            if self._is_playing:
+                print("[Pipeline] TTS再生中のため音声チャンクをスキップ")
                 continue
 
-            source_label = self.source_language.upper()
-            print(f"[{source_label}] {english_text}")
-            if self.on_english_text:
-                self.on_english_text(english_text)
+            # 待ちすぎたチャンクは結合・字幕のみ・破棄
+            audio_chunk, trace, speak = self._schedule(audio_chunk, trace)
+            if audio_chunk is None:
+                continue
+
+            # 処理中の発話が溜まっていれば減るまで待つ（背圧。その間のチャンクはキャプチャ側に溜まる）
+            while self._running and self.orchestrator.active_scopes >= self.pipeline_queue_size:
+                time.sleep(0.05)
+            self._spawn_utterance(next(seq), gates, "chunk", audio_chunk, trace, speak)
 
-            # 3. 翻訳
-            self._notify_status("翻訳中...")
+        # 保持中の断片も訳しておき（読み上げはしない）、処理中の発話が終わるのを待つ
+        try:
+            self._spawn_utterance(next(seq), gates, "flush").result(timeout=5.0)
+        except Exception as e:
+            print(f"[Pipeline] 処理中の発話を残して停止 ({type(e).__name__})")
+        self._print_stitcher_stats()
+
+    def _spawn_utterance(self, seq: int, gates, kind: str, audio_chunk=None, trace=None, speak: bool = True):
+        """発話1つ分の処理を、その発話のスコープで今の言語ペアで開始する"""
+        scope = self.orchestrator.scope(f"utterance-{seq}")
+        return scope.spawn(self._utterance(scope, seq, gates, kind, audio_chunk, time.time(), trace, speak,
+                                           self.pair))
+
+    async def _utterance(self, scope, seq: int, gates, kind: str, audio_chunk, t_start: float, trace=None,
+                         speak: bool = True, pair: LanguagePair = None):
+        """発話1つ分: 認識 → 文の結合（順番） → 翻訳（並行） → 読み上げ（順番） → 記録（順番）"""
+        stitch_gate, speak_gate, report_gate = gates
+        orchestrator = self.orchestrator
+
+        # 2. 音声認識（ASR 専用スレッド）
+        english_text = None
+        t_transcribe = 0.0
+        if kind == "chunk":
+            self._notify_status("認識中...")
             t_step = time.time()
             try:
-                translated_text = self.translator.translate(english_text)
+                english_text = await orchestrator.run_blocking("asr", self._transcribe, audio_chunk, trace, pair)
             except Exception as e:
-                print(f"[Pipeline] 翻訳エラー: {e}")
-                continue
-            t_translate = time.time() - t_step
+                print(f"[Pipeline] 音声認識エラー: {e}")
+            t_transcribe = time.time() - t_step
+            self._notify_status("キャプチャ中...")
 
-            if not translated_text.strip():
-                self._notify_status("キャプチャ中...")
-                continue
+        # 文が完結した分だけ翻訳へ（未完の末尾は次のチャンクと結合）
+        async with stitch_gate.turn(seq):
+            segments = self._stitch(kind, english_text, t_start, t_transcribe, trace, speak, pair)
+
+        # 3. 翻訳: セグメントごとに並行して始める（同時実行数は "translate" のセマフォ）
+        translations = []
+        for segment in segments:
+            parts = asyncio.Queue()
+            task = scope.create_task(
+                self._translate_async(segment["source"], parts, segment["trace"], segment["pair"]))
+            translations.append((segment, parts, task))
+
+        # 4. 音声合成: 届いた文から発話の順に投入する
+        reports = []
+        async with speak_gate.turn(seq):
+            for segment, parts, task in translations:
+                deadline = self._audio_deadline(segment["t_start"])
+                received, first_job = [], None
+                while (part := await parts.get()) is not None:
+                    received.append(part)
+                    if segment["speak"] and self._running and segment["pair"] is self.pair:
+                        first_job = first_job or self._speak_part(part, deadline, segment["trace"],
+                                                                  segment["pair"])
+                reports.append((segment, received, await task, first_job))
+
+        # 表示・ログ保存・遅延の報告（最初の音声ができるのを待つのでスレッドで）
+        async with report_gate.turn(seq):
+            for segment, received, t_translate, first_job in reports:
+                await orchestrator.run_blocking(
+                    None, self._report_translation, segment["source"], received, segment["t_start"],
+                    segment["t_transcribe"], t_translate, first_job, segment["speak"], segment["trace"],
+                    segment["pair"])
+
+    def _stitch(self, kind: str, text: str | None, t_start: float, t_transcribe: float,
+                trace=None, speak: bool = True, pair: LanguagePair = None) -> list[dict]:
+        """文の結合（発話の順に呼ぶ）。翻訳するセグメントを返す（speak=False なら字幕のみ）"""
+        pair = pair or self.pair
+        if not self._enter_stitch(pair):
+            # 言語ペアを差し替える前に始めた発話: 前のペアの認識結果は結合せずに捨てる
+            if text and text.strip():
+                print(f"[VoiceBridge] 言語ペア切り替え前の発話を破棄: {text.strip()}")
+            if trace is not None:
+                trace.finish()
+            return []
+        if kind == "poll":
+            sources, t_start, speak = self.stitcher.poll(), time.time(), True
+        elif kind == "flush":
+            sources, t_start, speak = self.stitcher.flush(), time.time(), False
+        elif text is None:
+            sources = []  # 認識エラー
+        elif not text.strip():
+            sources = self.stitcher.on_pause()  # 無音 → 保持中の断片を送出
+        else:
+            print(f"[{pair.source.upper()}] {text}")
+            if self.on_english_text:
+                self.on_english_text(text)
+            sources = self.stitcher.feed(text)
+            if self.stitcher.pending_text:
+                print(f"[Stitcher] 保持中: {self.stitcher.pending_text}")
+        # 保持していた断片だけのセグメント（poll / flush）はチャンクに結びつかないので、トレースを新しく始める
+        return [{"source": source, "t_start": t_start, "t_transcribe": t_transcribe, "speak": speak,
+                 "trace": trace or self.tracer.start(text=source), "pair": pair}
+                for source in sources]
+
+    def _enter_stitch(self, pair: LanguagePair) -> bool:
+        """
+        文の結合の前に呼ぶ（発話の順に）。差し替え前の言語ペアの発話なら False
+
+        差し替え後のペアの最初の発話で、保持中の前のペアの断片を捨てる
+        （前のペアの言語の断片を、新しいペアの発話と結合して訳さない）
+        """
+        if pair is not self.pair:
+            return False
+        if pair is not self._stitch_pair:
+            self._stitch_pair = pair
+            dropped = self.stitcher.discard()
+            if dropped:
+                print(f"[Stitcher] 言語ペアの切り替えで保持中の断片を破棄: {dropped}")
+        return True
 
-            target_label = self.target_language.upper()
-            print(f"[{target_label}] {translated_text}")
-            if self.on_japanese_text:
-                self.on_japanese_text(translated_text)
+    async def _translate_async(self, source_text: str, parts: asyncio.Queue, trace,
+                               pair: LanguagePair = None) -> float | None:
+        """翻訳して文ごとに parts へ入れる（最後に None）。最初の文が届くまでの秒数を返す"""
+        self._notify_status("翻訳中...")
+        t_step = time.time()
+        t_translate = None
+        try:
+            stream = self._traced_translation(source_text, trace, pair)
+            async for translated_part in self.orchestrator.iterate_blocking("translate", stream):
+                if not translated_part.strip():
+                    continue
+                if t_translate is None:
+                    t_translate = time.time() - t_step  # 最初の文が届くまで
+                    trace.mark("translate_first")
+                parts.put_nowait(translated_part)
+        except Exception as e:
+            print(f"[Pipeline] 翻訳エラー: {e}")
+        finally:
+            parts.put_nowait(None)
+        return t_translate
+
+    def _streaming_translate_loop(self):
+        """翻訳パイプラインループ（ストリーミング ASR + 途中経過の先行翻訳）"""
+        from transcriber_moonshine import StreamingTranscriber
+
+        finished_lines = queue.Queue()
+        streaming = StreamingTranscriber(
+            language=self.source_language,
+            on_text=self._on_interim_text,
+            on_line_completed=finished_lines.put,
+        )
+        self._notify_status("モデルロード中...")
+        streaming.start()
+        self._notify_status("キャプチャ中...")
 
-            # ログ保存
-            self.logger.log(
-                self.source_language, self.target_language,
-                english_text, translated_text,
-            )
+        while self._running:
+            # 言語ペアの用意ができていれば差し替え、ストリーミング ASR も新しい言語で始め直す
+            if self._apply_pending_pair():
+                self._enter_stitch(self.pair)
+                while not finished_lines.empty():
+                    finished_lines.get_nowait()  # 前の言語で確定した行は訳さない
+                streaming.set_language(self.source_language)
+
+            audio_chunk = self.capture.get_chunk(timeout=0.2)
+            if audio_chunk is not None and not self._is_playing:
+                streaming.add_audio(audio_chunk, sample_rate=self.capture.sample_rate)
+
+            # 確定した行を翻訳（先行翻訳済みの文は再利用される）
+            while True:
+                try:
+                    line = finished_lines.get_nowait()
+                except queue.Empty:
+                    break
+                t_start = time.time()
+                print(f"[{self.source_language.upper()}] {line}")
+                if self.on_english_text:
+                    self.on_english_text(line)
+                for segment in self.stitcher.feed(line):
+                    self._translate_and_speak(segment, t_start, 0.0)
+
+            for segment in self.stitcher.poll():
+                self._translate_and_speak(segment, time.time(), 0.0)
+
+        streaming.stop()
+        self._finish_stitcher()
+        print(f"[Speculative] {self.translator.stats()}")
+
+    def _on_interim_text(self, text: str, is_final: bool):
+        """ストリーミング ASR の途中経過 → 保持中の断片と結合した形で先行翻訳"""
+        if is_final or not self.speculative:
+            return
+        # ASR のスレッドから呼ばれる。pending_text はロックの下で読むので、パイプラインが結合中でも崩れない
+        self.translator.speculate(f"{self.stitcher.pending_text} {text}".strip())
+
+    def _finish_stitcher(self):
+        """停止時に保持中の断片も訳しておき（読み上げはしない）、削減効果を表示"""
+        for segment in self.stitcher.flush():
+            self._translate_and_speak(segment, time.time(), 0.0, speak=False)
+        self._print_stitcher_stats()
+
+    def _print_stitcher_stats(self):
+        stats = self.stitcher.stats()
+        if stats["fragments_in"]:
+            print(f"[Stitcher] 断片 {stats['fragments_in']}件 → 翻訳 {stats['segments_out']}件 "
+                  f"({stats['calls_saved']:.0%} 削減, {stats['calls_per_min']:.1f}回/分)")
+
+    def _translate_and_speak(self, source_text: str, t_start: float, t_transcribe: float,
+                             speak: bool = True):
+        """確定したセグメントを翻訳・ログ保存・音声合成する"""
+        # 3. 翻訳（ストリーミング対応エンジンなら1文ずつ届く）
+        self._notify_status("翻訳中...")
+        t_step = time.time()
+        parts = []
+        t_translate = None
+        first_job = None
+        deadline = self._audio_deadline(t_start)
+        try:
+            for translated_part in self.translator.translate_stream(source_text):
+                if not translated_part.strip():
+                    continue
+                if t_translate is None:
+                    t_translate = time.time() - t_step  # 最初の文が届くまで
+                parts.append(translated_part)
+                if not speak:
+                    continue
+                # 4. 音声合成（届いた文から文単位で投入し、次の文の翻訳・合成と並行させる）
+                job = self._speak_part(translated_part, deadline)
+                first_job = first_job or job
+        except Exception as e:
+            print(f"[Pipeline] 翻訳エラー: {e}")
 
-            # 4. 音声合成
-            self._notify_status("音声合成中...")
-            t_step = time.time()
-            try:
-                audio_path = self.tts.synthesize(translated_text)
-            except Exception as e:
-                print(f"[Pipeline] TTS エラー: {e}")
-                continue
-            t_tts = time.time() - t_step
+        self._report_translation(source_text, parts, t_start, t_transcribe, t_translate, first_job, speak)
 
-            if audio_path:
-                self.player.enqueue(audio_path)
+    def _audio_deadline(self, t_start: float) -> float | None:
+        """読み上げの期限: 元の発話の処理開始から max_audio_age 秒（time.time → time.monotonic に換算）"""
+        if not self.max_audio_age:
+            return None
+        return time.monotonic() - (time.time() - t_start) + self.max_audio_age
 
-            t_total = time.time() - t_start
-            # チャンク蓄積時間も加算した実質遅延
-            total_with_chunk = t_total + self.capture.chunk_duration
-            print(f"[Latency] 認識={t_transcribe:.1f}s 翻訳={t_translate:.1f}s TTS={t_tts:.1f}s "
-                  f"処理計={t_total:.1f}s 実質遅延={total_with_chunk:.1f}s")
-            self._notify_latency(total_with_chunk,
-                f"認識{t_transcribe:.1f}s+翻訳{t_translate:.1f}s+TTS{t_tts:.1f}s")
+    def _transcribe(self, audio_chunk, trace=None, pair: LanguagePair = None) -> str:
+        """音声認識（発話を始めた言語ペアの ASR で。トレースに ASR の開始・終了を記録する）"""
+        if trace is not None:
+            trace.mark("asr_start")
+        try:
+            text = (pair or self.pair).transcriber.transcribe(audio_chunk)
+        except Exception:
+            # 認識に失敗したチャンクは後の段に進まないので、ここでトレースを打ち切る（遅延の統計に入れない）
+            if trace is not None:
+                trace.abandon()
+            raise
+        if trace is not None:
+            trace.mark("asr_end")
+            trace.text = text.strip()
+        return text
+
+    def _traced_translation(self, source_text: str, trace, pair: LanguagePair = None):
+        """translate_stream を包み、最初の要素を取りに来た時点（翻訳の枠を得た時点）を翻訳開始として記録する"""
+        trace.mark("translate_start")
+        yield from (pair or self.pair).translator.translate_stream(source_text)
+
+    def _speak_part(self, text: str, deadline: float = None, trace=None, pair: LanguagePair = None):
+        """訳文1つを読み上げ待ちに入れる（発話を始めた言語ペアの TTS で、文単位で合成・再生キューへ）"""
+        self._notify_status("音声合成中...")
+        tts = (pair or self.pair).tts
+        if self.rate_control:
+            self.rate_control.update(tts)
+        return self.speech.speak(text, deadline=deadline, trace=trace, engine=tts)
+
+    def _report_translation(self, source_text: str, parts: list[str], t_start: float, t_transcribe: float,
+                            t_translate: float | None, first_job, speak: bool = True, trace=None,
+                            pair: LanguagePair = None):
+        """訳文の表示・ログ保存・遅延の報告"""
+        pair = pair or self.pair
+        # 読み上げに回さなかったトレースはここで完了（読み上げたものは最初の音が出た時点で完了）
+        if trace is not None and "speak" not in trace.marks:
+            trace.finish()
+        if first_job is None and pair is not self.pair:
+            # 訳している間に言語ペアを差し替えた: 前のペアの訳文は表示も読み上げもしない
+            if parts:
+                print(f"[VoiceBridge] 言語ペア切り替え前の訳文を破棄: {''.join(parts)[:40]}")
+            return
+        # 最初の文の音声ができるまでの時間（停止中は待たない）
+        t_tts = (first_job.wait_first(timeout=10.0 if self._running else 0.0) if first_job else None) or 0.0
 
-            self._notify_status("キャプチャ中...")
+        if not parts:
+            return
+        sep = "" if pair.target in ("ja", "zh", "zh-CN") else " "
+        translated_text = sep.join(p.strip() for p in parts)
+
+        target_label = pair.target.upper()
+        print(f"[{target_label}] {translated_text}")
+        startup.mark("first_translation", "最初の翻訳")
+        if self.on_japanese_text:
+            self.on_japanese_text(translated_text)
+
+        # ログ保存
+        self.logger.log(
+            pair.source, pair.target,
+            source_text, translated_text,
+        )
+
+        if not speak:
+            return
+
+        t_total = time.time() - t_start
+        if trace is not None and "capture_start" in trace.marks:
+            # キャプチャ時刻のあるチャンクは、最初の音が出た時点で実測値を報告する（_on_trace_complete）
+            print(f"[Latency] 認識={t_transcribe:.1f}s 翻訳={t_translate:.1f}s TTS={t_tts:.1f}s "
+                  f"処理計={t_total:.1f}s")
+            return
+        # チャンク蓄積時間も加算した実質遅延
+        total_with_chunk = t_total + self.capture.chunk_duration
+        print(f"[Latency] 認識={t_transcribe:.1f}s 翻訳={t_translate:.1f}s TTS={t_tts:.1f}s "
+              f"処理計={t_total:.1f}s 実質遅延={total_with_chunk:.1f}s")
+        self._notify_latency(total_with_chunk,
+            f"認識{t_transcribe:.1f}s+翻訳{t_translate:.1f}s+TTS{t_tts:.1f}s")
 
     def _chat_pipeline_loop(self):
         """AI チャットパイプラインループ（マイク入力）"""
         print("")
         print("[1/4] モデルロード中...")
         self._notify_status("モデルロード中...")
-        self.transcriber.load_model()
+        self.preload_model()
         print("[1/4] モデルロード完了 ✓")
         print("[====] マイク待機中... 話しかけてください")
         self._notify_status("マイク待機中...")
@@ -274,6 +845,7 @@ class VoiceBridge:
         SILENCE_THRESHOLD = 2  # 無音チャンクが連続N回で発話終了と判定
 
         while self._running:
+            self._apply_pending_pair()
             # 1. 音声チャンクを取得
             audio_chunk = self.capture.get_chunk(timeout=1.0)
             if audio_chunk is None:
@@ -284,7 +856,7 @@ class VoiceBridge:
                         user_text = " ".join(utterance_buffer)
                         utterance_buffer.clear()
                         silence_count = 0
-                        self._chat_send_to_ai(user_text)
+                        self.orchestrator.scope("chat").spawn(self._chat_send_to_ai(user_text))
                 continue
 
             # TTS 再生中はスキップ（フィードバックループ防止）
@@ -298,7 +870,8 @@ class VoiceBridge:
             self._notify_status("認識中...")
             t_step = time.time()
             try:
-                chunk_text = self.transcriber.transcribe(audio_chunk)
+                # ASR 専用スレッドで（AI への問い合わせ・読み上げはループ上で並行して進む）
+                chunk_text = self.orchestrator.call("asr", self.transcriber.transcribe, audio_chunk)
             except Exception as e:
                 print(f"[1/4] 音声認識エラー: {e}")
                 continue
@@ -312,7 +885,7 @@ class VoiceBridge:
                         user_text = " ".join(utterance_buffer)
                         utterance_buffer.clear()
                         silence_count = 0
-                        self._chat_send_to_ai(user_text)
+                        self.orchestrator.scope("chat").spawn(self._chat_send_to_ai(user_text))
                     else:
                         print(f"[1/4] (無音 {silence_count}/{SILENCE_THRESHOLD}...)")
                 continue
@@ -323,8 +896,8 @@ class VoiceBridge:
             print(f"[1/4] 認識: \"{chunk_text.strip()}\" (バッファ: {len(utterance_buffer)}件)")
             self._notify_status(f"聞いてます... ({len(utterance_buffer)})")
 
-    def _chat_send_to_ai(self, user_text: str):
-        """バッファに溜まったテキストをまとめてAIに送信"""
+    async def _chat_send_to_ai(self, user_text: str):
+        """バッファに溜まったテキストをまとめてAIに送信（応答は "chat" のセマフォで1件ずつ）"""
         t_start = time.time()
         print(f"[1/4] 認識完了 ✓")
         print(f"  YOU: {user_text}")
@@ -336,7 +909,7 @@ class VoiceBridge:
         self._notify_status("AI 応答中...")
         t_step = time.time()
         try:
-            ai_response = self.ai_chat.chat(user_text)
+            ai_response = await self.orchestrator.run_blocking("chat", self.ai_chat.chat, user_text)
         except Exception as e:
             print(f"[2/4] AI エラー: {e}")
             return
@@ -363,19 +936,11 @@ class VoiceBridge:
         # 4. 音声合成（ずんだもん等で読み上げ）
         print("[4/4] 音声合成中...")
         self._notify_status("音声合成中...")
-        t_step = time.time()
-        try:
-            audio_path = self.tts.synthesize(ai_response)
-        except Exception as e:
-            print(f"[4/4] TTS エラー: {e}")
-            return
-        t_tts = time.time() - t_step
-
-        if audio_path:
-            self.player.enqueue(audio_path)
+        job = self.speech.speak(ai_response, priority=URGENT)
+        t_tts = await self.orchestrator.run_blocking(None, job.wait_first, 30.0) or 0.0  # 1文目の音声ができるまで
 
         t_total = time.time() - t_start
-        print(f"[4/4] 音声合成完了 ({t_tts:.1f}s) ✓")
+        print(f"[4/4] 音声合成開始 (1文目 {t_tts:.1f}s / 全{len(job.segments)}文) ✓")
         print(f"[====] 合計 {t_total:.1f}s (AI{t_ai:.1f}s + TTS{t_tts:.1f}s)")
         self._notify_latency(t_total,
             f"AI{t_ai:.1f}s+TTS{t_tts:.1f}s")
@@ -388,41 +953,41 @@ class VoiceBridge:
         if not self.ai_chat or not text.strip():
             return
 
-        def _process():
-            print(f"[YOU] {text}")
-            if self.on_english_text:
-                self.on_english_text(text)
+        self.orchestrator.scope("chat-text").spawn(self._chat_text_async(text))
 
-            self._notify_status("AI 応答中...")
-            try:
-                ai_response = self.ai_chat.chat(text)
-            except Exception as e:
-                print(f"[Chat] AI エラー: {e}")
-                self._notify_status("マイク待機中..." if self._running else "停止中")
-                return
+    async def _chat_text_async(self, text: str):
+        print(f"[YOU] {text}")
+        if self.on_english_text:
+            self.on_english_text(text)
 
-            if not ai_response.strip():
-                return
+        self._notify_status("AI 応答中...")
+        try:
+            ai_response = await self.orchestrator.run_blocking("chat", self.ai_chat.chat, text)
+        except Exception as e:
+            print(f"[Chat] AI エラー: {e}")
+            self._notify_status("マイク待機中..." if self._running else "停止中")
+            return
 
-            print(f"[AI] {ai_response}")
-            if self.on_japanese_text:
-                self.on_japanese_text(ai_response)
+        if not ai_response.strip():
+            return
 
-            # ログ保存
-            self.logger.log("user", "ai", text, ai_response)
+        print(f"[AI] {ai_response}")
+        if self.on_japanese_text:
+            self.on_japanese_text(ai_response)
 
-            # 音声合成
-            self._notify_status("音声合成中...")
-            try:
-                audio_path = self.tts.synthesize(ai_response)
-                if audio_path:
-                    self.player.enqueue(audio_path)
-            except Exception as e:
-                print(f"[Chat] TTS エラー: {e}")
+        # ログ保存
+        self.logger.log("user", "ai", text, ai_response)
 
-            self._notify_status("マイク待機中..." if self._running else "停止中")
+        # 音声合成
+        self._notify_status("音声合成中...")
+        job = self.speech.speak(ai_response, priority=URGENT)
+        await self.orchestrator.run_blocking(None, job.wait_first, 30.0)
+
+        self._notify_status("マイク待機中..." if self._running else "停止中")
 
-        threading.Thread(target=_process, daemon=True).start()
+    def cancel_pending(self):
+        """処理中の発話（翻訳・AI の応答）をすべて取り消す"""
+        self.orchestrator.cancel_all()
 
     def _notify_status(self, status: str):
         if self.on_status_change:
@@ -444,16 +1009,85 @@ class VoiceBridge:
         """翻訳パイプラインを停止"""
         self._running = False
         self.capture.stop()
+        # 処理中のセグメントを流し切ってから（ログ保存まで）再生・合成を止める
+        if self._pipeline_thread:
+            self._pipeline_thread.join(timeout=6.0)
+            self._pipeline_thread = None
+        self._apply_pending_pair()  # 停止するまでに用意ができた言語ペア
+        self.cancel_pending()
         self.player.stop()
         self.tts.cleanup()
         self.logger.close()
-
-        if self._pipeline_thread:
-            self._pipeline_thread.join(timeout=3.0)
-            self._pipeline_thread = None
+        if self.translator:
+            self.translator.save_memory()
+            if self.speculative:
+                self.translator.shutdown()
+        stats = self.tts_cache.stats()
+        if stats["hits"] + stats["misses"]:
+            print(f"[TTSCache] ヒット {stats['hits']}/{stats['hits'] + stats['misses']}件 "
+                  f"({stats['hit_rate']:.0%}, {stats['bytes'] / 1024:.0f} KB)")
+        queue_stats = self.player.queue_stats()
+        if queue_stats["dropped"] or queue_stats["shortened"]:
+            print(f"[AudioPlayer] 期限切れ: 破棄 {queue_stats['dropped']}件 ({queue_stats['dropped_seconds']:.1f}s), "
+                  f"早回し {queue_stats['shortened']}件")
+        if self.rate_control:
+            report = self.rate_control.report()
+            if report["updates"]:
+                print(f"[RateController] 遅れ 平均 {report['drift_mean']:.1f}s / p95 {report['drift_p95']:.1f}s / "
+                      f"最大 {report['drift_max']:.1f}s, 話速 平均 {report['rate_mean']:.2f}x")
+        if self.scheduler:
+            decisions = self.scheduler.stats()
+            if any(decisions.values()):
+                print(f"[Scheduler] 処理 {decisions['process']}件, 結合 {decisions['merge']}件, "
+                      f"字幕のみ {decisions['text_only']}件, 破棄 {decisions['drop']}件")
+        if self.residency:
+            residency = self.residency.stats()
+            if residency["unloads"]:
+                print(f"[Residency] モデルを外した回数 {residency['unloads']}, 読み込み直した回数 {residency['rewarms']}")
+        if self.tracer.completed:
+            print(f"[LatencyTracer] 段ごとの遅延（直近 {self.tracer.window}件）\n{self.tracer.report()}")
+            if self.chrome_trace_path:
+                count = self.tracer.export_chrome(self.chrome_trace_path)
+                print(f"[LatencyTracer] Chrome トレース: {self.chrome_trace_path} ({count}件)")
+        self.tracer.close()
 
         print("[VoiceBridge] パイプライン停止")
 
+    def close(self):
+        """
+        VoiceBridge を使い終わる（停止して ASR モデルの参照を返す）
+
+        モデルはプロセスで共有しているので、registry の ttl の間に作った次の VoiceBridge
+        （モードの切り替え・作り直し）は読み込み直さずに使う
+        """
+        if self._running:
+            self.stop()
+        if self.residency:
+            self.residency.stop()
+        self._apply_pending_pair()
+        if self.translator:
+            self.translator.close()
+        self.transcriber.release()
+
+    def preload_model(self):
+        """ASR モデルを読み込んでおく（起動時に裏で呼ぶ。読み込み中に開始したらパイプライン側が終わるのを待つ）"""
+        with self._model_lock:
+            self.transcriber.load_model()
+
+    def enable_voicevox(self, speaker_id: int):
+        """起動後に VOICEVOX が見つかった — 読み上げ言語が日本語なら TTS を VOICEVOX に切り替える"""
+        from tts_voicevox import VoicevoxTTS
+
+        self.use_voicevox = True
+        self._voicevox_speaker_id = speaker_id
+        if self.tts_language != "ja" or isinstance(self.tts, VoicevoxTTS):
+            return
+        previous = self.tts
+        self.tts = VoicevoxTTS(speaker_id=speaker_id, cache=self.tts_cache)
+        self.speech.set_engine(self.tts)
+        self.speech.retire(previous)
+        print(f"[VoiceBridge] TTS: VOICEVOX (speaker_id={speaker_id})")
+
     def change_model(self, model_size: str):
         self.transcriber.change_model(model_size)
 
@@ -467,6 +1101,8 @@ class VoiceBridge:
 
     def change_voice(self, voice_key: str):
         """声を変更する（Edge TTS の場合はキー名、VOICEVOX の場合は speaker_id）"""
+        from tts_voicevox import VoicevoxTTS
+
         if self.use_voicevox:
             try:
                 speaker_id = int(voice_key)
@@ -479,43 +1115,121 @@ class VoiceBridge:
             self.tts.set_voice(voice_key)
 
     def change_language_pair(self, source: str, target: str) -> bool:
-        """言語ペアを動的に変更"""
-        # Transcriber の言語変更
-        if not self.transcriber.set_language(source):
-            return False
-
-        # Translator の言語ペア変更
-        if not self.translator.set_language_pair(source, target):
-            return False
+        """
+        言語ペアを変更する（待たない。未対応の組み合わせなら False）
+
+        新しいペアの ASR・翻訳・TTS は裏で用意してモデルも読み込んでおき、翻訳中なら発話の切れ目で
+        まとめて差し替える（停止中なら用意ができた時点で）。差し替える前に始めた発話の結果は読み上げない
+        """
+        if self.translator is not None:
+            from translator import Translator
+            if not Translator.supports(source, target):
+                print(f"[VoiceBridge] サポートされていない言語ペア: {source}→{target}")
+                return False
+        if (source, target) == (self.source_language, self.target_language) and not self.switcher.pending:
+            return True
+        self.switcher.request(source, target)
+        print(f"[VoiceBridge] 言語ペア {source}→{target} を準備中...")
+        return True
 
-        # TTS の言語変更（ターゲット言語に合わせる）
-        # VOICEVOX 使用中でターゲットが日本語以外 → Edge TTS に切り替え
-        if self.use_voicevox and isinstance(self.tts, VoicevoxTTS) and target != "ja":
-            self.tts.cleanup()
-            self.tts = TTSEngine(language=target)
-            print(f"[VoiceBridge] TTS: VOICEVOX → Edge TTS ({target})")
-        # VOICEVOX が利用可能でターゲットが日本語に戻った → VOICEVOX に復帰
-        elif self.use_voicevox and not isinstance(self.tts, VoicevoxTTS) and target == "ja":
-            self.tts.cleanup()
-            self.tts = VoicevoxTTS(speaker_id=self._voicevox_speaker_id)
-            print(f"[VoiceBridge] TTS: Edge TTS → VOICEVOX")
-        else:
-            if not self.tts.set_language(target):
+    def _make_translator(self, source: str, target: str):
+        """翻訳エンジンを作る（LLM 翻訳・先行翻訳の設定も反映する）"""
+        from translator import Translator
+        translator = Translator(
+            source=source,
+            target=target,
+            memory_dir=os.path.join("logs", "tm") if self.translation_memory else None,
+            log_dir="logs",
+            # LLM は1リクエストが長いのでデッドラインを延ばす
+            deadline=10.0 if self.translate_engine == "llm" else 2.5,
+        )
+        # LLM 翻訳: 文脈付き・ストリーミングで最優先に置き、Google/MyMemory をフェイルオーバー先にする
+        if self.translate_engine == "llm":
+            from ai_chat import AiChat
+            from translator_llm import LlmTranslator
+            llm = LlmTranslator(client=AiChat(**self._ai_config), source=source, target=target)
+            translator.set_engine("llm", llm, primary=True, hedge=False)
+        if self.speculative:
+            from speculative_translator import SpeculativeTranslator
+            translator = SpeculativeTranslator(translator)
+        return translator
+
+    def _make_tts(self, language: str, voice: str = "nanami"):
+        """TTS エンジンを作る（VOICEVOX が使えて日本語なら VOICEVOX、それ以外は Edge TTS）"""
+        if self.use_voicevox and language == "ja":
+            from tts_voicevox import VoicevoxTTS
+            return VoicevoxTTS(speaker_id=self._voicevox_speaker_id, cache=self.tts_cache)
+        from tts_engine import TTSEngine
+        return TTSEngine(language=language, voice=voice, cache=self.tts_cache, worker=self.orchestrator.worker)
+
+    def _tts_suits(self, tts, language: str) -> bool:
+        """今の TTS エンジンをそのまま language の読み上げに使えるか"""
+        from tts_voicevox import VoicevoxTTS
+
+        if isinstance(tts, VoicevoxTTS):
+            return language == "ja"
+        return getattr(tts, "language", None) == language and not (self.use_voicevox and language == "ja")
+
+    def _build_pair(self, source: str, target: str) -> LanguagePair | None:
+        """新しい言語ペアの部品を作り、ASR のモデルを読み込んでおく（裏のスレッドで呼ぶ。使える部品は使い回す）"""
+        with self._swap_lock:
+            current = self.pair
+        with self._model_lock:
+            transcriber = current.transcriber.with_language(source)
+            if transcriber is None:
+                return None
+            transcriber.load_model()
+        translator = current.translator
+        if translator is not None and (source, target) != (current.source, current.target):
+            translator = self._make_translator(source, target)
+        tts = current.tts if self._tts_suits(current.tts, target) else self._make_tts(target)
+        return LanguagePair(source, target, target, transcriber, translator, tts)
+
+    def _discard_pair(self, pair: LanguagePair):
+        """使われなかった言語ペアの、今のペアと共有していない TTS を片付け、ASR モデルの参照を返す"""
+        if pair.tts is not self.tts:
+            pair.tts.cleanup()
+        if pair.translator is not None and pair.translator is not self.translator:
+            pair.translator.close()
+        if pair.transcriber is not self.transcriber:
+            pair.transcriber.release()
+
+    def _on_pair_ready(self):
+        # 停止中は発話の切れ目を待たずに差し替える（翻訳中はパイプラインのループが差し替える）
+        if not self._running:
+            self._apply_pending_pair()
+
+    def _apply_pending_pair(self) -> bool:
+        """用意のできた言語ペアに差し替える（発話の切れ目で呼ぶ）。差し替えたか"""
+        with self._swap_lock:
+            pair = self.switcher.take()
+            if pair is None:
                 return False
+            previous, self.pair = self.pair, pair
+        self.speech.set_engine(pair.tts)
+        if previous.tts is not pair.tts:
+            self.speech.retire(previous.tts)  # 前のペアで合成中の文が終わってから片付ける
+        if previous.translator is not None and previous.translator is not pair.translator:
+            previous.translator.close()  # 翻訳メモリを保存してスレッドを止める（翻訳中の文は終わってから）
+        if previous.transcriber is not pair.transcriber:
+            previous.transcriber.release()  # 認識中の発話はそのまま終わる（結果は前のペアなので捨てる）
+        print(f"[VoiceBridge] 言語ペアを {previous.source}→{previous.target} から "
+              f"{pair.source}→{pair.target} に変更")
+        return True
 
-        # 内部状態を更新
-        self.source_language = source
-        self.target_language = target
-        self.tts_language = target
 
-        print(f"[VoiceBridge] 言語ペアを {source}→{target} に変更")
-        return True
+def probe_voicevox() -> dict | None:
+    """VOICEVOX が起動していれば話者一覧を返す（起動していなければ None）"""
+    from tts_voicevox import VoicevoxTTS
 
+    if not VoicevoxTTS.is_available():
+        return None
+    return VoicevoxTTS.fetch_speakers()
 
-def run_cli(args):
-    """CLI モードで実行"""
-    use_voicevox = VoicevoxTTS.is_available()
-    bridge = VoiceBridge(
+
+def make_bridge(args, use_voicevox: bool = False, voicevox_speaker_id: int = 3) -> VoiceBridge:
+    """コマンドライン引数から VoiceBridge を作る"""
+    return VoiceBridge(
         device_name=args.device,
         model_size=args.model,
         source_language=args.source_lang,
@@ -524,13 +1238,58 @@ def run_cli(args):
         voice=args.voice,
         chunk_duration=args.chunk,
         use_voicevox=use_voicevox,
-        voicevox_speaker_id=args.speaker_id if use_voicevox else 3,
+        voicevox_speaker_id=voicevox_speaker_id,
         asr_engine=args.asr,
         mode=args.mode,
         ai_base_url=args.ai_base_url,
         ai_model=args.ai_model,
+        stitch_budget=args.stitch_budget,
+        speculative=args.speculative,
+        translation_memory=not args.no_tm,
+        translate_engine=args.translator,
+        tts_cache_dir=args.tts_cache_dir,
+        rate_control=None if args.rate_control == "off" else args.rate_control,
+        max_rate=args.max_rate,
+        player_backend=args.player,
+        max_audio_age=args.max_audio_age,
+        translate_workers=args.translate_workers,
+        pipeline_queue_size=args.pipeline_queue,
+        orchestrator=args.orchestrator,
+        latency_log=args.latency_log,
+        chrome_trace=args.chrome_trace,
+        latency_budget=args.latency_budget,
+        idle_unload=args.idle_unload * 60,
+        rss_budget_mb=args.rss_budget,
     )
 
+
+def prepare_bridge(args, probes: StartupProbes, voicevox_speaker_id: int = 3) -> VoiceBridge:
+    """
+    VoiceBridge を用意する（probes の "voicevox" の確認と並行して、エンジンの読み込み・再生デバイスの確認を進める）
+
+    VOICEVOX の確認が後から終わったら TTS を切り替える。ASR モデルは "model" として裏で読み込んでおく
+    """
+    speakers = probes.result("voicevox", timeout=0)
+    bridge = make_bridge(args, use_voicevox=speakers is not None, voicevox_speaker_id=voicevox_speaker_id)
+    if speakers is None:
+        speakers = probes.result("voicevox")
+        if speakers is not None:
+            bridge.enable_voicevox(voicevox_speaker_id)
+    if speakers is None:
+        print("[VoiceBridge] VOICEVOX 未検出 → Edge TTS を使用")
+    if not bridge.speculative:  # ストリーミング ASR は開始時に自前のモデルを読み込む
+        probes.submit("model", bridge.preload_model)
+    startup.mark("bridge", "パイプライン準備完了")
+    return bridge
+
+
+def run_cli(args):
+    """CLI モードで実行"""
+    probes = StartupProbes()
+    probes.submit("voicevox", probe_voicevox)
+    bridge = prepare_bridge(args, probes, voicevox_speaker_id=args.speaker_id)
+    use_voicevox = bridge.use_voicevox
+
     # Ctrl+C で停止
     def signal_handler(sig, frame):
         print("\n[CLI] 停止中...")
@@ -589,47 +1348,29 @@ def run_cli(args):
         bridge.stop()
 
 
-def run_gui(args):
-    """GUI モードで実行"""
-    from gui import VoiceBridgeGUI
+EDGE_VOICES = ["nanami（女性）", "keita（男性）"]
 
-    # 利用可能なデバイス一覧を取得
-    try:
-        devices = [d["name"] for d in AudioCapture.list_devices()]
-    except Exception:
-        devices = [DEFAULT_DEVICE]
 
-    # VOICEVOX が起動しているか確認
-    voicevox_available = VoicevoxTTS.is_available()
-    voicevox_speakers = {}
-    if voicevox_available:
-        voicevox_speakers = VoicevoxTTS.fetch_speakers()
-        print(f"[VoiceBridge] VOICEVOX 検出: {len(voicevox_speakers)}話者")
-    else:
-        print("[VoiceBridge] VOICEVOX 未検出 → Edge TTS を使用")
+def start_gui(args):
+    """
+    GUI をすぐに表示し、起動時の確認（デバイス一覧・VOICEVOX・パイプラインの準備・モデルの読み込み）を
+    裏で並行して進める。終わったものから GUI に反映し、パイプラインの準備ができたら開始ボタンを有効にする
+
+    Returns:
+        (gui, probes)。probes.result("bridge") で VoiceBridge を待てる
+    """
+    from gui import VoiceBridgeGUI
 
     # デフォルトの speaker_id（ずんだもん ノーマル）
     default_speaker_id = 3
-
-    bridge = VoiceBridge(
-        device_name=args.device,
-        model_size=args.model,
-        source_language=args.source_lang,
-        target_language=args.target_lang,
-        tts_language=args.tts_lang,
-        voice=args.voice,
-        chunk_duration=args.chunk,
-        use_voicevox=voicevox_available,
-        voicevox_speaker_id=default_speaker_id,
-        asr_engine=args.asr,
-        mode=args.mode,
-        ai_base_url=args.ai_base_url,
-        ai_model=args.ai_model,
-    )
+    bridge = None
+    voicevox_speakers = {}
 
     # 声変更のコールバック
     def on_voice_change(voice_key: str):
-        if voicevox_available:
+        if bridge is None:
+            return
+        if voicevox_speakers:
             sid = voicevox_speakers.get(voice_key)
             if sid is not None:
                 bridge.change_voice(str(sid))
@@ -643,50 +1384,86 @@ def run_gui(args):
 
     # 言語ペア変更のコールバック
     def on_language_pair_change(source: str, target: str):
+        if bridge is None:
+            args.source_lang, args.target_lang = source, target
+            return
         bridge.change_language_pair(source, target)
 
+    def on_device_change(device_name: str):
+        if bridge is None:
+            args.device = device_name
+            return
+        bridge.change_device(device_name)
+
+    def on_model_change(model_size: str):
+        if bridge is None:
+            args.model = model_size
+            return
+        bridge.change_model(model_size)
+
     gui = VoiceBridgeGUI(
-        on_start=bridge.start,
-        on_stop=bridge.stop,
+        on_start=lambda: bridge.start(),
+        on_stop=lambda: bridge and bridge.stop(),
         on_clear=None,
-        on_model_change=bridge.change_model,
-        on_device_change=bridge.change_device,
+        on_model_change=on_model_change,
+        on_device_change=on_device_change,
         on_voice_change=on_voice_change,
         on_language_pair_change=on_language_pair_change,
     )
-
-    # GUI にテキストを表示するコールバック
-    bridge.on_english_text = gui.add_english_text
-    bridge.on_japanese_text = gui.add_japanese_text
-    bridge.on_status_change = gui.set_status
-    bridge.on_level = gui.set_level
-    bridge.on_latency = gui.set_latency
-
-    # 声のリストを構築
-    if voicevox_available:
-        voice_list = list(voicevox_speakers.keys())
-        default_voice = "ずんだもん（ノーマル）" if "ずんだもん（ノーマル）" in voice_list else voice_list[0]
-    else:
-        voice_list = ["nanami（女性）", "keita（男性）"]
-        default_voice = "nanami（女性）"
-
     gui.build(
-        devices=devices,
-        voices=voice_list,
-        default_voice=default_voice,
+        devices=[args.device],
+        voices=EDGE_VOICES,
+        default_voice=EDGE_VOICES[0],
         default_source_lang=args.source_lang,
         default_target_lang=args.target_lang,
     )
+    gui.set_ready(False)
+    gui.set_status("起動中...")
+    gui.root.after_idle(startup.mark, "window", "ウィンドウ表示")
+
+    # 入力デバイスの一覧
+    def on_devices(devices: list[dict]):
+        if devices:
+            gui.set_devices([d["name"] for d in devices])
+
+    # VOICEVOX が起動していれば話者一覧と利用表記（利用規約に基づくクレジット表記）
+    def on_voicevox(speakers: dict | None):
+        if speakers is None:
+            return
+        voicevox_speakers.update(speakers)
+        print(f"[VoiceBridge] VOICEVOX 検出: {len(speakers)}話者")
+        voice_list = list(speakers.keys())
+        default_voice = "ずんだもん（ノーマル）" if "ずんだもん（ノーマル）" in voice_list else voice_list[0]
+        gui.set_voices(voice_list, default_voice)
+        gui.set_credit(f"VOICEVOX:{default_voice.split('（')[0]} | https://voicevox.hiroshiba.jp/")
+
+    # パイプラインの準備ができたら GUI とつないで開始できるようにする
+    def on_bridge(ready: VoiceBridge):
+        nonlocal bridge
+        ready.on_english_text = gui.add_english_text
+        ready.on_japanese_text = gui.add_japanese_text
+        ready.on_status_change = gui.set_status
+        ready.on_level = gui.set_level
+        ready.on_latency = gui.set_latency
+        bridge = ready
+        gui.set_status("待機中")
+        gui.set_ready(True)
+
+    probes = StartupProbes()
+    probes.submit("devices", AudioCapture.list_devices, on_done=on_devices)
+    probes.submit("voicevox", probe_voicevox, on_done=on_voicevox)
+    probes.submit("bridge", prepare_bridge, args, probes, default_speaker_id, on_done=on_bridge)
+    return gui, probes
 
-    # VOICEVOX 利用表記（利用規約に基づくクレジット表記）
-    if voicevox_available:
-        credit = f"VOICEVOX:{default_voice.split('（')[0]} | https://voicevox.hiroshiba.jp/"
-        gui.set_credit(credit)
 
+def run_gui(args):
+    """GUI モードで実行"""
+    gui, probes = start_gui(args)
     gui.run()
+    probes.shutdown()
 
 
-def main():
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description="Voice Bridge - リアルタイム多言語翻訳",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -713,6 +1490,60 @@ def main():
     parser.add_argument("--speaker-id", type=int, default=3,
                         help="VOICEVOX speaker ID (default: 3 = ずんだもん)")
     parser.add_argument("--chunk", type=float, default=4.0, help="音声チャンク長（秒）")
+    parser.add_argument("--model-ttl", type=float, default=300.0,
+                        help="使われなくなった ASR モデルをメモリから外すまでの秒数（その間に使えば読み込み直さない）")
+    parser.add_argument("--idle-unload", type=float, default=10.0,
+                        help="音声がこの分数なければ ASR モデルをメモリから外す。音を検出したら裏で読み込み直す "
+                             "(default: 10, 0 で無効)")
+    parser.add_argument("--rss-budget", type=float, default=None,
+                        help="プロセスの RSS（MB）がこれを超えたら、しばらく使っていない ASR モデルをメモリから外す")
+    parser.add_argument("--stitch-budget", type=float, default=None,
+                        help="未完の文を次のチャンクと結合するまで保持する最大秒数 "
+                             "(default: チャンク長+0.5、0 で無効)")
+    parser.add_argument("--speculative", action="store_true",
+                        help="ストリーミング ASR の途中経過を先行翻訳する（--asr moonshine 時のみ）")
+    parser.add_argument("--no-tm", action="store_true",
+                        help="翻訳メモリ（過去の翻訳の再利用）を無効化")
+    parser.add_argument("--tts-cache-dir", default=None,
+                        help="合成済み音声キャッシュの保存先（指定すると次回起動時も再利用。default: メモリのみ）")
+    parser.add_argument("--translator", default="google", choices=["google", "llm"],
+                        help="翻訳エンジン: google / llm（--ai-base-url の OpenAI 互換 API。"
+                             "文脈付き・ストリーミング、失敗時は Google にフェイルオーバー）")
+    parser.add_argument("--rate-control", default="off", choices=["off", "engine", "stretch"],
+                        help="再生待ちが溜まったら話速を上げる: engine（TTS の話速）/ stretch（再生側で伸縮）")
+    parser.add_argument("--player", default="sounddevice", choices=["sounddevice", "pygame"],
+                        help="再生方式: sounddevice（コールバックで隙間なく再生）/ pygame（従来方式）")
+    parser.add_argument("--max-audio-age", type=float, default=20.0,
+                        help="元の発話からこの秒数以上遅れた訳文は読み上げずに捨てる（0 で無効, default: 20）")
+    parser.add_argument("--translate-workers", type=int, default=2,
+                        help="並行して翻訳するセグメント数（--translator llm では 1, default: 2）")
+    parser.add_argument("--pipeline-queue", type=int, default=4,
+                        help="処理段の間で待たせるセグメント数の上限。超えると上流が待つ (default: 4)")
+    parser.add_argument("--orchestrator", default="asyncio", choices=["asyncio", "threads"],
+                        help="発話の処理方式: asyncio（1つのイベントループのコルーチン）/ threads（段ごとのスレッド）")
+    parser.add_argument("--latency-log", default=None,
+                        help="チャンクごとの遅延トレース（キャプチャ → 最初の音）を JSONL で追記するファイル")
+    parser.add_argument("--chrome-trace", default=None,
+                        help="停止時に遅延トレースを Chrome トレース形式（chrome://tracing / Perfetto）で書き出すファイル")
+    parser.add_argument("--latency-budget", type=float, default=10.0,
+                        help="チャンクが揃ってから訳文・音声までの遅延予算（秒）。超えそうなチャンクは結合・字幕のみ・破棄"
+                             "（0 で無効, default: 10）")
+    parser.add_argument("--max-rate", type=float, default=1.5,
+                        help="話速制御の上限倍率 (default: 1.5)")
+
+    # サーバーモード（複数セッション）
+    parser.add_argument("--serve", action="store_true",
+                        help="WebSocket サーバーとして起動し、接続ごとに翻訳する（モデルは全接続で共有）")
+    parser.add_argument("--host", default="127.0.0.1", help="--serve の待ち受けアドレス")
+    parser.add_argument("--port", type=int, default=8765, help="--serve の待ち受けポート")
+    parser.add_argument("--max-sessions", type=int, default=None,
+                        help="--serve で同時に受け付ける接続数の上限 (default: 無制限)")
+    parser.add_argument("--max-batch", type=int, default=8,
+                        help="--serve で ASR にまとめる要求（チャンク）の上限")
+    parser.add_argument("--batch-wait", type=float, default=0.02,
+                        help="--serve で ASR の要求をまとめるために待つ最大秒数")
+    parser.add_argument("--asr-workers", type=int, default=1,
+                        help="--serve で同時に処理する ASR のまとまりの数")
 
     # AI チャットモード
     parser.add_argument("--mode", default="translate", choices=["translate", "chat"],
@@ -722,13 +1553,12 @@ def main():
     parser.add_argument("--ai-model", default=None,
                         help="AI モデル名 (default: .env の AI_MODEL or gpt-4o-mini)")
 
-    args = parser.parse_args()
+    return parser
 
-    # .env / 環境変数からデフォルト値を補完
-    if args.ai_base_url is None:
-        args.ai_base_url = os.environ.get("AI_BASE_URL", "https://api.openai.com/v1")
-    if args.ai_model is None:
-        args.ai_model = os.environ.get("AI_MODEL", "gpt-4o-mini")
+
+def main():
+    parser = build_parser()
+    args = parser.parse_args()
 
     if args.list_devices:
         print("利用可能な入力デバイス:")
@@ -739,7 +1569,22 @@ def main():
             print(f"  [{d['index']}] {d['name']} (ch={d['channels']}){extra}")
         return
 
-    if args.cli:
+    ModelRegistry.shared().ttl = args.model_ttl
+
+    # .env から環境変数をロード
+    from ai_chat import load_dotenv
+    load_dotenv()
+
+    # .env / 環境変数からデフォルト値を補完
+    if args.ai_base_url is None:
+        args.ai_base_url = os.environ.get("AI_BASE_URL", "https://api.openai.com/v1")
+    if args.ai_model is None:
+        args.ai_model = os.environ.get("AI_MODEL", "gpt-4o-mini")
+
+    if args.serve:
+        from session_server import run_server
+        run_server(args)
+    elif args.cli:
         run_cli(args)
     else:
         run_gui(args)
@@ -0,0 +1,254 @@
+"""
+モデルレジストリモジュール
+ASR のモデルをプロセス全体で共有する（同じモデルを2回読み込まない）
+
+  - (エンジン, モデルサイズ, 計算精度, 言語, デバイス) ごとに1つだけ読み込み、使う側には参照（ModelHandle）を渡す
+    （Whisper は1つのモデルで全言語を認識するので言語は None。Moonshine は言語ごとにモデルが決まるのでサイズは None）
+  - 翻訳モードとチャットモードの VoiceBridge を並べても、作り直しても、読み込み済みのモデルを使い回す
+  - 参照が0になってから ttl 秒使われなければメモリから外す（その間に再び使えば読み込み直さない）
+  - 同時に認識できる数はモデルごとに slots 個まで（handle.use() で待つ）
+  - evict() で参照を残したままモデルだけメモリから外せる（次に use() / warm() したときに読み込み直す。
+    外す方針は model_residency）
+
+  registry = ModelRegistry.shared()
+  handle = registry.acquire(ModelKey("whisper", "small", "int8", None), load=lambda: WhisperModel(...))
+  with handle.use() as model:
+      model.transcribe(...)
+  handle.release()
+"""
+
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import NamedTuple
+
+
+class ModelKey(NamedTuple):
+    engine: str
+    model_size: str | None
+    compute_type: str | None
+    language: str | None
+    device: str = "cpu"
+
+    def __str__(self):
+        return "/".join(str(part) for part in self if part is not None)
+
+
+class _Entry:
+    def __init__(self, key: ModelKey, slots: int):
+        self.key = key
+        self.model = None
+        self.load = None  # 読み込む関数（外した後の読み込み直しにも使う）
+        self.refs = 0
+        self.generation = 0  # 参照が増えるたびに進める（古い解放予約を無効にする）
+        self.in_use = 0      # use() の中にいる数（使用中は外さない）
+        self.last_used = time.monotonic()
+        self.load_lock = threading.Lock()
+        self.slots = threading.Semaphore(max(1, slots))
+
+
+class ModelHandle:
+    """共有モデルへの参照（release() で返す。share() で同じモデルの参照をもう1つ作る）"""
+
+    def __init__(self, registry: "ModelRegistry", entry: _Entry):
+        self._registry = registry
+        self._entry = entry
+        self._released = False
+
+    @property
+    def key(self) -> ModelKey:
+        return self._entry.key
+
+    @property
+    def model(self):
+        """モデル（外されていれば読み込み直す）"""
+        if self._released:
+            raise RuntimeError(f"解放済みのモデルです: {self.key}")
+        return self._registry._ensure_loaded(self._entry)
+
+    @property
+    def released(self) -> bool:
+        return self._released
+
+    @contextmanager
+    def use(self):
+        """モデルを使う（同時に使える数を超えていれば空くまで待つ。外されていれば読み込み直す）"""
+        if self._released:
+            raise RuntimeError(f"解放済みのモデルです: {self.key}")
+        entry = self._entry
+        with self._registry._lock:
+            entry.in_use += 1
+        try:
+            model = self._registry._ensure_loaded(entry)
+            with entry.slots:
+                yield model
+        finally:
+            with self._registry._lock:
+                entry.in_use -= 1
+                entry.last_used = time.monotonic()
+
+    def warm(self):
+        """外されていれば読み込み直す（読み込み済みなら何もしない）"""
+        self.model
+
+    def share(self) -> "ModelHandle":
+        if self._released:
+            raise RuntimeError(f"解放済みのモデルです: {self.key}")
+        return self._registry._retain(self._entry)
+
+    def release(self):
+        """参照を返す（2回目以降は何もしない）"""
+        if not self._released:
+            self._released = True
+            self._registry._release(self._entry)
+
+
+class ModelRegistry:
+    """参照カウント付きのモデル置き場（スレッドセーフ）"""
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, ttl: float | None = 300.0):
+        """
+        Args:
+            ttl: 参照が0になってからメモリから外すまでの秒数（0 ならすぐ、None なら外さない）
+        """
+        self.ttl = ttl
+        self._entries: dict[ModelKey, _Entry] = {}
+        self._loads = Counter()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> "ModelRegistry":
+        """プロセスで1つのインスタンスを返す"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def acquire(self, key: ModelKey, load, slots: int = 1) -> ModelHandle:
+        """
+        モデルの参照を受け取る（読み込まれていなければ load() で読み込む。同じ key の読み込みは1回だけ）
+
+        Args:
+            load: モデルを作る関数（引数なし）。失敗したら例外をそのまま返す
+            slots: 同時に使える数（最初に読み込んだときの値を使う）
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(key, slots)
+                entry.load = load
+            entry.refs += 1
+            entry.generation += 1
+        try:
+            self._ensure_loaded(entry)
+        except BaseException:
+            self._release(entry)
+            raise
+        return ModelHandle(self, entry)
+
+    def _ensure_loaded(self, entry: _Entry):
+        model = entry.model
+        if model is not None:
+            return model
+        with entry.load_lock:  # 同じモデルを読み込み中ならそれを待つ
+            if entry.model is None:
+                if self._loads[entry.key]:
+                    print(f"[ModelRegistry] モデルを読み込み直します: {entry.key}")
+                model = entry.load()
+                with self._lock:
+                    entry.model = model
+                    entry.last_used = time.monotonic()
+                    self._loads[entry.key] += 1
+            return entry.model
+
+    def _retain(self, entry: _Entry) -> ModelHandle:
+        with self._lock:
+            entry.refs += 1
+            entry.generation += 1
+        return ModelHandle(self, entry)
+
+    def _release(self, entry: _Entry):
+        with self._lock:
+            entry.refs -= 1
+            if entry.refs > 0:
+                return
+            generation = entry.generation
+        if self.ttl is None:
+            return
+        if self.ttl <= 0:
+            self._expire(entry, generation)
+            return
+        timer = threading.Timer(self.ttl, self._expire, args=(entry, generation))
+        timer.daemon = True
+        timer.start()
+
+    def _expire(self, entry: _Entry, generation: int):
+        with self._lock:
+            if entry.refs > 0 or entry.generation != generation or self._entries.get(entry.key) is not entry:
+                return  # また使われている
+            del self._entries[entry.key]
+            loaded = entry.model is not None
+            entry.model = None
+        if loaded:
+            print(f"[ModelRegistry] 使われていないモデルを解放: {entry.key}")
+
+    def evict(self, key: ModelKey) -> bool:
+        """
+        参照を残したまま、モデルをメモリから外す（使用中なら外さない）。外したか
+
+        参照を持つ側は次に use() したときに読み込み直す
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.model is None or entry.in_use > 0:
+                return False
+            entry.model = None
+        return True
+
+    def warm(self, key: ModelKey) -> bool:
+        """参照が残っているのに外されているモデルを読み込み直す。読み込み直したか"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.model is not None or entry.refs == 0:
+                return False
+        self._ensure_loaded(entry)
+        return True
+
+    def resident(self) -> list[tuple[ModelKey, float]]:
+        """メモリにあって使用中でないモデルと最後に使った時刻（time.monotonic）。古い順"""
+        with self._lock:
+            idle = [(key, entry.last_used) for key, entry in self._entries.items()
+                    if entry.model is not None and entry.in_use == 0]
+        return sorted(idle, key=lambda item: item[1])
+
+    def evicted(self) -> list[ModelKey]:
+        """参照が残っているのに外されているモデル"""
+        with self._lock:
+            return [key for key, entry in self._entries.items() if entry.model is None and entry.refs > 0]
+
+    def is_loaded(self, key: ModelKey) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry.model is not None
+
+    def loads(self, key: ModelKey) -> int:
+        """key のモデルを読み込んだ回数（解放後に読み込み直した分も数える）"""
+        with self._lock:
+            return self._loads[key]
+
+    def stats(self) -> list[dict]:
+        """読み込み中・読み込み済みのモデルごとの参照数と読み込み回数"""
+        with self._lock:
+            return [{"key": str(key), "refs": entry.refs, "loaded": entry.model is not None,
+                     "loads": self._loads[key]} for key, entry in self._entries.items()]
+
+    def clear(self):
+        """参照が0のモデルを今すぐ外す"""
+        with self._lock:
+            idle = [(entry, entry.generation) for entry in self._entries.values() if entry.refs == 0]
+        for entry, generation in idle:
+            self._expire(entry, generation)
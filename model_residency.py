@@ -0,0 +1,185 @@
+"""
+モデルの常駐管理モジュール
+使われていない ASR モデルをメモリから外し、音を検出したら裏で読み込み直す
+
+  - 音声（capture の音・認識）が idle_seconds 秒なければ、読み込み済みのモデルを外す
+  - プロセスの RSS が rss_budget_mb を超えたら、しばらく使っていないモデルから順に外す
+  - 外したモデルは、音を検出したら（note_sound）裏のスレッドで読み込み直す
+    （チャンクが揃って認識を始めるまでに読み込みが終わるか、少なくとも進んでいる）
+  - 外す前と後・読み込み直す前と後の RSS を表示する
+
+  monitor = ResidencyMonitor(ModelRegistry.shared(), idle_seconds=600, rss_budget_mb=2048)
+  monitor.start()
+  capture.on_sound = monitor.note_sound
+"""
+
+import ctypes
+import gc
+import os
+import platform
+import subprocess
+import threading
+import time
+
+from model_registry import ModelRegistry
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def current_rss_mb() -> float | None:
+    """プロセスの今の RSS（MB。測れなければ None）"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        pass
+    if platform.system() == "Darwin":
+        try:
+            out = subprocess.run(["ps", "-o", "rss=", "-p", str(os.getpid())],
+                                 capture_output=True, text=True, timeout=2).stdout
+            return int(out.strip()) / 1024  # KB
+        except (OSError, ValueError, subprocess.SubprocessError):
+            pass
+    return None
+
+
+def release_free_memory():
+    """外したモデルのメモリを OS に返す（循環参照の回収と、glibc なら malloc_trim）"""
+    gc.collect()
+    if platform.system() == "Linux":
+        try:
+            ctypes.CDLL("libc.so.6").malloc_trim(0)
+        except (OSError, AttributeError):
+            pass
+
+
+def _format_mb(value: float | None) -> str:
+    return "?" if value is None else f"{value:.0f}"
+
+
+def _format_duration(seconds: float) -> str:
+    return f"{seconds / 60:.0f}分" if seconds >= 120 else f"{seconds:.0f}秒"
+
+
+class ResidencyMonitor:
+    """モデルを外す・読み込み直すのを決める（スレッドセーフ。check() は裏のスレッドが interval 秒ごとに呼ぶ）"""
+
+    def __init__(
+        self,
+        registry: ModelRegistry = None,
+        idle_seconds: float | None = 600.0,
+        rss_budget_mb: float | None = None,
+        pressure_grace: float = 30.0,
+        interval: float = 10.0,
+        rss=current_rss_mb,
+    ):
+        """
+        Args:
+            registry: 対象のモデル置き場（None ならプロセスで共有するもの）
+            idle_seconds: 音声がこの秒数なければモデルを外す（None / 0 なら外さない）
+            rss_budget_mb: RSS がこれを超えたらモデルを外す（None なら見ない）
+            pressure_grace: RSS で外すのは、この秒数以上使っていないモデルだけ（話している間に外さない）
+            interval: 確認する間隔（秒）
+            rss: RSS（MB）を返す関数
+        """
+        self.registry = registry or ModelRegistry.shared()
+        self.idle_seconds = idle_seconds or None
+        self.rss_budget_mb = rss_budget_mb
+        self.pressure_grace = pressure_grace
+        self.interval = interval
+        self._rss = rss
+        self._last_sound = time.monotonic()
+        self._lock = threading.Lock()
+        self._warming = False
+        self._stop = threading.Event()
+        self._thread = None
+        self.unloads = 0
+        self.rewarms = 0
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="model-residency", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                print(f"[Residency] 確認に失敗: {type(e).__name__}: {e}")
+
+    def note_sound(self):
+        """音を検出した（capture のコールバックから呼ぶ。外したモデルがあれば裏で読み込み直す）"""
+        with self._lock:
+            self._last_sound = time.monotonic()
+            if self._warming or not self.registry.evicted():
+                return
+            self._warming = True
+        threading.Thread(target=self._rewarm, name="model-rewarm", daemon=True).start()
+
+    def _rewarm(self):
+        try:
+            for key in self.registry.evicted():
+                before = self._rss()
+                t_start = time.monotonic()
+                try:
+                    if not self.registry.warm(key):
+                        continue
+                except Exception as e:
+                    print(f"[Residency] {key} の読み込み直しに失敗: {type(e).__name__}: {e}")
+                    continue
+                self.rewarms += 1
+                print(f"[Residency] 音声を検出 → {key} を読み込み直しました "
+                      f"({time.monotonic() - t_start:.1f}s, RSS {_format_mb(before)} → {_format_mb(self._rss())} MB)")
+        finally:
+            with self._lock:
+                self._warming = False
+
+    def check(self, now: float = None) -> list:
+        """方針に沿ってモデルを外す。外したモデルのキーを返す"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            last_sound = self._last_sound
+            if self._warming:
+                return []  # 読み込み直している最中は外さない
+        evicted = []
+        if self.idle_seconds:
+            for key, last_used in self.registry.resident():
+                idle = now - max(last_used, last_sound)
+                if idle >= self.idle_seconds and self._evict(key, f"{_format_duration(idle)}間 音声なし"):
+                    evicted.append(key)
+        if self.rss_budget_mb is not None:
+            for key, last_used in self.registry.resident():  # 古い順
+                rss = self._rss()
+                if rss is None or rss <= self.rss_budget_mb:
+                    break
+                if now - last_used < self.pressure_grace:
+                    continue
+                if self._evict(key, f"RSS {rss:.0f} MB > 予算 {self.rss_budget_mb:.0f} MB"):
+                    evicted.append(key)
+        return evicted
+
+    def _evict(self, key, reason: str) -> bool:
+        before = self._rss()
+        if not self.registry.evict(key):
+            return False
+        release_free_memory()
+        self.unloads += 1
+        print(f"[Residency] {reason} → {key} をメモリから外しました "
+              f"(RSS {_format_mb(before)} → {_format_mb(self._rss())} MB。音声を検出したら読み込み直す)")
+        return True
+
+    def stats(self) -> dict:
+        return {"unloads": self.unloads, "rewarms": self.rewarms, "rss_mb": self._rss()}
@@ -0,0 +1,264 @@
+"""
+asyncio オーケストレーターモジュール
+プロセスで1つのイベントループ（EventLoopThread.shared(DEFAULT_LOOP)。edge-tts と共有）の上で、
+発話ごとの処理（認識 → 文の結合 → 翻訳 → 読み上げ）をコルーチンとして動かす
+
+  - 通信の段（翻訳・edge-tts・VOICEVOX・AI チャット）はコルーチン。同期 API しかない
+    クライアント（deep-translator / requests）は I/O 用のスレッドプールで待つ
+  - CPU を使う ASR は専用の1スレッドで実行する（モデルは同時に使わない）
+  - 同時実行数は種類ごとのセマフォ（asr / translate / tts / chat）で制限する
+  - 発話ごとに CancelScope を作り、その発話のタスクをまとめて取り消せる
+  - 発話の順番が必要な処理（文の結合・読み上げ）は OrderedGate で入力順に通す
+
+スレッドを呼び出しごとに作ったり、呼び出しごとにイベントループを作ったりしない。
+"""
+
+import asyncio
+import functools
+import itertools
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from event_loop_thread import DEFAULT_LOOP, EventLoopThread
+
+_END = object()  # 同期イテレータの終わり
+
+
+class CancelScope:
+    """1つの発話に属するタスクの集まり（cancel() でまとめて取り消す）"""
+
+    def __init__(self, orchestrator: "Orchestrator", name: str):
+        self.name = name
+        self.created_at = time.monotonic()
+        self._orchestrator = orchestrator
+        self._tasks: set = set()
+        self._cancelled = False
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    @property
+    def active(self) -> int:
+        """実行中のタスク数"""
+        return len(self._tasks)
+
+    def spawn(self, coro) -> Future:
+        """
+        このスコープのタスクとしてコルーチンを実行する（どのスレッドからでも呼べる）
+
+        Returns:
+            結果を受け取る concurrent.futures.Future（取り消されたら CancelledError）
+        """
+        if self._cancelled:
+            coro.close()
+            self._orchestrator._release(self)
+            future = Future()
+            future.cancel()
+            return future
+        return self._orchestrator.submit(self._track(coro))
+
+    def create_task(self, coro) -> asyncio.Task:
+        """このスコープの子タスクを作る（ループスレッドから呼ぶ）"""
+        return asyncio.get_running_loop().create_task(self._track(coro))
+
+    async def _track(self, coro):
+        if self._cancelled:  # 開始前に取り消された
+            coro.close()
+            self._orchestrator._release(self)
+            raise asyncio.CancelledError
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        self._orchestrator._register(self)
+        try:
+            return await coro
+        finally:
+            self._tasks.discard(task)
+            if not self._tasks:
+                self._orchestrator._release(self)
+
+    def cancel(self):
+        """このスコープのタスクをすべて取り消す（以降の spawn も実行しない）"""
+        self._cancelled = True
+        loop = self._orchestrator.loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._cancel_tasks)
+
+    def _cancel_tasks(self):
+        for task in list(self._tasks):
+            task.cancel()
+
+
+class OrderedGate:
+    """
+    連番の順に1つずつ通すゲート（ループスレッド専用）
+
+    async with gate.turn(seq): の中は seq の小さい順に実行される。
+    順番を待っている間に取り消されたタスクの番は飛ばす。
+    """
+
+    def __init__(self):
+        self._next = 0
+        self._skipped: set = set()
+        self._cond = None
+
+    def _condition(self) -> asyncio.Condition:
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        return self._cond
+
+    def turn(self, seq: int):
+        return _Turn(self, seq)
+
+    async def _wait(self, seq: int):
+        cond = self._condition()
+        async with cond:
+            await cond.wait_for(lambda: self._next >= seq)
+
+    async def _advance(self, seq: int, skipped: bool = False):
+        cond = self._condition()
+        async with cond:
+            if skipped and self._next < seq:
+                self._skipped.add(seq)
+                return
+            self._next = max(self._next, seq + 1)
+            while self._next in self._skipped:
+                self._skipped.discard(self._next)
+                self._next += 1
+            cond.notify_all()
+
+
+class _Turn:
+    def __init__(self, gate: OrderedGate, seq: int):
+        self._gate = gate
+        self._seq = seq
+
+    async def __aenter__(self):
+        try:
+            await self._gate._wait(self._seq)
+        except asyncio.CancelledError:
+            await asyncio.shield(self._gate._advance(self._seq, skipped=True))
+            raise
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await asyncio.shield(self._gate._advance(self._seq))
+        return False
+
+
+class Orchestrator:
+    """1つのイベントループで発話ごとの処理を動かすオーケストレーター（スレッドセーフ）"""
+
+    # 種類ごとの同時実行数の上限
+    DEFAULT_LIMITS = {"asr": 1, "translate": 2, "tts": 4, "chat": 1}
+
+    def __init__(self, worker: EventLoopThread = None, limits: dict = None, io_workers: int = 8):
+        """
+        Args:
+            worker: イベントループスレッド（None ならプロセス共有の "voice-bridge" ループ）
+            limits: 種類ごとの同時実行数（DEFAULT_LIMITS を上書き）
+            io_workers: 同期 API のクライアントを待つスレッド数
+        """
+        self.worker = worker or EventLoopThread.shared(DEFAULT_LOOP, max_concurrent=self.DEFAULT_LIMITS["tts"])
+        self.limits = {**self.DEFAULT_LIMITS, **(limits or {})}
+        self._semaphores: dict = {}
+        self._asr_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="asr")
+        self._io_executor = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="io")
+        self._scopes: dict = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop | None:
+        return self.worker.loop
+
+    # ── スレッドから ─────────────────────────────────
+
+    def submit(self, coro) -> Future:
+        """
+        コルーチンをループに投入する（どのスレッドからでも呼べる）
+
+        EventLoopThread.submit と違い、ループ全体のセマフォには数えない
+        （長く待つ発話の処理が edge-tts の枠を埋めないように。制限は種類ごとのセマフォで行う）
+        """
+        self.worker.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.worker.loop)
+
+    def scope(self, name: str = None) -> CancelScope:
+        """発話ごとのスコープを作る"""
+        scope = CancelScope(self, name or f"utterance-{next(self._ids)}")
+        self._register(scope)
+        return scope
+
+    def _register(self, scope: CancelScope):
+        with self._lock:
+            self._scopes[id(scope)] = scope
+
+    def _release(self, scope: CancelScope):
+        with self._lock:
+            self._scopes.pop(id(scope), None)
+
+    @property
+    def active_scopes(self) -> int:
+        """実行中のタスクが残っているスコープの数"""
+        with self._lock:
+            return len(self._scopes)
+
+    def cancel_all(self):
+        """すべてのスコープのタスクを取り消す"""
+        with self._lock:
+            scopes = list(self._scopes.values())
+        for scope in scopes:
+            scope.cancel()
+
+    def call(self, kind: str, func, *args, timeout: float = None):
+        """同期関数を種類ごとの制限つきで実行して待つ（ループ外のスレッドから使う）"""
+        return self.submit(self.run_blocking(kind, func, *args)).result(timeout=timeout)
+
+    def shutdown(self):
+        """スコープを取り消し、スレッドプールを止める（共有ループは止めない）"""
+        self.cancel_all()
+        self._asr_executor.shutdown(wait=False, cancel_futures=True)
+        self._io_executor.shutdown(wait=False, cancel_futures=True)
+
+    # ── ループ上から ─────────────────────────────────
+
+    def semaphore(self, kind: str) -> asyncio.Semaphore:
+        """種類ごとのセマフォ（ループスレッドで作る）"""
+        sem = self._semaphores.get(kind)
+        if sem is None:
+            sem = self._semaphores[kind] = asyncio.Semaphore(self.limits.get(kind, 1))
+        return sem
+
+    async def run_blocking(self, kind: str | None, func, *args):
+        """
+        同期関数をスレッドで実行して待つ（kind のセマフォで同時実行数を制限。None なら制限なし）
+
+        "asr" は ASR 専用スレッド、それ以外は I/O 用のスレッドプールで実行する。
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._asr_executor if kind == "asr" else self._io_executor
+        call = functools.partial(func, *args)
+        if kind is None:
+            return await loop.run_in_executor(executor, call)
+        async with self.semaphore(kind):
+            return await loop.run_in_executor(executor, call)
+
+    async def iterate_blocking(self, kind: str, iterator):
+        """
+        同期イテレータ（translate_stream など）の要素を、届いた順に非同期で返す
+
+        イテレータ全体で kind のセマフォを1つ使う。
+        """
+        loop = asyncio.get_running_loop()
+        async with self.semaphore(kind):
+            while True:
+                item = await loop.run_in_executor(self._io_executor, next, iterator, _END)
+                if item is _END:
+                    return
+                yield item
+
+    async def await_future(self, kind: str, future: Future):
+        """concurrent.futures.Future（TTS エンジンの合成など）を kind の制限つきで待つ"""
+        async with self.semaphore(kind):
+            return await asyncio.wrap_future(future)
@@ -0,0 +1,209 @@
+"""
+再生キューモジュール
+AudioPlayer / CallbackPlayer 共通の、期限と優先度つきの再生待ちキュー
+
+  - 優先度は2段: URGENT（チャットの応答・割り込みの相づちなど）は NORMAL より先に取り出す
+  - 各項目は期限（time.monotonic 基準）を持てる。取り出し時に期限を過ぎていれば、
+    遅れを取り戻せる範囲（max_speedup 倍速まで）なら速めて再生し、それ以上遅れていれば捨てる
+  - 再生待ちの量は件数ではなく秒数（duration）で返す
+"""
+
+import os
+import queue
+import threading
+import time
+import wave
+from collections import deque
+
+import audio_decode
+from audio_decode import AudioClip, AudioStream
+
+
+NORMAL = "normal"
+URGENT = "urgent"
+
+
+def audio_duration(audio) -> float:
+    """AudioClip / AudioStream / 音声ファイルのパスの再生時間（秒）"""
+    if isinstance(audio, (AudioClip, AudioStream)):
+        return audio.duration
+    # ファイル: wav はヘッダから、mp3 はサイズから推定
+    try:
+        if audio.endswith(".wav"):
+            with wave.open(audio, "rb") as wf:
+                return wf.getnframes() / wf.getframerate()
+        return os.path.getsize(audio) / audio_decode.MP3_BYTES_PER_SECOND
+    except (OSError, wave.Error, EOFError):
+        return 0.0
+
+
+def discard_audio(audio):
+    """再生しない音声の後始末（ストリームは合成を止め、ファイルは削除）"""
+    if isinstance(audio, AudioStream):
+        audio.cancel()
+    elif isinstance(audio, str) and os.path.exists(audio):
+        try:
+            os.remove(audio)
+        except OSError:
+            pass
+
+
+class PlayItem:
+    """再生キューの1項目"""
+
+    def __init__(self, audio, priority: str = NORMAL, deadline: float = None):
+        self.audio = audio
+        self.priority = priority
+        self.deadline = deadline        # これまでに再生を始めたい時刻（None なら期限なし）
+        self.enqueued_at = time.monotonic()
+        self.speed = 1.0                # 遅れを取り戻すための倍速（取り出し時に決まる）
+        self.decoded = None             # 先読みデコードの Future（DecodePool.submit。ストリームは None）
+        self.trace = None               # 遅延トレース（latency_trace.Trace。再生開始を記録する）
+
+    @property
+    def duration(self) -> float:
+        return audio_duration(self.audio)
+
+    def discard(self):
+        """再生しない項目の後始末（未着手の先読みデコードも取り消す）"""
+        if self.decoded is not None:
+            self.decoded.cancel()
+        discard_audio(self.audio)
+
+
+class PlayQueue:
+    """期限と優先度つきの再生待ちキュー（スレッドセーフ）"""
+
+    def __init__(self, max_age: float = None, max_speedup: float = 1.5):
+        """
+        Args:
+            max_age: 期限を指定しない項目の期限（キューに入ってからの秒数。None なら期限なし）
+            max_speedup: 期限切れの項目を速めて再生する上限倍率（1.0 なら速めずに捨てる）
+        """
+        self.max_age = max_age
+        self.max_speedup = max_speedup
+        self.on_drop = None  # (item: PlayItem) 期限切れで捨てた
+
+        self._lanes = {URGENT: deque(), NORMAL: deque()}
+        self._cond = threading.Condition()
+        self._closed = False
+
+        self.dropped = 0
+        self.dropped_seconds = 0.0
+        self.shortened = 0
+
+    def put(self, audio, priority: str = NORMAL, deadline: float = None) -> PlayItem:
+        """
+        Args:
+            audio: AudioClip / AudioStream / 音声ファイルのパス
+            priority: NORMAL / URGENT
+            deadline: 再生開始の期限（time.monotonic 基準。None なら max_age から決める）
+        """
+        if priority not in self._lanes:
+            raise ValueError(f"不明な優先度: {priority}")
+        item = PlayItem(audio, priority, deadline)
+        if deadline is None and self.max_age is not None:
+            item.deadline = item.enqueued_at + self.max_age
+        with self._cond:
+            self._lanes[priority].append(item)
+            self._cond.notify()
+        return item
+
+    def get(self, timeout: float = None, lead: float = 0.0) -> PlayItem | None:
+        """
+        次に再生する項目を取り出す（URGENT が先。期限切れは速めるか捨てる）
+
+        Args:
+            timeout: 待つ秒数（None なら項目が入るまで待つ）
+            lead: 取り出してから再生が始まるまでの秒数（先読みしている再生側で期限の判定に使う）
+
+        Returns:
+            PlayItem。close() 後は None
+
+        Raises:
+            queue.Empty: timeout までに項目がなかった
+        """
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    return None
+                item = self._pop(lead)
+                if item is not None:
+                    return item
+                remaining = None if end is None else end - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise queue.Empty
+                self._cond.wait(remaining)
+
+    def _pop(self, lead: float) -> PlayItem | None:
+        """ロック取得済み前提"""
+        for lane in (self._lanes[URGENT], self._lanes[NORMAL]):
+            while lane:
+                item = lane.popleft()
+                if self._admit(item, lead):
+                    return item
+        return None
+
+    def _admit(self, item: PlayItem, lead: float = 0.0) -> bool:
+        """期限を確認し、再生するなら True（必要なら item.speed を上げる）"""
+        if item.deadline is None:
+            return True
+        late = time.monotonic() + lead - item.deadline
+        if late <= 0:
+            return True
+        duration = item.duration
+        if duration > late and duration / (duration - late) <= self.max_speedup:
+            # 期限どおりに始めていれば終わっていた時刻に終わるよう速める
+            item.speed = duration / (duration - late)
+            self.shortened += 1
+            return True
+        self.dropped += 1
+        self.dropped_seconds += duration
+        print(f"[PlayQueue] 期限切れの音声を破棄 ({late:.1f}s 遅れ, {duration:.1f}s)")
+        item.discard()
+        if self.on_drop:
+            self.on_drop(item)
+        return False
+
+    def close(self):
+        """待っている get() を終わらせる（以降の get() は None）"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def reopen(self):
+        with self._cond:
+            self._closed = False
+
+    def clear(self) -> list[PlayItem]:
+        """全項目を取り除いて後始末する"""
+        with self._cond:
+            items = list(self._lanes[URGENT]) + list(self._lanes[NORMAL])
+            for lane in self._lanes.values():
+                lane.clear()
+        for item in items:
+            item.discard()
+        return items
+
+    def items(self) -> list[PlayItem]:
+        with self._cond:
+            return list(self._lanes[URGENT]) + list(self._lanes[NORMAL])
+
+    @property
+    def duration(self) -> float:
+        """再生待ちの音声の合計秒数"""
+        return sum(item.duration / item.speed for item in self.items())
+
+    def __len__(self) -> int:
+        with self._cond:
+            return sum(len(lane) for lane in self._lanes.values())
+
+    def stats(self) -> dict:
+        return {
+            "queued_items": len(self),
+            "queued_seconds": self.duration,
+            "dropped": self.dropped,
+            "dropped_seconds": self.dropped_seconds,
+            "shortened": self.shortened,
+        }
@@ -1,35 +1,71 @@
 """
 音声再生モジュール
-pygame.mixer を使って生成された音声ファイルを順次再生する
+pygame.mixer を使って TTS の音声を順次再生する
+
+  - AudioClip（メモリ上の mp3 / wav / float32 配列）はファイルを経由せず再生する
+  - AudioClip / 音声ファイルはキューに入った時点で DecodePool がデコードしておき、
+    再生スレッドは PCM を Sound に渡すだけにする（PyAV がなければ mp3 は pygame に渡す）
+  - AudioStream（ストリーミング合成）は届いたフレームから順にデコードして再生を始める
+  - ファイルパスも従来どおり受け付ける（再生後に削除）
+  - 再生待ちは PlayQueue（URGENT が先、期限切れは速めるか捨てる）
 """
 
+import io
 import queue
 import threading
 import time
 import os
 
+import numpy as np
+
 try:
     import pygame
 except ImportError:
     raise ImportError("pygame が必要です: pip install pygame")
 
+import audio_decode
+from audio_decode import AudioClip, AudioStream, StreamDecoder, time_stretch
+from decode_pool import DecodePool, PCMCache
+from play_queue import NORMAL, PlayQueue, discard_audio
+
 
 class AudioPlayer:
     """音声ファイルをキュー管理で順次再生するクラス"""
 
-    def __init__(self):
-        self._play_queue: queue.Queue = queue.Queue()
+    # ストリーミング再生: 最初にこの秒数分デコードできたら再生を始める
+    STREAM_START_SECONDS = 0.15
+    # mixer の出力形式（先読みデコードもこの形式で行う）
+    SAMPLE_RATE = 24000
+    CHANNELS = 2
+
+    def __init__(self, max_age: float = None, decode_workers: int = 2, pcm_cache: PCMCache = None):
+        """
+        Args:
+            max_age: 期限を指定せずに入れた音声の期限（キューに入ってからの秒数。None なら期限なし）
+            decode_workers: 先読みデコードのスレッド数
+            pcm_cache: デコード済み PCM のキャッシュ（None なら新規作成）
+        """
+        self._play_queue = PlayQueue(max_age=max_age)
+        self._decoder = DecodePool(self.SAMPLE_RATE, self.CHANNELS, workers=decode_workers, cache=pcm_cache)
         self._running = False
         self._thread = None
         self._initialized = False
         self.is_playing = False  # 現在再生中かどうか
         self.on_play_start = None  # 再生開始コールバック
         self.on_play_end = None    # 再生終了コールバック
+        self.on_first_audio = None  # (seconds: float) 合成開始から最初の音が出るまで（ストリーミング時）
+        self._current_stream = None
+        self.speed = 1.0  # 再生速度（1.0 以外なら WSOLA で音程を保ったまま伸縮）
+
+        # 待ち時間（秒）の計測用: 再生中の項目
+        self._current = None
+        self._current_started = 0.0
 
     def _init_mixer(self):
         """pygame mixer を初期化"""
         if not self._initialized:
-            pygame.mixer.init(frequency=24000)
+            # 形式の変更を許さない（デバイスとの変換は SDL に任せ、先読みデコードの形式と揃える）
+            pygame.mixer.init(frequency=self.SAMPLE_RATE, channels=self.CHANNELS, allowedchanges=0)
             self._initialized = True
 
     def _play_loop(self):
@@ -38,41 +74,134 @@ class AudioPlayer:
 
         while self._running:
             try:
-                file_path = self._play_queue.get(timeout=0.5)
+                item = self._play_queue.get(timeout=0.5)
             except queue.Empty:
+                self._current = None
                 continue
 
-            if file_path is None:  # 終了シグナル
+            if item is None:  # 終了シグナル
                 break
 
-            try:
-                if os.path.exists(file_path):
-                    self.is_playing = True
-                    if self.on_play_start:
-                        self.on_play_start()
+            self._current = item
+            self._current_started = time.monotonic()
+            speed = self.speed * item.speed
+
+            if isinstance(item.audio, AudioStream):
+                self._play_stream(item.audio, speed, item.trace)
+            elif isinstance(item.audio, AudioClip) or os.path.exists(item.audio):
+                self._play_clip(item, speed)
 
-                    pygame.mixer.music.load(file_path)
-                    pygame.mixer.music.play()
+    def _play_clip(self, item, speed: float = 1.0):
+        """AudioClip / 音声ファイルを再生する（先読みデコード済みの PCM を使う）"""
+        audio = item.audio
+        try:
+            self.is_playing = True
+            if self.on_play_start:
+                self.on_play_start()
 
-                    # 再生完了を待つ
-                    while pygame.mixer.music.get_busy() and self._running:
-                        time.sleep(0.1)
+            future = item.decoded if item.decoded is not None else self._decoder.submit(audio)
+            pcm = future.result()
+            if pcm is not None:
+                pcm = time_stretch(pcm, speed, self.SAMPLE_RATE, self.CHANNELS)
+                channel = pygame.mixer.Sound(buffer=pcm.tobytes()).play()
+                if item.trace is not None:
+                    item.trace.mark("first_audio")
+                while channel is not None and channel.get_busy() and self._running:
+                    time.sleep(0.02)
+            else:
+                # PyAV がなければ pygame に mp3 のまま渡す（メモリ or ファイルから読み込み）
+                if isinstance(audio, AudioClip):
+                    pygame.mixer.music.load(io.BytesIO(audio.data), audio.codec)
+                else:
+                    pygame.mixer.music.load(audio)
+                pygame.mixer.music.play()
+                if item.trace is not None:
+                    item.trace.mark("first_audio")
+                while pygame.mixer.music.get_busy() and self._running:
+                    time.sleep(0.02)
+        except Exception as e:
+            print(f"[AudioPlayer] 再生エラー: {e}")
+        finally:
+            self.is_playing = False
+            if self.on_play_end:
+                self.on_play_end()
+            if not isinstance(audio, AudioClip):
+                discard_audio(audio)  # 再生済みファイルを削除
 
-                    self.is_playing = False
-                    if self.on_play_end:
-                        self.on_play_end()
+    def _play_stream(self, stream: AudioStream, speed: float = 1.0, trace=None):
+        """AudioStream を届いた順にデコードし、Channel のキューでつなぎながら再生する"""
+        self._current_stream = stream
+        frequency, _, channels = pygame.mixer.get_init()
+        decoder = StreamDecoder(codec=stream.codec, sample_rate=frequency, channels=channels)
+        start_samples = int(frequency * self.STREAM_START_SECONDS) * channels
+        pending = []       # まだ Channel に渡していない PCM
+        pending_size = 0
+        channel = None
 
-                    # 再生済みファイルを削除
-                    try:
-                        os.remove(file_path)
-                    except OSError:
-                        pass
-            except Exception as e:
-                print(f"[AudioPlayer] 再生エラー: {e}")
+        def push(force: bool = False):
+            # Channel の待ち枠が空いていれば、溜まった PCM をまとめて1つの Sound として渡す
+            nonlocal channel, pending, pending_size
+            if not pending_size:
+                return
+            if channel is None:
+                if pending_size < start_samples and not force:
+                    return
+            elif channel.get_queue() is not None and channel.get_busy():
+                return
+            pcm = time_stretch(np.concatenate(pending), speed, frequency, channels)
+            pending, pending_size = [], 0
+            sound = pygame.mixer.Sound(buffer=pcm.tobytes())
+            if channel is None or not channel.get_busy():
+                self.is_playing = True
+                if channel is None:
+                    if trace is not None:
+                        trace.mark("first_audio")
+                    if self.on_first_audio:
+                        self.on_first_audio(time.monotonic() - stream.created_at)
+                    if self.on_play_start:
+                        self.on_play_start()
+                channel = sound.play()
+            else:
+                channel.queue(sound)
+
+        try:
+            for chunk in stream:
+                if not self._running:
+                    stream.cancel()
+                    break
+                if trace is not None:
+                    trace.mark_monotonic("tts_ready", stream.first_chunk_at)
+                pcm = decoder.feed(chunk)
+                if len(pcm):
+                    pending.append(pcm)
+                    pending_size += len(pcm)
+                push()
+            if self._running:
+                pcm = decoder.flush()
+                if len(pcm):
+                    pending.append(pcm)
+                    pending_size += len(pcm)
+                # 残りは待ち枠が空くのを待って渡す
+                while pending_size and self._running:
+                    push(force=True)
+                    if pending_size:
+                        time.sleep(0.02)
+            while channel is not None and channel.get_busy() and self._running:
+                time.sleep(0.02)
+        except Exception as e:
+            stream.cancel()
+            print(f"[AudioPlayer] ストリーミング再生エラー: {e}")
+
+        self._current_stream = None
+        if channel is not None:
+            self.is_playing = False
+            if self.on_play_end:
+                self.on_play_end()
 
     def start(self):
         """再生スレッドを開始"""
         self._running = True
+        self._play_queue.reopen()
         self._thread = threading.Thread(target=self._play_loop, daemon=True)
         self._thread.start()
         print("[AudioPlayer] 再生スレッド開始")
@@ -80,33 +209,89 @@ class AudioPlayer:
     def stop(self):
         """再生を停止"""
         self._running = False
-        self._play_queue.put(None)  # 終了シグナル
+        self._play_queue.close()  # 終了シグナル
+
+        # 再生中のストリームの受信待ちを解除
+        stream = self._current_stream
+        if stream is not None:
+            stream.cancel()
+            stream.close()
 
         if pygame.mixer.get_init():
             pygame.mixer.music.stop()
+            pygame.mixer.stop()
 
         if self._thread:
             self._thread.join(timeout=2.0)
             self._thread = None
 
         # キューをクリア
-        while not self._play_queue.empty():
-            try:
-                f = self._play_queue.get_nowait()
-                if f and os.path.exists(f):
-                    os.remove(f)
-            except queue.Empty:
-                break
+        self._play_queue.clear()
+        self._decoder.shutdown()
+        self._current = None
 
         print("[AudioPlayer] 再生停止")
 
-    def enqueue(self, file_path: str):
-        """再生キューにファイルを追加"""
-        self._play_queue.put(file_path)
+    def enqueue(self, audio, priority: str = NORMAL, deadline: float = None, trace=None):
+        """
+        再生キューに音声を追加
+
+        Args:
+            audio: AudioClip（メモリ上の音声）or 音声ファイルのパス（再生後に削除）
+            priority: "normal" / "urgent"（urgent は待っている音声より先に再生）
+            deadline: 再生開始の期限（time.monotonic 基準。過ぎたら速めるか捨てる）
+            trace: 遅延トレース（再生開始の時刻を記録する）
+        """
+        item = self._play_queue.put(audio, priority, deadline)
+        item.trace = trace
+        item.decoded = self._decoder.submit(audio)  # 再生を待つ間にデコードしておく
+
+    def enqueue_pcm(self, samples: np.ndarray, sample_rate: int, priority: str = NORMAL, deadline: float = None):
+        """再生キューに float32 のサンプル配列（-1.0〜1.0, モノラル）を追加"""
+        self.enqueue(AudioClip.from_samples(samples, sample_rate), priority, deadline)
+
+    def enqueue_stream(self, stream: AudioStream, priority: str = NORMAL, deadline: float = None, trace=None):
+        """再生キューにストリーミング合成中の音声を追加（合成完了を待たずに再生を始める）"""
+        self._play_queue.put(stream, priority, deadline).trace = trace
+
+    @property
+    def max_age(self) -> float | None:
+        return self._play_queue.max_age
+
+    @max_age.setter
+    def max_age(self, seconds: float | None):
+        """期限を指定せずに入れた音声の期限（秒）"""
+        self._play_queue.max_age = seconds
+
+    @property
+    def queue_duration(self) -> float:
+        """再生待ちの音声の合計秒数（再生中の残り時間を含む。再生速度を反映）"""
+        current, started = self._current, self._current_started
+        total = self._play_queue.duration / self.speed
+        if current is not None:
+            elapsed = time.monotonic() - started
+            total += max(0.0, current.duration / (self.speed * current.speed) - elapsed)
+        return total
+
+    def queue_stats(self) -> dict:
+        """再生待ちの秒数・件数と、期限切れで捨てた／速めた件数、デコード済み PCM のキャッシュ"""
+        stats = self._play_queue.stats()
+        stats["queued_seconds"] = self.queue_duration
+        stats["pcm_cache"] = self._decoder.cache.stats()
+        return stats
+
+    def set_speed(self, speed: float):
+        """再生速度を変更（キュー内の音声にも次の再生から反映。PyAV なしの mp3 再生は対象外）"""
+        self.speed = max(0.5, min(2.0, speed))
+
+    @staticmethod
+    def supports_streaming() -> bool:
+        """ストリーミング再生（PyAV によるデコード）が使えるか"""
+        return audio_decode.is_available()
 
     @property
     def queue_size(self) -> int:
-        return self._play_queue.qsize()
+        return len(self._play_queue)
 
     @property
     def is_running(self) -> bool:
@@ -0,0 +1,491 @@
+"""
+コールバック方式の音声再生モジュール
+sounddevice の OutputStream のコールバックが PCM キューから直接読み出して再生する
+（pygame.mixer.music を1ファイルずつ読み込んでポーリングする AudioPlayer の置き換え）
+
+  - 再生キューの音声はキューに入った時点で DecodePool がデコード・リサンプルしておき、
+    PCM を隙間なくつなげて再生する（同じ音声のデコード結果は PCMCache から再利用）
+  - 出力のサンプルレートはデバイスの既定値。デコード時に一度だけ変換する
+  - 音声ごとに再生開始・終了の時刻（DAC に届く時刻）を PlaybackRecord に記録する
+  - null_output=True で音声デバイスを使わない（テスト用。出力は破棄か記録）
+  - 再生待ちは PlayQueue（URGENT が先、期限切れは速めるか捨てる）
+
+AudioPlayer と同じインターフェース（enqueue / enqueue_pcm / enqueue_stream / queue_duration など）を持つ。
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from types import SimpleNamespace
+
+import numpy as np
+
+try:
+    import sounddevice as sd
+except (ImportError, OSError):
+    sd = None  # sounddevice / PortAudio がなければ null_output のみ（AudioPlayer にフォールバック）
+
+import audio_decode
+from audio_decode import AudioClip, AudioStream, StreamDecoder, time_stretch
+from decode_pool import DecodePool, PCMCache
+from play_queue import NORMAL, PlayQueue, discard_audio
+
+
+class PlaybackRecord:
+    """1つの音声の再生記録（時刻は time.monotonic 基準）"""
+
+    def __init__(self, text: str = "", created_at: float = None, trace=None):
+        self.text = text
+        self.created_at = created_at      # 合成開始時刻（ストリームのみ）
+        self.trace = trace                # 遅延トレース（再生開始を記録する）
+        self.enqueued_at = time.monotonic()
+        self.started_at = None            # 最初のサンプルが出力された時刻
+        self.ended_at = None              # 最後のサンプルが出力された時刻
+        self.start_frame = None           # 出力開始からのフレーム位置
+        self.end_frame = None
+
+    @property
+    def duration(self) -> float | None:
+        if self.started_at is None or self.ended_at is None:
+            return None
+        return self.ended_at - self.started_at
+
+    @property
+    def queue_wait(self) -> float | None:
+        """キューに入ってから再生が始まるまでの秒数"""
+        if self.started_at is None:
+            return None
+        return self.started_at - self.enqueued_at
+
+
+class NullOutputStream:
+    """
+    音声デバイスを使わない OutputStream（テスト用）
+
+    別スレッドから blocksize ごとにコールバックを呼ぶ。realtime=False なら待たずに次を呼ぶ。
+    record=True なら出力された PCM を written に残す。
+    """
+
+    def __init__(self, samplerate: int, channels: int, blocksize: int, callback,
+                 realtime: bool = True, record: bool = False):
+        self.samplerate = samplerate
+        self.channels = channels
+        self.blocksize = blocksize
+        self.callback = callback
+        self.realtime = realtime
+        self.record = record
+        self.written = []
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True, name="null-output")
+        self._thread.start()
+
+    def _run(self):
+        period = self.blocksize / self.samplerate
+        next_at = time.monotonic()
+        frame = 0
+        while self._running:
+            out = np.zeros((self.blocksize, self.channels), dtype=np.int16)
+            now = frame / self.samplerate
+            self.callback(out, self.blocksize, SimpleNamespace(currentTime=now, outputBufferDacTime=now), None)
+            if self.record:
+                self.written.append(out.copy())
+            frame += self.blocksize
+            if self.realtime:
+                next_at += period
+                time.sleep(max(0.0, next_at - time.monotonic()))
+            else:
+                time.sleep(0)
+
+    def output(self) -> np.ndarray:
+        """記録した出力（フレーム x チャンネル）"""
+        if not self.written:
+            return np.zeros((0, self.channels), dtype=np.int16)
+        return np.concatenate(self.written)
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    def close(self):
+        self.stop()
+
+
+class CallbackPlayer:
+    """PCM キューをコールバックで読み出して隙間なく再生するプレーヤー"""
+
+    # 先読みしてデコードしておく秒数（これ以上溜まっていれば次の音声のデコードを待つ）
+    PREFILL_SECONDS = 1.0
+    # ストリーミング再生: この秒数分デコードできるたびに出力キューへ渡す
+    STREAM_BLOCK_SECONDS = 0.1
+
+    def __init__(self, device=None, sample_rate: int = None, channels: int = 2, blocksize: int = 480,
+                 null_output: bool = False, realtime: bool = True, record: bool = False, max_age: float = None,
+                 decode_workers: int = 2, pcm_cache: PCMCache = None):
+        """
+        Args:
+            device: 出力デバイス（None なら既定のデバイス）
+            sample_rate: 出力サンプルレート（None ならデバイスの既定値。null_output 時は 24000）
+            channels: 出力チャンネル数
+            blocksize: コールバック1回あたりのフレーム数（小さいほど低遅延）
+            null_output: 音声デバイスを使わない（NullOutputStream）
+            realtime: null_output 時に実時間で進めるか
+            record: null_output 時に出力を記録するか
+            max_age: 期限を指定せずに入れた音声の期限（キューに入ってからの秒数。None なら期限なし）
+            decode_workers: 先読みデコードのスレッド数
+            pcm_cache: デコード済み PCM のキャッシュ（None なら新規作成）
+        """
+        if sd is None and not null_output:
+            raise ImportError("sounddevice が必要です: pip install sounddevice")
+        if sample_rate is None:
+            if null_output:
+                sample_rate = 24000
+            else:
+                sample_rate = int(sd.query_devices(device, "output")["default_samplerate"])
+        self.device = device
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.blocksize = blocksize
+        self.null_output = null_output
+        self.realtime = realtime
+        self.record = record
+
+        self._play_queue = PlayQueue(max_age=max_age)
+        self._decoder = DecodePool(sample_rate, channels, workers=decode_workers, cache=pcm_cache)
+        self._running = False
+        self._thread = None
+        self._notify_thread = None
+        self._output = None
+        self.is_playing = False
+        self.on_play_start = None  # 再生開始コールバック（無音から鳴り始めたとき）
+        self.on_play_end = None    # 再生終了コールバック（キューが空になったとき）
+        self.on_first_audio = None  # (seconds: float) 合成開始から最初の音が出るまで（ストリーミング時）
+        self.on_item_played = None  # (record: PlaybackRecord) 1つの音声の再生が終わった
+        self.speed = 1.0
+        self.history: deque = deque(maxlen=256)  # 再生済みの PlaybackRecord
+
+        # デコード済み PCM: [record, pcm(フレーム x チャンネル), 読み出し位置, 先頭か, 末尾か]
+        self._segments: deque = deque()
+        self._buffered = 0           # _segments に残っているフレーム数
+        self._lock = threading.Lock()
+        self._events: queue.Queue = queue.Queue()  # コールバック・先読み → 通知スレッド
+        self._frames_out = 0         # 出力したフレーム数（無音を含む）
+        self._clock_offset = None    # 出力フレーム 0 が DAC に届く時刻（time.monotonic 基準）
+
+        self._feeding = None         # 取り出して出力キューへ渡している途中の項目（最後のブロックを渡し終えるまで）
+        self._fed_frames = 0         # _feeding のうち出力キューへ渡したフレーム数
+        self._current_stream = None
+
+    @staticmethod
+    def is_available(device=None) -> bool:
+        """出力デバイスが使えるか"""
+        if sd is None:
+            return False
+        try:
+            sd.query_devices(device, "output")
+            return True
+        except Exception:
+            return False
+
+    # ── 出力コールバック（オーディオスレッド） ─────────────
+
+    def _callback(self, outdata, frames, time_info, status):
+        # 最初のコールバックで「出力フレーム 0 が DAC に届く時刻」を決め、以降は出力したフレーム数から求める
+        # （コールバックの呼ばれ方の揺れを含まない。currentTime が 0 のままのバックエンドでも使える）
+        if self._clock_offset is None:
+            try:
+                latency = max(0.0, time_info.outputBufferDacTime - time_info.currentTime)
+            except AttributeError:
+                latency = 0.0
+            self._clock_offset = time.monotonic() + latency
+        dac = self._clock_offset + self._frames_out / self.sample_rate
+        if not self.realtime:
+            dac = time.monotonic()  # 実時間で進めない出力は、フレーム数ではなく読み出した時刻を記録する
+        filled = 0
+        events = []
+        with self._lock:
+            while filled < frames and self._segments:
+                segment = self._segments[0]
+                record, pcm, pos, first, last = segment
+                if first and pos == 0 and record.started_at is None:
+                    record.started_at = dac + filled / self.sample_rate
+                    record.start_frame = self._frames_out + filled
+                    events.append(("start", record))
+                n = min(frames - filled, len(pcm) - pos)
+                if n:
+                    outdata[filled:filled + n] = pcm[pos:pos + n]
+                    filled += n
+                    segment[2] = pos + n
+                if segment[2] >= len(pcm):
+                    self._segments.popleft()
+                    if last:
+                        record.ended_at = dac + filled / self.sample_rate
+                        record.end_frame = self._frames_out + filled
+                        events.append(("end", record))
+            self._buffered -= filled
+            self._frames_out += frames
+        if filled < frames:
+            outdata[filled:] = 0
+        for event in events:
+            self._events.put(event)
+
+    # ── デコード（先読みスレッド） ─────────────────────────
+
+    def _feed_loop(self):
+        while self._running:
+            self._wait_for_room()
+            try:
+                # 期限は「先読み分を鳴らし終えて再生が始まる時刻」で判定する
+                item = self._play_queue.get(timeout=0.5, lead=self._buffered / self.sample_rate)
+            except queue.Empty:
+                continue
+            if item is None:  # 終了シグナル
+                break
+            with self._lock:
+                self._feeding = item
+                self._fed_frames = 0
+            speed = self.speed * item.speed
+            try:
+                if isinstance(item.audio, AudioStream):
+                    self._feed_stream(item.audio, speed, item.trace)
+                else:
+                    self._feed_clip(item, speed)
+            except Exception as e:
+                print(f"[CallbackPlayer] 再生エラー: {e}")
+            finally:
+                # ストリームはブロックの間に出力キューが空になることがあるので、最後のブロックを
+                # 渡し終えてから外す。その前に鳴り終わっていれば、ここで再生の終了を判定し直す
+                with self._lock:
+                    self._feeding = None
+                self._events.put(("check", None))
+
+    def _wait_for_room(self):
+        while self._running and self._buffered > self.PREFILL_SECONDS * self.sample_rate:
+            time.sleep(0.01)
+
+    def _push(self, record: PlaybackRecord, pcm: np.ndarray, first: bool, last: bool):
+        """デコード済み PCM を出力キューへ"""
+        frames = np.ascontiguousarray(pcm.reshape(-1, self.channels))
+        with self._lock:
+            self._segments.append([record, frames, 0, first, last])
+            self._buffered += len(frames)
+            self._fed_frames += len(frames)
+
+    def _feed_clip(self, item, speed: float):
+        """先読みデコードの結果を待って出力キューへ渡す"""
+        audio = item.audio
+        try:
+            future = item.decoded if item.decoded is not None else self._decoder.submit(audio)
+            pcm = future.result()
+            if pcm is None:
+                print("[CallbackPlayer] mp3 のデコードには PyAV が必要です: pip install av")
+                return
+            pcm = time_stretch(pcm, speed, self.sample_rate, self.channels)
+            text = audio.text if isinstance(audio, AudioClip) else ""
+            self._push(PlaybackRecord(text=text, trace=item.trace), pcm, first=True, last=True)
+        finally:
+            if not isinstance(audio, AudioClip):
+                discard_audio(audio)  # 再生し終えたファイルを削除
+
+    def _feed_stream(self, stream: AudioStream, speed: float, trace=None):
+        """届いた順にデコードし、STREAM_BLOCK_SECONDS ごとに出力キューへ渡す"""
+        self._current_stream = stream
+        record = PlaybackRecord(text=stream.text, created_at=stream.created_at, trace=trace)
+        decoder = StreamDecoder(codec=stream.codec, sample_rate=self.sample_rate, channels=self.channels)
+        block = int(self.sample_rate * self.STREAM_BLOCK_SECONDS) * self.channels
+        pending, pending_size = [], 0
+        first = True
+        try:
+            for chunk in stream:
+                if not self._running:
+                    stream.cancel()
+                    break
+                if trace is not None:
+                    trace.mark_monotonic("tts_ready", stream.first_chunk_at)
+                pcm = decoder.feed(chunk)
+                if len(pcm):
+                    pending.append(pcm)
+                    pending_size += len(pcm)
+                if pending_size >= block:
+                    pcm = time_stretch(np.concatenate(pending), speed, self.sample_rate, self.channels)
+                    self._push(record, pcm, first=first, last=False)
+                    pending, pending_size, first = [], 0, False
+            if self._running:
+                pending.append(decoder.flush())
+        except Exception as e:
+            stream.cancel()
+            print(f"[CallbackPlayer] ストリーミング再生エラー: {e}")
+        finally:
+            self._current_stream = None
+        pcm = np.concatenate(pending) if pending else np.zeros(0, dtype=np.int16)
+        pcm = time_stretch(pcm, speed, self.sample_rate, self.channels)
+        self._push(record, pcm, first=first, last=True)
+
+    # ── 通知（通知スレッド） ─────────────────────────────
+
+    def _notify_loop(self):
+        """コールバックで起きた再生開始・終了を、オーディオスレッドの外で通知する"""
+        while self._running or not self._events.empty():
+            try:
+                kind, record = self._events.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                if kind == "start":
+                    if record.trace is not None:
+                        record.trace.mark_monotonic("first_audio", record.started_at)
+                    if record.created_at is not None and self.on_first_audio:
+                        self.on_first_audio(record.started_at - record.created_at)
+                    if not self.is_playing:
+                        self.is_playing = True
+                        if self.on_play_start:
+                            self.on_play_start()
+                else:
+                    if kind == "end":
+                        self.history.append(record)
+                        if self.on_item_played:
+                            self.on_item_played(record)
+                    if self.is_playing and self._idle():
+                        self.is_playing = False
+                        if self.on_play_end:
+                            self.on_play_end()
+            except Exception as e:
+                print(f"[CallbackPlayer] 通知エラー: {e}")
+
+    def _idle(self) -> bool:
+        with self._lock:
+            if self._segments or self._feeding is not None:
+                return False
+        return not len(self._play_queue)
+
+    # ── 操作 ─────────────────────────────────────────
+
+    def start(self):
+        """出力ストリームと先読みスレッドを開始"""
+        self._running = True
+        self._play_queue.reopen()
+        self._clock_offset = None
+        self._frames_out = 0
+        if self.null_output:
+            self._output = NullOutputStream(self.sample_rate, self.channels, self.blocksize, self._callback,
+                                            realtime=self.realtime, record=self.record)
+        else:
+            self._output = sd.OutputStream(
+                samplerate=self.sample_rate,
+                channels=self.channels,
+                dtype="int16",
+                blocksize=self.blocksize,
+                device=self.device,
+                latency="low",
+                callback=self._callback,
+            )
+        self._output.start()
+        self._thread = threading.Thread(target=self._feed_loop, daemon=True)
+        self._thread.start()
+        self._notify_thread = threading.Thread(target=self._notify_loop, daemon=True)
+        self._notify_thread.start()
+        print(f"[CallbackPlayer] 再生開始 ({self.sample_rate} Hz, {self.blocksize} フレーム/回)")
+
+    def stop(self):
+        """再生を停止"""
+        self._running = False
+        self._play_queue.close()  # 終了シグナル
+
+        # 再生中のストリームの受信待ちを解除
+        stream = self._current_stream
+        if stream is not None:
+            stream.cancel()
+            stream.close()
+
+        if self._thread:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        if self._output is not None:
+            self._output.stop()
+            self._output.close()
+        if self._notify_thread:
+            self._notify_thread.join(timeout=2.0)
+            self._notify_thread = None
+
+        # キューをクリア
+        with self._lock:
+            self._segments.clear()
+            self._buffered = 0
+        self._play_queue.clear()
+        self._decoder.shutdown()
+        self._feeding = None
+        self.is_playing = False
+
+        print("[CallbackPlayer] 再生停止")
+
+    def enqueue(self, audio, priority: str = NORMAL, deadline: float = None, trace=None):
+        """
+        再生キューに音声を追加
+
+        Args:
+            audio: AudioClip（メモリ上の音声）or 音声ファイルのパス（再生後に削除）
+            priority: "normal" / "urgent"（urgent は待っている音声より先に再生）
+            deadline: 再生開始の期限（time.monotonic 基準。過ぎたら速めるか捨てる）
+            trace: 遅延トレース（再生開始の時刻を記録する）
+        """
+        item = self._play_queue.put(audio, priority, deadline)
+        item.trace = trace
+        item.decoded = self._decoder.submit(audio)  # 再生を待つ間にデコードしておく
+
+    def enqueue_pcm(self, samples: np.ndarray, sample_rate: int, priority: str = NORMAL, deadline: float = None):
+        """再生キューに float32 のサンプル配列（-1.0〜1.0, モノラル）を追加"""
+        self.enqueue(AudioClip.from_samples(samples, sample_rate), priority, deadline)
+
+    def enqueue_stream(self, stream: AudioStream, priority: str = NORMAL, deadline: float = None, trace=None):
+        """再生キューにストリーミング合成中の音声を追加（合成完了を待たずに再生を始める）"""
+        self._play_queue.put(stream, priority, deadline).trace = trace
+
+    @property
+    def max_age(self) -> float | None:
+        return self._play_queue.max_age
+
+    @max_age.setter
+    def max_age(self, seconds: float | None):
+        """期限を指定せずに入れた音声の期限（秒）"""
+        self._play_queue.max_age = seconds
+
+    @property
+    def queue_duration(self) -> float:
+        """再生待ちの音声の合計秒数（デコード済みで未出力の分を含む。再生速度を反映）"""
+        with self._lock:
+            feeding, fed, buffered = self._feeding, self._fed_frames, self._buffered
+        pending = self._play_queue.duration / self.speed
+        if feeding is not None:
+            # 渡している途中の項目は、まだ出力キューに渡していない分だけ
+            pending += max(0.0, feeding.duration / feeding.speed / self.speed - fed / self.sample_rate)
+        return pending + buffered / self.sample_rate
+
+    def queue_stats(self) -> dict:
+        """再生待ちの秒数・件数と、期限切れで捨てた／速めた件数、デコード済み PCM のキャッシュ"""
+        stats = self._play_queue.stats()
+        stats["queued_seconds"] = self.queue_duration
+        stats["pcm_cache"] = self._decoder.cache.stats()
+        return stats
+
+    def set_speed(self, speed: float):
+        """再生速度を変更（まだデコードしていない音声から反映）"""
+        self.speed = max(0.5, min(2.0, speed))
+
+    @staticmethod
+    def supports_streaming() -> bool:
+        """ストリーミング再生（PyAV によるデコード）が使えるか"""
+        return audio_decode.is_available()
+
+    @property
+    def queue_size(self) -> int:
+        return len(self._play_queue)
+
+    @property
+    def is_running(self) -> bool:
+        return self._running
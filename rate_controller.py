@@ -0,0 +1,126 @@
+"""
+話速制御モジュール
+再生待ちの音声（= 吹き替えが元の音声から遅れている秒数）を見て話速を上げ、
+長時間の吹き替えでも遅れが溜まり続けないようにする
+
+  - 待ち時間が target_backlog 以下なら等速、max_backlog で max_rate になるよう線形に上げる
+  - 話速は step 刻みに丸める（同じ文の合成結果を TTS キャッシュから再利用できるように）。
+    下げるときは hysteresis 秒分の余裕を見て、隣り合う刻みの間で行き来しないようにする
+  - mode="engine": TTS 側の話速を変える（edge-tts の rate / VOICEVOX の speedScale）。
+    これから合成する文にだけ効く
+  - mode="stretch": 再生側で WSOLA による伸縮をかける。キューに入っている音声にも効く
+  - 更新のたびに遅れ（秒）を記録し、report() で平均・最大・p95 を返す
+"""
+
+import threading
+
+import numpy as np
+
+
+class RateController:
+    """再生待ち時間に応じた話速の自動調整"""
+
+    MODES = ("engine", "stretch")
+
+    def __init__(self, player, pipeline=None, min_rate: float = 1.0, max_rate: float = 1.5,
+                 target_backlog: float = 2.0, max_backlog: float = 8.0, mode: str = "engine",
+                 step: float = 0.05, hysteresis: float = 1.0):
+        """
+        Args:
+            player: AudioPlayer（queue_duration / set_speed）
+            pipeline: SentencePipeline（合成中の文も待ち時間に含める。None なら再生キューのみ）
+            min_rate: 話速の下限（1.0 = 等速）
+            max_rate: 話速の上限
+            target_backlog: この秒数までの遅れは許容する（等速のまま）
+            max_backlog: この秒数の遅れで max_rate に達する
+            mode: "engine"（TTS の話速）/ "stretch"（再生側で伸縮）
+            step: 話速の刻み
+            hysteresis: 話速を下げるのは遅れがこの秒数ぶん余分に減ってから
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"サポートされていないモード: {mode}")
+        if not 0 < min_rate <= max_rate:
+            raise ValueError(f"話速の範囲が不正です: {min_rate}〜{max_rate}")
+        self.player = player
+        self.pipeline = pipeline
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.target_backlog = target_backlog
+        self.max_backlog = max(max_backlog, target_backlog + 0.1)
+        self.mode = mode
+        self.step = step
+        self.hysteresis = hysteresis
+
+        self.rate = min_rate
+        self._applied = None  # (tts の id, 話速) 最後に反映した組
+        self._lock = threading.Lock()
+        self._drift = []       # 更新ごとの遅れ（秒）
+        self._rates = []
+
+    def backlog_seconds(self) -> float:
+        """吹き替えの遅れ（再生待ち + 合成中の文の秒数）"""
+        backlog = self.player.queue_duration
+        if self.pipeline is not None:
+            backlog += self.pipeline.pending_seconds
+        return backlog
+
+    def rate_for(self, backlog: float) -> float:
+        """遅れの秒数に対する話速"""
+        ratio = (backlog - self.target_backlog) / (self.max_backlog - self.target_backlog)
+        rate = self.min_rate + (self.max_rate - self.min_rate) * min(max(ratio, 0.0), 1.0)
+        rate = round(rate / self.step) * self.step
+        return round(min(max(rate, self.min_rate), self.max_rate), 2)
+
+    def update(self, tts=None) -> float:
+        """
+        現在の遅れから話速を決めて反映する（文を合成キューに入れる直前に呼ぶ）
+
+        Args:
+            tts: 話速を変える TTS エンジン（mode="engine" のとき。TTSEngine / VoicevoxTTS）
+
+        Returns:
+            反映した話速
+        """
+        backlog = self.backlog_seconds()
+        rate = self.rate_for(backlog)
+        if rate < self.rate:
+            rate = min(self.rate, self.rate_for(backlog + self.hysteresis))
+        with self._lock:
+            self._drift.append(backlog)
+            self._rates.append(rate)
+            if rate != self.rate:
+                print(f"[RateController] 話速 {self.rate:.2f}x → {rate:.2f}x (遅れ {backlog:.1f}s)")
+            self.rate = rate
+            self._apply(rate, tts)
+        return rate
+
+    def _apply(self, rate: float, tts):
+        if self.mode == "stretch":
+            if self.player.speed != rate:
+                self.player.set_speed(rate)
+            return
+        if tts is None or self._applied == (id(tts), rate):
+            return
+        if hasattr(tts, "set_speed_scale"):
+            tts.set_speed_scale(rate)
+        elif hasattr(tts, "set_rate"):
+            tts.set_rate(f"{round((rate - 1.0) * 100):+d}%")
+        self._applied = (id(tts), rate)
+
+    def report(self) -> dict:
+        """遅れと話速の統計"""
+        with self._lock:
+            drift = np.array(self._drift, dtype=np.float64)
+            rates = np.array(self._rates, dtype=np.float64)
+        if not len(drift):
+            return {"updates": 0, "drift_mean": 0.0, "drift_p95": 0.0, "drift_max": 0.0,
+                    "drift_last": 0.0, "rate_mean": self.rate, "rate_max": self.rate}
+        return {
+            "updates": len(drift),
+            "drift_mean": float(drift.mean()),
+            "drift_p95": float(np.percentile(drift, 95)),
+            "drift_max": float(drift.max()),
+            "drift_last": float(drift[-1]),
+            "rate_mean": float(rates.mean()),
+            "rate_max": float(rates.max()),
+        }
@@ -0,0 +1,200 @@
+"""
+セグメント結合モジュール
+ASR のチャンク境界で途切れた文をつなぎ直してから翻訳に渡す
+
+  例: "It's a made it super simple. Right? She's on 10 months. No, server. No,"
+      → "It's a made it super simple. Right? She's on 10 months. No, server." を送出し、
+        末尾の "No," は次のチャンクと結合するまで保持する
+
+保持中の断片は次のいずれかで送出する:
+  - 句読点（. ! ? 。 ！ ？）で文が完結した
+  - 無音（ポーズ）が続いた
+  - 保持時間が遅延予算（latency_budget）を超えた
+
+チャンクごとに翻訳・TTS していた呼び出し回数が減り、文単位の訳で品質も上がる。
+保持中のテキストはロックの下で読み書きするので、ストリーミング ASR のコールバックなど
+パイプライン以外のスレッドからも pending_text を読める。
+"""
+
+import re
+import threading
+import time
+
+# 文末記号（後ろに閉じ括弧・引用符が続いてもよい）
+_SENTENCE_END = re.compile(r'[.!?。！？]+["\'」』）)]*')
+
+# ピリオドで終わっても文末とみなさない略語
+_ABBREVIATIONS = {
+    "mr.", "mrs.", "ms.", "dr.", "prof.", "sr.", "jr.", "st.",
+    "vs.", "etc.", "e.g.", "i.e.", "u.s.", "u.k.",
+}
+
+
+def split_sentences(text: str) -> list[str]:
+    """
+    テキストを文単位に分割する（英語系: . ! ? / 日本語・中国語: 。！？）
+
+    最後の要素は文末記号で終わっていない（未完の）場合がある。
+    """
+    sentences = []
+    start = 0
+    for match in _SENTENCE_END.finditer(text):
+        end = match.end()
+        # 英語系のピリオドは直後が空白 or 文末のときだけ区切る（"3.5" や "v1.2" を守る）
+        if match.group()[0] in ".!?" and end < len(text) and not text[end].isspace():
+            continue
+        candidate = text[start:end].strip()
+        last_word = candidate.rsplit(None, 1)[-1].lower() if candidate else ""
+        if match.group() == "." and last_word in _ABBREVIATIONS:
+            continue
+        if candidate:
+            sentences.append(candidate)
+        start = end
+    tail = text[start:].strip()
+    if tail:
+        sentences.append(tail)
+    return sentences
+
+
+def is_complete_sentence(text: str) -> bool:
+    """文末記号で終わっているか"""
+    parts = split_sentences(text)
+    if not parts:
+        return False
+    last = parts[-1]
+    match = _SENTENCE_END.search(last)
+    return match is not None and match.end() == len(last)
+
+
+class SegmentStitcher:
+    """ASR の断片を文単位にまとめて送出するステージ"""
+
+    def __init__(
+        self,
+        latency_budget: float = 4.5,
+        pause_after: float = None,
+        min_chars: int = 12,
+    ):
+        """
+        Args:
+            latency_budget: 断片を保持してよい最大秒数（0 以下で結合を無効化）
+            pause_after: 新しい断片がこの秒数来なければポーズとみなして送出
+                         （None なら latency_budget と同じ）
+            min_chars: 完結した文でもこの文字数未満なら次の断片とまとめる
+                       （"Right?" だけで1回翻訳しないため）
+        """
+        self.latency_budget = latency_budget
+        self.pause_after = latency_budget if pause_after is None else pause_after
+        self.min_chars = min_chars
+
+        self._pending = ""
+        self._held_since = None
+        self._last_feed = None
+        self._lock = threading.RLock()
+
+        # 効果測定用の統計
+        self._started_at = time.monotonic()
+        self.fragments_in = 0
+        self.segments_out = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.latency_budget > 0
+
+    @property
+    def pending_text(self) -> str:
+        """保持中（未完）のテキスト（どのスレッドから読んでもよい）"""
+        with self._lock:
+            return self._pending
+
+    def feed(self, text: str, now: float = None) -> list[str]:
+        """
+        ASR の断片を追加し、送出可能になったセグメントを返す
+
+        Returns:
+            翻訳に渡すセグメントのリスト（空の場合あり）
+        """
+        with self._lock:
+            now = time.monotonic() if now is None else now
+            text = text.strip()
+            if not text:
+                return self.poll(now)
+            self.fragments_in += 1
+            self._last_feed = now
+
+            if not self.enabled:
+                return self._emit(text)
+
+            combined = f"{self._pending} {text}".strip() if self._pending else text
+            if self._held_since is None:
+                self._held_since = now
+
+            sentences = split_sentences(combined)
+            if is_complete_sentence(combined):
+                complete, tail = sentences, []
+            else:
+                complete, tail = sentences[:-1], sentences[-1:]
+
+            ready = " ".join(complete)
+            self._pending = " ".join(tail)
+
+            if ready and len(ready) < self.min_chars:
+                # 短すぎる完結文は次の断片と一緒に送る
+                self._pending = f"{ready} {self._pending}".strip()
+                ready = ""
+
+            if ready:
+                # 残りの保持時間は、送出しなかった部分の到着時刻から数え直す
+                self._held_since = now if self._pending else None
+                return self._emit(ready) + self.poll(now)
+            return self.poll(now)
+
+    def poll(self, now: float = None) -> list[str]:
+        """保持中の断片が遅延予算 or ポーズ判定を超えていれば送出する"""
+        with self._lock:
+            if not self._pending:
+                return []
+            now = time.monotonic() if now is None else now
+            held = now - self._held_since if self._held_since is not None else 0.0
+            idle = now - self._last_feed if self._last_feed is not None else 0.0
+            if held >= self.latency_budget or idle >= self.pause_after:
+                return self.flush()
+            return []
+
+    def on_pause(self) -> list[str]:
+        """無音を検出した（ASR が空文字を返した等）ときに保持分を送出する"""
+        return self.flush()
+
+    def flush(self) -> list[str]:
+        """保持中の断片をすべて送出する"""
+        with self._lock:
+            if not self._pending:
+                return []
+            text = self._pending
+            self._pending = ""
+            self._held_since = None
+            return self._emit(text)
+
+    def discard(self) -> str:
+        """保持中の断片を送出せずに捨てる（言語ペアの切り替え時など）。捨てたテキストを返す"""
+        with self._lock:
+            text = self._pending
+            self._pending = ""
+            self._held_since = None
+            return text
+
+    def _emit(self, text: str) -> list[str]:
+        self.segments_out += 1
+        return [text]
+
+    def stats(self) -> dict:
+        """断片数・送出数・1分あたりの翻訳呼び出し数"""
+        minutes = max((time.monotonic() - self._started_at) / 60.0, 1e-9)
+        saved = 1.0 - self.segments_out / self.fragments_in if self.fragments_in else 0.0
+        return {
+            "fragments_in": self.fragments_in,
+            "segments_out": self.segments_out,
+            "fragments_per_min": self.fragments_in / minutes,
+            "calls_per_min": self.segments_out / minutes,
+            "calls_saved": saved,
+        }
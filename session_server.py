@@ -0,0 +1,481 @@
+"""
+サーバーモード（複数セッション）
+WebSocket で PCM を受け取り、接続ごとのセッションで 認識 → 文の結合 → 翻訳 → 読み上げ を行って、
+訳文と音声を接続ごとに送り返す（ブラウザのタブ・部屋ごとの音声を1台でまとめて扱う）。
+ASR のモデル・翻訳・TTS のクライアントは全セッションで共有し、ASR はセッションをまたいで
+まとめて処理する（asr_batcher）。
+
+  python main.py --serve --port 8765
+
+プロトコル（ws://HOST:PORT/ws?source=en&target=ja&sample_rate=16000）:
+  クライアント → サーバー
+    バイナリ: PCM（16bit 符号付き・リトルエンディアン・モノラル、sample_rate Hz）
+    テキスト: {"type": "flush"}  保持中の断片も訳す（発話の区切り）
+              {"type": "end"}    残りをすべて訳して {"type": "done"} を返す
+  サーバー → クライアント
+    {"type": "ready", "session": ID, "chunk_seconds": 秒, "cpu_count": CPU 数}
+    {"type": "source", "text": 認識結果, "audio_end": サンプル数}
+    {"type": "translation", "segment": 連番, "text": 訳文, "audio_end": サンプル数}
+    {"type": "audio", "segment": 連番, "codec": "mp3", "text": 文, "audio_end": サンプル数, "latency": 秒}
+        （直後のバイナリが音声。codec の形式）
+    {"type": "done"} / {"type": "error", "message": ...}
+
+  audio_end はその結果のもとになった音声の末尾が、クライアントが送った何サンプル目か（遅延の測定用）。
+  latency はその音声のチャンクが揃ってから（サーバーが受け取ってから）音声を送るまでの秒数。
+  GET /stats でセッション数・ASR のまとめ具合・最初の音声までの遅延を返す。
+"""
+
+import asyncio
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+
+try:
+    from aiohttp import WSMsgType, web
+except ImportError:
+    raise ImportError("aiohttp が必要です: pip install aiohttp")
+
+from asr_batcher import AsrBatcher
+from latency_trace import percentile
+from orchestrator import OrderedGate
+from segment_stitcher import SegmentStitcher
+from tts_cache import TTSCache
+
+ASR_SAMPLE_RATE = 16000
+
+
+class SharedEngines:
+    """
+    全セッションで共有する ASR・翻訳・TTS（言語・言語ペアごとに1つずつ、最初に使うときに作る）
+
+    ASR のモデルはプロセスのモデルレジストリから受け取るので、言語ごとの Transcriber が
+    同じモデルを使う（Whisper は全言語で1つ）。
+    """
+
+    def __init__(
+        self,
+        model_size: str = "small",
+        asr_engine: str = "whisper",
+        translation_memory: bool = True,
+        tts_cache_dir: str = None,
+        use_voicevox: bool = False,
+        voicevox_speaker_id: int = 3,
+        max_batch: int = 8,
+        batch_wait: float = 0.02,
+        asr_workers: int = 1,
+        translate_workers: int = 8,
+    ):
+        """
+        Args:
+            max_batch: ASR にまとめる要求の上限
+            batch_wait: ASR の要求をまとめるために待つ最大秒数
+            asr_workers: 同時に処理する ASR のまとまりの数
+            translate_workers: 翻訳のスレッド数（全セッション合計）
+        """
+        self.model_size = model_size
+        self.asr_engine = asr_engine
+        self.asr_workers = asr_workers
+        self.translation_memory = translation_memory
+        self.use_voicevox = use_voicevox
+        self.voicevox_speaker_id = voicevox_speaker_id
+        self.tts_cache = TTSCache(cache_dir=tts_cache_dir)
+        self._transcribers = {}  # 言語 → Future（読み込み中の言語はそれを待つ）
+        self._translators = {}
+        self._tts = {}
+        self._lock = threading.Lock()
+        self.asr = AsrBatcher(self._transcribe_batch, max_batch=max_batch, max_wait=batch_wait, workers=asr_workers)
+        self.translate_executor = ThreadPoolExecutor(max_workers=translate_workers, thread_name_prefix="translate")
+        self.residency = None  # ResidencyMonitor（使われていない ASR モデルを外す。run_server で設定）
+
+    def supports(self, source: str, target: str) -> bool:
+        from translator import Translator
+        return Translator.supports(source, target)
+
+    def transcriber(self, language: str):
+        """
+        言語の Transcriber（モデルを読み込んでおく。未対応の言語なら None）
+
+        読み込みはロックの外で行う（ほかの言語・翻訳・TTS を使うセッションを待たせない）。
+        同じ言語を読み込み中なら、その読み込みが終わるのを待つ
+        """
+        with self._lock:
+            future = self._transcribers.get(language)
+            loading = future is None
+            if loading:
+                future = self._transcribers[language] = Future()
+        if loading:
+            try:
+                transcriber = self._new_transcriber(language)
+                if language not in getattr(transcriber, "SUPPORTED_LANGUAGES", [language]):
+                    transcriber = None
+                else:
+                    transcriber.load_model()
+            except BaseException as e:
+                with self._lock:
+                    del self._transcribers[language]  # 次に使うときに読み込み直す
+                future.set_exception(e)
+                raise
+            future.set_result(transcriber)
+        return future.result()
+
+    def translator(self, source: str, target: str):
+        with self._lock:
+            if (source, target) not in self._translators:
+                self._translators[(source, target)] = self._new_translator(source, target)
+            return self._translators[(source, target)]
+
+    def tts(self, language: str):
+        with self._lock:
+            if language not in self._tts:
+                self._tts[language] = self._new_tts(language)
+            return self._tts[language]
+
+    def _new_transcriber(self, language: str):
+        if self.asr_engine == "moonshine":
+            from transcriber_moonshine import Transcriber
+            return Transcriber(model_size=self.model_size, language=language)
+        from transcriber import Transcriber
+        return Transcriber(model_size=self.model_size, language=language, num_workers=self.asr_workers)
+
+    def _new_translator(self, source: str, target: str):
+        from translator import Translator
+        return Translator(source=source, target=target, log_dir="logs",
+                          memory_dir=os.path.join("logs", "tm") if self.translation_memory else None)
+
+    def _new_tts(self, language: str):
+        if self.use_voicevox and language == "ja":
+            from tts_voicevox import VoicevoxTTS
+            return VoicevoxTTS(speaker_id=self.voicevox_speaker_id, cache=self.tts_cache)
+        from tts_engine import TTSEngine
+        return TTSEngine(language=language, cache=self.tts_cache)
+
+    def _transcribe_batch(self, language: str, audios: list) -> list[str]:
+        """同じ言語の音声をまとめて認識する（まとめて認識できないエンジンは1件ずつ）"""
+        transcriber = self.transcriber(language)
+        if hasattr(transcriber, "transcribe_batch"):
+            return transcriber.transcribe_batch(audios)
+        return [transcriber.transcribe(audio) for audio in audios]
+
+    def close(self):
+        if self.residency:
+            self.residency.stop()
+        self.asr.close()
+        self.translate_executor.shutdown(wait=False)
+        with self._lock:
+            translators, engines = list(self._translators.values()), list(self._tts.values())
+            transcribers = [f.result() for f in self._transcribers.values() if f.done() and f.exception() is None]
+            transcribers = [t for t in transcribers if t is not None]
+        for translator in translators:
+            translator.save_memory()
+        for tts in engines:
+            tts.cleanup()
+        for transcriber in transcribers:
+            transcriber.release()
+
+
+class Session:
+    """1つの接続: PCM をチャンクに分けて 認識 → 文の結合 → 翻訳 → 読み上げ し、結果を送り返す"""
+
+    def __init__(self, session_id: int, engines: SharedEngines, ws, source: str, target: str,
+                 sample_rate: int = ASR_SAMPLE_RATE, chunk_duration: float = 4.0,
+                 silence_threshold: float = 0.03, on_latency=None):
+        """
+        Args:
+            ws: 結果を送る WebSocket（send_json / send_bytes）
+            silence_threshold: この RMS 以下のチャンクは無音（認識せず、保持中の断片を送出する）
+            on_latency: 最初の音声を送ったら遅延（秒）を渡して呼ぶ関数
+        """
+        self.id = session_id
+        self.engines = engines
+        self.ws = ws
+        self.source = source
+        self.target = target
+        self.sample_rate = sample_rate
+        self.chunk_samples = int(sample_rate * chunk_duration)  # クライアントのサンプルレートで数える
+        self.silence_threshold = silence_threshold
+        self.on_latency = on_latency
+        self.stitcher = SegmentStitcher(latency_budget=chunk_duration + 0.5, pause_after=chunk_duration + 1.0)
+        self._buffer = np.zeros(0, dtype=np.float32)
+        self._received = 0  # 切り出したサンプル数（audio_end）
+        self._items: asyncio.Queue = asyncio.Queue()
+        self._gate = OrderedGate()
+        self._segments = itertools.count()
+        self._tasks: set = set()
+        self._asr_futures: deque = deque()
+        self._send_lock = asyncio.Lock()  # 音声のヘッダーと本体の間に別の送信を挟まない
+        self.chunks = 0
+        self.latencies = []
+
+    def feed(self, pcm: bytes):
+        """受け取った PCM を溜め、揃ったチャンクを認識に回す"""
+        samples = np.frombuffer(pcm, dtype="<i2").astype(np.float32) / 32768.0
+        self._buffer = np.concatenate([self._buffer, samples])
+        while len(self._buffer) >= self.chunk_samples:
+            chunk, self._buffer = self._buffer[:self.chunk_samples], self._buffer[self.chunk_samples:]
+            self._cut(chunk)
+
+    def _cut(self, chunk: np.ndarray):
+        self._received += len(chunk)
+        self.chunks += 1
+        t_ready = time.monotonic()
+        if np.sqrt(np.mean(chunk ** 2)) <= self.silence_threshold:
+            self._items.put_nowait(("pause", None, self._received, t_ready))
+            return
+        if self.engines.residency:
+            self.engines.residency.note_sound()  # 外したモデルがあれば、ほかのチャンクを待たずに読み込み直し始める
+        if self.sample_rate != ASR_SAMPLE_RATE:
+            n_out = int(round(len(chunk) * ASR_SAMPLE_RATE / self.sample_rate))
+            positions = np.arange(n_out, dtype=np.float64) * (self.sample_rate / ASR_SAMPLE_RATE)
+            chunk = np.interp(positions, np.arange(len(chunk)), chunk).astype(np.float32)
+        # 認識はすぐに投入して、ほかのセッションのチャンクとまとめてもらう（結果は届いた順に使う）
+        future = self.engines.asr.submit(self.source, chunk)
+        self._asr_futures.append(future)
+        self._items.put_nowait(("chunk", future, self._received, t_ready))
+
+    def flush(self):
+        """保持中の断片も訳す（発話の区切り）。溜まっている端数のチャンクも認識する"""
+        if len(self._buffer) > self.sample_rate * 0.5:
+            chunk, self._buffer = self._buffer, np.zeros(0, dtype=np.float32)
+            self._cut(chunk)
+        self._items.put_nowait(("flush", None, self._received, time.monotonic()))
+
+    async def run(self):
+        """チャンクを届いた順に文の結合へ通し、完結した文を翻訳・読み上げに回す（終わりは None）"""
+        while True:
+            try:
+                item = await asyncio.wait_for(self._items.get(), timeout=1.0)
+            except asyncio.TimeoutError:
+                # 保持中の断片が遅延予算・ポーズ判定を超えていれば送出
+                self._start_segments(self.stitcher.poll(), self._received, time.monotonic())
+                continue
+            if item is None:
+                break
+            kind, future, audio_end, t_ready = item
+            if kind == "pause":
+                sources = self.stitcher.on_pause()
+            elif kind == "flush":
+                sources = self.stitcher.flush()
+            else:
+                try:
+                    text = await asyncio.wrap_future(future)
+                except Exception as e:
+                    print(f"[Session {self.id}] 音声認識エラー: {e}")
+                    continue
+                finally:
+                    self._asr_futures.remove(future)
+                if text.strip():
+                    await self._send({"type": "source", "text": text, "audio_end": audio_end})
+                    sources = self.stitcher.feed(text)
+                else:
+                    sources = self.stitcher.on_pause()
+            self._start_segments(sources, audio_end, t_ready)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _start_segments(self, sources: list[str], audio_end: int, t_ready: float):
+        for source in sources:
+            task = asyncio.get_running_loop().create_task(
+                self._segment(next(self._segments), source, audio_end, t_ready))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _segment(self, seq: int, source_text: str, audio_end: int, t_ready: float):
+        """1セグメント: 翻訳（並行） → 文ごとの合成を投入 → セグメントの順に訳文と音声を送る"""
+        clips = []
+        parts = []
+        try:
+            translator = self.engines.translator(self.source, self.target)
+            parts = await asyncio.get_running_loop().run_in_executor(
+                self.engines.translate_executor, lambda: [p for p in translator.translate_stream(source_text) if p.strip()])
+            tts = self.engines.tts(self.target)
+            clips = [asyncio.wrap_future(tts.synthesize_audio_async(part)) for part in parts]
+        except Exception as e:
+            print(f"[Session {self.id}] 翻訳エラー: {e}")
+        async with self._gate.turn(seq):
+            if not parts:
+                return
+            sep = "" if self.target in ("ja", "zh", "zh-CN") else " "
+            await self._send({"type": "translation", "segment": seq, "text": sep.join(p.strip() for p in parts),
+                              "audio_end": audio_end})
+            first = True
+            for part, pending in zip(parts, clips):
+                try:
+                    clip = await pending
+                except Exception as e:
+                    print(f"[Session {self.id}] 音声合成エラー: {e}")
+                    clip = None
+                if clip is None or clip.data is None:
+                    continue
+                latency = time.monotonic() - t_ready
+                async with self._send_lock:
+                    await self.ws.send_json({"type": "audio", "segment": seq, "codec": clip.codec, "text": part,
+                                             "audio_end": audio_end, "latency": latency})
+                    await self.ws.send_bytes(clip.data)
+                if first:
+                    first = False
+                    self.latencies.append(latency)
+                    if self.on_latency:
+                        self.on_latency(latency)
+
+    async def _send(self, message: dict):
+        async with self._send_lock:
+            await self.ws.send_json(message)
+
+    async def finish(self):
+        """残りをすべて訳して送る"""
+        self.flush()
+        self._items.put_nowait(None)
+
+    def abort(self):
+        """切断: まだ始まっていない認識を取り消し、処理中のセグメントを止める"""
+        for future in list(self._asr_futures):
+            future.cancel()
+        for task in list(self._tasks):
+            task.cancel()
+        self._items.put_nowait(None)
+
+
+class BridgeServer:
+    """WebSocket の接続ごとに Session を作り、SharedEngines を共有させる"""
+
+    def __init__(self, engines: SharedEngines, chunk_duration: float = 4.0, max_sessions: int = None,
+                 window: int = 1000):
+        """
+        Args:
+            max_sessions: 同時に受け付けるセッション数の上限（None なら無制限。超えたら 503）
+            window: /stats の遅延の集計に使う直近の件数
+        """
+        self.engines = engines
+        self.chunk_duration = chunk_duration
+        self.max_sessions = max_sessions
+        self.sessions: dict[int, Session] = {}
+        self._ids = itertools.count(1)
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/ws", self._handle)
+        app.router.add_get("/stats", self._stats)
+        return app
+
+    async def _handle(self, request: web.Request):
+        query = request.query
+        source, target = query.get("source", "en"), query.get("target", "ja")
+        try:
+            sample_rate = int(query.get("sample_rate", ASR_SAMPLE_RATE))
+        except ValueError:
+            raise web.HTTPBadRequest(text="sample_rate は整数で指定してください")
+        if not self.engines.supports(source, target):
+            raise web.HTTPBadRequest(text=f"サポートされていない言語ペア: {source}→{target}")
+        # 初めての言語ならモデルを共有した Transcriber を作る（ブロックするので別スレッドで）
+        transcriber = await asyncio.get_running_loop().run_in_executor(None, self.engines.transcriber, source)
+        if transcriber is None:
+            raise web.HTTPBadRequest(text=f"音声認識が対応していない言語: {source}")
+        if self.max_sessions is not None and len(self.sessions) >= self.max_sessions:
+            raise web.HTTPServiceUnavailable(text=f"セッション数の上限 ({self.max_sessions}) に達しています")
+
+        ws = web.WebSocketResponse(heartbeat=30.0, max_msg_size=16 * 1024 * 1024)
+        await ws.prepare(request)
+        session = Session(next(self._ids), self.engines, ws, source, target, sample_rate=sample_rate,
+                          chunk_duration=self.chunk_duration, on_latency=self._record_latency)
+        self.sessions[session.id] = session
+        print(f"[Server] セッション {session.id} 開始 ({source}→{target}, {sample_rate} Hz, "
+              f"{len(self.sessions)} 接続中)")
+        runner = asyncio.get_running_loop().create_task(session.run())
+        finished = False
+        try:
+            await ws.send_json({"type": "ready", "session": session.id, "chunk_seconds": self.chunk_duration,
+                                "cpu_count": os.cpu_count()})
+            async for message in ws:
+                if message.type == WSMsgType.BINARY:
+                    session.feed(message.data)
+                elif message.type == WSMsgType.TEXT:
+                    kind = message.json().get("type")
+                    if kind == "flush":
+                        session.flush()
+                    elif kind == "end":
+                        await session.finish()
+                        await runner
+                        finished = True
+                        await ws.send_json({"type": "done"})
+                elif message.type == WSMsgType.ERROR:
+                    break
+        except Exception as e:
+            print(f"[Server] セッション {session.id} エラー: {type(e).__name__}: {e}")
+        finally:
+            if not finished:
+                session.abort()
+                runner.cancel()
+            del self.sessions[session.id]
+            print(f"[Server] セッション {session.id} 終了 (チャンク {session.chunks}件, "
+                  f"{len(self.sessions)} 接続中)")
+        return ws
+
+    def _record_latency(self, latency: float):
+        with self._lock:
+            self._latencies.append(latency)
+
+    def stats(self) -> dict:
+        """接続中のセッション数・ASR のまとめ具合・最初の音声までの遅延（直近 window 件）"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+        return {
+            "sessions": len(self.sessions),
+            "asr": self.engines.asr.stats(),
+            "first_audio": {
+                "count": len(latencies),
+                "p50": percentile(latencies, 50),
+                "p95": percentile(latencies, 95),
+                "p99": percentile(latencies, 99),
+            },
+        }
+
+    async def _stats(self, request: web.Request):
+        return web.json_response(self.stats())
+
+    def run(self, host: str = "127.0.0.1", port: int = 8765):
+        web.run_app(self.app(), host=host, port=port, print=None)
+
+
+def run_server(args):
+    """サーバーモードで起動する（main.py --serve）"""
+    use_voicevox = False
+    if args.target_lang == "ja":
+        from tts_voicevox import VoicevoxTTS
+        use_voicevox = VoicevoxTTS.is_available()
+    engines = SharedEngines(
+        model_size=args.model,
+        asr_engine=args.asr,
+        translation_memory=not args.no_tm,
+        tts_cache_dir=args.tts_cache_dir,
+        use_voicevox=use_voicevox,
+        voicevox_speaker_id=args.speaker_id,
+        max_batch=args.max_batch,
+        batch_wait=args.batch_wait,
+        asr_workers=args.asr_workers,
+    )
+    if args.idle_unload or args.rss_budget:
+        from model_residency import ResidencyMonitor
+        engines.residency = ResidencyMonitor(idle_seconds=args.idle_unload * 60, rss_budget_mb=args.rss_budget)
+        engines.residency.start()
+    # 最初のセッションを待たせないように、モデルと既定の言語ペアを読み込んでおく
+    engines.transcriber(args.source_lang)
+    if engines.supports(args.source_lang, args.target_lang):
+        engines.translator(args.source_lang, args.target_lang)
+    server = BridgeServer(engines, chunk_duration=args.chunk, max_sessions=args.max_sessions)
+    print(f"[Server] ws://{args.host}:{args.port}/ws?source={args.source_lang}&target={args.target_lang}"
+          f"&sample_rate=16000 で待機中（ASR: {args.asr} {args.model}, まとめる上限 {args.max_batch}件）")
+    try:
+        server.run(args.host, args.port)
+    finally:
+        stats = engines.asr.stats()
+        if stats["batches"]:
+            print(f"[Server] ASR {stats['items']}件を {stats['batches']}回で処理 "
+                  f"(平均 {stats['mean_batch']:.1f}件, 最大 {stats['max_batch']}件)")
+        engines.close()
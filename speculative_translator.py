@@ -0,0 +1,213 @@
+"""
+先行翻訳モジュール
+ストリーミング ASR の途中経過（interim）を確定前に翻訳しておき、確定時に再利用する
+
+  途中経過: "We use machine learning. It is"          → 1文目を先行翻訳
+  途中経過: "We use machine learning. It is fast"     → 末尾が変化中なので待つ
+  確定:     "We use machine learning. It is fast."    → 1文目はキャッシュを再利用、
+                                                          変化した末尾だけを翻訳
+
+  - キャッシュは文単位。確定テキストの先頭から連続してヒットした文は再利用し、
+    残り（変化した末尾）は1回の呼び出しでまとめて翻訳する
+  - 未完の末尾は、同じ内容の途中経過が2回続いた（安定した）ときだけ先行翻訳する
+  - 途中経過から消えた文の未実行ジョブはキャンセルし、同時実行数と待ち件数に上限を設ける
+
+Translator と同じ translate() インターフェースを持つので、VoiceBridge からはそのまま差し替えられる。
+"""
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from segment_stitcher import split_sentences, is_complete_sentence
+
+# 文をスペースなしで連結する言語（訳文の結合用）
+_NO_SPACE_LANGUAGES = {"ja", "zh", "zh-CN", "zh-TW"}
+
+
+def _key(sentence: str) -> str:
+    """キャッシュキー: 末尾の句点の有無で別扱いしない（"It is fast" と "It is fast." を同一視）
+
+    疑問符・感嘆符は意味が変わるので残す（"It is fast?" は "It is fast." の訳を使わない）
+    """
+    return sentence.strip().rstrip(".。").strip()
+
+
+class SpeculativeTranslator:
+    """途中経過の先行翻訳キャッシュ付きの Translator ラッパー"""
+
+    def __init__(
+        self,
+        translator,
+        max_concurrent: int = 2,
+        max_pending: int = 4,
+        max_entries: int = 128,
+        wait_timeout: float = 3.0,
+    ):
+        """
+        Args:
+            translator: translate(text) を持つ翻訳器（Translator など）
+            max_concurrent: 先行翻訳の同時実行数
+            max_pending: 実行待ちを含めた先行翻訳ジョブの上限（超えたら新規投入しない）
+            max_entries: キャッシュする文の最大数（LRU）
+            wait_timeout: 確定時、実行中の先行翻訳を待つ最大秒数
+        """
+        self.translator = translator
+        self.max_concurrent = max_concurrent
+        self.max_pending = max_pending
+        self.max_entries = max_entries
+        self.wait_timeout = wait_timeout
+
+        self._executor = None  # 最初の先行翻訳で作る（shutdown() の後もまた作る）
+        self._cache: OrderedDict = OrderedDict()  # 原文の文（_key）→ Future
+        self._last_tail = ""
+        self._lock = threading.Lock()
+
+        # 効果測定用
+        self.speculated = 0
+        self.cancelled = 0
+        self.reused = 0
+        self.retranslated = 0
+
+    def __getattr__(self, name):
+        # add_terminology / engine_stats / source / target などは元の Translator に委譲
+        return getattr(self.translator, name)
+
+    def speculate(self, interim_text: str):
+        """途中経過のテキストを受け取り、安定した文を先行翻訳に回す"""
+        units = split_sentences(interim_text.strip())
+        if not units:
+            return
+
+        complete = is_complete_sentence(interim_text)
+        with self._lock:
+            # _last_tail は ASR のコールバック（speculate）と確定側（translate / clear）の両方が触る
+            if complete:
+                stable, tail = units, ""
+            else:
+                stable, tail = units[:-1], units[-1]
+                # 末尾は前回と同じ（安定した）ときだけ先行翻訳する
+                if tail == self._last_tail:
+                    stable = units
+            self._last_tail = tail
+
+            # 途中経過から消えた文の未実行ジョブは取り消す
+            wanted = {_key(u) for u in units}
+            for key, future in list(self._cache.items()):
+                if key not in wanted and not future.done() and future.cancel():
+                    del self._cache[key]
+                    self.cancelled += 1
+
+            for source in stable:
+                key = _key(source)
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    continue
+                if self._in_flight() >= self.max_pending:
+                    break
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent,
+                                                        thread_name_prefix="speculate")
+                self._cache[key] = self._executor.submit(self.translator.translate, source)
+                self.speculated += 1
+            self._evict()
+
+    def translate(self, text: str) -> str:
+        """
+        確定テキストを翻訳する。先頭から連続して先行翻訳済みの文は再利用し、
+        残りだけを翻訳する
+        """
+        if not text or not text.strip():
+            return ""
+        units = split_sentences(text.strip())
+        with self._lock:
+            self._last_tail = ""
+
+        reused = []
+        for source in units:
+            with self._lock:
+                future = self._cache.get(_key(source))
+            if future is None or future.cancelled():
+                break
+            try:
+                result = future.result(timeout=self.wait_timeout)
+            except FutureTimeoutError:
+                break
+            except Exception:
+                result = ""
+            if not result:
+                break
+            reused.append(result)
+
+        rest = units[len(reused):]
+        if reused:
+            self.reused += len(reused)
+            print(f"[Speculative] 先行翻訳を再利用: {len(reused)}/{len(units)}文")
+        if not rest:
+            return self._join(reused)
+
+        self.retranslated += 1
+        rest_result = self.translator.translate(" ".join(rest))
+        if not rest_result:
+            return self._join(reused) if reused else ""
+        return self._join(reused + [rest_result])
+
+    def translate_stream(self, text: str):
+        """先行翻訳キャッシュを使うため、確定テキスト全体の訳を1回だけ返す"""
+        result = self.translate(text)
+        if result:
+            yield result
+
+    def set_language_pair(self, source: str, target: str) -> bool:
+        """言語ペア変更時は先行翻訳キャッシュを破棄する"""
+        if not self.translator.set_language_pair(source, target):
+            return False
+        self.clear()
+        return True
+
+    def clear(self):
+        """キャッシュと実行待ちジョブを破棄"""
+        with self._lock:
+            for future in self._cache.values():
+                future.cancel()
+            self._cache.clear()
+            self._last_tail = ""
+
+    def stats(self) -> dict:
+        return {
+            "speculated": self.speculated,
+            "cancelled": self.cancelled,
+            "reused": self.reused,
+            "retranslated": self.retranslated,
+        }
+
+    def shutdown(self):
+        """先行翻訳のスレッドを止める（停止時・言語ペアの差し替え時。次の speculate() でまた作る）"""
+        self.clear()
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def close(self):
+        """先行翻訳のスレッドを止め、元の Translator も片付ける（使い終わったとき）"""
+        self.shutdown()
+        self.translator.close()
+
+    def _in_flight(self) -> int:
+        return sum(1 for f in self._cache.values() if not f.done())
+
+    def _evict(self):
+        """完了済みの古いエントリから LRU で削除（ロック取得済み前提）"""
+        while len(self._cache) > self.max_entries:
+            for key, future in self._cache.items():
+                if future.done():
+                    del self._cache[key]
+                    break
+            else:
+                break
+
+    def _join(self, parts: list[str]) -> str:
+        target = getattr(self.translator, "target", "ja")
+        sep = "" if target in _NO_SPACE_LANGUAGES else " "
+        return sep.join(p.strip() for p in parts if p.strip())
@@ -0,0 +1,255 @@
+"""
+段階並行パイプラインモジュール
+処理を段（ASR → 文の結合 → 翻訳 → 読み上げ など）に分け、段ごとのワーカーで並行に動かす
+
+  - 段と段は上限付きのキューでつなぐ（下流が詰まれば上流の put が待つ = 背圧）
+  - 各段は入力に到着順の連番を振り、ワーカーが複数でも出力は入力の順に下流へ渡す
+  - 1つの入力から 0 個以上の出力を出せる（emit）。先頭の入力の出力は出た時点で、
+    後続の入力の出力は先頭の処理が終わるまで待ってから渡す
+  - stop(drain=True) は受け付けを止め、上流の段から順に処理済みを流し切ってから終わる
+
+直列に処理していたときの1件あたりの処理時間は「各段の合計」だが、
+並行にすると定常状態のスループットは「最も遅い段」で決まる。
+"""
+
+import queue
+import threading
+import time
+from collections import defaultdict
+
+_STOP = object()  # ワーカーの終了シグナル
+
+
+class Stage:
+    """パイプラインの1段"""
+
+    def __init__(self, name: str, func, workers: int = 1, maxsize: int = 4):
+        """
+        Args:
+            name: 段の名前（ログ・統計用）
+            func: (item, emit) を受け取る処理。emit(output) で次の段へ渡す（何回呼んでもよい）
+            workers: ワーカースレッド数（状態を持つ段は 1）
+            maxsize: 入力キューの上限（0 なら無制限）
+        """
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.maxsize = maxsize
+        self.on_error = None  # (stage: Stage, item, error: Exception)
+
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._next = None           # 次の段（最後の段なら None）
+        self._output = None         # 最後の段の出力先
+        self._threads = []
+        self._running = False
+        self._put_lock = threading.Lock()
+        self._order_lock = threading.Lock()
+        self._seq_in = 0            # 次に振る連番
+        self._head = 0              # 出力を渡してよい入力の連番
+        self._done = set()          # 処理が終わった連番（先頭より後ろ）
+        self._held = defaultdict(list)  # 連番 → 先頭を待っている出力
+
+        self.processed = 0
+        self.busy_seconds = 0.0
+        self.max_depth = 0
+
+    def put(self, item, timeout: float = None) -> bool:
+        """
+        入力を追加する（キューが一杯なら空くまで待つ）
+
+        Returns:
+            追加できたか（timeout までに空かなかった・停止中なら False）
+        """
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._put_lock:  # 連番の順とキューに入る順を揃える
+            seq = self._seq_in
+            while True:
+                if not self._running:
+                    return False
+                wait = 0.1 if end is None else min(0.1, end - time.monotonic())
+                if wait <= 0:
+                    return False
+                try:
+                    self._queue.put((seq, item), timeout=wait)
+                    break
+                except queue.Full:
+                    continue
+            self._seq_in += 1
+        self.max_depth = max(self.max_depth, self._queue.qsize())
+        return True
+
+    def start(self):
+        self._seq_in = self._head = 0
+        self._done.clear()
+        self._held.clear()
+        self._running = True
+        self._threads = [
+            threading.Thread(target=self._work, daemon=True, name=f"stage-{self.name}-{i}")
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def close(self, timeout: float = None) -> bool:
+        """残りの入力を処理し終えてからワーカーを止める（戻り値: 時間内に止まったか）"""
+        end = None if timeout is None else time.monotonic() + timeout
+        try:
+            for _ in self._threads:
+                self._queue.put((None, _STOP), timeout=None if end is None else max(0.0, end - time.monotonic()))
+        except queue.Full:
+            return False
+        for thread in self._threads:
+            thread.join(None if end is None else max(0.0, end - time.monotonic()))
+        stopped = not any(thread.is_alive() for thread in self._threads)
+        self._running = False
+        return stopped
+
+    def abort(self):
+        """処理待ちの入力を捨てて止める（処理中の1件は最後まで実行される）"""
+        self._running = False
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        for _ in self._threads:
+            try:
+                self._queue.put_nowait((None, _STOP))
+            except queue.Full:
+                break
+
+    def join(self, timeout: float = None):
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def _work(self):
+        while True:
+            seq, item = self._queue.get()
+            if item is _STOP:
+                return
+            t_start = time.monotonic()
+            try:
+                if self._running:
+                    self.func(item, lambda output, seq=seq: self._emit(seq, output))
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(self, item, e)
+                else:
+                    print(f"[Pipeline] {self.name} エラー: {e}")
+            finally:
+                self._finish(seq, time.monotonic() - t_start)
+
+    def _emit(self, seq: int, output):
+        with self._order_lock:
+            if seq == self._head:
+                self._deliver(output)
+            else:
+                self._held[seq].append(output)
+
+    def _finish(self, seq: int, elapsed: float):
+        """処理が終わった。先頭なら、後ろで待っていた出力を順に渡す"""
+        with self._order_lock:
+            self.processed += 1
+            self.busy_seconds += elapsed
+            self._done.add(seq)
+            while self._head in self._done:
+                self._done.discard(self._head)
+                self._head += 1
+                for output in self._held.pop(self._head, []):
+                    self._deliver(output)
+
+    def _deliver(self, output):
+        """ロック取得済み前提（下流が詰まっていればここで待つ）"""
+        if self._next is not None:
+            self._next.put(output)
+        elif self._output is not None:
+            self._output(output)
+
+    def stats(self) -> dict:
+        return {
+            "processed": self.processed,
+            "busy_seconds": self.busy_seconds,
+            "queued": self.depth,
+            "max_queued": self.max_depth,
+            "workers": self.workers,
+        }
+
+
+class StagedPipeline:
+    """Stage をつないだパイプライン（スレッドセーフ）"""
+
+    def __init__(self, stages: list[Stage], on_output=None):
+        """
+        Args:
+            stages: 上流から順に並べた段
+            on_output: (output) 最後の段の出力の受け取り先（None なら捨てる）
+        """
+        if not stages:
+            raise ValueError("stages が空です")
+        self.stages = stages
+        for upstream, downstream in zip(stages, stages[1:]):
+            upstream._next = downstream
+        stages[-1]._output = on_output
+        self._running = False
+
+    def start(self):
+        for stage in reversed(self.stages):
+            stage.start()
+        self._running = True
+
+    def submit(self, item, timeout: float = None) -> bool:
+        """
+        先頭の段に入力する（キューが一杯なら待つ = 背圧）
+
+        Returns:
+            受け付けたか（timeout までに空かなかった・停止後なら False）
+        """
+        if not self._running:
+            return False
+        return self.stages[0].put(item, timeout=timeout)
+
+    def stop(self, drain: bool = True, timeout: float = 10.0) -> bool:
+        """
+        パイプラインを止める
+
+        Args:
+            drain: True なら受け付け済みの入力をすべて処理してから止める。False なら処理待ちを捨てる
+            timeout: 全体で待つ秒数
+
+        Returns:
+            時間内にすべてのワーカーが止まったか
+        """
+        self._running = False
+        end = time.monotonic() + timeout
+        stopped = True
+        if drain:
+            # 上流から順に流し切る（上流が止まれば、その出力はすべて下流のキューに入っている）
+            for stage in self.stages:
+                stopped = stage.close(timeout=max(0.0, end - time.monotonic())) and stopped
+                if not stopped:
+                    break
+        if not drain or not stopped:
+            for stage in self.stages:
+                stage.abort()
+        for stage in self.stages:
+            stage.join(timeout=max(0.0, end - time.monotonic()))
+        return stopped
+
+    @property
+    def is_running(self) -> bool:
+        return self._running
+
+    def stats(self) -> dict:
+        """段ごとの処理件数・処理時間の合計・キューの深さ"""
+        return {stage.name: stage.stats() for stage in self.stages}
+
+    def bottleneck(self) -> str | None:
+        """1件あたりの処理時間（ワーカー数で割った値）が最も長い段"""
+        busy = [(stage.busy_seconds / stage.workers / stage.processed, stage.name)
+                for stage in self.stages if stage.processed]
+        return max(busy)[1] if busy else None
@@ -0,0 +1,122 @@
+"""
+起動処理モジュール
+起動時の確認（VOICEVOX・話者一覧・入出力デバイス・モデルの読み込み等）を並行して実行し、
+終わったものから知らせる。起動からの経過時間（ウィンドウ表示・最初の翻訳まで）も記録する
+
+  probes = StartupProbes()
+  probes.submit("voicevox", check_voicevox, on_done=show_voices)
+  probes.submit("devices", AudioCapture.list_devices, on_done=gui.set_devices)
+  ...
+  probes.result("voicevox", timeout=3.0)   # 必要になったところで結果を待つ
+
+標準ライブラリだけを使う（main から最初に import して、起動時刻を記録する）
+"""
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+_T0 = time.perf_counter()  # このモジュールを読み込んだ時刻（≈ 起動時刻）
+_marks: dict[str, float] = {}
+_marks_lock = threading.Lock()
+
+
+def elapsed() -> float:
+    """起動からの秒数"""
+    return time.perf_counter() - _T0
+
+
+def mark(name: str, label: str = None) -> float:
+    """起動からの経過時間を記録する（同じ名前は最初の1回だけ。label があれば表示）"""
+    with _marks_lock:
+        if name in _marks:
+            return _marks[name]
+        _marks[name] = seconds = elapsed()
+    if label:
+        print(f"[Startup] {label}: {seconds:.2f}s")
+    return seconds
+
+
+def marks() -> dict[str, float]:
+    """記録した経過時間 {名前: 起動からの秒数}"""
+    with _marks_lock:
+        return dict(_marks)
+
+
+class StartupProbes:
+    """起動時の確認を並行して実行する（結果は名前で取り出す。完了時のコールバックは実行したスレッドで呼ぶ）"""
+
+    def __init__(self, max_workers: int = 4):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="startup")
+        self._futures: dict[str, Future] = {}
+        self._timings: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, name: str, fn, *args, on_done=None) -> Future:
+        """
+        確認を開始する
+
+        Args:
+            name: 結果を取り出すときの名前
+            fn: 実行する関数（*args を渡す）
+            on_done: 成功したときに結果を渡して呼ぶ関数（失敗したときはログだけ出す）
+        """
+        def run():
+            t_start = time.perf_counter()
+            try:
+                result = fn(*args)
+            except Exception as e:
+                print(f"[Startup] {name} 失敗: {type(e).__name__}: {e}")
+                raise
+            finally:
+                with self._lock:
+                    self._timings[name] = time.perf_counter() - t_start
+            if on_done:
+                try:
+                    on_done(result)
+                except Exception as e:
+                    print(f"[Startup] {name} の反映に失敗: {type(e).__name__}: {e}")
+            return result
+
+        future = self._executor.submit(run)
+        with self._lock:
+            self._futures[name] = future
+        return future
+
+    def result(self, name: str, timeout: float = None, default=None):
+        """確認の結果（終わるまで待つ。失敗・時間切れ・未登録なら default）"""
+        with self._lock:
+            future = self._futures.get(name)
+        if future is None:
+            return default
+        try:
+            return future.result(timeout=timeout)
+        except Exception:
+            return default
+
+    def wait(self, timeout: float = None) -> bool:
+        """すべての確認が終わるまで待つ。時間内に終わったか"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                futures = list(self._futures.values())
+            for future in futures:
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    future.result(timeout=remaining)
+                except FutureTimeoutError:
+                    return False
+                except Exception:
+                    pass
+            with self._lock:
+                # 待っている間に追加された確認（完了時に次の確認を始める場合）も待つ
+                if len(self._futures) == len(futures):
+                    return True
+
+    def timings(self) -> dict[str, float]:
+        """終わった確認の所要時間 {名前: 秒}"""
+        with self._lock:
+            return dict(self._timings)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+ASR のまとめ処理（AsrBatcher）のテストスクリプト
+処理中に届いた要求を次のまとまりに入れること、言語ごとに分けて認識すること、
+失敗・取り消しを要求ごとに返すことを確認する（認識はダミー）
+"""
+
+import sys
+import threading
+
+from asr_batcher import AsrBatcher
+
+
+class GatedRecognizer:
+    """最初のまとまりを release() まで止めるダミーの認識（呼ばれたまとまりを記録する）"""
+
+    def __init__(self):
+        self.calls = []
+        self.started = threading.Event()
+        self.gate = threading.Event()
+
+    def __call__(self, language, audios):
+        self.calls.append((language, list(audios)))
+        self.started.set()
+        self.gate.wait(5.0)
+        return [f"{language}:{audio}" for audio in audios]
+
+
+def test_batches_while_busy():
+    """処理中に届いた要求は、次の1回にまとめて認識する"""
+    recognizer = GatedRecognizer()
+    batcher = AsrBatcher(recognizer, max_batch=8, max_wait=0.0)
+
+    first = batcher.submit("en", 0)
+    assert recognizer.started.wait(2.0)
+    rest = [batcher.submit("en", i) for i in range(1, 6)]
+    recognizer.gate.set()
+
+    assert first.result(2.0) == "en:0"
+    assert [f.result(2.0) for f in rest] == [f"en:{i}" for i in range(1, 6)]
+    assert [audios for _, audios in recognizer.calls] == [[0], [1, 2, 3, 4, 5]], recognizer.calls
+    stats = batcher.stats()
+    assert (stats["batches"], stats["items"], stats["max_batch"]) == (2, 6, 5), stats
+    batcher.close()
+    print(f"✓ 処理中に届いた要求をまとめる（平均 {stats['mean_batch']:.1f}件）")
+
+
+def test_max_batch_and_languages():
+    """1回のまとまりは max_batch 件まで。言語ごとに分けて認識し、届いた順を保つ"""
+    recognizer = GatedRecognizer()
+    batcher = AsrBatcher(recognizer, max_batch=3, max_wait=0.0)
+
+    batcher.submit("en", "warmup")
+    assert recognizer.started.wait(2.0)
+    futures = [batcher.submit(language, i) for i, language in enumerate(["en", "ja", "en", "en"])]
+    recognizer.gate.set()
+
+    assert [f.result(2.0) for f in futures] == ["en:0", "ja:1", "en:2", "en:3"]
+    assert recognizer.calls[1:] == [("en", [0, 2]), ("ja", [1]), ("en", [3])], recognizer.calls
+    batcher.close()
+    print("✓ max_batch 件まで・言語ごとにまとめる")
+
+
+def test_errors_and_cancel():
+    """認識の失敗はそのまとまりの要求にだけ返し、取り消された要求は認識しない"""
+    recognizer = GatedRecognizer()
+
+    def run_batch(language, audios):
+        if language == "xx":
+            raise RuntimeError("unsupported")
+        return recognizer(language, audios)
+
+    batcher = AsrBatcher(run_batch, max_batch=8, max_wait=0.0)
+    batcher.submit("en", "warmup")
+    assert recognizer.started.wait(2.0)
+    cancelled = batcher.submit("en", "gone")
+    kept = batcher.submit("en", "kept")
+    broken = batcher.submit("xx", "noise")
+    assert cancelled.cancel()
+    recognizer.gate.set()
+
+    assert kept.result(2.0) == "en:kept"
+    try:
+        broken.result(2.0)
+        raise AssertionError("例外が返らない")
+    except RuntimeError:
+        pass
+    assert recognizer.calls[-1] == ("en", ["kept"]), recognizer.calls
+
+    batcher.close()
+    assert isinstance(batcher.submit("en", "late").exception(1.0), RuntimeError)
+    print("✓ 失敗・取り消しを要求ごとに扱う")
+
+
+def test_short_result_fails_remaining_requests():
+    """認識結果が要求より少なければ、結果のない要求には例外を返す（待たせたままにしない）"""
+    recognizer = GatedRecognizer()
+
+    def run_batch(language, audios):
+        return recognizer(language, audios)[:-1]  # 最後の1件の結果が抜ける
+
+    batcher = AsrBatcher(run_batch, max_batch=8, max_wait=0.0)
+    batcher.submit("en", "warmup")
+    assert recognizer.started.wait(2.0)
+    futures = [batcher.submit("en", i) for i in range(3)]
+    recognizer.gate.set()
+
+    assert [f.result(2.0) for f in futures[:2]] == ["en:0", "en:1"]
+    assert isinstance(futures[2].exception(2.0), RuntimeError), futures[2]
+    batcher.close()
+    print("✓ 足りない認識結果は例外で返す")
+
+
+def main():
+    tests = [
+        test_batches_while_busy,
+        test_max_batch_and_languages,
+        test_errors_and_cancel,
+        test_short_result_fails_remaining_requests,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__name__}: {e}")
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
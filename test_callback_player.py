@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+コールバック方式の再生（CallbackPlayer）のテストスクリプト
+音声デバイスを使わない出力（null_output）で、音声の隙間のない連結・一度だけのリサンプル・
+再生開始／終了時刻の記録・ストリーミング再生・停止を確認する
+"""
+
+import sys
+import threading
+import time
+
+import numpy as np
+
+from audio_decode import AudioClip, AudioStream
+from player_callback import CallbackPlayer
+from test_streaming_playback import make_mp3
+
+
+def wait_until(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_clips_play_back_to_back():
+    """連続した音声の間に無音が入らない（出力の非ゼロ区間が1つにつながる）"""
+    player = CallbackPlayer(sample_rate=24000, null_output=True, realtime=False, record=True)
+    levels = [0.25, 0.5, 0.75]
+    for level in levels:
+        player.enqueue_pcm(np.full(2400 + 137, level, dtype=np.float32), 24000)
+    player.start()
+    try:
+        assert wait_until(lambda: len(player.history) == 3)
+    finally:
+        player.stop()
+
+    out = player._output.output()[:, 0]
+    nonzero = np.flatnonzero(out)
+    start, end = nonzero[0], nonzero[-1] + 1
+    assert end - start == len(nonzero) == 3 * (2400 + 137), (end - start, len(nonzero))
+    values = [int(level * 32767) for level in levels]
+    segments = np.split(out[start:end], 3)
+    assert [int(s[0]) for s in segments] == values and all(np.all(s == s[0]) for s in segments)
+    records = list(player.history)
+    assert records[0].end_frame == records[1].start_frame and records[1].end_frame == records[2].start_frame
+    print("✓ 3つの音声を隙間なく連結")
+
+
+def test_resampled_once_to_output_rate():
+    """入力のサンプルレートに関係なく、出力レートに一度だけ変換される"""
+    player = CallbackPlayer(sample_rate=48000, channels=1, null_output=True, realtime=False, record=True)
+    player.enqueue_pcm(np.full(16000, 0.5, dtype=np.float32), 16000)  # 1秒
+    player.start()
+    try:
+        assert wait_until(lambda: len(player.history) == 1)
+    finally:
+        player.stop()
+    record = player.history[0]
+    assert record.end_frame - record.start_frame == 48000
+    print("✓ 16 kHz → 48 kHz（1秒 = 48000 フレーム）")
+
+
+def test_timestamps_and_callbacks():
+    """実時間で再生し、開始／終了時刻と再生状態のコールバックが正しい"""
+    player = CallbackPlayer(sample_rate=24000, null_output=True, blocksize=240)
+    events = []
+    player.on_play_start = lambda: events.append(("start", time.monotonic()))
+    player.on_play_end = lambda: events.append(("end", time.monotonic()))
+    player.start()
+    try:
+        t_enqueue = time.monotonic()
+        player.enqueue(AudioClip.from_samples(np.full(4800, 0.1, dtype=np.float32), 24000, text="一つ目"))
+        player.enqueue(AudioClip.from_samples(np.full(7200, 0.1, dtype=np.float32), 24000, text="二つ目"))
+        assert 0.4 < player.queue_duration <= 0.5 + 1e-6, player.queue_duration
+        assert wait_until(lambda: events and events[-1][0] == "end")
+    finally:
+        player.stop()
+
+    first, second = player.history
+    assert [first.text, second.text] == ["一つ目", "二つ目"]
+    assert abs(first.duration - 0.2) < 0.03, first.duration
+    assert abs(second.duration - 0.3) < 0.03, second.duration
+    assert abs(second.started_at - first.ended_at) < 1e-6
+    assert 0 <= first.started_at - t_enqueue < 0.1
+    # 続けて鳴っている間は開始・終了を1回ずつだけ通知
+    assert [kind for kind, _ in events] == ["start", "end"], events
+    assert player.queue_duration == 0.0
+    print(f"✓ 再生時刻の記録 (待ち {first.queue_wait * 1000:.0f}ms, "
+          f"長さ {first.duration:.3f}s / {second.duration:.3f}s)")
+
+
+def test_stream_starts_before_synthesis_ends():
+    """ストリーミング: 最後のチャンクが届く前に再生が始まる"""
+    data = make_mp3(1.0)
+    player = CallbackPlayer(sample_rate=24000, null_output=True)
+    first_audio = []
+    player.on_first_audio = first_audio.append
+    player.start()
+    try:
+        stream = AudioStream(codec="mp3", text="ストリーム")
+        player.enqueue_stream(stream)
+        chunk = len(data) // 8
+        for i in range(0, len(data), chunk):
+            stream.put(data[i:i + chunk])
+            time.sleep(0.06)
+        t_last_chunk = time.monotonic()
+        stream.close()
+        assert wait_until(lambda: len(player.history) == 1)
+    finally:
+        player.stop()
+    record = player.history[0]
+    assert first_audio and record.started_at < t_last_chunk
+    assert abs(record.duration - 1.0) < 0.15, record.duration
+    print(f"✓ ストリーミング再生 (初回音声 {first_audio[0]:.2f}s)")
+
+
+def test_play_end_waits_for_whole_stream():
+    """ストリームのブロックの間に出力が空になっても、最後のブロックを鳴らし終えるまで再生終了にしない"""
+    data = make_mp3(1.0)
+    player = CallbackPlayer(sample_rate=24000, null_output=True)
+    events = []
+    player.on_play_start = lambda: events.append(("start", time.monotonic()))
+    player.on_play_end = lambda: events.append(("end", time.monotonic()))
+    # 前の文の終了の通知に時間がかかり、判定するころにはストリームの最初のブロックも鳴り終わっている
+    player.on_item_played = lambda record: time.sleep(0.5) if record.text == "前の文" else None
+    player.start()
+    try:
+        player.enqueue(AudioClip.from_samples(np.full(2400, 0.1, dtype=np.float32), 24000, text="前の文"))
+        stream = AudioStream(codec="mp3", text="ストリーム")
+        player.enqueue_stream(stream)
+        chunk = len(data) // 4
+        for i in range(0, len(data), chunk):
+            stream.put(data[i:i + chunk])
+            time.sleep(0.8)  # 届いた分（約 0.25s）を鳴らし終えてから次が届く
+        t_last_chunk = time.monotonic()
+        stream.close()
+        assert wait_until(lambda: len(player.history) == 2)
+        assert wait_until(lambda: events and events[-1][0] == "end")
+    finally:
+        player.stop()
+    assert [kind for kind, _ in events] == ["start", "end"], events
+    assert events[-1][1] >= t_last_chunk
+    print("✓ ストリームの途中で再生終了を通知しない")
+
+
+def test_stop_clears_queue():
+    """停止でキューが空になり、受信待ちのストリームも解除される"""
+    player = CallbackPlayer(sample_rate=24000, null_output=True)
+    player.start()
+    stream = AudioStream(codec="mp3")
+    player.enqueue_stream(stream)
+    player.enqueue_pcm(np.zeros(24000 * 5, dtype=np.float32), 24000)
+    time.sleep(0.1)
+    done = threading.Event()
+    threading.Thread(target=lambda: (player.stop(), done.set()), daemon=True).start()
+    assert done.wait(3.0), "stop() が戻らない"
+    assert stream.cancelled and player.queue_duration == 0.0
+    print("✓ 停止でキューをクリア")
+
+
+def main():
+    tests = [
+        test_clips_play_back_to_back,
+        test_resampled_once_to_output_rate,
+        test_timestamps_and_callbacks,
+        test_stream_starts_before_synthesis_ends,
+        test_play_end_waits_for_whole_stream,
+        test_stop_clears_queue,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__name__}: {e}")
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+期限つきスケジューラー（DeadlineScheduler）のテストスクリプト
+待ち時間と段の見積もりからの処理・結合・字幕のみ・破棄の判断、
+見積もりの減衰による回復、判断の件数を確認する
+"""
+
+import sys
+import time
+
+from deadline_scheduler import DROP, MERGE, PROCESS, TEXT_ONLY, DeadlineScheduler
+from latency_trace import LatencyTracer
+
+MS = 1_000_000  # ns
+
+
+def completed_trace(tracer: LatencyTracer, asr_ms: int, translate_ms: int, tts_ms: int):
+    """ASR・翻訳・TTS の時間を与えた完了済みのトレース"""
+    trace = tracer.start(captured_ns=0, chunk_seconds=3.0)
+    t = 0
+    for name, step in [("dequeued", 0), ("asr_start", 0), ("asr_end", asr_ms), ("translate_start", 0),
+                       ("translate_first", translate_ms), ("speak", 0), ("tts_ready", tts_ms),
+                       ("first_audio", 0)]:
+        t += step
+        trace.mark(name, t * MS)
+    return trace
+
+
+def test_decisions():
+    """間に合うなら処理、音声が間に合わなければ結合 → 字幕のみ、訳文も無理なら破棄"""
+    tracer = LatencyTracer()
+    scheduler = DeadlineScheduler(budget=5.0, max_merge=3)
+    scheduler.observe(completed_trace(tracer, asr_ms=1000, translate_ms=500, tts_ms=1000))
+
+    assert scheduler.decide(age=0.5).action == PROCESS
+    # 音声まで 1.0 + 2.5 + 再生待ち 2.0 = 5.5s > 5s
+    assert scheduler.decide(age=1.0, waiting=2, playback_wait=2.0).action == MERGE
+    assert scheduler.decide(age=1.0, waiting=2, playback_wait=2.0, merged=3).action == TEXT_ONLY
+    assert scheduler.decide(age=1.0, waiting=0, playback_wait=2.0).action == TEXT_ONLY
+    # 訳文まで 4.0 + 1.5 = 5.5s > 5s: 後ろに待っていれば破棄、最後のチャンクなら字幕だけ出す
+    assert scheduler.decide(age=4.0, waiting=1, merged=3).action == DROP
+    assert scheduler.decide(age=4.0, waiting=0).action == TEXT_ONLY
+    # 取り出した時点で予算切れ
+    assert scheduler.decide(age=6.0).action == DROP
+
+    counts = scheduler.stats()
+    assert counts == {PROCESS: 1, MERGE: 1, TEXT_ONLY: 3, DROP: 2}, counts
+    print(f"✓ 処理・結合・字幕のみ・破棄の判断 ({counts})")
+
+
+def test_estimates_recover():
+    """一時的に遅くなった見積もりは、記録がなくても最小値へ戻る"""
+    tracer = LatencyTracer()
+    scheduler = DeadlineScheduler(budget=5.0, alpha=0.5, half_life=0.05)
+    scheduler.observe(completed_trace(tracer, asr_ms=500, translate_ms=200, tts_ms=300))
+    for _ in range(5):
+        scheduler.observe(completed_trace(tracer, asr_ms=6000, translate_ms=200, tts_ms=300))
+
+    slow = scheduler.estimate("asr")
+    assert slow > 4.0, slow
+    assert scheduler.decide(age=0.5, waiting=1, merged=3).action == DROP
+
+    time.sleep(0.5)  # 半減期の 10 倍
+    recovered = scheduler.estimate("asr")
+    assert 0.5 <= recovered < 0.6, recovered
+    assert scheduler.decide(age=0.5, waiting=1).action == PROCESS
+    print(f"✓ 見積もりの回復 (asr {slow:.1f}s → {recovered:.2f}s)")
+
+
+def test_unfinished_trace():
+    """最初の音まで届かなかったトレース（字幕のみ）も、記録のある段だけ見積もりに使う"""
+    tracer = LatencyTracer()
+    scheduler = DeadlineScheduler()
+    trace = tracer.start(captured_ns=0)
+    for name, t in [("dequeued", 0), ("asr_start", 0), ("asr_end", 800), ("translate_start", 800),
+                    ("translate_first", 1100)]:
+        trace.mark(name, t * MS)
+    trace.finish()
+    scheduler.observe(trace)
+
+    assert abs(scheduler.estimate("asr") - 0.8) < 1e-6
+    assert abs(scheduler.estimate("translate") - 0.3) < 1e-6
+    assert scheduler.estimate("tts") == 0.0
+    print("✓ 途中で終わったトレースの段を反映")
+
+
+def main():
+    tests = [
+        test_decisions,
+        test_estimates_recover,
+        test_unfinished_trace,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__name__}: {e}")
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
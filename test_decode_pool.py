@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+先読みデコード（DecodePool / PCMCache）のテストスクリプト
+デコード済み PCM の LRU、内容ハッシュによる再利用、プレーヤーがキュー投入時にデコードを始めることを確認する
+（音声デバイスは使わない）
+"""
+
+import io
+import sys
+import threading
+import time
+import wave
+
+import numpy as np
+
+from audio_decode import AudioClip
+from decode_pool import DecodePool, PCMCache
+from player_callback import CallbackPlayer
+
+
+def make_wav(seconds: float, sample_rate: int = 16000, level: float = 0.25) -> bytes:
+    samples = np.full(int(seconds * sample_rate), int(level * 32767), dtype=np.int16)
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(samples.tobytes())
+    return buf.getvalue()
+
+
+def test_byte_bounded_lru():
+    """合計サイズが上限を超えたら最も使われていないものから削除"""
+    cache = PCMCache(max_bytes=300)
+    for name in ("a", "b", "c"):
+        cache.put(name, np.zeros(50, dtype=np.int16))  # 100 バイト
+    cache.get("a")
+    cache.put("d", np.zeros(50, dtype=np.int16))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("d") is not None
+    assert cache.total_bytes == 300
+    cache.put("huge", np.zeros(1000, dtype=np.int16))
+    assert cache.get("huge") is None and len(cache) == 3
+    print("✓ サイズ上限付き LRU")
+
+
+def test_same_content_decoded_once():
+    """同じ内容・同じ出力形式ならキャッシュから返し、形式が違えば別にデコードする"""
+    cache = PCMCache()
+    pool = DecodePool(sample_rate=24000, channels=2, cache=cache)
+    data = make_wav(0.5)
+    first = pool.submit(AudioClip(data=data, codec="wav")).result()
+    second = pool.submit(AudioClip(data=data, codec="wav", text="別のテキスト")).result()
+    assert second is first and not first.flags.writeable
+    assert len(first) == 12000 * 2
+    assert cache.stats()["hits"] == 1
+
+    mono = DecodePool(sample_rate=24000, channels=1, cache=cache).decode(AudioClip(data=data, codec="wav"))
+    assert len(mono) == 12000 and len(cache) == 2
+    other = pool.decode(AudioClip(data=make_wav(0.5, level=0.5), codec="wav"))
+    assert other is not first and len(cache) == 3
+    pool.shutdown()
+    print("✓ 同じ内容は一度だけデコード")
+
+
+def test_player_decodes_ahead_of_playback():
+    """キューに入れた時点でデコードが始まり、再生スレッドは結果を待つだけ"""
+    player = CallbackPlayer(sample_rate=24000, null_output=True, realtime=False)
+    decoding = threading.Event()
+    release = threading.Event()
+    decode = player._decoder.decode
+
+    def slow_decode(audio):
+        decoding.set()
+        release.wait(2.0)
+        return decode(audio)
+
+    player._decoder.decode = slow_decode
+    player.enqueue(AudioClip(data=make_wav(0.2), codec="wav", text="先読み"))
+    assert decoding.wait(1.0), "start() 前にデコードが始まっていない"
+    player.start()
+    try:
+        release.set()
+        deadline = time.monotonic() + 5.0
+        while not player.history and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert [record.text for record in player.history] == ["先読み"]
+        record = player.history[0]
+        assert record.end_frame - record.start_frame == 4800
+    finally:
+        player.stop()
+    assert player.queue_stats()["pcm_cache"]["entries"] == 1
+    print("✓ キュー投入時に先読みデコード")
+
+
+def main():
+    tests = [
+        test_byte_bounded_lru,
+        test_same_content_decoded_once,
+        test_player_decodes_ahead_of_playback,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__name__}: {e}")
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
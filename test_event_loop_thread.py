@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+常駐イベントループ（EventLoopThread）のテストスクリプト
+1つのループの使い回し、同時実行数の上限、複数スレッドからの投入、
+TTSEngine.synthesize_async の並行合成を確認する（edge-tts には接続しない）
+"""
+
+import asyncio
+import sys
+import threading
+import time
+
+from event_loop_thread import EventLoopThread
+from tts_engine import TTSEngine
+
+
+def test_single_loop_and_bounded_concurrency():
+    """全コルーチンが同じループで動き、同時実行数は max_concurrent まで"""
+    worker = EventLoopThread(name="test", max_concurrent=2)
+    running = 0
+    peak = 0
+    loops = set()
+
+    async def job():
+        nonlocal running, peak
+        loops.add(id(asyncio.get_running_loop()))
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.1)
+        running -= 1
+        return threading.current_thread().name
+
+    try:
+        t_start = time.monotonic()
+        futures = [worker.submit(job()) for _ in range(6)]
+        names = {f.result(timeout=5) for f in futures}
+        elapsed = time.monotonic() - t_start
+        assert len(loops) == 1 and names == {"test-loop"}
+        assert peak == 2, peak
+        assert 0.25 < elapsed < 1.0, elapsed
+    finally:
+        worker.stop()
+    assert not worker.is_running
+    print(f"✓ ループ1つ・同時実行 {peak}件 ({elapsed:.2f}s)")
+
+
+def test_submit_from_many_threads():
+    """起動前のループに複数スレッドから同時に投入しても、全員がループの起動を待って結果を受け取る"""
+    async def square(x):
+        await asyncio.sleep(0.01)
+        return x * x
+
+    for round_ in range(20):
+        worker = EventLoopThread(name=f"test-threads-{round_}", max_concurrent=8)
+        results, errors = {}, []
+        barrier = threading.Barrier(32)
+
+        def caller(i):
+            barrier.wait()  # 全スレッドで一斉に start() を呼ぶ
+            try:
+                results[i] = worker.run(square(i), timeout=5)
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+
+        try:
+            threads = [threading.Thread(target=caller, args=(i,)) for i in range(32)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            assert not errors, errors[:3]
+            assert results == {i: i * i for i in range(32)}
+        finally:
+            worker.stop()
+    print("✓ 起動前のループへ複数スレッドから同時に投入")
+
+
+def test_shared_instance_and_errors():
+    """shared() は名前ごとに同じインスタンス。例外は Future 経由で返る"""
+    a = EventLoopThread.shared("test-shared")
+    b = EventLoopThread.shared("test-shared")
+    assert a is b and a.is_running
+
+    async def boom():
+        raise ValueError("boom")
+
+    try:
+        a.run(boom(), timeout=5)
+        raise AssertionError("例外が伝わらない")
+    except ValueError:
+        pass
+    a.stop()
+    print("✓ 共有インスタンスと例外の伝搬")
+
+
+def test_tts_engine_overlaps_syntheses():
+    """TTSEngine: 複数の文の合成が常駐ループ上で並行して進む"""
+    worker = EventLoopThread(name="test-tts", max_concurrent=4)
+    engine = TTSEngine(language="ja", worker=worker)
+
+    async def fake_synthesize(text):
+        await asyncio.sleep(0.2)
+        return text.encode()
+
+    engine._synthesize_bytes = fake_synthesize
+    try:
+        t_start = time.monotonic()
+        futures = [engine.synthesize_audio_async(f"文{i}。") for i in range(4)]
+        clips = [f.result(timeout=5) for f in futures]
+        elapsed = time.monotonic() - t_start
+        assert [c.data.decode() for c in clips] == [f"文{i}。" for i in range(4)]
+        assert elapsed < 0.6, elapsed
+        assert engine.synthesize("") is None
+    finally:
+        engine.cleanup()
+        worker.stop()
+    print(f"✓ TTSEngine: 4文を並行合成 ({elapsed:.2f}s)")
+
+
+def main():
+    tests = [
+        test_single_loop_and_bounded_concurrency,
+        test_submit_from_many_threads,
+        test_shared_instance_and_errors,
+        test_tts_engine_overlaps_syntheses,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__name__}: {e}")
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
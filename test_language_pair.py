@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+言語ペアの切り替え（PairSwitcher）のテストスクリプト
+準備を待たずに戻ること、最後に頼んだペアだけを渡すこと、
+差し替えた TTS エンジンを合成中の文が終わってから片付けること、
+保持中の断片を送出せずに捨てられることを確認する（部品はダミー）
+"""
+
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+from audio_decode import AudioClip
+from language_pair import LanguagePair, PairSwitcher
+from segment_stitcher import SegmentStitcher
+from tts_pipeline import SentencePipeline
+
+
+class ManualTTS:
+    """合成の完了をテスト側で決めるダミー TTS"""
+
+    def __init__(self):
+        self.futures = []
+        self.cleaned = False
+
+    def synthesize_audio_async(self, text):
+        future = Future()
+        self.futures.append((future, text))
+        return future
+
+    def finish_all(self):
+        for future, text in self.futures:
+            future.set_result(AudioClip(data=text.encode(), codec="wav", text=text))
+
+    def cleanup(self):
+        self.cleaned = True
+
+
+class FakePlayer:
+    def __init__(self):
+        self.items = []
+
+    def enqueue(self, audio, priority="normal", deadline=None, trace=None):
+        self.items.append(audio.text)
+
+    def supports_streaming(self):
+        return False
+
+
+def slow_build(seconds: float, built: list):
+    def build(source, target):
+        time.sleep(seconds)
+        pair = LanguagePair(source, target, tts=ManualTTS())
+        built.append(pair)
+        return pair
+    return build
+
+
+def test_request_does_not_block():
+    """準備は裏で進み、用意ができるまで take() は None（発話の処理は止まらない）"""
+    built = []
+    ready = threading.Event()
+    switcher = PairSwitcher(slow_build(0.3, built), on_ready=ready.set)
+
+    t_start = time.perf_counter()
+    switcher.request("ja", "en")
+    elapsed = time.perf_counter() - t_start
+    assert elapsed < 0.05, elapsed
+    assert switcher.pending
+    assert switcher.take() is None
+
+    assert ready.wait(2.0)
+    pair = switcher.take()
+    assert (pair.source, pair.target, pair.tts_language) == ("ja", "en", "en"), pair
+    assert switcher.take() is None
+    assert not switcher.pending
+    print(f"✓ 準備を待たずに戻る ({elapsed * 1000:.1f}ms)")
+
+
+def test_latest_request_wins():
+    """準備中・差し替え前に次のペアを頼んだら、前のペアは使わずに片付ける"""
+    built, discarded = [], []
+    switcher = PairSwitcher(slow_build(0.1, built), discard=discarded.append)
+
+    switcher.request("en", "ja")
+    switcher.request("ja", "en")   # 1つ目の準備中
+    assert switcher.wait(2.0)
+    time.sleep(0.2)                # 1つ目の準備が終わるまで
+    switcher.request("ko", "ja")   # 2つ目は用意ができて差し替えを待っている
+    assert switcher.wait(2.0)
+
+    pair = switcher.take()
+    assert (pair.source, pair.target) == ("ko", "ja"), pair
+    assert sorted((p.source, p.target) for p in discarded) == [("en", "ja"), ("ja", "en")], discarded
+    print(f"✓ 最後に頼んだペアだけを渡す（{len(discarded)}件を片付け）")
+
+
+def test_failed_build_keeps_current_pair():
+    """準備に失敗したら差し替えない"""
+    def broken(source, target):
+        raise ValueError("unsupported")
+
+    switcher = PairSwitcher(broken)
+    switcher.request("fr", "ko")
+    assert switcher.wait(2.0)
+    assert switcher.take() is None
+    assert not switcher.pending
+    print("✓ 準備に失敗したら差し替えない")
+
+
+def test_retire_waits_for_pending_synthesis():
+    """差し替えた TTS は、合成中の文を再生キューへ入れ終わってから片付ける"""
+    old, new = ManualTTS(), ManualTTS()
+    player = FakePlayer()
+    speech = SentencePipeline(old, player)
+
+    job = speech.speak("これは前のペアの訳文です。")
+    speech.set_engine(new)
+    speech.retire(old)
+    assert not old.cleaned  # 合成中に閉じない
+
+    speech.speak("This is the new pair.", engine=new)
+    assert len(new.futures) == 1 and len(old.futures) == 1
+
+    old.finish_all()
+    assert job.wait(1.0)
+    assert old.cleaned
+    assert player.items == ["これは前のペアの訳文です。"], player.items
+
+    new.finish_all()
+    assert player.items[-1] == "This is the new pair."
+    assert not new.cleaned
+
+    idle = ManualTTS()
+    speech.retire(idle)  # 合成待ちがなければすぐに片付ける
+    assert idle.cleaned
+    print("✓ 合成中の文が終わってから TTS を片付ける")
+
+
+def test_stitcher_discard():
+    """保持中の断片は送出せずに捨てられる（送出数に数えない）"""
+    stitcher = SegmentStitcher(latency_budget=10.0)
+    assert stitcher.feed("and then we went") == []
+    assert stitcher.discard() == "and then we went"
+    assert stitcher.pending_text == ""
+    assert stitcher.flush() == []
+    assert stitcher.stats()["segments_out"] == 0
+    print("✓ 保持中の断片を捨てる")
+
+
+def main():
+    tests = [
+        test_request_does_not_block,
+        test_latest_request_wins,
+        test_failed_build_keeps_current_pair,
+        test_retire_waits_for_pending_synthesis,
+        test_stitcher_discard,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__name__}: {e}")
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+遅延トレース（LatencyTracer）のテストスクリプト
+段ごとの時間とパーセンタイル、JSONL / Chrome トレース形式の書き出し、
+文単位 TTS パイプライン → 再生（CallbackPlayer）までの時刻の記録を確認する
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from audio_decode import AudioClip
+from latency_trace import LatencyTracer, percentile
+from player_callback import CallbackPlayer
+from tts_pipeline import SentencePipeline
+
+MS = 1_000_000  # ns
+
+
+def fake_trace(tracer: LatencyTracer, asr_ms: int, translate_ms: int):
+    """キャプチャ → 最初の音 までの時刻を与えたトレース（時刻は ms 単位の固定値）"""
+    trace = tracer.start(captured_ns=4000 * MS, chunk_seconds=4.0)
+    t = 4000
+    for name, step in [("dequeued", 10), ("asr_start", 0), ("asr_end", asr_ms), ("translate_start", 5),
+                       ("translate_first", translate_ms), ("speak", 0), ("tts_ready", 300), ("first_audio", 100)]:
+        t += step
+        trace.mark(name, t * MS)
+    return trace
+
+
+def test_spans_and_percentiles():
+    """段の時間は時刻の差、パーセンタイルは直近 window 件から"""
+    completed = []
+    tracer = LatencyTracer(window=100)
+    tracer.on_complete = completed.append
+    for i in range(100):
+        fake_trace(tracer, asr_ms=500 + i, translate_ms=200)
+
+    assert len(completed) == 100 and tracer.completed == 100
+    spans = completed[0].spans()
+    assert abs(spans["capture"] - 4.0) < 1e-9 and abs(spans["asr"] - 0.5) < 1e-9, spans
+    assert abs(spans["total"] - (4.0 + 0.010 + 0.5 + 0.005 + 0.2 + 0.3 + 0.1)) < 1e-9, spans["total"]
+    stats = tracer.percentiles()
+    assert list(stats)[0] == "capture" and list(stats)[-1] == "total"
+    assert stats["asr"]["count"] == 100
+    assert abs(stats["asr"]["p50"] - 0.549) < 1e-9 and abs(stats["asr"]["p99"] - 0.598) < 1e-9, stats["asr"]
+    assert percentile([], 50) == 0.0 and percentile([1.0], 99) == 1.0
+    print(f"✓ 段ごとの p50 / p95 / p99\n{tracer.report()}")
+
+
+def test_marks_are_first_only_and_finish_once():
+    """同じ名前の時刻は最初の1回だけ。first_audio で完了し、以降の記録は無視する"""
+    completed = []
+    tracer = LatencyTracer()
+    tracer.on_complete = completed.append
+    trace = tracer.start()
+    trace.mark("speak", 1 * MS)
+    trace.mark("speak", 2 * MS)
+    trace.mark("first_audio", 5 * MS)
+    trace.mark("first_audio", 9 * MS)
+    trace.finish()
+    assert trace.marks == {"speak": 1 * MS, "first_audio": 5 * MS}, trace.marks
+    assert completed == [trace] and "total" not in trace.spans()  # キャプチャ時刻なし
+    print("✓ 最初の時刻だけを記録し、1回だけ完了")
+
+
+def test_abandoned_trace_is_not_counted():
+    """打ち切ったトレースは統計・完了通知に入らず、以降の mark / finish も無視する"""
+    completed = []
+    tracer = LatencyTracer()
+    tracer.on_complete = completed.append
+    trace = tracer.start(captured_ns=10 * MS)
+    trace.mark("asr_start", 20 * MS)
+    trace.abandon()
+    trace.mark("asr_end", 30 * MS)
+    trace.finish()
+    assert completed == [] and tracer.completed == 0 and tracer.percentiles() == {}
+    assert "asr_end" not in trace.marks and trace.finished
+    print("✓ 打ち切ったトレースは統計に入れない")
+
+
+def test_export_jsonl_and_chrome():
+    """完了したトレースを JSONL に追記し、Chrome トレース形式で書き出す"""
+    with tempfile.TemporaryDirectory() as tmp:
+        jsonl = os.path.join(tmp, "trace", "latency.jsonl")
+        tracer = LatencyTracer(jsonl_path=jsonl)
+        for i in range(3):
+            fake_trace(tracer, asr_ms=400, translate_ms=100 * i).text = f"sentence {i}"
+        tracer.close()
+        with open(jsonl, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f]
+        assert [row["id"] for row in rows] == [1, 2, 3]
+        assert rows[2]["spans_ms"]["translate"] == 200.0 and rows[0]["marks_ms"]["capture_start"] == 0.0
+
+        chrome = os.path.join(tmp, "trace.json")
+        assert tracer.export_chrome(chrome) == 3
+        with open(chrome, encoding="utf-8") as f:
+            events = json.load(f)["traceEvents"]
+    spans = [e for e in events if e["ph"] == "X"]
+    assert {e["tid"] for e in spans} == {1, 2, 3}
+    asr = next(e for e in spans if e["name"] == "asr" and e["tid"] == 1)
+    assert asr["ts"] == 4010 * 1000 and asr["dur"] == 400 * 1000, asr  # μs
+    assert not any(e["name"] == "total" for e in spans)
+    print(f"✓ JSONL / Chrome トレース形式 ({len(spans)} 区間)")
+
+
+def test_pipeline_to_playback_marks():
+    """合成の投入 → 音声ができた → 再生開始 が記録され、最初の音が出た時点で完了する"""
+
+    class SlowTTS:
+        def synthesize_audio_async(self, text):
+            future = Future()
+            threading.Timer(0.05, future.set_result,
+                            [AudioClip.from_samples(np.full(2400, 0.1, dtype=np.float32), 24000, text=text)]).start()
+            return future
+
+    completed = threading.Event()
+    tracer = LatencyTracer()
+    tracer.on_complete = lambda trace: completed.set()
+    player = CallbackPlayer(sample_rate=24000, null_output=True)
+    player.start()
+    try:
+        trace = tracer.start(captured_ns=time.perf_counter_ns(), chunk_seconds=1.0)
+        SentencePipeline(SlowTTS(), player).speak("最初の文です。次の文です。", trace=trace)
+        assert completed.wait(5.0)
+    finally:
+        player.stop()
+    spans = trace.spans()
+    assert 0.04 < spans["tts"] < 1.0, spans
+    assert 0.0 <= spans["player_queue"] < 0.5, spans
+    assert 1.0 < spans["total"] < 2.0, spans
+    print(f"✓ TTS → 再生開始を記録 (tts {spans['tts'] * 1000:.0f}ms, "
+          f"再生待ち {spans['player_queue'] * 1000:.0f}ms)")
+
+
+def main():
+    tests = [
+        test_spans_and_percentiles,
+        test_marks_are_first_only_and_finish_once,
+        test_abandoned_trace_is_not_counted,
+        test_export_jsonl_and_chrome,
+        test_pipeline_to_playback_marks,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__name__}: {e}")
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
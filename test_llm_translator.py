@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+LLM 翻訳エンジン（LlmTranslator）のテストスクリプト
+ローカルの OpenAI 互換スタブサーバーを立てて、まとめ翻訳・文脈・ストリーミング・
+フェイルオーバーを確認する（外部 API には接続しない）
+"""
+
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ai_chat import AiChat
+from translator import Translator
+from translator_llm import LlmTranslator
+
+
+class StubLlmServer:
+    """
+    /v1/chat/completions のスタブ
+    最後の user メッセージの番号付きの行を "訳:" 付きで返す。ストリーミング時は
+    1行ごとに line_delay 秒待つ（LLM の生成時間の代わり）。stall_after 行を送った後は stall 秒止まる。
+    truncate を指定するとストリーミングは先頭の truncate 行で終わる（途中で生成をやめたモデルの代わり）
+    """
+
+    def __init__(self, line_delay: float = 0.0, fail: bool = False, stall_after: int = None, stall: float = 0.0,
+                 truncate: int = None):
+        self.line_delay = line_delay
+        self.fail = fail
+        self.stall_after = stall_after
+        self.stall = stall
+        self.truncate = truncate
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def write_chunk(self, data: bytes):
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                stub.requests.append(body)
+                if stub.fail:
+                    self.send_response(500)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                lines = [f"{line.split('. ', 1)[0]}. 訳:{line.split('. ', 1)[1]}"
+                         for line in body["messages"][-1]["content"].splitlines()]
+                if not body.get("stream"):
+                    data = json.dumps({"choices": [{"message": {"content": "\n".join(lines)}}]}, ensure_ascii=False).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                try:
+                    for n, line in enumerate(lines[:stub.truncate]):
+                        time.sleep(stub.line_delay)
+                        if n == stub.stall_after:
+                            time.sleep(stub.stall)
+                        # 1行を2つの断片に分けて送る
+                        for piece in (line[:3], line[3:] + "\n"):
+                            chunk = {"choices": [{"delta": {"content": piece}}]}
+                            # 多くのローカルサーバーと同じく charset なし・UTF-8 そのままで送る
+                            self.write_chunk(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode())
+                    self.write_chunk(b"data: [DONE]\n\n")
+                    self.write_chunk(b"")
+                except OSError:
+                    pass  # 打ち切られたストリーミング
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class FakeGoogle:
+    """フェイルオーバー先のダミーエンジン"""
+
+    def translate(self, text):
+        return f"google:{text}"
+
+
+def _client(server: StubLlmServer) -> AiChat:
+    return AiChat(base_url=server.base_url, api_key="test", model="stub", timeout=5.0)
+
+
+def test_batch_keeps_sentence_alignment():
+    """複数の文を1リクエストで訳し、文ごとの対応を保つ"""
+    server = StubLlmServer()
+    try:
+        llm = LlmTranslator(client=_client(server))
+        result = llm.translate_batch(["Hello there.", "How are you?", "Fine."])
+        assert result == ["訳:Hello there.", "訳:How are you?", "訳:Fine."], result
+        assert len(server.requests) == 1
+    finally:
+        server.close()
+    print("✓ まとめ翻訳（3文 → 1リクエスト）")
+
+
+def test_rolling_context_is_sent():
+    """直近の訳文が次のリクエストの文脈として渡される"""
+    server = StubLlmServer()
+    try:
+        llm = LlmTranslator(client=_client(server), context_size=2)
+        llm.translate("First sentence.")
+        llm.translate("Second sentence. Third sentence.")
+        llm.translate("Fourth.")
+        messages = server.requests[-1]["messages"]
+        assert messages[1] == {"role": "user", "content": "1. Second sentence.\n2. Third sentence."}
+        assert messages[2]["content"] == "1. 訳:Second sentence.\n2. 訳:Third sentence."
+        llm.set_language_pair("ja", "en")
+        llm.translate("Fifth.")
+        assert len(server.requests[-1]["messages"]) == 2
+    finally:
+        server.close()
+    print("✓ 直近の文脈を送信（言語ペア変更で破棄）")
+
+
+def test_stream_yields_first_sentence_early():
+    """ストリーミングでは最初の文が応答全体の完了前に届く"""
+    server = StubLlmServer(line_delay=0.3)
+    try:
+        llm = LlmTranslator(client=_client(server))
+        t_start = time.monotonic()
+        arrivals = []
+        for sentence in llm.translate_stream("One. Two. Three."):
+            arrivals.append((time.monotonic() - t_start, sentence))
+        assert [s for _, s in arrivals] == ["訳:One.", "訳:Two.", "訳:Three."]
+        first, last = arrivals[0][0], arrivals[-1][0]
+        print(f"✓ ストリーミング: 最初の文 {first:.2f}s / 全体 {last:.2f}s")
+        assert first < last - 0.4
+    finally:
+        server.close()
+
+
+def test_truncated_stream_translates_the_rest():
+    """ストリーミングの応答が途中の文で終わったら、残りの文をまとめて訳して全文を返す"""
+    server = StubLlmServer(truncate=2)
+    try:
+        llm = LlmTranslator(client=_client(server))
+        result = list(llm.translate_stream("One. Two. Three. Four. Five."))
+        assert result == ["訳:One.", "訳:Two.", "訳:Three.", "訳:Four.", "訳:Five."], result
+        assert [r.get("stream", False) for r in server.requests] == [True, False]
+        assert server.requests[1]["messages"][-1]["content"] == "1. Three.\n2. Four.\n3. Five."
+        assert list(llm._context) == [(f"{s}.", f"訳:{s}.") for s in ("Two", "Three", "Four", "Five")]
+    finally:
+        server.close()
+    print("✓ 途中で終わったストリーミングの残りをまとめて翻訳")
+
+
+def test_stream_respects_max_batch():
+    """ストリーミングも max_batch 文ごとに1リクエスト"""
+    server = StubLlmServer()
+    try:
+        llm = LlmTranslator(client=_client(server), max_batch=2)
+        result = list(llm.translate_stream("One. Two. Three. Four. Five."))
+        assert result == ["訳:One.", "訳:Two.", "訳:Three.", "訳:Four.", "訳:Five."], result
+        sizes = [len(r["messages"][-1]["content"].splitlines()) for r in server.requests]
+        assert sizes == [2, 2, 1], sizes
+    finally:
+        server.close()
+    print("✓ ストリーミングを max_batch 文ずつに分割（5文 → 3リクエスト）")
+
+
+def test_translator_streams_and_fails_over():
+    """Translator 経由: LLM を最優先にしてストリーミング、落ちていれば Google にフェイルオーバー"""
+    server = StubLlmServer()
+    try:
+        translator = Translator(source="en", target="ja", memory_dir=None, deadline=3.0)
+        translator.set_engine("google", FakeGoogle())
+        translator.set_engine("llm", LlmTranslator(client=_client(server)), primary=True, hedge=False)
+        assert list(translator.translate_stream("Hello. World.")) == ["訳:Hello.", "訳:World."]
+
+        server.fail = True
+        assert list(translator.translate_stream("Good night.")) == ["google:Good night."]
+        assert translator.translate("See you.") == "google:See you."
+        stats = translator.engine_stats()
+        assert stats["llm"]["failures"] >= 2, stats
+    finally:
+        server.close()
+    print("✓ Translator: ストリーミング + Google へのフェイルオーバー")
+
+
+def test_stalled_stream_fails_over():
+    """LLM の最初の文が届かない・途中で止まったら、まだ返していない文を Google で訳す"""
+    server = StubLlmServer(stall_after=0, stall=3.0)
+    try:
+        translator = Translator(source="en", target="ja", memory_dir=None, deadline=1.0)
+        translator.set_engine("google", FakeGoogle())
+        translator.set_engine("llm", LlmTranslator(client=_client(server)), primary=True, hedge=False)
+        t_start = time.monotonic()
+        assert list(translator.translate_stream("Hello. World.")) == ["google:Hello. World."]
+        first = time.monotonic() - t_start
+        assert first < 1.2, first  # 最初の文のデッドライン（1.0s の 6 割）で諦める
+
+        server.stall_after = 1  # 1文目の後で止まる
+        t_start = time.monotonic()
+        parts = list(translator.translate_stream("One. Two. Three."))
+        middle = time.monotonic() - t_start
+        assert parts == ["訳:One.", "google:Two. Three."], parts
+        assert middle < 1.6, middle
+        assert translator.engine_stats()["llm"]["failures"] == 2, translator.engine_stats()
+    finally:
+        server.close()
+    print(f"✓ 止まった LLM のストリーミングを打ち切って Google へ（{first:.2f}s / {middle:.2f}s）")
+
+
+def main():
+    tests = [
+        test_batch_keeps_sentence_alignment,
+        test_rolling_context_is_sent,
+        test_stream_yields_first_sentence_early,
+        test_truncated_stream_translates_the_rest,
+        test_stream_respects_max_batch,
+        test_translator_streams_and_fails_over,
+        test_stalled_stream_fails_over,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__name__}: {e}")
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
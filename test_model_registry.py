@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+モデルレジストリ（ModelRegistry）のテストスクリプト
+同じモデルを1回しか読み込まないこと、参照が0になってから ttl 秒で外すこと、
+同時に使える数を守ること、読み込みの失敗を引きずらないことを確認する（モデルはダミー）
+"""
+
+import sys
+import threading
+import time
+
+from model_registry import ModelKey, ModelRegistry
+
+KEY = ModelKey("whisper", "small", "int8", None)
+
+
+class SlowLoader:
+    """seconds 秒かかって新しいダミーのモデルを返す（呼ばれた回数を数える）"""
+
+    def __init__(self, seconds: float = 0.0):
+        self.seconds = seconds
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(self.seconds)
+        return object()
+
+
+def test_loads_once_for_concurrent_users():
+    """同時に受け取っても読み込みは1回で、全員が同じモデルを使う"""
+    registry = ModelRegistry(ttl=None)
+    load = SlowLoader(0.2)
+    handles = []
+    lock = threading.Lock()
+
+    def user():
+        handle = registry.acquire(KEY, load)
+        with lock:
+            handles.append(handle)
+
+    threads = [threading.Thread(target=user) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5.0)
+
+    assert load.calls == 1 and registry.loads(KEY) == 1, load.calls
+    assert len({id(h.model) for h in handles}) == 1
+    other = registry.acquire(ModelKey("moonshine", None, None, "ja"), load)
+    assert load.calls == 2 and other.model is not handles[0].model
+    assert {s["refs"] for s in registry.stats() if s["key"] == str(KEY)} == {4}
+    print("✓ 同じモデルは1回だけ読み込んで共有する")
+
+
+def test_idle_ttl():
+    """参照が0になって ttl 秒使われなければ外す。その前に使えば読み込み直さない"""
+    registry = ModelRegistry(ttl=0.2)
+    load = SlowLoader()
+
+    first = registry.acquire(KEY, load)
+    shared = first.share()
+    first.release()
+    first.release()  # 2回目は何もしない
+    time.sleep(0.3)
+    assert registry.is_loaded(KEY)  # share() の参照が残っている
+
+    shared.release()
+    time.sleep(0.1)
+    again = registry.acquire(KEY, load)  # ttl 内に再び使う（作り直し・モード切り替え）
+    assert load.calls == 1
+    again.release()
+    time.sleep(0.35)
+    assert not registry.is_loaded(KEY)
+
+    registry.acquire(KEY, load).release()
+    assert load.calls == 2 and registry.loads(KEY) == 2
+    registry.clear()
+    assert not registry.is_loaded(KEY)
+    try:
+        again.model
+        raise AssertionError("解放済みの参照からモデルを取れる")
+    except RuntimeError:
+        pass
+    print("✓ 使われなくなって ttl 秒でモデルを外す")
+
+
+def test_slots_limit_concurrent_use():
+    """同時に使えるのは slots 個まで"""
+    registry = ModelRegistry(ttl=None)
+    handle = registry.acquire(KEY, SlowLoader(), slots=2)
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def work():
+        with handle.use():
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+
+    threads = [threading.Thread(target=work) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5.0)
+    assert peak[0] == 2, peak
+    print("✓ 同時に使う数を slots 個に抑える")
+
+
+def test_failed_load_is_retried():
+    """読み込みに失敗したら例外を返し、次に受け取るときは読み込み直す"""
+    registry = ModelRegistry(ttl=0)
+
+    def broken():
+        raise OSError("model not found")
+
+    try:
+        registry.acquire(KEY, broken)
+        raise AssertionError("例外が返らない")
+    except OSError:
+        pass
+    assert not registry.is_loaded(KEY) and registry.stats() == []
+
+    handle = registry.acquire(KEY, SlowLoader())
+    assert handle.model is not None
+    handle.release()
+    assert not registry.is_loaded(KEY)  # ttl=0 ならすぐに外す
+    print("✓ 読み込みの失敗を引きずらない")
+
+
+def main():
+    tests = [
+        test_loads_once_for_concurrent_users,
+        test_idle_ttl,
+        test_slots_limit_concurrent_use,
+        test_failed_load_is_retried,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__name__}: {e}")
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
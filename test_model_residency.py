@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+モデルの常駐管理（ResidencyMonitor）のテストスクリプト
+音声がしばらくないとモデルを外すこと、RSS が予算を超えたら古いモデルから外すこと、
+音を検出したら裏で読み込み直すこと、使用中のモデルは外さないことを確認する（モデルと RSS はダミー）
+"""
+
+import sys
+import threading
+import time
+
+from model_registry import ModelKey, ModelRegistry
+from model_residency import ResidencyMonitor, current_rss_mb
+
+SMALL = ModelKey("whisper", "small", "int8", None)
+MEDIUM = ModelKey("whisper", "medium", "int8", None)
+MODEL_MB = {SMALL: 500, MEDIUM: 1500}
+
+
+class FakeModels:
+    """読み込んだ回数を数えるダミーのモデルと、読み込み済みのモデルから決まる RSS"""
+
+    def __init__(self, registry: ModelRegistry):
+        self.registry = registry
+        self.loads = {}
+
+    def loader(self, key):
+        def load():
+            self.loads[key] = self.loads.get(key, 0) + 1
+            return object()
+        return load
+
+    def rss(self) -> float:
+        return 200 + sum(MODEL_MB[key] for key in MODEL_MB if self.registry.is_loaded(key))
+
+
+def test_unloads_after_idle_and_reloads_on_use():
+    """音声が idle_seconds 秒なければ外し、参照はそのまま次に使うときに読み込み直す"""
+    registry = ModelRegistry(ttl=None)
+    models = FakeModels(registry)
+    handle = registry.acquire(SMALL, models.loader(SMALL))
+    monitor = ResidencyMonitor(registry, idle_seconds=600, rss=models.rss)
+
+    now = time.monotonic()
+    assert monitor.check(now + 300) == []
+    assert monitor.check(now + 601) == [SMALL]
+    assert not registry.is_loaded(SMALL) and models.rss() == 200
+    assert registry.evicted() == [SMALL]
+
+    with handle.use() as model:
+        assert model is not None
+    assert models.loads[SMALL] == 2 and registry.is_loaded(SMALL)
+    print("✓ 音声がなければ外し、使うときに読み込み直す")
+
+
+def test_sound_keeps_models_and_rewarms():
+    """音を検出している間は外さない。外した後に音を検出したら裏で読み込み直す"""
+    registry = ModelRegistry(ttl=None)
+    models = FakeModels(registry)
+    handle = registry.acquire(SMALL, models.loader(SMALL))
+    monitor = ResidencyMonitor(registry, idle_seconds=600, rss=models.rss)
+
+    now = time.monotonic()
+    monitor._last_sound = now + 500  # 500 秒後に音があった
+    assert monitor.check(now + 601) == []
+    assert monitor.check(now + 1101) == [SMALL]
+
+    t_start = time.perf_counter()
+    monitor.note_sound()
+    elapsed = time.perf_counter() - t_start
+    for _ in range(100):
+        if registry.is_loaded(SMALL):
+            break
+        time.sleep(0.01)
+    assert registry.is_loaded(SMALL) and models.loads[SMALL] == 2
+    assert monitor.stats()["rewarms"] == 1 and monitor.stats()["unloads"] == 1
+    monitor.note_sound()  # 読み込み済みなら何もしない
+    time.sleep(0.05)
+    assert models.loads[SMALL] == 2
+    handle.release()
+    print(f"✓ 音を検出したら裏で読み込み直す（呼び出しは {elapsed * 1000:.1f}ms で戻る）")
+
+
+def test_rss_budget_evicts_oldest_first():
+    """RSS が予算を超えたら、しばらく使っていないモデルから予算内に収まるまで外す"""
+    registry = ModelRegistry(ttl=None)
+    models = FakeModels(registry)
+    small = registry.acquire(SMALL, models.loader(SMALL))
+    medium = registry.acquire(MEDIUM, models.loader(MEDIUM))
+    with small.use():
+        pass
+    time.sleep(0.01)
+    with medium.use():
+        pass
+    monitor = ResidencyMonitor(registry, idle_seconds=None, rss_budget_mb=1800, pressure_grace=30, rss=models.rss)
+
+    now = time.monotonic()
+    assert models.rss() == 2200
+    assert monitor.check(now + 10) == []  # どちらも使ったばかり
+    assert monitor.check(now + 60) == [SMALL]  # 古い方から。1700 MB で予算内
+    assert registry.is_loaded(MEDIUM) and models.rss() == 1700
+
+    monitor.rss_budget_mb = 1000
+    assert monitor.check(now + 60) == [MEDIUM]
+    assert models.rss() == 200
+    print("✓ RSS が予算を超えたら古いモデルから外す")
+
+
+def test_model_in_use_is_not_evicted():
+    """認識中のモデルは外さない"""
+    registry = ModelRegistry(ttl=None)
+    models = FakeModels(registry)
+    handle = registry.acquire(SMALL, models.loader(SMALL))
+    monitor = ResidencyMonitor(registry, idle_seconds=1, rss=models.rss)
+    entered, leave = threading.Event(), threading.Event()
+
+    def recognize():
+        with handle.use():
+            entered.set()
+            leave.wait(2.0)
+
+    worker = threading.Thread(target=recognize)
+    worker.start()
+    assert entered.wait(2.0)
+    assert monitor.check(time.monotonic() + 10) == []
+    assert not registry.evict(SMALL)
+    leave.set()
+    worker.join(2.0)
+    assert monitor.check(time.monotonic() + 10) == [SMALL]
+    print("✓ 使用中のモデルは外さない")
+
+
+def test_current_rss():
+    rss = current_rss_mb()
+    assert rss is None or rss > 1, rss
+    print(f"✓ RSS を測る ({'測れない環境' if rss is None else f'{rss:.0f} MB'})")
+
+
+def main():
+    tests = [
+        test_unloads_after_idle_and_reloads_on_use,
+        test_sound_keeps_models_and_rewarms,
+        test_rss_budget_evicts_oldest_first,
+        test_model_in_use_is_not_evicted,
+        test_current_rss,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__name__}: {e}")
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
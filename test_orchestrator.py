@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+asyncio オーケストレーター（Orchestrator）のテストスクリプト
+種類ごとのセマフォによる同時実行数、発話ごとの取り消し、OrderedGate の順番、
+ループが1つだけであることを確認する（ネットワークには接続しない）
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from concurrent.futures import CancelledError
+
+from event_loop_thread import EventLoopThread
+from orchestrator import Orchestrator, OrderedGate
+
+
+def test_semaphore_limits_concurrency():
+    """同期関数は kind のセマフォの数までしか同時に走らない"""
+    orchestrator = Orchestrator(worker=EventLoopThread(name="test-orch-limit"), limits={"translate": 2})
+    lock = threading.Lock()
+    running, peak = [0], [0]
+
+    def translate(text):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return text.upper()
+
+    futures = [orchestrator.submit(orchestrator.run_blocking("translate", translate, f"s{i}")) for i in range(6)]
+    assert [f.result(timeout=5) for f in futures] == [f"S{i}" for i in range(6)]
+    assert peak[0] == 2, peak
+    orchestrator.shutdown()
+    orchestrator.worker.stop()
+    print("✓ セマフォで同時実行数を制限")
+
+
+def test_iterate_blocking_streams_items():
+    """同期イテレータの要素が届いた順に返る"""
+    orchestrator = Orchestrator(worker=EventLoopThread(name="test-orch-iter"))
+
+    def parts():
+        for i in range(3):
+            time.sleep(0.02)
+            yield f"文{i}"
+
+    async def collect():
+        return [part async for part in orchestrator.iterate_blocking("translate", parts())]
+
+    assert orchestrator.submit(collect()).result(timeout=5) == ["文0", "文1", "文2"]
+    orchestrator.shutdown()
+    orchestrator.worker.stop()
+    print("✓ 同期イテレータを非同期で読む")
+
+
+def test_cancel_scope_cancels_children():
+    """スコープを取り消すと、子タスクを含めてその発話のタスクだけが止まる"""
+    orchestrator = Orchestrator(worker=EventLoopThread(name="test-orch-cancel"))
+    cancelled = []
+
+    async def child(name):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(name)
+            raise
+
+    async def utterance(scope, name):
+        task = scope.create_task(child(f"{name}-child"))
+        await asyncio.sleep(5)
+        await task
+
+    async def quick():
+        await asyncio.sleep(0.1)
+        return "done"
+
+    stale = orchestrator.scope("stale")
+    stale_future = stale.spawn(utterance(stale, "stale"))
+    fresh = orchestrator.scope("fresh")
+    fresh_future = fresh.spawn(quick())
+    time.sleep(0.05)
+    assert orchestrator.active_scopes == 2
+    stale.cancel()
+    try:
+        stale_future.result(timeout=2)
+        assert False, "取り消されていない"
+    except CancelledError:
+        pass
+    assert fresh_future.result(timeout=2) == "done"
+    assert cancelled == ["stale-child"], cancelled
+    assert stale.spawn(quick()).cancelled()  # 取り消し後は実行しない
+    time.sleep(0.05)
+    assert orchestrator.active_scopes == 0
+    orchestrator.shutdown()
+    orchestrator.worker.stop()
+    print("✓ 発話ごとに取り消し")
+
+
+def test_ordered_gate_skips_cancelled():
+    """OrderedGate は連番の順に通し、順番待ちで取り消された番は飛ばす"""
+    orchestrator = Orchestrator(worker=EventLoopThread(name="test-orch-gate"))
+    gate = OrderedGate()
+    order = []
+
+    async def step(seq, delay):
+        await asyncio.sleep(delay)
+        async with gate.turn(seq):
+            order.append(seq)
+
+    scopes = [orchestrator.scope() for _ in range(4)]
+    futures = [scope.spawn(step(seq, delay))
+               for seq, (scope, delay) in enumerate(zip(scopes, [0.15, 0.0, 0.05, 0.0]))]
+    time.sleep(0.08)
+    scopes[1].cancel()  # 1 は順番待ちのまま取り消す
+    for i, future in enumerate(futures):
+        if i != 1:
+            future.result(timeout=2)
+    assert order == [0, 2, 3], order
+    orchestrator.worker.stop()
+    print("✓ 順番どおりに通し、取り消された番は飛ばす")
+
+
+def test_single_shared_loop():
+    """既定ではプロセスで1つのループを edge-tts と共有する"""
+    from tts_engine import TTSEngine
+
+    orchestrator = Orchestrator()
+    tts = TTSEngine(language="ja")
+    assert tts.worker is orchestrator.worker
+    assert orchestrator.submit(asyncio.sleep(0, result=1)).result(timeout=2) == 1
+    assert orchestrator.loop is tts.worker.loop
+    orchestrator.shutdown()
+    print("✓ イベントループは1つ")
+
+
+def main():
+    tests = [
+        test_semaphore_limits_concurrency,
+        test_iterate_blocking_streams_items,
+        test_cancel_scope_cancels_children,
+        test_ordered_gate_skips_cancelled,
+        test_single_shared_loop,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__name__}: {e}")
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
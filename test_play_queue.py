@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+再生キュー（PlayQueue）のテストスクリプト
+優先度（urgent が先）、期限切れの音声の破棄・早回し、秒数での待ち量、
+再生側（CallbackPlayer）・文単位パイプラインでの割り込みを確認する（音声デバイス不要）
+"""
+
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from audio_decode import AudioClip, AudioStream
+from play_queue import NORMAL, URGENT, PlayQueue
+from player_callback import CallbackPlayer
+from tts_pipeline import SentencePipeline
+
+
+def clip(seconds: float, text: str = "") -> AudioClip:
+    return AudioClip.from_samples(np.full(int(24000 * seconds), 0.1, dtype=np.float32), 24000, text=text)
+
+
+def test_urgent_first_and_duration():
+    """urgent は normal より先。待ち量は件数ではなく秒数"""
+    q = PlayQueue()
+    q.put(clip(1.0, "a"))
+    q.put(clip(2.0, "b"))
+    q.put(clip(0.5, "reply"), priority=URGENT)
+    assert len(q) == 3 and abs(q.duration - 3.5) < 1e-6
+    assert [q.get(timeout=0).audio.text for _ in range(3)] == ["reply", "a", "b"]
+    try:
+        q.get(timeout=0.05)
+        raise AssertionError("空のキューから取り出せた")
+    except queue.Empty:
+        pass
+    try:
+        q.put(clip(1.0), priority="high")
+        raise AssertionError("不明な優先度が通った")
+    except ValueError:
+        pass
+    print("✓ urgent が先・待ち量は秒数")
+
+
+def test_expired_items_are_dropped_or_shortened():
+    """少し遅れた音声は速めて再生し、大きく遅れた音声は捨てる"""
+    q = PlayQueue(max_speedup=1.5)
+    dropped = []
+    q.on_drop = dropped.append
+    now = time.monotonic()
+    q.put(clip(2.0, "on time"), deadline=now + 10)
+    q.put(clip(2.0, "slightly late"), deadline=now - 0.5)   # 2.0 / 1.5 = 1.33 倍で取り戻せる
+    q.put(clip(2.0, "stale"), deadline=now - 5.0)           # 取り戻せない
+    stream = AudioStream(codec="mp3", text="stale stream")
+    q.put(stream, deadline=now - 30.0)
+    q.put(clip(1.0, "no deadline"))
+
+    items = [q.get(timeout=0) for _ in range(3)]
+    assert [i.audio.text for i in items] == ["on time", "slightly late", "no deadline"]
+    assert items[0].speed == 1.0
+    assert abs(items[1].speed - 2.0 / 1.5) < 0.01, items[1].speed
+    assert [i.audio.text for i in dropped] == ["stale", "stale stream"]
+    assert stream.cancelled  # 捨てたストリームは合成も止める
+    stats = q.stats()
+    assert stats["dropped"] == 2 and stats["shortened"] == 1 and stats["queued_items"] == 0
+    print("✓ 期限切れ: 早回し 1件 / 破棄 2件")
+
+
+def test_max_age_and_close():
+    """max_age は期限を指定しない項目に使われる。close() で待ちが解除される"""
+    q = PlayQueue(max_age=0.05, max_speedup=1.0)
+    q.put(clip(1.0, "old"))
+    time.sleep(0.1)
+    q.put(clip(1.0, "new"))
+    assert q.get(timeout=0).audio.text == "new" and q.dropped == 1
+
+    result = []
+    waiter = threading.Thread(target=lambda: result.append(q.get()))
+    waiter.start()
+    time.sleep(0.05)
+    q.close()
+    waiter.join(timeout=2.0)
+    assert result == [None]
+    print("✓ max_age と close()")
+
+
+def test_callback_player_urgent_jumps_queue():
+    """CallbackPlayer: 後から入れた urgent が、待っている normal より先に鳴る"""
+    player = CallbackPlayer(sample_rate=24000, null_output=True)
+    player.PREFILL_SECONDS = 0.1
+    player.enqueue(clip(0.3, "n1"))
+    player.enqueue(clip(0.3, "n2"))
+    player.enqueue(clip(0.3, "n3"))
+    player.start()
+    try:
+        time.sleep(0.1)
+        player.enqueue(clip(0.2, "urgent"), priority=URGENT)
+        assert player.queue_stats()["queued_items"] <= 3
+        deadline = time.monotonic() + 5
+        while len(player.history) < 4 and time.monotonic() < deadline:
+            time.sleep(0.02)
+    finally:
+        player.stop()
+    order = [r.text for r in player.history]
+    assert order.index("urgent") < order.index("n3"), order
+    print(f"✓ urgent の割り込み: {order}")
+
+
+def test_pipeline_urgent_lane_does_not_wait():
+    """文単位パイプライン: normal の合成待ちがあっても urgent はすぐ再生キューへ"""
+
+    class SlowTTS:
+        def __init__(self):
+            self.futures = {}
+
+        def synthesize_audio_async(self, text):
+            future = Future()
+            if text.startswith("至急"):
+                future.set_result(clip(0.1, text))
+            else:
+                self.futures[text] = future  # 完了させるまで待たせる
+            return future
+
+    class Recorder:
+        def __init__(self):
+            self.items = []
+
+        def enqueue(self, audio, priority=NORMAL, deadline=None, trace=None):
+            self.items.append((audio.text, priority, deadline))
+
+        def supports_streaming(self):
+            return False
+
+    tts, player = SlowTTS(), Recorder()
+    pipeline = SentencePipeline(tts, player, streaming=False)
+    pipeline.speak("通常の文です。", deadline=123.0)
+    pipeline.speak("至急の返事です。", priority=URGENT)
+    assert player.items == [("至急の返事です。", URGENT, None)]
+    tts.futures["通常の文です。"].set_result(clip(0.1, "通常の文です。"))
+    assert player.items[1] == ("通常の文です。", NORMAL, 123.0)
+    print("✓ パイプラインの urgent レーン")
+
+
+def main():
+    tests = [
+        test_urgent_first_and_duration,
+        test_expired_items_are_dropped_or_shortened,
+        test_max_age_and_close,
+        test_callback_player_urgent_jumps_queue,
+        test_pipeline_urgent_lane_does_not_wait,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__name__}: {e}")
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
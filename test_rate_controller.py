@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+話速制御（RateController）のテストスクリプト
+待ち時間から話速への変換、TTS エンジンへの反映、WSOLA の伸縮、
+1時間分の吹き替えを模擬したときの遅れを確認する（音声出力・edge-tts は使わない）
+"""
+
+import sys
+
+import numpy as np
+
+from audio_decode import AudioClip, time_stretch
+from player import AudioPlayer
+from rate_controller import RateController
+from tts_engine import TTSEngine
+from tts_voicevox import VoicevoxTTS
+
+
+class SimPlayer:
+    """再生キューの残り秒数だけを持つ模擬プレーヤー（時間は advance() で進める）"""
+
+    def __init__(self):
+        self.queued = 0.0
+        self.speed = 1.0
+
+    @property
+    def queue_duration(self) -> float:
+        return self.queued / self.speed
+
+    def set_speed(self, speed: float):
+        self.speed = speed
+
+    def advance(self, seconds: float):
+        self.queued = max(0.0, self.queued - seconds * self.speed)
+
+
+class SimTTS:
+    def __init__(self):
+        self.rate = "+0%"
+
+    def set_rate(self, rate: str):
+        self.rate = rate
+
+    @property
+    def speed(self) -> float:
+        return 1.0 + int(self.rate.rstrip("%")) / 100
+
+
+def simulate_hour(controller, player, tts, interval=4.0, speech_ratio=1.25):
+    """
+    元の音声が interval 秒ごとに1発話、訳文の読み上げが等速で interval * speech_ratio 秒かかる状況を1時間分流す
+
+    Returns:
+        発話ごとの遅れ（秒）
+    """
+    rng = np.random.default_rng(0)
+    drift = []
+    for _ in range(int(3600 / interval)):
+        player.advance(interval)
+        if controller:
+            controller.update(tts)
+        seconds = interval * speech_ratio * rng.uniform(0.8, 1.2)
+        player.queued += seconds / tts.speed  # engine モード: 合成時の話速で短くなる
+        drift.append(player.queue_duration)
+    return np.array(drift)
+
+
+def test_rate_mapping():
+    """target 以下は等速、max_backlog で上限、間は step 刻み"""
+    controller = RateController(SimPlayer(), min_rate=1.0, max_rate=1.5, target_backlog=2.0, max_backlog=8.0)
+    assert controller.rate_for(0.0) == 1.0
+    assert controller.rate_for(2.0) == 1.0
+    assert controller.rate_for(5.0) == 1.25
+    assert controller.rate_for(30.0) == 1.5
+    assert controller.rate_for(3.1) in (1.05, 1.1)
+    try:
+        RateController(SimPlayer(), mode="fast")
+        raise AssertionError("不正なモードが通った")
+    except ValueError:
+        pass
+    print("✓ 待ち時間 → 話速の変換")
+
+
+def test_applies_to_engines():
+    """engine モード: edge-tts は rate 文字列、VOICEVOX は speedScale で反映"""
+    player = SimPlayer()
+    player.queued = 8.0
+    controller = RateController(player, max_rate=1.3)
+
+    edge = TTSEngine(language="ja")
+    assert controller.update(edge) == 1.3
+    assert edge.rate == "+30%", edge.rate
+
+    voicevox = VoicevoxTTS(host="http://127.0.0.1:9")
+    try:
+        controller.update(voicevox)
+        assert voicevox.speed_scale == 1.3
+        player.queued = 0.0
+        controller.update(voicevox)
+        assert voicevox.speed_scale == 1.0
+    finally:
+        voicevox.cleanup()
+        edge.cleanup()
+    print("✓ TTS エンジンへの話速の反映")
+
+
+def test_time_stretch_keeps_pitch():
+    """WSOLA: 長さは 1/factor、音程（周波数）はそのまま"""
+    sr = 24000
+    t = np.arange(sr * 2) / sr
+    tone = (np.sin(2 * np.pi * 300 * t) * 12000).astype(np.int16)
+    pcm = np.repeat(tone, 2)
+    for factor in (1.25, 1.5, 0.8):
+        out = time_stretch(pcm, factor, sr, 2).reshape(-1, 2)[:, 0].astype(np.float64)
+        assert abs(len(out) / sr - 2 / factor) < 0.03, (factor, len(out) / sr)
+        crossings = np.sum((out[:-1] < 0) & (out[1:] >= 0)) / (len(out) / sr)
+        assert abs(crossings - 300) < 6, (factor, crossings)
+    assert time_stretch(pcm, 1.0, sr, 2) is pcm
+    print("✓ WSOLA で音程を保った伸縮")
+
+
+def test_player_queue_duration():
+    """AudioPlayer.queue_duration はキュー内の音声の秒数（再生速度を反映）"""
+    player = AudioPlayer()
+    player.enqueue_pcm(np.zeros(24000 * 2, dtype=np.float32), 24000)
+    player.enqueue(AudioClip(data=b"\0" * 6000, codec="mp3"))
+    assert abs(player.queue_duration - 3.0) < 1e-6, player.queue_duration
+    player.set_speed(1.5)
+    assert abs(player.queue_duration - 2.0) < 1e-6
+    player.stop()
+    assert player.queue_duration == 0.0
+    print("✓ 再生待ちの秒数")
+
+
+def test_hour_of_dubbing_stays_bounded():
+    """1時間: 制御なしでは遅れが増え続け、制御ありでは上限付近で止まる"""
+    player, tts = SimPlayer(), SimTTS()
+    uncontrolled = simulate_hour(None, player, tts)
+
+    player, tts = SimPlayer(), SimTTS()
+    controller = RateController(player, max_rate=1.5, target_backlog=2.0, max_backlog=8.0)
+    controlled = simulate_hour(controller, player, tts)
+
+    player = SimPlayer()
+    stretch = RateController(player, max_rate=1.5, target_backlog=2.0, max_backlog=8.0, mode="stretch")
+    stretched = simulate_hour(stretch, player, SimTTS())
+
+    assert uncontrolled[-1] > 600, uncontrolled[-1]  # 1時間で 10 分以上遅れる
+    assert controlled.max() < 12.0, controlled.max()
+    assert stretched.max() < 12.0, stretched.max()
+    report = controller.report()
+    assert report["updates"] == 900 and 1.1 < report["rate_mean"] < 1.5, report
+    print(f"✓ 1時間の遅れ: 制御なし {uncontrolled[-1]:.0f}s / engine 最大 {controlled.max():.1f}s "
+          f"(p95 {report['drift_p95']:.1f}s, 平均 {report['rate_mean']:.2f}x) / stretch 最大 {stretched.max():.1f}s")
+
+
+def main():
+    tests = [
+        test_rate_mapping,
+        test_applies_to_engines,
+        test_time_stretch_keeps_pitch,
+        test_player_queue_duration,
+        test_hour_of_dubbing_stays_bounded,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__name__}: {e}")
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
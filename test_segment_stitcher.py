@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+セグメント結合（SegmentStitcher）のテストスクリプト
+ログに残っている実際の ASR 断片を使って、翻訳呼び出し回数が減ることを確認する
+"""
+
+import sys
+
+from segment_stitcher import SegmentStitcher, split_sentences
+
+
+# logs/20260228.log の ASR 断片（4秒チャンク、文の途中で切れている）
+LOG_FRAGMENTS = [
+    "You should go for example like",
+    "We're doing industry work.",
+    "So you basically you get a choice different",
+    "See, it's the point now. I wonder how long",
+    "I'm sorry. I'm sorry. I'm",
+    "And now it says meet Max Claw chat, right?",
+    "Let's try and connect these two.",
+    "I'm just doing the background.",
+    "I started using this with Max Core. And then...",
+    "Then once you've done that, you' It was",
+    "Oh, goodness, what? Like, a pairing contest",
+    "Telegram, which is pretty nice. So that was",
+]
+
+
+def test_split_sentences():
+    """英語・日本語の文分割と、小数・略語の扱い"""
+    assert split_sentences("It's a made it super simple. Right? She's on 10 months. No, server. No,") == [
+        "It's a made it super simple.", "Right?", "She's on 10 months.", "No, server.", "No,",
+    ]
+    assert split_sentences("今日は晴れ。明日は雨！まだ") == ["今日は晴れ。", "明日は雨！", "まだ"]
+    assert split_sentences("Mr. Smith paid 3.5 dollars. OK") == ["Mr. Smith paid 3.5 dollars.", "OK"]
+    print("✓ 文分割: 英語 / 日本語 / 小数・略語")
+
+
+def test_holds_trailing_clause():
+    """完結した文だけを送出し、未完の末尾は保持する"""
+    st = SegmentStitcher(latency_budget=5.0)
+    out = st.feed("It's a made it super simple. Right? She's on 10 months. No, server. No,", now=0.0)
+    assert out == ["It's a made it super simple. Right? She's on 10 months. No, server."]
+    assert st.pending_text == "No,"
+    out = st.feed("it doesn't need a server at all.", now=4.0)
+    assert out == ["No, it doesn't need a server at all."]
+    assert st.pending_text == ""
+    print("✓ 未完の末尾を次のチャンクと結合")
+
+
+def test_deadline_and_pause():
+    """遅延予算 or ポーズを超えたら未完でも送出する"""
+    st = SegmentStitcher(latency_budget=3.0, pause_after=10.0)
+    assert st.feed("So you basically you get a choice different", now=0.0) == []
+    assert st.poll(now=2.9) == []
+    assert st.poll(now=3.0) == ["So you basically you get a choice different"]
+
+    st = SegmentStitcher(latency_budget=10.0, pause_after=2.0)
+    st.feed("Telegram, which is pretty nice. So that was", now=0.0)
+    assert st.poll(now=2.0) == ["So that was"]
+
+    st = SegmentStitcher(latency_budget=10.0)
+    st.feed("You should go for example like", now=0.0)
+    assert st.on_pause() == ["You should go for example like"]
+    print("✓ 遅延予算 / ポーズで送出")
+
+
+def test_disabled_passes_through():
+    """latency_budget=0 なら断片をそのまま送出"""
+    st = SegmentStitcher(latency_budget=0)
+    assert st.feed("So that was", now=0.0) == ["So that was"]
+    print("✓ 無効化時はそのまま送出")
+
+
+def test_fewer_calls_on_log_fragments():
+    """実ログの断片で翻訳呼び出し回数が減る（4秒チャンクを想定）"""
+    st = SegmentStitcher(latency_budget=4.5, pause_after=5.0)
+    segments = []
+    for i, fragment in enumerate(LOG_FRAGMENTS):
+        segments += st.feed(fragment, now=i * 4.0)
+    segments += st.flush()
+
+    stats = st.stats()
+    print(f"✓ 断片 {stats['fragments_in']}件 → 翻訳 {stats['segments_out']}件 "
+          f"({stats['calls_saved']:.0%} 削減)")
+    for seg in segments:
+        print(f"    {seg}")
+    assert stats["segments_out"] < stats["fragments_in"]
+    # 内容は失われない
+    assert " ".join(segments).split() == " ".join(LOG_FRAGMENTS).split()
+
+
+def main():
+    tests = [
+        test_split_sentences,
+        test_holds_trailing_clause,
+        test_deadline_and_pause,
+        test_disabled_passes_through,
+        test_fewer_calls_on_log_fragments,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__name__}: {e}")
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+サーバーモード（session_server）のテストスクリプト
+WebSocket で PCM を送ると、認識結果・訳文・音声が順に返ること、
+セッションごとに結果が分かれること、言語ペアの検査を確認する（部品はダミー、ネットワークはローカルのみ）
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+import aiohttp
+import numpy as np
+from aiohttp import WSMsgType, web
+
+from audio_decode import AudioClip
+from session_server import BridgeServer, SharedEngines
+
+
+class DummyTranscriber:
+    SUPPORTED_LANGUAGES = ["en", "ja"]
+
+    def __init__(self, language):
+        self.language = language
+        self.batches = []
+
+    def load_model(self):
+        pass
+
+    def release(self):
+        pass
+
+    def transcribe_batch(self, audios):
+        self.batches.append(len(audios))
+        # 音量から何番目のチャンクかを読み取って文にする
+        return [f"Chunk {round(float(np.abs(audio).mean()) * 100)} is done." for audio in audios]
+
+
+class DummyTranslator:
+    def translate_stream(self, text):
+        yield f"訳:{text}"
+
+    def save_memory(self):
+        pass
+
+
+class DummyTTS:
+    def synthesize_audio_async(self, text):
+        future = Future()
+        future.set_result(AudioClip(data=text.encode(), codec="mp3", text=text))
+        return future
+
+    def cleanup(self):
+        pass
+
+
+class DummyEngines(SharedEngines):
+    def supports(self, source, target):
+        return (source, target) in (("en", "ja"), ("xx", "ja"))
+
+    def _new_transcriber(self, language):
+        return DummyTranscriber(language)
+
+    def _new_translator(self, source, target):
+        return DummyTranslator()
+
+    def _new_tts(self, language):
+        return DummyTTS()
+
+
+def pcm(level: float, seconds: float, sample_rate: int) -> bytes:
+    """値 level の一定の音（認識のダミーが音量から文を作る）"""
+    return (np.full(int(seconds * sample_rate), level) * 32767).astype("<i2").tobytes()
+
+
+async def start_server(chunk_duration=1.0):
+    engines = DummyEngines(batch_wait=0.05)
+    server = BridgeServer(engines, chunk_duration=chunk_duration)
+    runner = web.AppRunner(server.app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return server, engines, runner, f"http://127.0.0.1:{port}"
+
+
+async def stream(http, base, levels, sample_rate=16000):
+    """チャンクごとに levels の音量で送り、end までの受信を返す"""
+    messages = []
+    async with http.ws_connect(f"{base}/ws?source=en&target=ja&sample_rate={sample_rate}") as ws:
+        for level in levels:
+            await ws.send_bytes(pcm(level, 1.0, sample_rate))
+        await ws.send_json({"type": "end"})
+        async for message in ws:
+            if message.type == WSMsgType.BINARY:
+                messages.append(("binary", message.data))
+                continue
+            data = message.json()
+            messages.append((data["type"], data))
+            if data["type"] == "done":
+                break
+    return messages
+
+
+def test_session_roundtrip():
+    """認識結果 → 訳文 → 音声（ヘッダーの直後にバイナリ）の順に返り、無音のチャンクは認識しない"""
+    async def scenario():
+        server, engines, runner, base = await start_server()
+        try:
+            async with aiohttp.ClientSession() as http:
+                # 8 kHz で送っても 16 kHz に変換して認識する
+                return await stream(http, base, [0.11, 0.0, 0.12], sample_rate=8000), server
+        finally:
+            await runner.cleanup()
+            engines.close()
+
+    messages, server = asyncio.run(scenario())
+    kinds = [kind for kind, _ in messages]
+    assert kinds[0] == "ready", kinds
+    sources = [data["text"] for kind, data in messages if kind == "source"]
+    assert sources == ["Chunk 11 is done.", "Chunk 12 is done."], sources
+    translations = [data for kind, data in messages if kind == "translation"]
+    assert [t["text"] for t in translations] == ["訳:Chunk 11 is done.", "訳:Chunk 12 is done."], translations
+    assert [t["audio_end"] for t in translations] == [8000, 24000], translations
+    for i, (kind, data) in enumerate(messages):
+        if kind == "audio":
+            assert messages[i + 1] == ("binary", data["text"].encode()), messages[i + 1]
+            assert data["latency"] >= 0
+    assert kinds[-1] == "done"
+    assert not server.sessions
+    print(f"✓ 認識結果・訳文・音声が順に返る（{len(messages)}件）")
+
+
+def test_sessions_are_isolated_and_batched():
+    """同時に流した2つのセッションの結果は混ざらず、ASR はまとめて処理される"""
+    async def scenario():
+        server, engines, runner, base = await start_server()
+        try:
+            async with aiohttp.ClientSession() as http:
+                results = await asyncio.gather(
+                    stream(http, base, [0.21, 0.22, 0.23]),
+                    stream(http, base, [0.31, 0.32, 0.33]),
+                )
+            return results, engines.asr.stats()
+        finally:
+            await runner.cleanup()
+            engines.close()
+
+    (first, second), stats = asyncio.run(scenario())
+    texts = lambda messages: [d["text"] for kind, d in messages if kind == "translation"]  # noqa: E731
+    assert texts(first) == [f"訳:Chunk {n} is done." for n in (21, 22, 23)], texts(first)
+    assert texts(second) == [f"訳:Chunk {n} is done." for n in (31, 32, 33)], texts(second)
+    assert stats["items"] == 6 and stats["max_batch"] >= 2, stats
+    print(f"✓ セッションごとに結果が分かれ、ASR をまとめる（{stats['batches']}回で {stats['items']}件）")
+
+
+def test_rejects_unsupported_pair():
+    """翻訳・音声認識が対応していない言語ペアは接続前に断る"""
+    async def scenario():
+        server, engines, runner, base = await start_server()
+        try:
+            async with aiohttp.ClientSession() as http:
+                statuses = []
+                for query in ("source=fr&target=ko", "source=xx&target=ja"):
+                    async with http.get(f"{base}/ws?{query}") as resp:
+                        statuses.append(resp.status)
+                async with http.get(f"{base}/stats") as resp:
+                    stats = await resp.json()
+            return statuses, stats
+        finally:
+            await runner.cleanup()
+            engines.close()
+
+    statuses, stats = asyncio.run(scenario())
+    assert statuses == [400, 400], statuses
+    assert stats["sessions"] == 0 and "asr" in stats, stats
+    print("✓ 対応していない言語ペアを断る")
+
+
+def test_model_load_does_not_block_lookups():
+    """ASR モデルの読み込み中も、ほかのセッションの翻訳・TTS の取得は待たされない（同じ言語の読み込みは1回）"""
+    loads = []
+
+    class SlowLoadEngines(DummyEngines):
+        def _new_transcriber(self, language):
+            transcriber = DummyTranscriber(language)
+            transcriber.load_model = lambda: (loads.append(language), time.sleep(0.5))
+            return transcriber
+
+    engines = SlowLoadEngines(batch_wait=0.05)
+    results = []
+    try:
+        threads = [threading.Thread(target=lambda: results.append(engines.transcriber("en"))) for _ in range(2)]
+        for t in threads:
+            t.start()
+        time.sleep(0.05)
+        t_start = time.perf_counter()
+        engines.translator("en", "ja")
+        engines.tts("ja")
+        elapsed = time.perf_counter() - t_start
+        for t in threads:
+            t.join(2.0)
+    finally:
+        engines.close()
+    assert elapsed < 0.1, elapsed
+    assert loads == ["en"] and len(results) == 2 and results[0] is results[1], (loads, results)
+    print(f"✓ モデルの読み込み中も翻訳・TTS をすぐ取得できる（{elapsed * 1000:.1f}ms）")
+
+
+def main():
+    tests = [
+        test_session_roundtrip,
+        test_sessions_are_isolated_and_batched,
+        test_rejects_unsupported_pair,
+        test_model_load_does_not_block_lookups,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__name__}: {e}")
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+先行翻訳（SpeculativeTranslator）のテストスクリプト
+途中経過の先行翻訳を確定時に再利用すること、途中経過から消えた文を取り消すこと、
+同時実行数の上限、translate_stream と元の Translator への委譲を確認する（翻訳はダミー）
+"""
+
+import sys
+import threading
+import time
+
+from speculative_translator import SpeculativeTranslator
+
+
+class FakeTranslator:
+    """<原文> を返すダミー（呼ばれた原文と同時実行数を記録する）"""
+
+    def __init__(self, delay: float = 0.0, gate: threading.Event = None):
+        self.source = "en"
+        self.target = "ja"
+        self.delay = delay
+        self.gate = gate
+        self.calls = []
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def translate(self, text):
+        with self._lock:
+            self.calls.append(text)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            if self.gate is not None:
+                self.gate.wait(5.0)
+            time.sleep(self.delay)
+            return f"<{text}>"
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def engine_stats(self):
+        return {"google": {"calls": len(self.calls)}}
+
+    def set_language_pair(self, source, target):
+        self.source, self.target = source, target
+        return True
+
+
+def wait_idle(speculative: SpeculativeTranslator):
+    for _ in range(200):
+        if speculative._in_flight() == 0:
+            return
+        time.sleep(0.01)
+    raise AssertionError("先行翻訳が終わらない")
+
+
+def test_reuses_speculation_on_final():
+    """先行翻訳済みの文は確定時に再利用し、変化した末尾だけを翻訳する"""
+    fake = FakeTranslator()
+    speculative = SpeculativeTranslator(fake)
+    try:
+        speculative.speculate("We use machine learning. It is")
+        wait_idle(speculative)
+        assert fake.calls == ["We use machine learning."], fake.calls
+
+        result = speculative.translate("We use machine learning. It is fast.")
+        assert result == "<We use machine learning.><It is fast.>", result
+        assert fake.calls == ["We use machine learning.", "It is fast."], fake.calls
+        stats = speculative.stats()
+        assert stats["reused"] == 1 and stats["retranslated"] == 1, stats
+    finally:
+        speculative.shutdown()
+    print("✓ 先行翻訳を確定時に再利用する")
+
+
+def test_question_is_not_reused_for_statement():
+    """句点の有無だけが違う文は再利用し、疑問符・感嘆符が付いた文は翻訳し直す"""
+    fake = FakeTranslator()
+    speculative = SpeculativeTranslator(fake)
+    try:
+        speculative.speculate("It is fast.")
+        wait_idle(speculative)
+        assert speculative.translate("It is fast") == "<It is fast.>"
+        assert speculative.translate("It is fast?") == "<It is fast?>"
+        assert speculative.translate("It is fast！") == "<It is fast！>"
+        assert fake.calls == ["It is fast.", "It is fast?", "It is fast！"], fake.calls
+    finally:
+        speculative.shutdown()
+    print("✓ 疑問文・感嘆文には平叙文の先行翻訳を使わない")
+
+
+def test_stable_tail_is_speculated():
+    """未完の末尾は同じ途中経過が2回続いたときだけ先行翻訳し、確定すると数え直す"""
+    fake = FakeTranslator()
+    speculative = SpeculativeTranslator(fake)
+    try:
+        speculative.speculate("Good morning. See you")
+        wait_idle(speculative)
+        assert fake.calls == ["Good morning."], fake.calls
+        speculative.speculate("Good morning. See you")
+        wait_idle(speculative)
+        assert fake.calls == ["Good morning.", "See you"], fake.calls
+
+        speculative.translate("Good morning. See you.")
+        speculative.speculate("Next one")  # 確定後は前回の末尾を引き継がない
+        wait_idle(speculative)
+        assert "Next one" not in fake.calls, fake.calls
+    finally:
+        speculative.shutdown()
+    print("✓ 安定した末尾だけを先行翻訳する")
+
+
+def test_stale_speculation_is_discarded():
+    """途中経過から消えた文の未実行ジョブは取り消し、確定テキストには新しい訳を使う"""
+    gate = threading.Event()
+    fake = FakeTranslator(gate=gate)
+    speculative = SpeculativeTranslator(fake, max_concurrent=1, max_pending=4)
+    try:
+        speculative.speculate("I think it is good.")   # 実行中（gate で止まる）
+        speculative.speculate("I think it is food.")   # 実行待ち
+        speculative.speculate("I think it is fun.")    # 前の実行待ちは取り消す
+        assert speculative.stats()["cancelled"] == 1, speculative.stats()
+        gate.set()
+        wait_idle(speculative)
+        assert "I think it is food." not in fake.calls, fake.calls
+
+        result = speculative.translate("I think it is fun.")
+        assert result == "<I think it is fun.>", result
+        result = speculative.translate("I think it is great.")  # 先行翻訳と違う確定 → 翻訳し直す
+        assert result == "<I think it is great.>", result
+        assert fake.calls.count("I think it is great.") == 1, fake.calls
+        assert speculative.stats()["reused"] == 1, speculative.stats()
+    finally:
+        gate.set()
+        speculative.shutdown()
+    print("✓ 途中経過から消えた先行翻訳を取り消して翻訳し直す")
+
+
+def test_concurrency_and_pending_limits():
+    """同時実行数は max_concurrent、投入するジョブは max_pending まで"""
+    fake = FakeTranslator(delay=0.05)
+    speculative = SpeculativeTranslator(fake, max_concurrent=2, max_pending=3)
+    text = " ".join(f"Sentence number {i} is here." for i in range(6))
+    try:
+        speculative.speculate(text)
+        assert speculative.stats()["speculated"] == 3, speculative.stats()
+        wait_idle(speculative)
+        speculative.speculate(text)  # 空いた分だけ続きを投入する
+        wait_idle(speculative)
+        assert speculative.stats()["speculated"] == 6, speculative.stats()
+        assert fake.peak == 2, fake.peak
+    finally:
+        speculative.shutdown()
+    print(f"✓ 同時実行 {fake.peak}件・投入 3件までに抑える")
+
+
+def test_translate_stream_and_delegation():
+    """translate_stream は訳全体を1回だけ返し、それ以外の属性は元の Translator に委譲する"""
+    fake = FakeTranslator()
+    speculative = SpeculativeTranslator(fake)
+    try:
+        assert list(speculative.translate_stream("Hello there.")) == ["<Hello there.>"]
+        assert list(speculative.translate_stream("   ")) == []
+        assert speculative.source == "en" and speculative.engine_stats() == {"google": {"calls": 1}}
+        try:
+            speculative.no_such_attribute
+            raise AssertionError("存在しない属性が取れる")
+        except AttributeError:
+            pass
+
+        speculative.speculate("Good morning.")
+        wait_idle(speculative)
+        assert speculative.set_language_pair("en", "ko") and fake.target == "ko"
+        assert speculative.translate("Good morning.") == "<Good morning.>"
+        assert fake.calls.count("Good morning.") == 2, fake.calls  # 言語ペアを変えたらキャッシュを捨てる
+
+        speculative.shutdown()
+        speculative.speculate("After shutdown.")  # 停止後もまた使える
+        wait_idle(speculative)
+        assert "After shutdown." in fake.calls, fake.calls
+    finally:
+        speculative.shutdown()
+    print("✓ translate_stream と Translator への委譲")
+
+
+def main():
+    tests = [
+        test_reuses_speculation_on_final,
+        test_question_is_not_reused_for_statement,
+        test_stable_tail_is_speculated,
+        test_stale_speculation_is_discarded,
+        test_concurrency_and_pending_limits,
+        test_translate_stream_and_delegation,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__name__}: {e}")
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
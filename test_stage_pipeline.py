@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+段階並行パイプライン（StagedPipeline）のテストスクリプト
+段の重ね合わせによるスループット、複数ワーカーでの出力順、背圧、停止時の流し切りを確認する
+"""
+
+import random
+import sys
+import threading
+import time
+
+from stage_pipeline import Stage, StagedPipeline
+
+
+def sleeper(seconds: float):
+    def func(item, emit):
+        time.sleep(seconds)
+        emit(item)
+    return func
+
+
+def test_throughput_is_slowest_stage():
+    """3段 × 0.05秒: 直列なら 10件で 1.5秒、並行なら約 0.05 × (10 + 2) 秒"""
+    outputs = []
+    pipeline = StagedPipeline(
+        [Stage("a", sleeper(0.05)), Stage("b", sleeper(0.05)), Stage("c", sleeper(0.05))],
+        on_output=outputs.append,
+    )
+    pipeline.start()
+    t_start = time.monotonic()
+    for i in range(10):
+        assert pipeline.submit(i)
+    assert pipeline.stop(drain=True)
+    elapsed = time.monotonic() - t_start
+    assert outputs == list(range(10)), outputs
+    assert elapsed < 1.0, elapsed
+    print(f"✓ 3段を重ねて処理 ({elapsed:.2f}s / 直列 1.50s)")
+
+
+def test_parallel_workers_keep_order():
+    """ワーカーが複数で処理時間がばらばらでも、出力（複数出力を含む）は入力順"""
+    rng = random.Random(0)
+    delays = [rng.uniform(0.0, 0.03) for _ in range(30)]
+
+    def translate(item, emit):
+        time.sleep(delays[item])
+        emit((item, 0))
+        time.sleep(delays[item] / 2)
+        emit((item, 1))
+
+    outputs = []
+    pipeline = StagedPipeline([Stage("translate", translate, workers=4, maxsize=8)], on_output=outputs.append)
+    pipeline.start()
+    for i in range(30):
+        pipeline.submit(i)
+    assert pipeline.stop(drain=True)
+    assert outputs == [(i, part) for i in range(30) for part in (0, 1)], outputs
+    print("✓ 複数ワーカーでも入力順に出力")
+
+
+def test_backpressure_blocks_submit():
+    """下流が詰まると上流のキューも埋まり、submit が待つ"""
+    release = threading.Event()
+
+    def blocked(item, emit):
+        release.wait(5.0)
+        emit(item)
+
+    outputs = []
+    pipeline = StagedPipeline([Stage("fast", sleeper(0.0), maxsize=1), Stage("slow", blocked, maxsize=1)],
+                              on_output=outputs.append)
+    pipeline.start()
+    accepted = sum(pipeline.submit(i, timeout=0.2) for i in range(10))
+    # slow の処理中 1 + slow のキュー 1 + fast の受け渡し待ち 1 + fast のキュー 1
+    assert accepted == 4, accepted
+    release.set()
+    assert pipeline.stop(drain=True)
+    assert outputs == list(range(4)), outputs
+    print("✓ 背圧で受け付けを止める")
+
+
+def test_stop_without_drain_discards_pending():
+    """drain=False は処理待ちを捨てて速やかに止まる。エラーはパイプラインを止めない"""
+    errors = []
+
+    def flaky(item, emit):
+        if item == 1:
+            raise RuntimeError("boom")
+        time.sleep(0.05)
+        emit(item)
+
+    outputs = []
+    stage = Stage("flaky", flaky, maxsize=0)
+    stage.on_error = lambda stage, item, error: errors.append(item)
+    pipeline = StagedPipeline([stage], on_output=outputs.append)
+    pipeline.start()
+    for i in range(50):
+        pipeline.submit(i)
+    time.sleep(0.12)
+    t_stop = time.monotonic()
+    assert pipeline.stop(drain=False, timeout=2.0)
+    assert time.monotonic() - t_stop < 0.5
+    assert errors == [1] and 0 in outputs and len(outputs) < 10, outputs
+    assert not pipeline.submit(99)
+    print(f"✓ drain なしで停止 ({len(outputs)}件処理)")
+
+
+def main():
+    tests = [
+        test_throughput_is_slowest_stage,
+        test_parallel_workers_keep_order,
+        test_backpressure_blocks_submit,
+        test_stop_without_drain_discards_pending,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__name__}: {e}")
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
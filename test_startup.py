@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+起動処理（StartupProbes）のテストスクリプト
+起動時の確認が並行して進むこと、完了時のコールバック、失敗時の既定値、
+完了時に追加した確認の待ち合わせ、起動からの経過時間の記録、
+再生まわりのモジュールが PyAV を起動時に読み込まないことを確認する
+"""
+
+import subprocess
+import sys
+import time
+
+import startup
+from startup import StartupProbes
+
+
+def test_probes_run_concurrently():
+    """3つの確認（各 0.2 秒）は並行して 0.2 秒ほどで終わり、終わったものから知らせる"""
+    probes = StartupProbes()
+    done = []
+    t_start = time.perf_counter()
+    for name in ("voicevox", "devices", "bridge"):
+        probes.submit(name, lambda n=name: (time.sleep(0.2), n)[1], on_done=done.append)
+    assert probes.wait(timeout=2.0)
+    elapsed = time.perf_counter() - t_start
+    probes.shutdown()
+
+    assert elapsed < 0.35, elapsed
+    assert sorted(done) == ["bridge", "devices", "voicevox"], done
+    assert probes.result("devices") == "devices"
+    assert set(probes.timings()) == {"voicevox", "devices", "bridge"}
+    print(f"✓ 並行して確認 (3件 × 0.2s → {elapsed:.2f}s)")
+
+
+def test_failure_and_timeout_return_default():
+    """失敗・時間切れ・未登録の確認は既定値を返し、コールバックは呼ばない"""
+    probes = StartupProbes()
+    called = []
+
+    def broken():
+        raise ConnectionError("refused")
+
+    probes.submit("voicevox", broken, on_done=called.append)
+    probes.submit("slow", time.sleep, 0.5)
+    assert probes.result("voicevox", default="none") == "none"
+    assert probes.result("slow", timeout=0, default="pending") == "pending"
+    assert probes.result("missing", default=0) == 0
+    assert not called
+    probes.wait(timeout=2.0)
+    probes.shutdown()
+    print("✓ 失敗・時間切れは既定値")
+
+
+def test_wait_includes_chained_probes():
+    """確認の完了時に始めた確認（パイプライン → モデルの先読み）も wait で待つ"""
+    probes = StartupProbes()
+    loaded = []
+
+    def on_bridge(_):
+        probes.submit("model", lambda: (time.sleep(0.2), loaded.append(True)))
+
+    probes.submit("bridge", time.sleep, 0.1, on_done=on_bridge)
+    assert probes.wait(timeout=2.0)
+    probes.shutdown()
+    assert loaded == [True], loaded
+    print("✓ 後から始めた確認も待つ")
+
+
+def test_marks_are_first_only():
+    """経過時間は名前ごとに最初の1回だけ記録する"""
+    first = startup.mark("test_window")
+    time.sleep(0.01)
+    assert startup.mark("test_window") == first
+    assert startup.marks()["test_window"] == first
+    assert 0.0 < first <= startup.elapsed()
+    print(f"✓ 経過時間の記録 ({first:.2f}s)")
+
+
+def test_playback_modules_defer_pyav():
+    """再生キュー・デコードのモジュールを読み込んでも PyAV は読み込まず、デコードするときに読み込む"""
+    code = (
+        "import sys, play_queue, decode_pool, audio_decode\n"
+        "print('av' in sys.modules, audio_decode.is_available())\n"
+        "if audio_decode.is_available():\n"
+        "    audio_decode.StreamDecoder()\n"
+        "    print('av' in sys.modules)\n"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, timeout=30).stdout.split()
+    assert out[0] == "False", out
+    if out[1] == "True":
+        assert out[2] == "True", out
+    print(f"✓ PyAV はデコードするときに読み込む（PyAV {'あり' if out[1] == 'True' else 'なし'}）")
+
+
+def main():
+    tests = [
+        test_probes_run_concurrently,
+        test_failure_and_timeout_return_default,
+        test_wait_includes_chained_probes,
+        test_marks_are_first_only,
+        test_playback_modules_defer_pyav,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__name__}: {e}")
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
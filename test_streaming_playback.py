@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+ストリーミング TTS 再生・メモリ上の音声再生のテストスクリプト
+mp3 を少しずつ届けて、デコードの正しさと「合成完了前に再生が始まる」ことを確認する。
+AudioClip（mp3 / wav / float32 配列）がファイルを経由せずに再生されることも確認する
+（SDL のダミー音声ドライバを使うので音声デバイス不要）
+"""
+
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+import wave
+
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import av
+import numpy as np
+
+from audio_decode import AudioClip, AudioStream, StreamDecoder, decode_bytes, decode_clip
+from player import AudioPlayer
+
+
+def make_mp3(seconds: float, sample_rate: int = 24000) -> bytes:
+    """テスト用の mp3（440Hz のサイン波、ヘッダなしの生フレーム）"""
+    encoder = av.CodecContext.create("libmp3lame", "w")
+    encoder.sample_rate = sample_rate
+    encoder.layout = "mono"
+    encoder.format = "s16p"
+    n = int(seconds * sample_rate)
+    samples = (0.3 * np.sin(2 * np.pi * 440 * np.arange(n) / sample_rate) * 32767).astype(np.int16)
+    data = b""
+    for i in range(0, n, 1152):
+        frame = av.AudioFrame.from_ndarray(samples[None, i:i + 1152], format="s16p", layout="mono")
+        frame.sample_rate = sample_rate
+        data += b"".join(bytes(p) for p in encoder.encode(frame))
+    data += b"".join(bytes(p) for p in encoder.encode(None))
+    return data
+
+
+def test_chunked_decode_matches_whole():
+    """小さなチャンクに分けてデコードしても一括デコードと同じ PCM になる"""
+    data = make_mp3(1.0)
+    whole = decode_bytes(data, sample_rate=24000, channels=2)
+    decoder = StreamDecoder(sample_rate=24000, channels=2)
+    parts = [decoder.feed(data[i:i + 333]) for i in range(0, len(data), 333)]
+    chunked = np.concatenate(parts + [decoder.flush()])
+    assert np.array_equal(whole, chunked)
+    assert abs(len(whole) / 2 / 24000 - 1.0) < 0.1, len(whole)
+    print(f"✓ 分割デコード = 一括デコード ({len(whole) // 2} サンプル)")
+
+
+def test_id3_tag_is_skipped():
+    """先頭の ID3v2 タグは読み飛ばす"""
+    data = make_mp3(0.5)
+    tag = b"ID3\x04\x00\x00\x00\x00\x00\x0a" + b"\x00" * 10
+    tagged = decode_bytes(tag + data, sample_rate=24000, channels=1)
+    plain = decode_bytes(data, sample_rate=24000, channels=1)
+    assert np.array_equal(tagged, plain)
+    print("✓ ID3 タグを読み飛ばす")
+
+
+def test_playback_starts_before_stream_ends():
+    """ストリームの最後のチャンクが届く前に再生が始まり、最後まで再生される"""
+    data = make_mp3(1.5)
+    player = AudioPlayer()
+    first_audio = []
+    ended = threading.Event()
+    player.on_first_audio = first_audio.append
+    player.on_play_end = ended.set
+    player.start()
+    try:
+        stream = AudioStream(codec="mp3")
+        player.enqueue_stream(stream)
+        chunk = len(data) // 10
+        for i in range(0, len(data), chunk):
+            stream.put(data[i:i + chunk])
+            time.sleep(0.08)
+        t_done = time.monotonic() - stream.created_at
+        stream.close()
+        assert first_audio, "再生が始まっていない"
+        print(f"✓ 初回音声 {first_audio[0]:.2f}s / 合成完了 {t_done:.2f}s")
+        assert first_audio[0] < t_done - 0.3
+        assert ended.wait(timeout=5.0), "再生が終わらない"
+        assert stream.wait_first_chunk(0) is not None
+    finally:
+        player.stop()
+
+
+def test_stop_unblocks_stalled_stream():
+    """合成が止まったストリームの再生中でも stop() で終了できる"""
+    player = AudioPlayer()
+    player.start()
+    stream = AudioStream(codec="mp3")
+    stream.put(make_mp3(0.3))
+    player.enqueue_stream(stream)
+    time.sleep(0.3)
+    t_start = time.monotonic()
+    player.stop()
+    assert time.monotonic() - t_start < 2.0
+    assert stream.cancelled
+    print("✓ 停止時に受信待ちを解除")
+
+
+def make_wav(seconds: float, sample_rate: int = 24000) -> bytes:
+    """テスト用の wav（VOICEVOX と同じ 16bit モノラル）"""
+    n = int(seconds * sample_rate)
+    samples = (0.3 * np.sin(2 * np.pi * 440 * np.arange(n) / sample_rate) * 32767).astype(np.int16)
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(samples.tobytes())
+    return buf.getvalue()
+
+
+def test_decode_clip_formats():
+    """mp3 / wav / float32 配列のどれも再生形式（int16 ステレオ）に変換できる"""
+    for clip, seconds in [
+        (AudioClip(data=make_mp3(0.5), codec="mp3"), 0.5),
+        (AudioClip(data=make_wav(0.5, sample_rate=24000), codec="wav"), 0.5),
+        (AudioClip.from_samples(np.zeros(16000, dtype=np.float32), 16000), 1.0),
+    ]:
+        pcm = decode_clip(clip, sample_rate=44100, channels=2)
+        assert pcm.dtype == np.int16
+        assert abs(len(pcm) / 2 / 44100 - seconds) < 0.1, (clip.codec, len(pcm))
+    print("✓ mp3 / wav / float32 配列をデコード")
+
+
+def test_clip_playback_touches_no_files():
+    """AudioClip の再生では一時ファイルを作らない"""
+    player = AudioPlayer()
+    ended = threading.Event()
+    played = []
+    player.on_play_start = lambda: played.append(time.monotonic())
+    player.on_play_end = ended.set
+    before = set(os.listdir(tempfile.gettempdir()))
+    player.start()
+    try:
+        player.enqueue(AudioClip(data=make_wav(0.3), codec="wav"))
+        assert ended.wait(timeout=5.0)
+        ended.clear()
+        player.enqueue_pcm(np.zeros(2400, dtype=np.float32), 24000)
+        assert ended.wait(timeout=5.0)
+    finally:
+        player.stop()
+    assert len(played) == 2
+    assert set(os.listdir(tempfile.gettempdir())) == before
+    print("✓ メモリ上の音声をファイルなしで再生")
+
+
+def main():
+    tests = [
+        test_chunked_decode_matches_whole,
+        test_id3_tag_is_skipped,
+        test_playback_starts_before_stream_ends,
+        test_stop_unblocks_stalled_stream,
+        test_decode_clip_formats,
+        test_clip_playback_touches_no_files,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__name__}: {e}")
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
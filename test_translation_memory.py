@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+翻訳メモリ（TranslationMemory）のテストスクリプト
+数字・固有名詞だけが違う原文のローカル解決、容量上限、保存・復元、検索速度を確認する
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+from translation_memory import TranslationMemory
+from translation_logger import TranslationLogger
+
+
+def test_exact_and_number_substitution():
+    """完全一致と、数字だけが違う原文の置換"""
+    tm = TranslationMemory()
+    tm.add("It's like over 10,000 AI agents already built.",
+           "すでに 10,000 を超える AI エージェントが構築されているようです。")
+    assert tm.lookup("It's like over 10,000 AI agents already built.") is not None
+    assert tm.lookup("It's like over 20,000 AI agents already built.") == \
+        "すでに 20,000 を超える AI エージェントが構築されているようです。"
+    print("✓ 数字だけ違う文をローカルで解決")
+
+
+def test_chained_and_overlapping_numbers():
+    """置換は元の訳文に1回だけ行い、長い数字の一部には当てない"""
+    tm = TranslationMemory()
+    tm.add("Move 10 boxes to room 20 today.", "今日 10 個の箱を 20 号室に移動します。")
+    assert tm.lookup("Move 20 boxes to room 30 today.") == "今日 20 個の箱を 30 号室に移動します。"
+
+    tm = TranslationMemory()
+    tm.add("Take 1 of the 10 boxes today.", "今日 10 個の箱から 1 個取ってください。")
+    assert tm.lookup("Take 2 of the 10 boxes today.") == "今日 10 個の箱から 2 個取ってください。"
+
+    tm = TranslationMemory()
+    tm.add("Take 1 of the 10 boxes today.", "今日 10 個の箱から一つ取ってください。")
+    assert tm.lookup("Take 2 of the 10 boxes today.") is None  # "1" は訳文に単独で現れない
+    print("✓ 連鎖する数字・長い数字の一部は置換しない")
+
+
+def test_name_substitution():
+    """訳文に原文表記のまま残る固有名詞は置換できる"""
+    tm = TranslationMemory()
+    tm.add("Why would anyone still use OpenCore?", "なぜまだ OpenCore を使用する人がいるのでしょう?")
+    assert tm.lookup("Why would anyone still use OpenClaw?") == "なぜまだ OpenClaw を使用する人がいるのでしょう?"
+    print("✓ 固有名詞だけ違う文をローカルで解決")
+
+
+def test_rejects_real_differences():
+    """意味が変わる差分（訳文に現れない単語）はエンジンに回す"""
+    tm = TranslationMemory()
+    tm.add("I started using this with Max Core.", "私はMax Coreでこれを使い始めました。")
+    assert tm.lookup("I stopped using this with Max Core.") is None
+    assert tm.lookup("Completely unrelated sentence about the weather.") is None
+    print("✓ 意味の違う文はヒットしない")
+
+
+def test_bounded_and_persistent():
+    """上限を超えたら LRU で削除し、保存・復元できる"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "tm_en_ja.jsonl")
+        tm = TranslationMemory(max_entries=100, path=path)
+        for i in range(150):
+            tm.add(f"sentence number {i} is here", f"文 {i}")
+        assert len(tm) == 100
+        # 最も古いエントリは完全一致では残っていない
+        assert tm.search("sentence number 0 is here")[0][0] < 1.0
+        tm.save()
+
+        restored = TranslationMemory(path=path)
+        assert len(restored) == 100
+        assert restored.lookup("sentence number 149 is here") == "文 149"
+    print("✓ 容量上限と保存・復元")
+
+
+def test_builds_from_logger():
+    """TranslationLogger のログから構築できる"""
+    tm = TranslationMemory()
+    count = tm.load_pairs(TranslationLogger.read_entries("logs", "en", "ja"))
+    assert count > 0 and len(tm) > 0
+    print(f"✓ 翻訳ログから {len(tm)}件を構築")
+
+
+def test_lookup_is_sub_millisecond():
+    """2万件のメモリでも1回の検索が 1ms 未満"""
+    rng = random.Random(0)
+    words = [f"w{i}" for i in range(3000)] + ["the", "a", "is", "to", "and", "of", "we", "it"]
+    tm = TranslationMemory(max_entries=20000)
+    for i in range(20000):
+        sentence = " ".join(rng.choice(words) for _ in range(rng.randint(6, 14)))
+        tm.add(f"{sentence} {i}", f"訳 {i}")
+
+    queries = []
+    for i in range(500):
+        sentence = " ".join(rng.choice(words) for _ in range(rng.randint(6, 14)))
+        queries.append(sentence)
+
+    t_start = time.perf_counter()
+    for q in queries:
+        tm.lookup(q)
+    per_lookup = (time.perf_counter() - t_start) / len(queries)
+    print(f"✓ 検索速度: {per_lookup * 1000:.3f} ms/回 (20000件)")
+    assert per_lookup < 0.001
+
+
+def main():
+    tests = [
+        test_exact_and_number_substitution,
+        test_chained_and_overlapping_numbers,
+        test_name_substitution,
+        test_rejects_real_differences,
+        test_bounded_and_persistent,
+        test_builds_from_logger,
+        test_lookup_is_sub_millisecond,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__name__}: {e}")
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+翻訳レジリエンス（デッドライン・ヘッジ・サーキットブレーカー）のテストスクリプト
+ローカルの偽翻訳サーバーを立てて、遅延・エラーを再現する（ネットワーク不要）
+"""
+
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import requests
+
+from translation_resilience import CircuitBreaker, ResilientCaller, TranslationUnavailable
+
+
+class FakeTranslateServer:
+    """
+    偽の翻訳サーバー
+
+    GET /translate?q=... に対して "<prefix>:<q>" を返す。
+    delay_fn(n) で n 件目のリクエストの遅延秒数、fail_fn(n) で 500 を返すかを決める。
+    """
+
+    def __init__(self, prefix: str = "ja", delay_fn=None, fail_fn=None):
+        self.prefix = prefix
+        self.delay_fn = delay_fn or (lambda n: 0.0)
+        self.fail_fn = fail_fn or (lambda n: False)
+        self.requests = 0
+        self._lock = threading.Lock()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                    n = server.requests
+                time.sleep(server.delay_fn(n))
+                if server.fail_fn(n):
+                    self.send_response(500)
+                    self.end_headers()
+                    return
+                q = parse_qs(urlparse(self.path).query).get("q", [""])[0]
+                body = f"{server.prefix}:{q}".encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._httpd.server_address[1]}/translate"
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class FakeServerEngine:
+    """偽サーバーを叩く翻訳エンジン（GoogleTranslator 互換の translate を持つ）"""
+
+    def __init__(self, server: FakeTranslateServer):
+        self.server = server
+        self._session = requests.Session()
+
+    def translate(self, text: str) -> str:
+        resp = self._session.get(self.server.url, params={"q": text}, timeout=10)
+        resp.raise_for_status()
+        return resp.text
+
+
+def test_healthy_primary():
+    """正常時はプライマリの結果を返す"""
+    primary = FakeTranslateServer(prefix="google")
+    secondary = FakeTranslateServer(prefix="mymemory")
+    try:
+        caller = ResilientCaller(deadline=2.0)
+        caller.set_engine("google", FakeServerEngine(primary))
+        caller.set_engine("mymemory", FakeServerEngine(secondary))
+        for i in range(5):
+            assert caller.call(f"hello {i}") == f"google:hello {i}"
+        assert secondary.requests == 0
+        print("✓ 正常時: プライマリのみ使用")
+    finally:
+        primary.close()
+        secondary.close()
+
+
+def test_hedge_cuts_tail_latency():
+    """5件に1件だけ 2秒かかるサーバーでも、ヘッジで全件が短時間で返る"""
+    primary = FakeTranslateServer(delay_fn=lambda n: 2.0 if n % 5 == 0 else 0.02)
+    try:
+        caller = ResilientCaller(deadline=3.0, hedge_delay=0.2, min_hedge_delay=0.1)
+        caller.set_engine("google", FakeServerEngine(primary))
+        latencies = []
+        for i in range(20):
+            t_start = time.monotonic()
+            assert caller.call(f"text {i}") == f"ja:text {i}"
+            latencies.append(time.monotonic() - t_start)
+        worst = max(latencies)
+        stats = caller.stats()["google"]
+        print(f"✓ ヘッジ: 最大遅延 {worst:.2f}s, ヘッジ送信 {stats['hedges']}件")
+        assert worst < 1.0
+        assert stats["hedges"] >= 1
+    finally:
+        primary.close()
+
+
+def test_breaker_fails_over_to_secondary():
+    """プライマリが 500 を返し続けるとブレーカーが開き、セカンダリに切り替わる"""
+    primary = FakeTranslateServer(prefix="google", fail_fn=lambda n: True)
+    secondary = FakeTranslateServer(prefix="mymemory")
+    try:
+        caller = ResilientCaller(
+            deadline=2.0, max_attempts=1,
+            breaker_options={"min_samples": 3, "cooldown": 60.0},
+        )
+        caller.set_engine("google", FakeServerEngine(primary))
+        caller.set_engine("mymemory", FakeServerEngine(secondary))
+        for i in range(6):
+            assert caller.call(f"t{i}") == f"mymemory:t{i}"
+        assert caller.stats()["google"]["state"] == CircuitBreaker.OPEN
+        # 遮断後はプライマリにリクエストが飛ばない
+        before = primary.requests
+        caller.call("after")
+        assert primary.requests == before
+        print(f"✓ ブレーカー: {before}件の失敗で遮断 → セカンダリへフェイルオーバー")
+    finally:
+        primary.close()
+        secondary.close()
+
+
+def test_breaker_trips_on_latency():
+    """エラーがなくても p95 レイテンシが閾値を超えれば遮断する"""
+    primary = FakeTranslateServer(prefix="google", delay_fn=lambda n: 0.3)
+    secondary = FakeTranslateServer(prefix="mymemory")
+    try:
+        caller = ResilientCaller(
+            deadline=3.0, hedge_delay=2.0, max_attempts=1,
+            breaker_options={"min_samples": 3, "latency_threshold": 0.2, "cooldown": 60.0},
+        )
+        caller.set_engine("google", FakeServerEngine(primary))
+        caller.set_engine("mymemory", FakeServerEngine(secondary))
+        results = [caller.call(f"t{i}") for i in range(5)]
+        assert results[0].startswith("google:")
+        assert results[-1].startswith("mymemory:")
+        print("✓ ブレーカー: レイテンシ超過で遮断")
+    finally:
+        primary.close()
+        secondary.close()
+
+
+def test_latency_threshold_follows_deadline():
+    """レイテンシで遮断する閾値はデッドライン（のうち最初のエンジンの持ち時間）より短い"""
+    caller = ResilientCaller(deadline=2.5)
+    caller.set_engine("google", object())
+    threshold = caller._state("google").breaker.latency_threshold
+    assert threshold < 2.5 * caller.primary_share, threshold
+    custom = ResilientCaller(deadline=2.5, breaker_options={"latency_threshold": 0.2})
+    custom.set_engine("google", object())
+    assert custom._state("google").breaker.latency_threshold == 0.2
+
+    # デッドライン内に返るが遅いエンジンは、閾値を指定しなくても遮断される
+    primary = FakeTranslateServer(prefix="google", delay_fn=lambda n: 0.8)
+    secondary = FakeTranslateServer(prefix="mymemory")
+    try:
+        caller = ResilientCaller(deadline=1.5, hedge_delay=2.0, max_attempts=1,
+                                 breaker_options={"min_samples": 3, "cooldown": 60.0})
+        caller.set_engine("google", FakeServerEngine(primary))
+        caller.set_engine("mymemory", FakeServerEngine(secondary))
+        results = [caller.call(f"t{i}") for i in range(5)]
+        assert results[0].startswith("google:") and results[-1].startswith("mymemory:"), results
+        print(f"✓ ブレーカー: 閾値 {threshold:.1f}s（デッドライン 2.5s）でレイテンシ超過を遮断")
+    finally:
+        primary.close()
+        secondary.close()
+        caller.shutdown()
+
+
+def test_hung_primary_does_not_starve_fallback():
+    """応答のないプライマリの呼び出しが残っていても、セカンダリは自分のスレッドですぐ呼べる"""
+    primary = FakeTranslateServer(prefix="google", delay_fn=lambda n: 2.0)
+    secondary = FakeTranslateServer(prefix="mymemory")
+    try:
+        caller = ResilientCaller(deadline=0.5, max_attempts=1, max_workers=2,
+                                 breaker_options={"min_samples": 100})  # 遮断させずに毎回プライマリを試す
+        caller.set_engine("google", FakeServerEngine(primary))
+        caller.set_engine("mymemory", FakeServerEngine(secondary))
+        worst = 0.0
+        for i in range(6):
+            t_start = time.monotonic()
+            assert caller.call(f"t{i}") == f"mymemory:t{i}"
+            worst = max(worst, time.monotonic() - t_start)
+        assert worst < 0.8, worst
+        print(f"✓ 応答のないプライマリがあってもフェイルオーバーできる（最大 {worst:.2f}s）")
+    finally:
+        caller.shutdown()
+        primary.close()
+        secondary.close()
+
+
+def test_shutdown_waits_for_in_flight_call():
+    """片付けても翻訳中の呼び出しは最後まで返り、その後にスレッドを止める（以降の呼び出しは断る）"""
+    primary = FakeTranslateServer(prefix="google", delay_fn=lambda n: 0.3)
+    try:
+        caller = ResilientCaller(deadline=2.0, hedge_delay=2.0)
+        caller.set_engine("google", FakeServerEngine(primary))
+        results = []
+        worker = threading.Thread(target=lambda: results.append(caller.call("in flight")))
+        worker.start()
+        time.sleep(0.1)
+        caller.shutdown()
+        worker.join(3.0)
+        assert results == ["google:in flight"], results
+        executor = caller._state("google").executor
+        assert executor._shutdown
+        try:
+            caller.call("after")
+            raise AssertionError("片付けた後も呼び出せる")
+        except TranslationUnavailable:
+            pass
+        print("✓ 片付けは翻訳中の呼び出しが終わってからスレッドを止める")
+    finally:
+        primary.close()
+
+
+def test_deadline_bounds_total_time():
+    """全エンジンが遅い場合はデッドラインで打ち切って TranslationUnavailable"""
+    primary = FakeTranslateServer(delay_fn=lambda n: 3.0)
+    secondary = FakeTranslateServer(delay_fn=lambda n: 3.0)
+    try:
+        caller = ResilientCaller(deadline=0.5, hedge_delay=0.1)
+        caller.set_engine("google", FakeServerEngine(primary))
+        caller.set_engine("mymemory", FakeServerEngine(secondary))
+        t_start = time.monotonic()
+        try:
+            caller.call("slow")
+            assert False, "例外が発生しませんでした"
+        except TranslationUnavailable:
+            pass
+        elapsed = time.monotonic() - t_start
+        print(f"✓ デッドライン: {elapsed:.2f}s で打ち切り")
+        assert elapsed < 0.8
+    finally:
+        primary.close()
+        secondary.close()
+
+
+def test_translator_returns_empty_on_failure():
+    """Translator は翻訳失敗時にエラー文言ではなく空文字を返す（読み上げ防止）"""
+    from translator import Translator
+
+    primary = FakeTranslateServer(fail_fn=lambda n: True)
+    try:
+        tr = Translator(source="en", target="ja", deadline=0.5, fallback=None)
+        tr.set_engine("google", FakeServerEngine(primary))
+        assert tr.translate("Hello") == ""
+        print("✓ Translator: 翻訳失敗時は空文字")
+    finally:
+        primary.close()
+
+
+def main():
+    tests = [
+        test_healthy_primary,
+        test_hedge_cuts_tail_latency,
+        test_breaker_fails_over_to_secondary,
+        test_breaker_trips_on_latency,
+        test_latency_threshold_follows_deadline,
+        test_hung_primary_does_not_starve_fallback,
+        test_shutdown_waits_for_in_flight_call,
+        test_deadline_bounds_total_time,
+        test_translator_returns_empty_on_failure,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__name__}: {e}")
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+TTS キャッシュ（TTSCache）のテストスクリプト
+サイズ上限付き LRU、ディスク保存、TTSEngine / VoicevoxTTS での再合成の省略を確認する
+（edge-tts・VOICEVOX には接続しない）
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from tts_cache import TTSCache
+from tts_engine import TTSEngine
+from tts_voicevox import VoicevoxTTS
+
+
+def test_key_depends_on_all_parameters():
+    """エンジン・話者・速度・音量・テキストのどれが違っても別キー"""
+    base = TTSCache.make_key("edge", "ja-JP-NanamiNeural", "+0%", "+0%", "こんにちは")
+    assert base == TTSCache.make_key("edge", "ja-JP-NanamiNeural", "+0%", "+0%", " こんにちは ")
+    variants = [
+        TTSCache.make_key("voicevox", "ja-JP-NanamiNeural", "+0%", "+0%", "こんにちは"),
+        TTSCache.make_key("edge", "ja-JP-KeitaNeural", "+0%", "+0%", "こんにちは"),
+        TTSCache.make_key("edge", "ja-JP-NanamiNeural", "+10%", "+0%", "こんにちは"),
+        TTSCache.make_key("edge", "ja-JP-NanamiNeural", "+0%", "-10%", "こんにちは"),
+        TTSCache.make_key("edge", "ja-JP-NanamiNeural", "+0%", "+0%", "こんばんは"),
+    ]
+    assert base not in variants and len(set(variants)) == len(variants)
+    print("✓ キーは全パラメータに依存")
+
+
+def test_byte_bounded_lru():
+    """合計サイズが上限を超えたら最も使われていないものから削除"""
+    cache = TTSCache(max_bytes=300)
+    for name in ("a", "b", "c"):
+        cache.put(name, b"x" * 100, "mp3")
+    cache.get("a")                      # a を最近使ったことにする
+    cache.put("d", b"x" * 100, "mp3")   # b が追い出される
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("d") is not None
+    assert cache.total_bytes == 300
+    cache.put("huge", b"x" * 1000, "mp3")  # 上限より大きいものは保持しない
+    assert cache.get("huge") is None and len(cache) == 3
+    print("✓ サイズ上限付き LRU")
+
+
+def test_disk_persistence():
+    """ディスクに保存して次回起動時に読み込む（追い出したファイルは削除）"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = TTSCache(max_bytes=250, cache_dir=tmp)
+        keys = [TTSCache.make_key("edge", "v", "+0%", "+0%", f"text {i}") for i in range(3)]
+        for key in keys:
+            cache.put(key, b"y" * 100, "mp3")
+        assert len(os.listdir(tmp)) == 2
+
+        restored = TTSCache(max_bytes=250, cache_dir=tmp)
+        assert restored.get(keys[0]) is None
+        assert restored.get(keys[2]) == (b"y" * 100, "mp3")
+    print("✓ ディスク保存と復元")
+
+
+def test_disk_lru_order_and_codec_change():
+    """ヒットしたファイルは次回起動時も新しい扱い。同じキーを別の形式で保存し直すと古いファイルは消す"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = TTSCache(max_bytes=250, cache_dir=tmp)
+        keys = [TTSCache.make_key("edge", "v", "+0%", "+0%", f"text {i}") for i in range(2)]
+        for i, key in enumerate(keys):
+            cache.put(key, b"y" * 100, "mp3")
+            os.utime(os.path.join(tmp, f"{key}.mp3"), (1000 + i, 1000 + i))
+        assert cache.get(keys[0]) is not None  # 先に書いた方を最近使った
+
+        restored = TTSCache(max_bytes=150, cache_dir=tmp)
+        assert restored.get(keys[1]) is None and restored.get(keys[0]) is not None
+        assert sorted(os.listdir(tmp)) == [f"{keys[0]}.mp3"]
+
+        restored.put(keys[0], b"z" * 50, "wav")
+        assert sorted(os.listdir(tmp)) == [f"{keys[0]}.wav"]
+        assert restored.total_bytes == 50
+
+        # 以前の版が残した同じキーの別形式のファイルは、読み込み時に古い方を消す
+        with open(os.path.join(tmp, f"{keys[0]}.mp3"), "wb") as f:
+            f.write(b"y" * 100)
+        os.utime(os.path.join(tmp, f"{keys[0]}.mp3"), (1000, 1000))
+        again = TTSCache(max_bytes=250, cache_dir=tmp)
+        assert again.get(keys[0]) == (b"z" * 50, "wav") and again.total_bytes == 50
+        assert sorted(os.listdir(tmp)) == [f"{keys[0]}.wav"]
+    print("✓ ディスクの LRU 順と形式の変更")
+
+
+def test_edge_engine_skips_resynthesis():
+    """TTSEngine: 同じテキストは edge-tts を呼ばない（ファイル API は毎回別ファイル）"""
+    engine = TTSEngine(language="ja")
+    calls = []
+
+    async def fake_synthesize(text):
+        calls.append(text)
+        return b"ID3-fake-mp3"
+
+    engine._synthesize_bytes = fake_synthesize
+    try:
+        first = engine.synthesize("ありがとうございます。")
+        second = engine.synthesize("ありがとうございます。")
+        assert calls == ["ありがとうございます。"]
+        assert first != second and open(second, "rb").read() == b"ID3-fake-mp3"
+        assert engine.synthesize_audio("ありがとうございます。").data == b"ID3-fake-mp3"
+        engine.set_rate("+20%")
+        engine.synthesize_audio("ありがとうございます。")
+        assert len(calls) == 2
+    finally:
+        engine.cleanup()
+    print("✓ TTSEngine: 同じ文は再合成しない")
+
+
+def test_voicevox_skips_resynthesis():
+    """VoicevoxTTS: 同じ話者・同じテキストは VOICEVOX を呼ばない"""
+    requests_seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            requests_seen.append(self.path.split("?")[0])
+            length = int(self.headers.get("Content-Length") or 0)
+            self.rfile.read(length)
+            body = json.dumps({"speedScale": 1.0}).encode() if self.path.startswith("/audio_query") \
+                else b"RIFF-fake-wav"
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    tts = VoicevoxTTS(speaker_id=3, host=f"http://127.0.0.1:{server.server_address[1]}")
+    try:
+        tts.synthesize_audio("こんにちは")
+        path = tts.synthesize("こんにちは")
+        assert requests_seen == ["/audio_query", "/synthesis"]
+        assert open(path, "rb").read() == b"RIFF-fake-wav"
+        tts.set_speaker(1)
+        tts.synthesize_audio("こんにちは")
+        assert len(requests_seen) == 4
+    finally:
+        tts.cleanup()
+        server.shutdown()
+        server.server_close()
+    print("✓ VoicevoxTTS: 同じ文は再合成しない")
+
+
+def main():
+    tests = [
+        test_key_depends_on_all_parameters,
+        test_byte_bounded_lru,
+        test_disk_persistence,
+        test_disk_lru_order_and_codec_change,
+        test_edge_engine_skips_resynthesis,
+        test_voicevox_skips_resynthesis,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__name__}: {e}")
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
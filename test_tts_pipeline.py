@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+文単位 TTS パイプライン（SentencePipeline）のテストスクリプト
+文の分割、最初の音声までの時間が応答の長さに依存しないこと、
+複数回の speak() をまたいだ再生順を確認する（TTS・再生はダミー）
+"""
+
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from audio_decode import AudioClip, AudioStream
+from tts_pipeline import SentencePipeline, split_for_tts
+
+
+class FakeTTS:
+    """文字数に比例して時間がかかるダミー TTS（synthesize_audio_async を持つ）"""
+
+    def __init__(self, seconds_per_char: float = 0.01, jitter: float = 0.0, workers: int = 3):
+        self.seconds_per_char = seconds_per_char
+        self.jitter = jitter
+        self.texts = []
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._rng = random.Random(0)
+
+    def synthesize_audio_async(self, text):
+        self.texts.append(text)
+        delay = len(text) * self.seconds_per_char + self._rng.random() * self.jitter
+
+        def run():
+            time.sleep(delay)
+            return AudioClip(data=text.encode(), codec="wav", text=text)
+
+        return self._executor.submit(run)
+
+
+class FakeStreamingTTS:
+    """synthesize_stream を持つダミー TTS"""
+
+    def synthesize_stream(self, text):
+        stream = AudioStream(codec="mp3", text=text)
+
+        def run():
+            time.sleep(0.05)
+            stream.put(text.encode())
+            stream.close()
+
+        threading.Thread(target=run, daemon=True).start()
+        return stream
+
+
+class FakePlayer:
+    """再生キューに入った順番を記録するダミー"""
+
+    def __init__(self, streaming: bool = False):
+        self.items = []
+        self.streaming = streaming
+        self._lock = threading.Lock()
+
+    def enqueue(self, audio, priority="normal", deadline=None, trace=None):
+        with self._lock:
+            self.items.append(audio.text)
+
+    def enqueue_stream(self, stream, priority="normal", deadline=None, trace=None):
+        with self._lock:
+            self.items.append(stream.text)
+
+    def supports_streaming(self):
+        return self.streaming
+
+
+def test_split_for_tts():
+    """日英の文末で分割し、極端に短い文は次の文とまとめる"""
+    assert split_for_tts("今日は晴れです。明日は雨です！週末は？") == ["今日は晴れです。", "明日は雨です！週末は？"]
+    assert split_for_tts("はい。今日は良い天気ですね。") == ["はい。今日は良い天気ですね。"]
+    assert split_for_tts("OK. It works. See you at 3.5 pm!") == ["OK. It works.", "See you at 3.5 pm!"]
+    assert split_for_tts("短い。") == ["短い。"]
+    assert split_for_tts("") == []
+    print("✓ 文単位に分割")
+
+
+def test_first_audio_independent_of_length():
+    """最初の音声ができるまでの時間は応答の長さではなく1文目で決まる"""
+    sentence = "これはテスト用の少し長めの文章です。"
+    results = {}
+    for count in (1, 10):
+        tts = FakeTTS(seconds_per_char=0.005)
+        player = FakePlayer()
+        pipeline = SentencePipeline(tts, player)
+        job = pipeline.speak(sentence * count)
+        results[count] = job.wait_first(timeout=5)
+        assert job.wait(timeout=10)
+        assert player.items == [sentence] * count
+    print(f"✓ 最初の音声: 1文 {results[1]:.2f}s / 10文 {results[10]:.2f}s")
+    assert results[10] < results[1] * 1.5 + 0.05
+
+
+def test_order_across_jobs():
+    """合成時間がばらついても、複数回の speak() をまたいで投入順に再生キューへ入る"""
+    tts = FakeTTS(seconds_per_char=0.0, jitter=0.05, workers=6)
+    player = FakePlayer()
+    pipeline = SentencePipeline(tts, player)
+    jobs = [pipeline.speak(f"発話{i}の一文目です。発話{i}の二文目です。") for i in range(5)]
+    for job in jobs:
+        assert job.wait(timeout=5)
+    expected = [f"発話{i}の{n}文目です。" for i in range(5) for n in ("一", "二")]
+    assert player.items == expected, player.items
+    print("✓ 発話をまたいで順番どおり")
+
+
+def test_streaming_engine():
+    """ストリーミング対応エンジンは合成開始と同時に再生キューへ入れる"""
+    player = FakePlayer(streaming=True)
+    pipeline = SentencePipeline(FakeStreamingTTS(), player)
+    job = pipeline.speak("最初の文です。次の文です。")
+    assert player.items == ["最初の文です。", "次の文です。"]
+    first = job.wait_first(timeout=5)
+    assert first is not None and first < 1.0
+    print("✓ ストリーミング合成はすぐに再生キューへ")
+
+
+def main():
+    tests = [
+        test_split_for_tts,
+        test_first_audio_independent_of_length,
+        test_order_across_jobs,
+        test_streaming_engine,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__name__}: {e}")
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+VOICEVOX クライアント（VoicevoxTTS）のテストスクリプト
+ローカルの偽 VOICEVOX サーバーを立てて、接続の使い回し・audio_query キャッシュ・
+文ごとの並行合成と順序を確認する（VOICEVOX 本体は不要）
+"""
+
+import io
+import json
+import sys
+import threading
+import time
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from tts_voicevox import VoicevoxTTS
+
+
+class FakeVoicevox:
+    """/audio_query と /synthesis だけを持つ偽 VOICEVOX エンジン"""
+
+    def __init__(self, synthesis_delay: float = 0.0):
+        self.synthesis_delay = synthesis_delay
+        self.calls = []             # (path, text)
+        self.speed_scales = []      # /synthesis に届いた speedScale
+        self.connections = set()    # クライアントのポート（接続数の確認用）
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                from urllib.parse import urlparse, parse_qs
+                url = urlparse(self.path)
+                params = parse_qs(url.query)
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                with fake._lock:
+                    fake.connections.add(self.client_address[1])
+                if url.path == "/audio_query":
+                    text = params["text"][0]
+                    fake.calls.append(("/audio_query", text))
+                    data = json.dumps({"text": text, "speedScale": 1.0}).encode()
+                else:
+                    query = json.loads(body)
+                    fake.calls.append(("/synthesis", query["text"]))
+                    fake.speed_scales.append(query["speedScale"])
+                    with fake._lock:
+                        fake.active += 1
+                        fake.peak = max(fake.peak, fake.active)
+                    time.sleep(fake.synthesis_delay)
+                    with fake._lock:
+                        fake.active -= 1
+                    data = fake.wav(query["text"])
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    @staticmethod
+    def wav(text: str) -> bytes:
+        """テキストを埋め込んだ短い無音 wav（どの文の音声か判別できるように）"""
+        buf = io.BytesIO()
+        with wave.open(buf, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(24000)
+            wf.writeframes(b"\x00\x00" * 240)
+        return buf.getvalue() + text.encode()
+
+    @property
+    def host(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def count(self, path: str) -> int:
+        return sum(1 for p, _ in self.calls if p == path)
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def test_sentences_are_parallel_and_ordered():
+    """長いテキストは文に分けて並行合成され、Future は文の順番どおり"""
+    server = FakeVoicevox(synthesis_delay=0.3)
+    tts = VoicevoxTTS(host=server.host, max_workers=3)
+    text = "今日は晴れです。明日は雨です。週末は曇りでしょう。"
+    try:
+        t_start = time.monotonic()
+        futures = tts.synthesize_sentences(text)
+        first = futures[0].result(timeout=5)
+        t_first = time.monotonic() - t_start
+        clips = [f.result(timeout=5) for f in futures]
+        t_all = time.monotonic() - t_start
+        assert [c.text for c in clips] == ["今日は晴れです。", "明日は雨です。", "週末は曇りでしょう。"]
+        assert all(c.data.endswith(c.text.encode()) for c in clips)
+        assert first is clips[0]
+        assert server.peak == 3, server.peak
+        # 直列なら 0.9 秒かかるところが、ほぼ1文分で終わる
+        assert t_all < 0.7, t_all
+    finally:
+        tts.cleanup()
+        server.close()
+    print(f"✓ 3文を並行合成 (1文目 {t_first:.2f}s / 全体 {t_all:.2f}s)")
+
+
+def test_connections_are_reused():
+    """keep-alive で接続を使い回す"""
+    server = FakeVoicevox()
+    tts = VoicevoxTTS(host=server.host, max_workers=2)
+    try:
+        for i in range(6):
+            assert tts.synthesize_audio(f"テスト{i}。") is not None
+        assert len(server.calls) == 12
+        assert len(server.connections) == 1, server.connections
+    finally:
+        tts.cleanup()
+        server.close()
+    print("✓ 12リクエストを1接続で処理")
+
+
+def test_audio_query_is_cached():
+    """同じ (テキスト, 話者) の audio_query は再取得しない"""
+    server = FakeVoicevox()
+    tts = VoicevoxTTS(host=server.host)
+    try:
+        tts.synthesize_audio("こんにちは。")
+        tts.cache.clear()  # 音声キャッシュを消しても audio_query は再利用
+        tts.synthesize_audio("こんにちは。")
+        assert server.count("/audio_query") == 1
+        assert server.count("/synthesis") == 2
+        tts.set_speaker(1)
+        tts.synthesize_audio("こんにちは。")
+        assert server.count("/audio_query") == 2
+    finally:
+        tts.cleanup()
+        server.close()
+    print("✓ audio_query をキャッシュ")
+
+
+def test_speed_scale():
+    """speedScale は合成リクエストに反映され、話速ごとに別のキャッシュになる"""
+    server = FakeVoicevox()
+    tts = VoicevoxTTS(host=server.host)
+    try:
+        tts.set_speed_scale(1.25)
+        tts.synthesize_audio("こんにちは。")
+        tts.set_speed_scale(1.0)
+        tts.synthesize_audio("こんにちは。")
+        tts.synthesize_audio("こんにちは。")  # 等速はキャッシュ済み
+        assert server.speed_scales == [1.25, 1.0], server.speed_scales
+        assert server.count("/audio_query") == 1
+    finally:
+        tts.cleanup()
+        server.close()
+    print("✓ speedScale の反映")
+
+
+def test_synthesize_after_cleanup():
+    """cleanup()（停止のたびに呼ばれる）の後も、接続とスレッドプールを作り直して合成できる"""
+    server = FakeVoicevox()
+    tts = VoicevoxTTS(host=server.host)
+    try:
+        assert tts.synthesize_audio_async("停止前。").result(timeout=5) is not None
+        tts.cleanup()
+        clip = tts.synthesize_audio_async("再開後。").result(timeout=5)
+        assert clip is not None and clip.text == "再開後。", clip
+        assert tts.synthesize("ファイル。") is not None
+    finally:
+        tts.cleanup()
+        server.close()
+    print("✓ cleanup() の後も合成できる")
+
+
+def test_engine_down_returns_none():
+    """VOICEVOX が落ちていれば None（例外を投げない）"""
+    tts = VoicevoxTTS(host="http://127.0.0.1:9")
+    try:
+        assert tts.synthesize_audio("こんにちは。") is None
+        assert [f.result(timeout=5) for f in tts.synthesize_sentences("a。b。")] == [None, None]
+    finally:
+        tts.cleanup()
+    print("✓ 接続できなければ None")
+
+
+def main():
+    tests = [
+        test_sentences_are_parallel_and_ordered,
+        test_connections_are_reused,
+        test_audio_query_is_cached,
+        test_speed_scale,
+        test_synthesize_after_cleanup,
+        test_engine_down_returns_none,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__name__}: {e}")
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
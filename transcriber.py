@@ -4,6 +4,9 @@ faster-whisper を使って複数言語の音声をテキストに変換する
 対応言語: en, ja, zh, es, fr, de, ko
 """
 
+import copy
+import threading
+
 import numpy as np
 
 try:
@@ -11,12 +14,20 @@ try:
 except ImportError:
     raise ImportError("faster-whisper が必要です: pip install faster-whisper")
 
+from model_registry import ModelKey, ModelRegistry
+
 
 class Transcriber:
     """faster-whisper を使った複数言語音声認識"""
 
     AVAILABLE_MODELS = ["tiny", "base", "small", "medium", "large-v2"]
     SUPPORTED_LANGUAGES = ["en", "ja", "zh", "es", "fr", "de", "ko"]
+    # transcribe() と transcribe_batch() で共通のデコード設定（まとめて認識しても結果の傾向を揃える）
+    DECODE_OPTIONS = {
+        "beam_size": 5,  # 安定性重視
+        "suppress_blank": True,
+        "suppress_tokens": [-1],  # -1 = 既定の記号類を抑制（faster-whisper・CTranslate2 とも同じ意味）
+    }
     LANGUAGE_NAMES = {
         "en": "English",
         "ja": "日本語",
@@ -48,30 +59,68 @@ class Transcriber:
         "お疲れ様でした",
     ]
 
-    def __init__(self, model_size: str = "small", language: str = "en", device: str = "cpu", compute_type: str = "int8"):
+    def __init__(self, model_size: str = "small", language: str = "en", device: str = "cpu", compute_type: str = "int8",
+                 num_workers: int = 1, registry: ModelRegistry = None):
         """
         Args:
             model_size: Whisper モデルサイズ (tiny/base/small/medium/large-v2)
             language: 認識言語 (en/ja/zh/es/fr/de/ko, default: en)
             device: "cpu" or "cuda"
             compute_type: "int8" (高速/CPU推奨) or "float16" (GPU) or "float32"
+            num_workers: 1つのモデルで同時に認識できる数（最初に読み込んだときの値を使う）
+            registry: モデルの置き場（None ならプロセスで共有するもの。同じモデルは全言語・全インスタンスで共有）
         """
         self.model_size = model_size
         self.language = language
         self.device = device
         self.compute_type = compute_type
-        self._model = None
+        self.num_workers = num_workers
+        self.registry = registry or ModelRegistry.shared()
+        self._handle = None  # 共有モデルへの参照（load_model で受け取る）
+        self._released = False
+        self._load_lock = threading.Lock()
+        self._batch_unsupported = False  # まとめて認識できない版の faster-whisper
+
+    @property
+    def model_key(self) -> ModelKey:
+        """Whisper は1つのモデルで全言語を認識するので、言語はキーに含めない"""
+        return ModelKey("whisper", self.model_size, self.compute_type, None, self.device)
 
     def load_model(self):
-        """モデルをロード（初回のみ）"""
-        if self._model is None:
-            print(f"[Transcriber] モデルをロード中: {self.model_size} (device={self.device}, compute_type={self.compute_type})")
-            self._model = WhisperModel(
-                self.model_size,
-                device=self.device,
-                compute_type=self.compute_type,
-            )
-            print(f"[Transcriber] モデルロード完了")
+        """モデルをロード（ほかのインスタンスが読み込み済みならそれを使う。読み込み済みなら何もしない）"""
+        with self._load_lock:
+            if self._released:
+                return
+            if self._handle is not None:
+                self._handle.warm()  # 使われていない間にメモリから外されていたら読み込み直す
+                return
+            key = self.model_key
+            if self.registry.is_loaded(key):
+                print(f"[Transcriber] 読み込み済みのモデルを使用: {key}")
+            self._handle = self.registry.acquire(key, self._load, slots=self.num_workers)
+
+    def _load(self):
+        print(f"[Transcriber] モデルをロード中: {self.model_size} (device={self.device}, compute_type={self.compute_type})")
+        model = WhisperModel(
+            self.model_size,
+            device=self.device,
+            compute_type=self.compute_type,
+            num_workers=self.num_workers,
+        )
+        print(f"[Transcriber] モデルロード完了")
+        return model
+
+    def release(self):
+        """
+        この Transcriber を使い終わる（モデルの参照を返す。以後の認識は空文字を返す）
+
+        ほかに使っている Transcriber がなければ、モデルは registry の ttl 秒後にメモリから外れる
+        """
+        with self._load_lock:
+            handle, self._handle = self._handle, None
+            self._released = True
+        if handle is not None:
+            handle.release()
 
     def transcribe(self, audio: np.ndarray, sample_rate: int = 16000) -> str:
         """
@@ -85,25 +134,22 @@ class Transcriber:
             認識されたテキスト
         """
         self.load_model()
-
-        # float32 に変換
-        if audio.dtype != np.float32:
-            audio = audio.astype(np.float32)
-
-        # 音声の正規化（レベルを-1.0～1.0に調整）
-        max_val = np.max(np.abs(audio))
-        if max_val > 0:
-            audio = audio / max_val * 0.95  # クリッピング防止
+        handle = self._handle
+        if handle is None:
+            return ""  # release() 済み
+        audio = self._normalize(audio)
 
         # 音声認識実行
         # VAD フィルタは無効化（audio_capture 側で既に音声検出を行っているため）
         # 重複VAD処理による無音繰り返し問題を解決
-        segments, info = self._model.transcribe(
-            audio,
-            language=self.language,  # 動的言語対応
-            beam_size=5,  # 安定性重視
-            vad_filter=False,  # 改善：True → False（audio_capture側で管理）
-        )
+        with handle.use() as model:
+            segments, info = model.transcribe(
+                audio,
+                language=self.language,  # 動的言語対応
+                vad_filter=False,  # 改善：True → False（audio_capture側で管理）
+                **self.DECODE_OPTIONS,
+            )
+            segments = list(segments)  # 認識は取り出すときに進むので、モデルを使っている間に取り出す
 
         # セグメントを結合（重複排除）
         text_parts = []
@@ -127,6 +173,61 @@ class Transcriber:
 
         return result
 
+    def transcribe_batch(self, audios: list[np.ndarray]) -> list[str]:
+        """
+        複数の音声（別々のセッションのチャンク等）をまとめて認識する（同じ言語。結果は audios と同じ順）
+
+        30 秒に揃えた特徴量をまとめてエンコード・デコードするので、1件ずつ transcribe() するより
+        呼び出しあたりの固定費が減る（タイムスタンプなし・1チャンク1セグメント）。
+        faster-whisper の内部 API を使うので、使えない版では1件ずつ認識する
+        （1.1 系の faster_whisper.audio.pad_or_trim・WhisperModel.encode・model.model.generate に合わせている。
+        requirements.txt で 1.x に固定）
+        """
+        if len(audios) <= 1 or self._batch_unsupported:
+            return [self.transcribe(audio) for audio in audios]
+        self.load_model()
+        handle = self._handle
+        if handle is None:
+            return ["" for _ in audios]
+        try:
+            with handle.use() as model:
+                texts = self._decode_batch(model, [self._normalize(audio) for audio in audios])
+        except (AttributeError, ImportError, TypeError, ValueError) as e:
+            print(f"[Transcriber] まとめて認識できないため1件ずつ認識します: {type(e).__name__}: {e}")
+            self._batch_unsupported = True
+            return [self.transcribe(audio) for audio in audios]
+        results = []
+        for text in texts:
+            if self._is_hallucination(text):
+                print(f"[Transcriber] ハルシネーション検出（スキップ）: {text[:80]}")
+                text = ""
+            results.append(text)
+        return results
+
+    def _decode_batch(self, model, audios: list[np.ndarray]) -> list[str]:
+        from faster_whisper.audio import pad_or_trim
+        from faster_whisper.tokenizer import Tokenizer
+
+        frames = model.feature_extractor.nb_max_frames
+        features = np.stack([pad_or_trim(model.feature_extractor(audio), frames) for audio in audios])
+        tokenizer = Tokenizer(model.hf_tokenizer, model.model.is_multilingual,
+                              task="transcribe", language=self.language)
+        prompt = list(tokenizer.sot_sequence) + [tokenizer.no_timestamps]
+        results = model.model.generate(model.encode(features), [prompt] * len(audios), **self.DECODE_OPTIONS)
+        return [tokenizer.decode(result.sequences_ids[0]).strip() for result in results]
+
+    @staticmethod
+    def _normalize(audio: np.ndarray) -> np.ndarray:
+        # float32 に変換
+        if audio.dtype != np.float32:
+            audio = audio.astype(np.float32)
+
+        # 音声の正規化（レベルを-1.0～1.0に調整）
+        max_val = np.max(np.abs(audio))
+        if max_val > 0:
+            audio = audio / max_val * 0.95  # クリッピング防止
+        return audio
+
     def _is_hallucination(self, text: str) -> bool:
         """Whisper のハルシネーション（無音時の幻聴テキスト）を検出"""
         if not text:
@@ -155,8 +256,11 @@ class Transcriber:
     def change_model(self, model_size: str):
         """モデルサイズを変更"""
         if model_size != self.model_size:
-            self.model_size = model_size
-            self._model = None  # 次回の transcribe で再ロード
+            with self._load_lock:
+                handle, self._handle = self._handle, None
+                self.model_size = model_size  # 次回の transcribe で再ロード
+            if handle is not None:
+                handle.release()
             print(f"[Transcriber] モデルサイズを {model_size} に変更（次回ロード時に適用）")
 
     def set_language(self, language: str) -> bool:
@@ -171,6 +275,18 @@ class Transcriber:
         print(f"[Transcriber] 認識言語を {lang_name} ({language}) に変更")
         return True
 
+    def with_language(self, language: str):
+        """認識言語だけを変えた Transcriber を返す（モデルは共有する。言語ペアの切り替え用。未対応なら None）"""
+        if language not in self.SUPPORTED_LANGUAGES:
+            print(f"[Transcriber] サポートされていない言語: {language}")
+            return None
+        other = copy.copy(self)
+        other.language = language
+        with self._load_lock:
+            other._handle = self._handle.share() if self._handle is not None else None
+        other._load_lock = threading.Lock()
+        return other
+
 
 if __name__ == "__main__":
     # テスト: モデルロードのみ
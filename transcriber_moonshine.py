@@ -14,6 +14,7 @@ moonshine-voice を使って複数言語の音声をテキストに変換する
 ※ fr, de は Moonshine 未対応のため、この版では使用不可
 """
 
+import copy
 import re
 import numpy as np
 import threading
@@ -25,6 +26,8 @@ except ImportError:
         "moonshine-voice が必要です: pip install moonshine-voice"
     )
 
+from model_registry import ModelKey, ModelRegistry
+
 
 class Transcriber:
     """moonshine-voice を使った複数言語音声認識（faster-whisper 互換インターフェース）"""
@@ -70,6 +73,7 @@ class Transcriber:
         language: str = "en",
         device: str = "cpu",
         compute_type: str = "int8",
+        registry: ModelRegistry = None,
     ):
         """
         Args:
@@ -77,33 +81,59 @@ class Transcriber:
             language: 認識言語 (en/ja/zh/es/ko)
             device: 互換性のため受け取るが Moonshine では無視（常に CPU 最適化）
             compute_type: 互換性のため受け取るが Moonshine では無視
+            registry: モデルの置き場（None ならプロセスで共有するもの。同じ言語のモデルは全インスタンスで共有）
         """
         self.model_size = model_size
         self.language = language
         self.device = device
         self.compute_type = compute_type
-        self._transcriber = None
-        self._model_path = None
-        self._model_arch = None
+        self.registry = registry or ModelRegistry.shared()
+        self._handle = None  # 共有モデルへの参照（load_model で受け取る）
+        self._released = False
+        self._load_lock = threading.Lock()
+
+    @property
+    def model_key(self) -> ModelKey:
+        """Moonshine は言語ごとにモデルが決まるので、サイズ・精度はキーに含めない"""
+        return ModelKey("moonshine", None, None, self.language)
 
     def load_model(self):
-        """モデルをロード（初回のみ）"""
-        if self._transcriber is None:
-            print(
-                f"[Transcriber/Moonshine] モデルをロード中: language={self.language}"
+        """モデルをロード（ほかのインスタンスが読み込み済みならそれを使う。読み込み済みなら何もしない）"""
+        with self._load_lock:
+            if self._released:
+                return
+            if self._handle is not None:
+                self._handle.warm()  # 使われていない間にメモリから外されていたら読み込み直す
+                return
+            key = self.model_key
+            if self.registry.is_loaded(key):
+                print(f"[Transcriber/Moonshine] 読み込み済みのモデルを使用: {key}")
+            # moonshine_voice.Transcriber を複数スレッドから同時に使わない（slots=1）
+            self._handle = self.registry.acquire(key, self._load, slots=1)
+
+    def _load(self):
+        print(
+            f"[Transcriber/Moonshine] モデルをロード中: language={self.language}"
+        )
+        try:
+            model_path, model_arch = moonshine_voice.get_model_for_language(self.language)
+            model = moonshine_voice.Transcriber(
+                model_path=model_path,
+                model_arch=model_arch,
             )
-            try:
-                self._model_path, self._model_arch = (
-                    moonshine_voice.get_model_for_language(self.language)
-                )
-                self._transcriber = moonshine_voice.Transcriber(
-                    model_path=self._model_path,
-                    model_arch=self._model_arch,
-                )
-                print(f"[Transcriber/Moonshine] モデルロード完了")
-            except Exception as e:
-                print(f"[Transcriber/Moonshine] モデルロード失敗: {e}")
-                raise
+            print(f"[Transcriber/Moonshine] モデルロード完了")
+            return model
+        except Exception as e:
+            print(f"[Transcriber/Moonshine] モデルロード失敗: {e}")
+            raise
+
+    def release(self):
+        """この Transcriber を使い終わる（モデルの参照を返す。以後の認識は空文字を返す）"""
+        with self._load_lock:
+            handle, self._handle = self._handle, None
+            self._released = True
+        if handle is not None:
+            handle.release()
 
     def transcribe(self, audio: np.ndarray, sample_rate: int = 16000) -> str:
         """
@@ -117,6 +147,9 @@ class Transcriber:
             認識されたテキスト
         """
         self.load_model()
+        handle = self._handle
+        if handle is None:
+            return ""  # release() 済み
 
         # float32 に変換
         if audio.dtype != np.float32:
@@ -129,9 +162,10 @@ class Transcriber:
 
         # Moonshine のバッチ認識（ストリーミングなし版）
         try:
-            transcript = self._transcriber.transcribe_without_streaming(
-                audio, sample_rate
-            )
+            with handle.use() as model:
+                transcript = model.transcribe_without_streaming(
+                    audio, sample_rate
+                )
         except Exception as e:
             print(f"[Transcriber/Moonshine] 認識エラー: {e}")
             return ""
@@ -246,8 +280,11 @@ class Transcriber:
             return False
 
         if language != self.language:
-            self.language = language
-            self._transcriber = None  # 次回 transcribe で再ロード
+            with self._load_lock:
+                handle, self._handle = self._handle, None
+                self.language = language  # 次回 transcribe で再ロード
+            if handle is not None:
+                handle.release()
             lang_name = self.LANGUAGE_NAMES.get(language, language)
             print(
                 f"[Transcriber/Moonshine] 認識言語を {lang_name} ({language}) に変更"
@@ -255,6 +292,25 @@ class Transcriber:
             )
         return True
 
+    def with_language(self, language: str):
+        """
+        認識言語だけを変えた Transcriber を返す（言語ペアの切り替え用。未対応なら None）
+
+        同じ言語ならモデルを共有する。言語が変わるとモデルも変わるので、新しいインスタンスで読み込む
+        （読み込み終わるまでは今のインスタンスで認識を続けられる）
+        """
+        if language not in self.SUPPORTED_LANGUAGES:
+            print(f"[Transcriber/Moonshine] サポートされていない言語: {language}")
+            return None
+        if language == self.language:
+            other = copy.copy(self)
+            with self._load_lock:
+                other._handle = self._handle.share() if self._handle is not None else None
+            other._load_lock = threading.Lock()
+            return other
+        return Transcriber(model_size=self.model_size, language=language,
+                           device=self.device, compute_type=self.compute_type, registry=self.registry)
+
 
 class StreamingTranscriber:
     """
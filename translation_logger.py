@@ -11,6 +11,7 @@
   パイプラインの認識・翻訳・TTS（合計2〜3秒）に対して無視できるレベル。
 """
 
+import glob
 import os
 import threading
 from datetime import datetime
@@ -69,3 +70,35 @@ class TranslationLogger:
                 self._file.close()
                 self._file = None
                 print("[Logger] ログファイルを閉じました")
+
+    @staticmethod
+    def read_entries(log_dir: str = "logs", source_lang: str = None, target_lang: str = None):
+        """
+        過去のログから (source_text, translated_text) を古い順に読み出す
+
+        Args:
+            log_dir: ログフォルダのパス
+            source_lang: 指定すればこの言語ペアの行だけを返す (例: "en")
+            target_lang: 同上 (例: "ja")
+
+        Yields:
+            (source_text, translated_text)
+        """
+        label = None
+        if source_lang and target_lang:
+            label = f"[{source_lang.upper()}→{target_lang.upper()}]"
+
+        for path in sorted(glob.glob(os.path.join(log_dir, "*.log"))):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        parts = line.rstrip("\n").split("\t")
+                        if len(parts) != 4:
+                            continue
+                        if label and parts[1] != label:
+                            continue
+                        # 旧バージョンが記録した翻訳エラー行は除外
+                        if parts[2] and parts[3] and not parts[3].startswith("[翻訳エラー]"):
+                            yield parts[2], parts[3]
+            except OSError as e:
+                print(f"[Logger] ログ読み込みエラー: {path}: {e}")
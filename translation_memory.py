@@ -0,0 +1,264 @@
+"""
+翻訳メモリモジュール
+過去の (原文, 訳文) を文字 n-gram の転置インデックスで引き、
+ほぼ同じ原文（数字や固有名詞だけが違う）は翻訳エンジンを呼ばずにローカルで訳す
+
+  過去: "It's like over 10,000 AI agents already built."  → "すでに 10,000 を超える AI エージェント..."
+  今回: "It's like over 20,000 AI agents already built."  → 数字だけ差し替えて即座に返す
+
+仕組み:
+  - 原文を正規化（小文字化・空白の統一）して文字 3-gram の集合に分解し、
+    gram → スロット番号の転置リスト（numpy 配列）を持つ
+  - 検索はクエリの gram の転置リストを連結して np.bincount で共通 gram 数を一括で数え、
+    Dice 係数が閾値以上のエントリだけを候補にする（2万件で 1ms 未満）
+  - 候補との差分がトークン単位の置換のみで、置換前のトークン（数字や英字の固有名詞）が
+    訳文にそのまま現れる場合に限り、訳文側のトークンを差し替えて返す
+  - エントリ数に上限を設けて LRU で追い出し、JSONL ファイルに保存・復元する
+"""
+
+import difflib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# 数字・英字の単語・それ以外の文字（日本語は1文字ずつ）に分割
+_TOKEN_RE = re.compile(r"\d+(?:[.,]\d+)*|[A-Za-z][A-Za-z'\-]*|[^\sA-Za-z\d]")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def _token_pattern(token: str) -> str:
+    """訳文中で token を単独のトークンとしてだけ探すパターン（"10" の中の "1" などには当たらない）"""
+    if token[0].isdigit():
+        return rf"(?<!\d)(?<!\d[.,]){re.escape(token)}(?!\d|[.,]\d)"
+    return rf"(?<![A-Za-z'\-]){re.escape(token)}(?![A-Za-z'\-])"
+
+
+def _normalize(text: str) -> str:
+    return _SPACE_RE.sub(" ", text.strip().lower())
+
+
+class TranslationMemory:
+    """文字 n-gram インデックス付きの翻訳メモリ（1言語ペア分）"""
+
+    def __init__(
+        self,
+        n: int = 3,
+        threshold: float = 0.8,
+        max_entries: int = 20000,
+        path: str = None,
+    ):
+        """
+        Args:
+            n: n-gram の文字数
+            threshold: 候補とみなす Dice 係数の下限（0.0〜1.0）
+            max_entries: 保持するエントリ数の上限（超えたら最も使われていないものを削除）
+            path: 保存先の JSONL ファイル（None なら保存しない）
+        """
+        self.n = n
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.path = path
+
+        # エントリはスロット番号で管理し、削除されたスロットは再利用する
+        self._entries: OrderedDict = OrderedDict()  # slot → (source, target, grams)（LRU 順）
+        self._exact: dict[str, int] = {}            # 正規化した原文 → slot
+        self._postings: dict[str, np.ndarray] = {}  # gram → slot の配列
+        self._sizes = np.zeros(max_entries, dtype=np.int32)  # slot → gram 数
+        self._free_slots = list(range(max_entries - 1, -1, -1))
+        self._dirty = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def _grams(self, normalized: str) -> frozenset:
+        padded = f" {normalized} "
+        if len(padded) < self.n:
+            return frozenset([padded])
+        return frozenset(padded[i:i + self.n] for i in range(len(padded) - self.n + 1))
+
+    def add(self, source: str, target: str):
+        """(原文, 訳文) を登録する。同じ原文があれば訳文を更新する"""
+        source = source.strip()
+        target = target.strip()
+        if not source or not target:
+            return
+        key = _normalize(source)
+        with self._lock:
+            if key in self._exact:
+                slot = self._exact[key]
+                _, _, grams = self._entries[slot]
+                self._entries[slot] = (source, target, grams)
+                self._entries.move_to_end(slot)
+                self._dirty += 1
+                return
+
+            if not self._free_slots:
+                self._remove(next(iter(self._entries)))
+            slot = self._free_slots.pop()
+            grams = self._grams(key)
+            self._entries[slot] = (source, target, grams)
+            self._exact[key] = slot
+            self._sizes[slot] = len(grams)
+            for gram in grams:
+                ids = self._postings.get(gram)
+                self._postings[gram] = (
+                    np.array([slot], dtype=np.int32) if ids is None else np.append(ids, np.int32(slot))
+                )
+            self._dirty += 1
+
+    def _remove(self, slot: int):
+        """エントリとその転置リストを削除（ロック取得済み前提）"""
+        source, _, grams = self._entries.pop(slot)
+        self._exact.pop(_normalize(source), None)
+        self._sizes[slot] = 0
+        self._free_slots.append(slot)
+        for gram in grams:
+            ids = self._postings.get(gram)
+            if ids is None:
+                continue
+            ids = ids[ids != slot]
+            if len(ids):
+                self._postings[gram] = ids
+            else:
+                del self._postings[gram]
+
+    def search(self, text: str, limit: int = 3) -> list[tuple[float, str, str]]:
+        """
+        類似する過去の原文を探す
+
+        Returns:
+            [(Dice 係数, 原文, 訳文), ...]（類似度の高い順）
+        """
+        key = _normalize(text)
+        query = self._grams(key)
+        q_len = len(query)
+
+        with self._lock:
+            exact_slot = self._exact.get(key)
+            if exact_slot is not None:
+                source, target, _ = self._entries[exact_slot]
+                return [(1.0, source, target)]
+
+            postings = [self._postings[g] for g in query if g in self._postings]
+            if not postings:
+                return []
+
+            # 共通 gram 数を全エントリ分まとめて数え、Dice 係数 = 2|A∩B| / (|A|+|B|)
+            overlap = np.bincount(np.concatenate(postings), minlength=self.max_entries)
+            dice = 2.0 * overlap / (q_len + self._sizes)
+            hits = np.nonzero(dice >= self.threshold)[0]
+            if len(hits) > limit:
+                hits = hits[np.argsort(dice[hits])[::-1][:limit]]
+
+            results = []
+            for slot in hits:
+                source, target, _ = self._entries[int(slot)]
+                results.append((float(dice[slot]), source, target))
+
+        results.sort(key=lambda r: r[0], reverse=True)
+        return results
+
+    def lookup(self, text: str) -> str | None:
+        """
+        翻訳メモリだけで訳せるなら訳文を返す（訳せなければ None）
+
+        完全一致はそのまま、類似ヒットはトークン置換で訳文を組み立てる。
+        """
+        for score, source, target in self.search(text):
+            result = target if score == 1.0 else self._substitute(text, source, target)
+            if result is not None:
+                with self._lock:
+                    slot = self._exact.get(_normalize(source))
+                    if slot is not None:
+                        self._entries.move_to_end(slot)
+                self.hits += 1
+                return result
+        self.misses += 1
+        return None
+
+    @staticmethod
+    def _substitute(text: str, source: str, target: str) -> str | None:
+        """
+        原文の差分がトークンの置換だけで、置換前のトークンが訳文にそのまま1回ずつ
+        現れる（数字・英字の固有名詞など）場合に、訳文側を差し替えて返す
+        """
+        new_tokens = _TOKEN_RE.findall(text)
+        old_tokens = _TOKEN_RE.findall(source)
+        new_lower = [t.lower() for t in new_tokens]
+        old_lower = [t.lower() for t in old_tokens]
+        if new_lower == old_lower:
+            return target
+
+        matcher = difflib.SequenceMatcher(a=old_lower, b=new_lower, autojunk=False)
+        replacements = []
+        for op, i1, i2, j1, j2 in matcher.get_opcodes():
+            if op == "equal":
+                continue
+            if op != "replace" or (i2 - i1) != (j2 - j1):
+                return None
+            for old, new in zip(old_tokens[i1:i2], new_tokens[j1:j2]):
+                # 置換できるのは数字 or 英字の単語（訳文に原文表記のまま残るもの）だけ
+                if not (old[0].isdigit() or (old[0].isalpha() and old.isascii())):
+                    return None
+                if old_tokens.count(old) != 1 or len(re.findall(_token_pattern(old), target)) != 1:
+                    return None
+                replacements.append((old, new))
+
+        # 元の訳文に対して1回で置き換える（10→20・20→30 のような置換が連鎖しない）
+        mapping = dict(replacements)
+        pattern = "|".join(_token_pattern(old) for old in sorted(mapping, key=len, reverse=True))
+        return re.sub(pattern, lambda m: mapping[m.group(0)], target)
+
+    def save(self, path: str = None):
+        """JSONL に保存する（LRU 順。一時ファイル経由で置き換える）"""
+        path = path or self.path
+        if not path:
+            return
+        with self._lock:
+            rows = [(s, t) for s, t, _ in self._entries.values()]
+            self._dirty = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for source, target in rows:
+                f.write(json.dumps({"source": source, "target": target}, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, path)
+
+    def load(self, path: str):
+        """JSONL から読み込む"""
+        count = 0
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self.add(row.get("source", ""), row.get("target", ""))
+                count += 1
+        self._dirty = 0
+        print(f"[TranslationMemory] {count}件を読み込み: {path}")
+
+    def load_pairs(self, pairs):
+        """(原文, 訳文) のイテラブルをまとめて登録する（TranslationLogger.read_entries など）"""
+        count = 0
+        for source, target in pairs:
+            self.add(source, target)
+            count += 1
+        return count
+
+    @property
+    def dirty(self) -> int:
+        """前回の保存以降に追加・更新された件数"""
+        return self._dirty
@@ -0,0 +1,515 @@
+"""
+翻訳レジリエンスモジュール
+翻訳バックエンドの呼び出しにデッドライン・ヘッジリクエスト・サーキットブレーカーを適用する
+
+  - デッドライン: 1リクエストあたりの上限時間。超えたら待たずに次の手段へ進む
+  - ヘッジ: 直近レイテンシの p95 を過ぎても応答がなければ同じリクエストを重複送信し、
+            先に返ってきた方を採用する（平均ではなくテール遅延を削る）
+  - サーキットブレーカー: エラー率 or p95 レイテンシが閾値を超えたエンジンは
+            一定時間スキップし、セカンダリエンジンにフェイルオーバーする
+  - ストリーミング: 最初の要素が届くまでのデッドラインと、要素の間が空きすぎたときの打ち切りを
+            ブレーカーと同じ統計に載せる（call_stream）
+
+エンジンは translate(text) -> str を持つ任意のオブジェクト
+（deep-translator の GoogleTranslator / MyMemoryTranslator など）。
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class TranslationUnavailable(RuntimeError):
+    """全エンジンが失敗またはデッドライン超過した"""
+
+
+class LatencyWindow:
+    """直近 N 件のレイテンシを保持してパーセンタイルを返す（スレッドセーフ）"""
+
+    def __init__(self, size: int = 50):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float):
+        with self._lock:
+            self._samples.append(latency)
+
+    def percentile(self, p: float) -> float | None:
+        """p パーセンタイル（0〜100）。サンプルがなければ None"""
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._samples)
+
+
+class CircuitBreaker:
+    """
+    エラー率とレイテンシを監視するサーキットブレーカー
+
+    状態:
+      closed    — 通常。全リクエストを通す
+      open      — 遮断中。cooldown 秒経過するまでリクエストを通さない
+      half_open — 試験中。1件だけ通し、成功なら closed、失敗なら open に戻す
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str = "engine",
+        window: int = 20,
+        min_samples: int = 5,
+        error_rate_threshold: float = 0.5,
+        latency_threshold: float = 3.0,
+        cooldown: float = 15.0,
+    ):
+        """
+        Args:
+            name: ログ表示用の名前
+            window: 判定に使う直近リクエスト数
+            min_samples: 判定に必要な最小サンプル数
+            error_rate_threshold: この割合以上失敗したら遮断（0.0〜1.0）
+            latency_threshold: 成功リクエストの p95 がこの秒数以上なら遮断
+            cooldown: 遮断後、試験リクエストを許可するまでの秒数
+        """
+        self.name = name
+        self.min_samples = min_samples
+        self.error_rate_threshold = error_rate_threshold
+        self.latency_threshold = latency_threshold
+        self.cooldown = cooldown
+
+        self._outcomes = deque(maxlen=window)  # True=成功, False=失敗
+        self._latencies = LatencyWindow(size=window)
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def allow(self) -> bool:
+        """このエンジンにリクエストを送ってよいか"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.cooldown:
+                    return False
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+            # half_open: 試験リクエストは同時に1件だけ
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self, latency: float):
+        with self._lock:
+            self._outcomes.append(True)
+            self._latencies.record(latency)
+            if self._state == self.HALF_OPEN:
+                print(f"[CircuitBreaker] {self.name}: 復旧を確認 → closed")
+                self._reset()
+                return
+            self._evaluate()
+
+    def record_failure(self):
+        with self._lock:
+            self._outcomes.append(False)
+            if self._state == self.HALF_OPEN:
+                self._trip("試験リクエスト失敗")
+                return
+            self._evaluate()
+
+    def error_rate(self) -> float:
+        with self._lock:
+            return self._error_rate()
+
+    def _error_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    def _evaluate(self):
+        """closed 状態で閾値を超えていれば遮断する（ロック取得済み前提）"""
+        if self._state != self.CLOSED or len(self._outcomes) < self.min_samples:
+            return
+        error_rate = self._error_rate()
+        if error_rate >= self.error_rate_threshold:
+            self._trip(f"エラー率 {error_rate:.0%}")
+            return
+        p95 = self._latencies.percentile(95)
+        if len(self._latencies) >= self.min_samples and p95 is not None and p95 >= self.latency_threshold:
+            self._trip(f"p95 レイテンシ {p95:.2f}s")
+
+    def _trip(self, reason: str):
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._probe_in_flight = False
+        print(f"[CircuitBreaker] {self.name}: 遮断 ({reason}) → {self.cooldown:.0f}秒間スキップ")
+
+    def _reset(self):
+        self._state = self.CLOSED
+        self._outcomes.clear()
+        self._latencies = LatencyWindow(size=self._outcomes.maxlen)
+        self._probe_in_flight = False
+
+
+class _EngineState:
+    """エンジン1つ分の統計とブレーカーと呼び出し用のスレッド"""
+
+    def __init__(self, name: str, engine, breaker: CircuitBreaker, hedge: bool = True, workers: int = 8):
+        self.name = name
+        self.engine = engine
+        self.breaker = breaker
+        self.hedge = hedge
+        self.latencies = LatencyWindow()
+        self.calls = 0
+        self.hedges = 0
+        self.failures = 0
+        # エンジンごとに別のスレッドで呼ぶ（デッドラインで見捨てた応答のない呼び出しが
+        # スレッドを使い切っても、フェイルオーバー先の呼び出しは待たされない）
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix=f"translate-{name}")
+
+
+class ResilientCaller:
+    """
+    複数の翻訳エンジンを優先順に、デッドライン・ヘッジ・ブレーカー付きで呼び出す
+
+    使用例:
+        caller = ResilientCaller(deadline=2.5)
+        caller.set_engine("google", GoogleTranslator(source="en", target="ja"))
+        caller.set_engine("mymemory", MyMemoryTranslator(source="en-US", target="ja-JP"))
+        text = caller.call("Hello")   # 失敗時は TranslationUnavailable
+    """
+
+    def __init__(
+        self,
+        deadline: float = 2.5,
+        hedge_delay: float = 0.8,
+        min_hedge_delay: float = 0.2,
+        max_attempts: int = 3,
+        primary_share: float = 0.6,
+        max_workers: int = 8,
+        breaker_options: dict = None,
+    ):
+        """
+        Args:
+            deadline: 1リクエスト全体（フェイルオーバー込み）の上限秒数
+            hedge_delay: レイテンシ統計が揃うまでのヘッジ待ち時間（秒）
+            min_hedge_delay: p95 がこれより短くてもこの秒数は待つ
+            max_attempts: 1エンジンあたりの最大送信数（初回 + ヘッジ/再送）
+            primary_share: セカンダリがある場合、最初のエンジンに割り当てる時間の割合
+            max_workers: エンジンごとに同時に実行できるバックエンド呼び出し数
+            breaker_options: CircuitBreaker に渡す追加引数（latency_threshold を省くと、
+                             デッドラインのうち最初のエンジンに割り当てる時間の 8 割にする）
+        """
+        self.deadline = deadline
+        self.hedge_delay = hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.max_attempts = max(1, max_attempts)
+        self.primary_share = primary_share
+        self.max_workers = max_workers
+        # 成功した応答の p95 がデッドライン以上になることはないので、レイテンシでの遮断はその手前で判定する
+        self._breaker_options = {"latency_threshold": deadline * primary_share * 0.8, **(breaker_options or {})}
+        self._engines: list[_EngineState] = []
+        self._lock = threading.Lock()
+        self._active = 0        # 呼び出し中の call / call_stream の数
+        self._closed = False    # shutdown() 済み（呼び出し中のものが終わったらスレッドを止める）
+
+    def set_engine(self, name: str, engine, priority: int = None, hedge: bool = True):
+        """
+        エンジンを登録する。同名のエンジンがあれば統計を引き継いで差し替える
+
+        Args:
+            name: エンジン名（"google" など）
+            engine: translate(text) を持つオブジェクト
+            priority: 呼び出し順の位置（0 が最優先）。None なら末尾に追加
+            hedge: False ならヘッジ送信しない（ローカル LLM など重複実行が負荷になるエンジン）
+        """
+        with self._lock:
+            for state in self._engines:
+                if state.name == name:
+                    state.engine = engine
+                    state.hedge = hedge
+                    if priority is not None:
+                        self._engines.remove(state)
+                        self._engines.insert(priority, state)
+                    return
+            breaker = CircuitBreaker(name=name, **self._breaker_options)
+            state = _EngineState(name, engine, breaker, hedge=hedge, workers=self.max_workers)
+            if priority is None:
+                self._engines.append(state)
+            else:
+                self._engines.insert(priority, state)
+
+    def remove_engine(self, name: str):
+        with self._lock:
+            removed = [s for s in self._engines if s.name == name]
+            self._engines = [s for s in self._engines if s.name != name]
+        for state in removed:
+            state.executor.shutdown(wait=False, cancel_futures=True)
+
+    @property
+    def engine_names(self) -> list[str]:
+        with self._lock:
+            return [s.name for s in self._engines]
+
+    def _state(self, name: str) -> _EngineState | None:
+        with self._lock:
+            for state in self._engines:
+                if state.name == name:
+                    return state
+        return None
+
+    def call(self, text: str, deadline: float = None, exclude: tuple = ()) -> str:
+        """
+        優先順にエンジンを試し、最初に成功した結果を返す
+
+        Args:
+            exclude: 試さないエンジン名（ストリーミングに失敗したエンジンなど）
+
+        Raises:
+            TranslationUnavailable: 全エンジンが失敗 or 遮断中 or デッドライン超過
+        """
+        self._enter()
+        try:
+            return self._call(text, deadline, exclude)
+        finally:
+            self._leave()
+
+    def _call(self, text: str, deadline: float, exclude: tuple) -> str:
+        budget = self.deadline if deadline is None else deadline
+        deadline_at = time.monotonic() + budget
+
+        with self._lock:
+            engines = [s for s in self._engines if s.name not in exclude]
+
+        last_error = None
+        for index, state in enumerate(engines):
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                break
+            if not state.breaker.allow():
+                continue
+
+            # 後続エンジンが残っていれば、その分の時間を残しておく
+            has_fallback = any(s.breaker.state != CircuitBreaker.OPEN for s in engines[index + 1:])
+            engine_budget = remaining * self.primary_share if has_fallback else remaining
+
+            try:
+                return self._call_engine(state, text, time.monotonic() + engine_budget)
+            except Exception as e:
+                last_error = e
+                if has_fallback:
+                    print(f"[Translator] {state.name} 失敗 → フェイルオーバー: {e}")
+
+        raise TranslationUnavailable(
+            f"翻訳エンジンが応答しません ({budget:.1f}s 以内): {last_error}"
+        )
+
+    def call_stream(self, name: str, open_stream, first_deadline: float = None, stall_timeout: float = None):
+        """
+        エンジン name のストリーミング呼び出しを、ブレーカーとデッドライン付きで読む
+
+        open_stream() が返すイテレータはエンジンのスレッドで読み進め、届いた要素から順に返す。
+        最初の要素が first_deadline 秒以内に届かない・要素の間が stall_timeout 秒を超えたら
+        読むのをやめて TimeoutError（エンジンの失敗として記録する）
+
+        Args:
+            open_stream: 引数なしでイテレータを返す関数
+            first_deadline: 最初の要素までの上限秒数（None ならデッドラインのうち最初のエンジンの持ち時間）
+            stall_timeout: 2つ目以降の要素の間の上限秒数（None ならデッドライン）
+
+        Raises:
+            TranslationUnavailable: エンジンがない or 遮断中
+        """
+        state = self._state(name)
+        if state is None or not state.breaker.allow():
+            raise TranslationUnavailable(f"{name}: 遮断中")
+        first_deadline = self.deadline * self.primary_share if first_deadline is None else first_deadline
+        stall_timeout = self.deadline if stall_timeout is None else stall_timeout
+
+        items = queue.Queue()
+        cancelled = threading.Event()
+        done = object()
+
+        def pump():
+            try:
+                for item in open_stream():
+                    if cancelled.is_set():
+                        return
+                    items.put((True, item))
+                items.put((True, done))
+            except Exception as e:
+                items.put((False, e))
+
+        self._enter()
+        state.calls += 1
+        t_start = time.monotonic()
+        received = 0
+        first_latency = None
+        try:
+            state.executor.submit(pump)
+            while True:
+                timeout = first_deadline if received == 0 else stall_timeout
+                try:
+                    ok, item = items.get(timeout=timeout)
+                except queue.Empty:
+                    raise TimeoutError(f"{name}: {'最初の応答' if received == 0 else '続きの応答'}が"
+                                       f"{timeout:.1f}s 以内に届きません") from None
+                if not ok:
+                    raise item
+                if item is done:
+                    break
+                if first_latency is None:
+                    first_latency = time.monotonic() - t_start
+                received += 1
+                yield item
+        except GeneratorExit:
+            cancelled.set()  # 呼び出し側が読むのをやめた（届いた分は成功として記録する）
+            self._record_stream_success(state, first_latency)
+            raise
+        except Exception:
+            cancelled.set()
+            state.failures += 1
+            state.breaker.record_failure()
+            raise
+        finally:
+            self._leave()
+        if received == 0:
+            state.failures += 1
+            state.breaker.record_failure()
+            raise ValueError(f"{name}: 空の翻訳結果")
+        self._record_stream_success(state, first_latency)
+
+    @staticmethod
+    def _record_stream_success(state: _EngineState, first_latency: float):
+        # ストリーミングは最初の要素までの時間で速さを測る（全体の時間は文の数で決まる）
+        state.latencies.record(first_latency)
+        state.breaker.record_success(first_latency)
+
+    def _current_hedge_delay(self, state: _EngineState) -> float:
+        """ヘッジ送信までの待ち時間: 直近 p95（統計不足時は既定値）"""
+        if len(state.latencies) < 5:
+            return self.hedge_delay
+        return max(self.min_hedge_delay, state.latencies.percentile(95))
+
+    def _timed_call(self, state: _EngineState, text: str):
+        t_start = time.monotonic()
+        result = state.engine.translate(text)
+        return result, time.monotonic() - t_start
+
+    def _call_engine(self, state: _EngineState, text: str, deadline_at: float) -> str:
+        """1つのエンジンをヘッジ付きで呼び出す"""
+        state.calls += 1
+        pending = {state.executor.submit(self._timed_call, state, text)}
+        attempts = 1
+        hedge_at = time.monotonic() + self._current_hedge_delay(state)
+        last_error = None
+
+        while True:
+            now = time.monotonic()
+            if now >= deadline_at:
+                break
+
+            can_hedge = attempts < (self.max_attempts if state.hedge else 1)
+            wake_at = min(hedge_at, deadline_at) if can_hedge else deadline_at
+            done, pending = wait(pending, timeout=max(0.0, wake_at - now), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                try:
+                    result, latency = future.result()
+                except Exception as e:
+                    last_error = e
+                    continue
+                if result is None:
+                    last_error = ValueError("空の翻訳結果")
+                    continue
+                state.latencies.record(latency)
+                state.breaker.record_success(latency)
+                return result
+
+            if not can_hedge:
+                if not pending:
+                    break
+                continue
+
+            # 全リクエストが失敗 → 即再送 / p95 を過ぎても応答なし → ヘッジ送信
+            if not pending or time.monotonic() >= hedge_at:
+                if pending:
+                    state.hedges += 1
+                pending.add(state.executor.submit(self._timed_call, state, text))
+                attempts += 1
+                hedge_at = time.monotonic() + self._current_hedge_delay(state)
+
+        state.failures += 1
+        state.breaker.record_failure()
+        if last_error is None:
+            raise TimeoutError(f"{state.name}: デッドライン超過")
+        raise last_error
+
+    def stats(self) -> dict:
+        """エンジン別の統計（状態、p50/p95/p99、エラー率、ヘッジ数）"""
+        with self._lock:
+            engines = list(self._engines)
+        return {
+            s.name: {
+                "state": s.breaker.state,
+                "calls": s.calls,
+                "failures": s.failures,
+                "hedges": s.hedges,
+                "error_rate": s.breaker.error_rate(),
+                "p50": s.latencies.percentile(50),
+                "p95": s.latencies.percentile(95),
+                "p99": s.latencies.percentile(99),
+            }
+            for s in engines
+        }
+
+    def _enter(self):
+        with self._lock:
+            if self._closed:
+                raise TranslationUnavailable("翻訳エンジンは片付け済みです")
+            self._active += 1
+
+    def _leave(self):
+        with self._lock:
+            self._active -= 1
+            idle = self._closed and self._active == 0
+        if idle:
+            self._stop_executors()
+
+    def shutdown(self):
+        """
+        エンジンのスレッドを止める（言語ペアの差し替え・終了時）
+
+        呼び出し中の call / call_stream があれば、それが終わってから止める。以降の呼び出しは
+        TranslationUnavailable
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            if self._active:
+                return
+        self._stop_executors()
+
+    def _stop_executors(self):
+        with self._lock:
+            engines = list(self._engines)
+        for state in engines:
+            state.executor.shutdown(wait=False, cancel_futures=True)
@@ -1,17 +1,25 @@
 """
 翻訳モジュール
 deep-translator を使って複数言語間の翻訳を行う
-専門用語辞書サポート付き
+専門用語辞書・翻訳メモリサポート付き
+
+Google が遅い・落ちている場合は translation_resilience でヘッジ送信し、
+サーキットブレーカーが開いたら MyMemory にフェイルオーバーする。
 """
 
-import time
+import os
 import re
 
 try:
-    from deep_translator import GoogleTranslator
+    from deep_translator import GoogleTranslator, MyMemoryTranslator
 except ImportError:
     raise ImportError("deep-translator が必要です: pip install deep-translator")
 
+from segment_stitcher import split_sentences
+from translation_resilience import ResilientCaller, TranslationUnavailable
+from translation_memory import TranslationMemory
+from translation_logger import TranslationLogger
+
 
 class Translator:
     """Google Translate を使った複数言語翻訳 + 専門用語辞書対応"""
@@ -32,6 +40,17 @@ class Translator:
         "zh": "zh-CN",  # zh を zh-CN に変換
     }
 
+    # MyMemory（フェイルオーバー先）は地域付きの言語コードを要求する
+    MYMEMORY_CODE_MAP = {
+        "en": "en-US",
+        "ja": "ja-JP",
+        "zh-CN": "zh-CN",
+        "es": "es-ES",
+        "fr": "fr-FR",
+        "de": "de-DE",
+        "ko": "ko-KR",
+    }
+
     LANGUAGE_NAMES = {
         "en": "English",
         "ja": "日本語",
@@ -42,7 +61,26 @@ class Translator:
         "ko": "韓国語",
     }
 
-    def __init__(self, source: str = "en", target: str = "ja", max_retries: int = 3):
+    def __init__(
+        self,
+        source: str = "en",
+        target: str = "ja",
+        max_retries: int = 3,
+        deadline: float = 2.5,
+        fallback: str | None = "mymemory",
+        memory_dir: str | None = None,
+        log_dir: str = "logs",
+    ):
+        """
+        Args:
+            source: 翻訳元の言語コード
+            target: 翻訳先の言語コード
+            max_retries: 1エンジンあたりの最大送信数（初回 + ヘッジ/再送）
+            deadline: 1文あたりの翻訳の上限秒数（フェイルオーバー込み）
+            fallback: Google が使えないときのセカンダリエンジン（"mymemory" or None）
+            memory_dir: 翻訳メモリの保存先フォルダ（None なら翻訳メモリを使わない）
+            log_dir: 翻訳メモリの初期データにする TranslationLogger のログフォルダ
+        """
         # 言語コード変換
         source = self.LANGUAGE_CODE_MAP.get(source, source)
         target = self.LANGUAGE_CODE_MAP.get(target, target)
@@ -57,7 +95,15 @@ class Translator:
         self.source = source
         self.target = target
         self.max_retries = max_retries
-        self._translator = GoogleTranslator(source=source, target=target)
+        self.fallback = fallback
+        self._caller = ResilientCaller(deadline=deadline, max_attempts=max_retries)
+        self._extra_engines = {}  # set_engine で追加したエンジン（言語ペア変更を伝える）
+        self._build_engines()
+
+        self.memory_dir = memory_dir
+        self.log_dir = log_dir
+        self.memory = None
+        self._load_memory()
 
         source_name = self.LANGUAGE_NAMES.get(source, source)
         target_name = self.LANGUAGE_NAMES.get(target, target)
@@ -96,6 +142,72 @@ class Translator:
             "implementation": "実装",
         }
 
+    def _build_engines(self):
+        """現在の言語ペアで翻訳エンジンを（再）構築する（ブレーカーの状態は引き継ぐ）"""
+        self._translator = GoogleTranslator(source=self.source, target=self.target)
+        self._caller.set_engine("google", self._translator)
+
+        if self.fallback == "mymemory":
+            try:
+                secondary = MyMemoryTranslator(
+                    source=self.MYMEMORY_CODE_MAP.get(self.source, self.source),
+                    target=self.MYMEMORY_CODE_MAP.get(self.target, self.target),
+                )
+                self._caller.set_engine("mymemory", secondary)
+            except Exception as e:
+                print(f"[Translator] フェイルオーバー先を初期化できません: {e}")
+                self._caller.remove_engine("mymemory")
+
+    def _load_memory(self):
+        """現在の言語ペアの翻訳メモリを読み込む（初回は過去の翻訳ログから構築）"""
+        if not self.memory_dir:
+            return
+        # ログには UI の言語コード（zh-CN ではなく zh）で記録されている
+        ui_code = {v: k for k, v in self.LANGUAGE_CODE_MAP.items()}
+        source = ui_code.get(self.source, self.source)
+        target = ui_code.get(self.target, self.target)
+
+        path = os.path.join(self.memory_dir, f"tm_{source}_{target}.jsonl")
+        self.memory = TranslationMemory(path=path)
+        if len(self.memory) == 0:
+            count = self.memory.load_pairs(
+                TranslationLogger.read_entries(self.log_dir, source, target)
+            )
+            if count:
+                print(f"[Translator] 翻訳ログから翻訳メモリを構築: {count}件")
+
+    def save_memory(self):
+        """翻訳メモリをディスクに保存"""
+        if self.memory and self.memory.dirty:
+            self.memory.save()
+
+    def close(self):
+        """
+        使い終わった Translator を片付ける（翻訳メモリを保存し、エンジンのスレッドを止める）
+
+        言語ペアの差し替えで古くなった Translator に呼ぶ。翻訳中の文があれば、それが終わってから止める
+        """
+        self.save_memory()
+        self._caller.shutdown()
+
+    def set_engine(self, name: str, engine, primary: bool = False, hedge: bool = True):
+        """
+        翻訳エンジンを追加・差し替える
+
+        Args:
+            name: エンジン名（既存名なら差し替え）
+            engine: translate(text) -> str を持つオブジェクト
+                    （set_language_pair / translate_stream があれば利用する）
+            primary: True なら最優先、False ならフェイルオーバー候補として末尾に追加
+            hedge: False ならヘッジ送信しない（ローカル LLM など）
+        """
+        self._caller.set_engine(name, engine, priority=0 if primary else None, hedge=hedge)
+        self._extra_engines[name] = engine
+
+    def engine_stats(self) -> dict:
+        """エンジン別のレイテンシ・エラー率・ブレーカー状態"""
+        return self._caller.stats()
+
     def _apply_terminology(self, text: str) -> dict:
         """
         テキストに対して専門用語辞書を適用
@@ -137,6 +249,13 @@ class Translator:
         self.terminology.update(term_dict)
         print(f"[Translator] {len(term_dict)}個の用語を追加しました")
 
+    @classmethod
+    def supports(cls, source: str, target: str) -> bool:
+        """対応している言語ペアか（UI の言語コードのまま渡せる）"""
+        source = cls.LANGUAGE_CODE_MAP.get(source, source)
+        target = cls.LANGUAGE_CODE_MAP.get(target, target)
+        return (source, target) in cls.SUPPORTED_LANGUAGE_PAIRS
+
     def set_language_pair(self, source: str, target: str) -> bool:
         """言語ペアを動的に変更"""
         # 言語コード変換
@@ -148,9 +267,14 @@ class Translator:
             print(f"[Translator] 対応ペア: {self.SUPPORTED_LANGUAGE_PAIRS}")
             return False
 
+        self.save_memory()
         self.source = source
         self.target = target
-        self._translator = GoogleTranslator(source=source, target=target)
+        self._build_engines()
+        self._load_memory()
+        for engine in self._extra_engines.values():
+            if hasattr(engine, "set_language_pair"):
+                engine.set_language_pair(source, target)
 
         source_name = self.LANGUAGE_NAMES.get(source, source)
         target_name = self.LANGUAGE_NAMES.get(target, target)
@@ -185,35 +309,105 @@ class Translator:
         Returns:
             日本語に翻訳されたテキスト
         """
+        return self._translate(text)
+
+    def _translate(self, text: str, exclude: tuple = ()) -> str:
+        """translate() の本体（exclude のエンジンは試さない）"""
         if not text or not text.strip():
             return ""
 
+        # ステップ0: 翻訳メモリ（完全一致 or 数字・固有名詞だけ違う文）で訳せればエンジンを呼ばない
+        if self.memory is not None:
+            remembered = self.memory.lookup(text)
+            if remembered is not None:
+                print(f"[Translator] 翻訳メモリでヒット")
+                return remembered
+
         # ステップ1: 専門用語を抽出・置換
         term_data = self._apply_terminology(text.strip())
         text_to_translate = term_data["modified_text"]
         replacements = term_data["replacements"]
 
-        for attempt in range(self.max_retries):
-            try:
-                # ステップ2: Google翻訳を実行
-                result = self._translator.translate(text_to_translate)
+        try:
+            # ステップ2: 翻訳を実行（デッドライン・ヘッジ・フェイルオーバー付き）
+            result = self._caller.call(text_to_translate, exclude=exclude)
+        except TranslationUnavailable as e:
+            # エラー文言を読み上げないよう、空文字を返してパイプラインにスキップさせる
+            print(f"[Translator] 翻訳失敗: {e}")
+            return ""
 
-                # ステップ3: 専門用語を復元
-                final_result = self._restore_terminology(result, replacements)
+        # ステップ3: 専門用語を復元
+        final_result = self._restore_terminology(result, replacements)
 
-                # ステップ4: 重複した文を削除
-                cleaned_result = self._remove_duplicate_sentences(final_result)
+        # ステップ4: 重複した文を削除
+        cleaned_result = self._remove_duplicate_sentences(final_result)
 
-                return cleaned_result if cleaned_result else ""
+        self._remember(text, cleaned_result)
+        return cleaned_result if cleaned_result else ""
 
-            except Exception as e:
-                if attempt < self.max_retries - 1:
-                    wait = 0.5 * (attempt + 1)
-                    print(f"[Translator] 翻訳エラー (リトライ {attempt + 1}/{self.max_retries}): {e}")
-                    time.sleep(wait)
-                else:
-                    print(f"[Translator] 翻訳失敗: {e}")
-                    return f"[翻訳エラー] {text}"
+    def translate_stream(self, text: str):
+        """
+        テキストを翻訳し、訳文を文ごとに返す
+
+        最優先エンジンがストリーミング対応（LLM）なら1文完成するごとに返すので、
+        呼び出し側は最初の文の音声合成を全体の翻訳完了前に始められる。
+        それ以外のエンジンでは translate() の結果を1回だけ返す。
+
+        ストリーミングもブレーカーとデッドラインの下で読む（ResilientCaller.call_stream）。
+        遮断中・最初の文が届かない・途中で止まった場合は、まだ返していない文を
+        フェイルオーバー先で一括翻訳する。
+
+        Yields:
+            訳文（文 or テキスト全体）
+        """
+        if not text or not text.strip():
+            return
+
+        names = self._caller.engine_names
+        primary = self._extra_engines.get(names[0]) if names else None
+        if primary is None or not hasattr(primary, "translate_stream"):
+            result = self.translate(text)
+            if result:
+                yield result
+            return
+
+        if self.memory is not None:
+            remembered = self.memory.lookup(text)
+            if remembered is not None:
+                print(f"[Translator] 翻訳メモリでヒット")
+                yield remembered
+                return
+
+        term_data = self._apply_terminology(text.strip())
+        replacements = term_data["replacements"]
+        parts = []
+        try:
+            stream = self._caller.call_stream(names[0], lambda: primary.translate_stream(term_data["modified_text"]))
+            for sentence in stream:
+                sentence = self._restore_terminology(sentence, replacements)
+                parts.append(sentence)
+                yield sentence
+        except Exception as e:
+            if not isinstance(e, TranslationUnavailable):
+                print(f"[Translator] {names[0]} ストリーミング失敗: {e}")
+            # まだ返していない文だけをフェイルオーバー先で訳す
+            rest = split_sentences(text.strip())[len(parts):] if parts else [text.strip()]
+            if rest:
+                result = self._translate(" ".join(rest), exclude=(names[0],))
+                if result:
+                    yield result
+            return
+
+        # 文が欠けた訳はメモリに残さない（次回以降も欠けたまま返ってしまう）
+        if len(parts) == len(split_sentences(term_data["modified_text"])):
+            self._remember(text, primary.join(parts) if hasattr(primary, "join") else " ".join(parts))
+
+    def _remember(self, source_text: str, translated_text: str):
+        """翻訳結果を翻訳メモリに追加（50件ごとに保存）"""
+        if translated_text and self.memory is not None:
+            self.memory.add(source_text, translated_text)
+            if self.memory.dirty >= 50:
+                self.save_memory()
 
 
 if __name__ == "__main__":
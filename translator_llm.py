@@ -0,0 +1,218 @@
+"""
+LLM 翻訳モジュール
+ai_chat.AiChat（OpenAI 互換 API）を翻訳エンジンとして使う
+Ollama / LM Studio を使えば翻訳まで完全ローカルで動かせる
+
+  - 直近の (原文, 訳文) を数文分だけ文脈として渡し、用語や文体を揃える
+  - 複数の文を番号付きでまとめて1リクエストで訳し、文ごとの対応を保つ
+  - ストリーミングで受信し、番号付きの行が1つ完成するたびに訳文を返す
+    （最初の文の TTS を応答全体の完了前に始められる）
+
+Translator.set_engine("llm", LlmTranslator(...), primary=True) で Google の前段に置くと、
+LLM が遅い・落ちている場合はサーキットブレーカーで Google にフェイルオーバーする。
+"""
+
+import re
+from collections import deque
+
+from ai_chat import AiChat
+from segment_stitcher import split_sentences
+
+# 番号付きの行 "1. 訳文" / "2) 訳文"
+_NUMBERED_LINE = re.compile(r"^\s*(\d+)\s*[.)．]\s*(.*)$")
+# ローカル LLM（Qwen / DeepSeek 系）が出力する推論ブロック
+_THINK_BLOCK = re.compile(r"<think>.*?</think>", re.DOTALL)
+
+# 文をスペースなしで連結する言語（訳文の結合用）
+_NO_SPACE_LANGUAGES = {"ja", "zh", "zh-CN", "zh-TW"}
+
+
+class LlmTranslator:
+    """OpenAI 互換 LLM を使った翻訳エンジン（Translator のエンジンとして使用）"""
+
+    LANGUAGE_NAMES = {
+        "en": "English",
+        "ja": "Japanese",
+        "zh": "Simplified Chinese",
+        "zh-CN": "Simplified Chinese",
+        "es": "Spanish",
+        "fr": "French",
+        "de": "German",
+        "ko": "Korean",
+    }
+
+    def __init__(
+        self,
+        client: AiChat = None,
+        source: str = "en",
+        target: str = "ja",
+        context_size: int = 4,
+        max_batch: int = 8,
+        base_url: str = "http://localhost:11434/v1",
+        api_key: str = None,
+        model: str = "llama3",
+    ):
+        """
+        Args:
+            client: 共有する AiChat クライアント（None なら base_url/api_key/model で作成）
+            source: 翻訳元の言語コード
+            target: 翻訳先の言語コード
+            context_size: 文脈として渡す直近の文の数
+            max_batch: 1リクエストにまとめる最大文数
+            base_url: client を作成する場合の API ベース URL
+            api_key: client を作成する場合の API キー
+            model: client を作成する場合のモデル名
+        """
+        self.client = client or AiChat(base_url=base_url, api_key=api_key, model=model)
+        self.source = source
+        self.target = target
+        self.max_batch = max_batch
+        self._context = deque(maxlen=context_size)
+
+    def set_language_pair(self, source: str, target: str) -> bool:
+        """言語ペアを変更（文脈は別言語になるので破棄）"""
+        self.source = source
+        self.target = target
+        self._context.clear()
+        return True
+
+    def _system_prompt(self) -> str:
+        source = self.LANGUAGE_NAMES.get(self.source, self.source)
+        target = self.LANGUAGE_NAMES.get(self.target, self.target)
+        return (
+            f"You are a professional subtitle translator. Translate {source} speech transcripts into natural "
+            f"spoken {target}. The input is a numbered list of sentences; reply with the same numbers, one "
+            f"translated sentence per line, and nothing else. Keep placeholders such as <TERM_0> unchanged. "
+            f"Keep names and technical terms consistent with the previous turns."
+        )
+
+    @staticmethod
+    def _numbered(sentences: list[str]) -> str:
+        return "\n".join(f"{i + 1}. {s}" for i, s in enumerate(sentences))
+
+    def _messages(self, sentences: list[str]) -> list[dict]:
+        """システムプロンプト + 直近の文脈（例示として）+ 今回の文"""
+        messages = [{"role": "system", "content": self._system_prompt()}]
+        if self._context:
+            sources = [s for s, _ in self._context]
+            targets = [t for _, t in self._context]
+            messages.append({"role": "user", "content": self._numbered(sources)})
+            messages.append({"role": "assistant", "content": self._numbered(targets)})
+        messages.append({"role": "user", "content": self._numbered(sentences)})
+        return messages
+
+    def _remember(self, sentences: list[str], translations: list[str]):
+        for source, target in zip(sentences, translations):
+            if target:
+                self._context.append((source, target))
+
+    @staticmethod
+    def _parse(output: str, expected: int) -> list[str] | None:
+        """番号付きの応答を文ごとに分解する（番号が揃わなければ None）"""
+        output = _THINK_BLOCK.sub("", output).strip()
+        if expected == 1 and not _NUMBERED_LINE.match(output.splitlines()[0] if output else ""):
+            return [output] if output else None
+        results = {}
+        for line in output.splitlines():
+            match = _NUMBERED_LINE.match(line)
+            if match:
+                results[int(match.group(1))] = match.group(2).strip()
+        if sorted(results) != list(range(1, expected + 1)):
+            return None
+        return [results[i] for i in range(1, expected + 1)]
+
+    def translate_batch(self, sentences: list[str]) -> list[str]:
+        """
+        複数の文をまとめて翻訳する（max_batch 文ごとに1リクエスト）
+
+        Returns:
+            入力と同じ順序・同じ数の訳文
+        """
+        results = []
+        for start in range(0, len(sentences), self.max_batch):
+            batch = sentences[start:start + self.max_batch]
+            output = self.client.complete(self._messages(batch), temperature=0.0)
+            parsed = self._parse(output, len(batch))
+            if parsed is None:
+                if len(batch) == 1:
+                    raise ValueError("LLM の応答が空です")
+                # 番号が崩れた場合は1文ずつ訳し直す
+                print(f"[LlmTranslator] 番号付き応答を解析できないため1文ずつ再翻訳")
+                parsed = [self.translate_batch([s])[0] for s in batch]
+            self._remember(batch, parsed)
+            results.extend(parsed)
+        return results
+
+    def translate(self, text: str) -> str:
+        """テキストを文に分けてまとめて翻訳する（Translator のエンジンインターフェース）"""
+        sentences = split_sentences(text.strip())
+        if not sentences:
+            return ""
+        return self.join(self.translate_batch(sentences))
+
+    def translate_stream(self, text: str):
+        """
+        ストリーミングで翻訳し、訳文を1文完成するごとに返す（max_batch 文ごとに1リクエスト）
+
+        応答が途中の文で終わった場合は、残りの文を translate_batch() で訳して続けて返す。
+
+        Yields:
+            訳文（入力の文ごと。入力と同じ数）
+        """
+        sentences = split_sentences(text.strip())
+        for start in range(0, len(sentences), self.max_batch):
+            batch = sentences[start:start + self.max_batch]
+            done = []
+            for sentence in self._stream_batch(batch):
+                done.append(sentence)
+                yield sentence
+            if not done:
+                raise ValueError("LLM の応答が空です")
+            # 届いた文は番号順なので、原文の先頭から対応する
+            self._remember(batch[:len(done)], done)
+            if len(done) < len(batch):
+                print(f"[LlmTranslator] 応答が {len(done)}/{len(batch)} 文で終わったため残りをまとめて翻訳")
+                yield from self.translate_batch(batch[len(done):])
+
+    def _stream_batch(self, batch: list[str]):
+        """1リクエスト分をストリーミングで受信し、番号どおりに完成した訳文を返す（途中で終わることがある）"""
+        buffer = ""
+        in_think = False
+        count = 0
+        for delta in self.client.stream(self._messages(batch), temperature=0.0):
+            buffer += delta
+            # 推論ブロックは読み飛ばす
+            if "<think>" in buffer and not in_think:
+                in_think = True
+            if in_think:
+                if "</think>" not in buffer:
+                    continue
+                buffer = buffer.split("</think>", 1)[1]
+                in_think = False
+            # 改行まで届いた行を確定させる
+            while "\n" in buffer and count < len(batch):
+                line, buffer = buffer.split("\n", 1)
+                sentence = self._take_line(line, count)
+                if sentence is not None:
+                    count += 1
+                    yield sentence
+
+        rest = buffer.strip()
+        if rest and count < len(batch):
+            sentence = self._take_line(rest, count)
+            if sentence is None and len(batch) == 1:
+                sentence = rest  # 番号なしで1文だけ返ってきた
+            if sentence is not None:
+                yield sentence
+
+    @staticmethod
+    def _take_line(line: str, index: int) -> str | None:
+        match = _NUMBERED_LINE.match(line)
+        if match and int(match.group(1)) == index + 1 and match.group(2).strip():
+            return match.group(2).strip()
+        return None
+
+    def join(self, parts: list[str]) -> str:
+        """文ごとの訳文を1つの訳文にする（訳先の言語に合わせてスペースを入れる）"""
+        sep = "" if self.target in _NO_SPACE_LANGUAGES else " "
+        return sep.join(p for p in parts if p)
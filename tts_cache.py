@@ -0,0 +1,174 @@
+"""
+TTS キャッシュモジュール
+合成済みの音声データを (エンジン, 話者, 速度, 音量, テキスト) のハッシュで保持し、
+同じ文の読み上げでは edge-tts / VOICEVOX を呼ばずに即座に返す
+
+  - キーは内容のハッシュ（同じ条件・同じテキストなら同じキー）
+  - 合計バイト数に上限を設け、最も使われていないものから追い出す（LRU）
+  - cache_dir を指定するとディスクにも保存し、次回起動時に読み込む
+    （ヒットしたファイルは更新時刻を新しくするので、次回起動時も LRU の順が保たれる）
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+
+class TTSCache:
+    """内容アドレス方式の音声データキャッシュ（スレッドセーフ）"""
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, cache_dir: str = None):
+        """
+        Args:
+            max_bytes: 保持する音声データの合計サイズ上限（バイト）
+            cache_dir: ディスク保存先（None ならメモリのみ）
+        """
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self._entries: OrderedDict = OrderedDict()  # key → (bytes, ext)（LRU 順）
+        self._total = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._load_dir()
+
+    @staticmethod
+    def make_key(engine: str, voice, rate, volume, text: str) -> str:
+        """キャッシュキー（SHA-256）を作る"""
+        material = "\x1f".join(str(v) for v in (engine, voice, rate, volume, text.strip()))
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._total
+
+    def get(self, key: str) -> tuple[bytes, str] | None:
+        """
+        Returns:
+            (音声データ, 拡張子) or None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        if self.cache_dir:
+            self._touch(key, entry[1])
+        return entry
+
+    def put(self, key: str, data: bytes, ext: str):
+        """音声データを登録（上限を超えたら古いものから削除）"""
+        if not data or len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total -= len(old[0])
+            self._entries[key] = (data, ext)
+            self._total += len(data)
+            evicted = self._evict()
+
+        if self.cache_dir:
+            if old is not None and old[1] != ext:
+                evicted.append((key, old[1]))  # 別の形式で保存していた同じキーのファイル
+            for old_key, old_ext in evicted:
+                try:
+                    os.remove(self._path(old_key, old_ext))
+                except OSError:
+                    pass
+            if (key, ext) not in evicted:
+                self._write(key, data, ext)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, total = len(self._entries), self._total
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": total,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _evict(self) -> list[tuple[str, str]]:
+        """上限を超えた分を LRU で削除（ロック取得済み前提）"""
+        evicted = []
+        while self._total > self.max_bytes and self._entries:
+            key, (data, ext) = self._entries.popitem(last=False)
+            self._total -= len(data)
+            evicted.append((key, ext))
+        return evicted
+
+    def _path(self, key: str, ext: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.{ext}")
+
+    def _touch(self, key: str, ext: str):
+        """ヒットしたファイルの更新時刻を今にする（_load_dir() は更新時刻の古い順に読む）"""
+        try:
+            os.utime(self._path(key, ext))
+        except OSError:
+            pass
+
+    def _write(self, key: str, data: bytes, ext: str):
+        """一時ファイル経由でディスクに保存"""
+        path = self._path(key, ext)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[TTSCache] 保存エラー: {e}")
+
+    def _load_dir(self):
+        """ディスク上のキャッシュを古い順に読み込む（上限を超えた分は削除）"""
+        files = []
+        for name in os.listdir(self.cache_dir):
+            key, _, ext = name.partition(".")
+            if len(key) != 64 or not ext or ext.endswith("tmp"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            files.append((os.path.getmtime(path), key, ext, path))
+
+        for _, key, ext, path in sorted(files):
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+            except OSError:
+                continue
+            with self._lock:
+                # 同じキーが別の形式でも残っていれば、古い方（先に読んだ方）を消す
+                old = self._entries.pop(key, None)
+                if old is not None:
+                    self._total -= len(old[0])
+                self._entries[key] = (data, ext)
+                self._total += len(data)
+                evicted = self._evict()
+            if old is not None and old[1] != ext:
+                evicted.append((key, old[1]))
+            for old_key, old_ext in evicted:
+                try:
+                    os.remove(self._path(old_key, old_ext))
+                except OSError:
+                    pass
+
+        if self._entries:
+            print(f"[TTSCache] {len(self._entries)}件を読み込み ({self._total / 1024:.0f} KB): {self.cache_dir}")
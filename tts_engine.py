@@ -4,15 +4,20 @@ edge-tts を使って複数言語のテキストを音声に変換する
 対応言語: ja, en, zh, es, fr, de, ko
 """
 
-import asyncio
 import tempfile
 import os
+import threading
+from concurrent.futures import Future
 
 try:
     import edge_tts
 except ImportError:
     raise ImportError("edge-tts が必要です: pip install edge-tts")
 
+from tts_cache import TTSCache
+from audio_decode import AudioClip, AudioStream
+from event_loop_thread import DEFAULT_LOOP, EventLoopThread
+
 
 class TTSEngine:
     """Microsoft Edge TTS を使った複数言語音声合成"""
@@ -52,13 +57,16 @@ class TTSEngine:
     # 後方互換性のため、従来の VOICES 名前も保持
     VOICES = LANGUAGE_VOICES.get("ja", {})
 
-    def __init__(self, language: str = "ja", voice: str = "nanami", rate: str = "+0%", volume: str = "+0%"):
+    def __init__(self, language: str = "ja", voice: str = "nanami", rate: str = "+0%", volume: str = "+0%",
+                 cache: TTSCache = None, worker: EventLoopThread = None):
         """
         Args:
             language: 対象言語 (ja/en/zh/es/fr/de/ko, default: ja)
             voice: 言語別の音声名 (例: 日本語は "nanami"/"keita")
             rate: 速度調整 (例: "+10%", "-20%")
             volume: 音量調整 (例: "+10%", "-20%")
+            cache: 合成済み音声のキャッシュ（None ならこのエンジン専用のメモリキャッシュ）
+            worker: edge-tts を実行するイベントループスレッド（None ならプロセス共有のループ）
         """
         self.language = language
 
@@ -71,36 +79,77 @@ class TTSEngine:
 
         self.rate = rate
         self.volume = volume
-        self._temp_dir = tempfile.mkdtemp(prefix="voice_bridge_")
+        self._temp_dir = None  # ファイル出力（フォールバック）を使うときだけ作成
         self._counter = 0
-        self._loop = None
+        self._counter_lock = threading.Lock()
+        self.worker = worker or EventLoopThread.shared(DEFAULT_LOOP, max_concurrent=4)
+        self.cache = cache if cache is not None else TTSCache()
 
         print(f"[TTSEngine] 言語: {language}, 音声: {self.voice}")
 
-    def _get_loop(self) -> asyncio.AbstractEventLoop:
-        """イベントループを取得（なければ新規作成）"""
-        try:
-            loop = asyncio.get_event_loop()
-            if loop.is_closed():
-                raise RuntimeError
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-        return loop
-
-    async def _synthesize_async(self, text: str, output_path: str):
-        """非同期で音声合成を実行"""
+    async def _synthesize_bytes(self, text: str) -> bytes:
+        """非同期で音声合成を実行し、mp3 のバイト列を返す（ファイルには書かない）"""
         communicate = edge_tts.Communicate(
             text,
             self.voice,
             rate=self.rate,
             volume=self.volume,
         )
-        await communicate.save(output_path)
+        chunks = []
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio":
+                chunks.append(chunk["data"])
+        return b"".join(chunks)
+
+    def synthesize_audio(self, text: str) -> AudioClip | None:
+        """
+        テキストをメモリ上の音声（mp3）に変換する（完了まで待つ）
+
+        Returns:
+            AudioClip。エラー時は None
+        """
+        return self.synthesize_audio_async(text).result()
+
+    def synthesize_audio_async(self, text: str) -> Future:
+        """
+        テキストをメモリ上の音声（mp3）に変換する（待たずに Future を返す。どのスレッドからでも呼べる）
+
+        合成は常駐イベントループ上で行うので、次の文の合成を現在の文の再生と並行して進められる。
+
+        Returns:
+            結果（AudioClip。エラー時は None）を受け取る Future
+        """
+        future = Future()
+        if not text or not text.strip():
+            future.set_result(None)
+            return future
+
+        # 同じ条件で合成済みなら edge-tts を呼ばない
+        key = TTSCache.make_key("edge", self.voice, self.rate, self.volume, text)
+        cached = self.cache.get(key)
+        if cached is not None:
+            future.set_result(AudioClip(data=cached[0], codec=cached[1], text=text))
+            return future
+
+        return self.worker.submit(self._synthesize_clip(text, key))
+
+    async def _synthesize_clip(self, text: str, key: str) -> AudioClip | None:
+        """ループスレッド上で合成してキャッシュに登録する"""
+        try:
+            data = await self._synthesize_bytes(text)
+        except Exception as e:
+            print(f"[TTSEngine] 音声合成エラー: {e}")
+            return None
+        if not data:
+            print(f"[TTSEngine] 音声合成エラー: 音声データが空です")
+            return None
+        self.cache.put(key, data, "mp3")
+        return AudioClip(data=data, codec="mp3", text=text)
 
     def synthesize(self, text: str) -> str | None:
         """
-        テキストを音声ファイル（mp3）に変換する
+        テキストを音声ファイル（mp3）に変換する（完了まで待つ）
+        ファイルが必要な場合のフォールバック。通常は synthesize_audio() を使う
 
         Args:
             text: 日本語テキスト
@@ -108,19 +157,73 @@ class TTSEngine:
         Returns:
             生成された mp3 ファイルのパス。エラー時は None
         """
+        return self.synthesize_async(text).result()
+
+    def synthesize_async(self, text: str) -> Future:
+        """synthesize() の非同期版（結果は mp3 ファイルのパス）"""
+        future = Future()
+
+        def write_file(clip_future: Future):
+            try:
+                clip = clip_future.result()
+                future.set_result(self._write_file(clip) if clip else None)
+            except Exception as e:
+                future.set_exception(e)
+
+        self.synthesize_audio_async(text).add_done_callback(write_file)
+        return future
+
+    def _write_file(self, clip: AudioClip) -> str:
+        with self._counter_lock:
+            if self._temp_dir is None or not os.path.exists(self._temp_dir):
+                self._temp_dir = tempfile.mkdtemp(prefix="voice_bridge_")
+            self._counter += 1
+            output_path = os.path.join(self._temp_dir, f"tts_{self._counter:06d}.{clip.codec}")
+        with open(output_path, "wb") as f:
+            f.write(clip.data)
+        return output_path
+
+    def synthesize_stream(self, text: str) -> AudioStream | None:
+        """
+        テキストを音声に変換し、届いた順に mp3 のチャンクを返すストリームを返す（待たない）
+
+        AudioPlayer.enqueue_stream() に渡すと、合成の完了を待たずに最初のフレームから再生できる。
+
+        Returns:
+            AudioStream（空テキストなら None）
+        """
         if not text or not text.strip():
             return None
 
-        self._counter += 1
-        output_path = os.path.join(self._temp_dir, f"tts_{self._counter:06d}.mp3")
+        stream = AudioStream(codec="mp3", text=text)
+        key = TTSCache.make_key("edge", self.voice, self.rate, self.volume, text)
+        cached = self.cache.get(key)
+        if cached is not None:
+            stream.put(cached[0])
+            stream.close()
+            return stream
 
+        self.worker.submit(self._stream_to(stream, text, key))
+        return stream
+
+    async def _stream_to(self, stream: AudioStream, text: str, key: str):
+        """ループスレッド上で edge-tts の音声チャンクをストリームへ流す"""
+        chunks = []
         try:
-            loop = self._get_loop()
-            loop.run_until_complete(self._synthesize_async(text, output_path))
-            return output_path
+            communicate = edge_tts.Communicate(text, self.voice, rate=self.rate, volume=self.volume)
+            async for chunk in communicate.stream():
+                if stream.cancelled:
+                    break
+                if chunk["type"] == "audio":
+                    chunks.append(chunk["data"])
+                    stream.put(chunk["data"])
         except Exception as e:
             print(f"[TTSEngine] 音声合成エラー: {e}")
-            return None
+            stream.close(error=e)
+            return
+        if not stream.cancelled:
+            self.cache.put(key, b"".join(chunks), "mp3")
+        stream.close()
 
     def set_voice(self, voice: str):
         """音声を変更"""
@@ -154,7 +257,7 @@ class TTSEngine:
     def cleanup(self):
         """一時ファイルを削除"""
         import shutil
-        if os.path.exists(self._temp_dir):
+        if self._temp_dir and os.path.exists(self._temp_dir):
             shutil.rmtree(self._temp_dir, ignore_errors=True)
             print(f"[TTSEngine] 一時ファイルを削除: {self._temp_dir}")
 
@@ -0,0 +1,228 @@
+"""
+文単位 TTS パイプライン
+長いテキスト（AI チャットの応答・長い訳文）を文に分けて合成し、
+できた文から順に再生キューへ入れる（TTSEngine / VoicevoxTTS 共通）
+
+  - 文の区切り: 。！？ . ! ?（segment_stitcher.split_sentences と同じ規則）
+  - 1文目から順に合成を投入し、1文目ができた時点で再生キューへ入れる。
+    2文目以降は再生中に先回りして合成しておく
+  - 複数回の speak() をまたいでも再生順は投入順のまま（優先度ごと。urgent は normal を待たない）
+
+最初の音声が出るまでの時間が、応答全体の長さではなく1文目の長さで決まるようになる。
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from segment_stitcher import split_sentences
+from audio_decode import estimate_speech_seconds
+from play_queue import NORMAL, URGENT
+
+
+def split_for_tts(text: str, min_chars: int = 6) -> list[str]:
+    """
+    読み上げ用に文単位に分割する
+
+    極端に短い文（"はい。" "OK." など）は次の文とまとめて、細切れの抑揚にならないようにする。
+    """
+    segments = []
+    carry = ""
+    for sentence in split_sentences(text.strip()):
+        if carry:
+            sep = "" if _is_cjk(carry[-1]) else " "
+            sentence = f"{carry}{sep}{sentence}"
+        if len(sentence) < min_chars:
+            carry = sentence
+            continue
+        segments.append(sentence)
+        carry = ""
+    if carry:
+        if segments:
+            sep = "" if _is_cjk(carry[0]) else " "
+            segments[-1] = f"{segments[-1]}{sep}{carry}"
+        else:
+            segments.append(carry)
+    return segments
+
+
+def _is_cjk(char: str) -> bool:
+    return "　" <= char <= "鿿" or "＀" <= char <= "￯"
+
+
+class SpeechJob:
+    """speak() 1回分（複数の文）の進捗"""
+
+    def __init__(self, segments: list[str], trace=None):
+        self.segments = segments
+        self.trace = trace  # 遅延トレース（音声ができた・再生が始まった時刻を記録する）
+        self.started_at = time.monotonic()
+        self.first_ready_at = None  # 1文目の音声が再生キューに入った（ストリームなら最初のチャンクが届いた）時刻
+        self._first_ready = threading.Event()
+        self._done = threading.Event()
+        self._remaining = len(segments)
+        self._streams = []
+        if not segments:
+            self._first_ready.set()
+            self._done.set()
+
+    def _segment_ready(self):
+        if self.first_ready_at is None:
+            self.first_ready_at = time.monotonic()
+            self._first_ready.set()
+        self._remaining -= 1
+        if self._remaining <= 0:
+            self._done.set()
+
+    def wait_first(self, timeout: float = None) -> float | None:
+        """1文目の音声が用意できるまで待ち、speak() からの秒数を返す（できなければ None）"""
+        if self._streams:
+            return self._streams[0].wait_first_chunk(timeout)
+        self._first_ready.wait(timeout)
+        if self.first_ready_at is None:
+            return None
+        return self.first_ready_at - self.started_at
+
+    def wait(self, timeout: float = None) -> bool:
+        """全文が再生キューに入るまで待つ"""
+        return self._done.wait(timeout)
+
+
+class SentencePipeline:
+    """TTS エンジン共通の文単位の合成・再生キュー投入"""
+
+    def __init__(self, tts, player, min_chars: int = 6, streaming: bool = True):
+        """
+        Args:
+            tts: TTSEngine / VoicevoxTTS（synthesize_audio_async / synthesize_audio / synthesize のいずれか）
+            player: AudioPlayer
+            min_chars: これより短い文は次の文とまとめる
+            streaming: エンジンと再生側が対応していればストリーミング合成を使う
+        """
+        self.tts = tts
+        self.player = player
+        self.min_chars = min_chars
+        self.streaming = streaming
+        # 優先度ごとの (job, Future, text, deadline, tts)  投入順
+        self._lanes = {URGENT: deque(), NORMAL: deque()}
+        self._retired = []  # 差し替えた後、合成待ちの文が残っているエンジン
+        self._lock = threading.Lock()
+
+    def set_engine(self, tts):
+        """TTS エンジンを差し替える（言語ペア変更時など）"""
+        self.tts = tts
+
+    def retire(self, tts):
+        """
+        差し替えた TTS エンジンを片付ける
+
+        そのエンジンで合成中の文が残っていれば、再生キューへ入れ終わってから cleanup() する
+        （合成中にセッション・スレッドを閉じて、読み上げが途中で消えないように）
+        """
+        with self._lock:
+            if tts is self.tts or tts in self._retired:
+                return
+            if self._in_use(tts):
+                self._retired.append(tts)
+                return
+        tts.cleanup()
+
+    def _in_use(self, tts) -> bool:
+        return any(entry[4] is tts for pending in self._lanes.values() for entry in pending)
+
+    @property
+    def uses_streaming(self) -> bool:
+        return self._can_stream(self.tts)
+
+    def _can_stream(self, tts) -> bool:
+        return self.streaming and hasattr(tts, "synthesize_stream") and self.player.supports_streaming()
+
+    def speak(self, text: str, priority: str = NORMAL, deadline: float = None, trace=None,
+              engine=None) -> SpeechJob:
+        """
+        テキストを文に分けて合成を投入する（待たない）
+
+        Args:
+            text: 読み上げるテキスト
+            priority: "normal" / "urgent"（チャットの応答など。待っている音声より先に再生）
+            deadline: 再生開始の期限（time.monotonic 基準。過ぎた文は速めるか捨てる）
+            trace: 遅延トレース（latency_trace.Trace。合成の投入・音声ができた・再生開始を記録する）
+            engine: 合成に使う TTS エンジン（None なら今のエンジン。発話を始めた言語ペアのエンジンを渡す）
+
+        Returns:
+            SpeechJob（wait_first() で最初の音声までの時間、wait() で全文の投入完了を待てる）
+        """
+        job = SpeechJob(split_for_tts(text, self.min_chars) if text else [], trace)
+        if not job.segments:
+            return job
+        if trace is not None:
+            trace.mark("speak")
+        tts = engine or self.tts
+
+        if self._can_stream(tts):
+            # ストリーミング: 合成開始と同時に再生キューへ入れる（順番はキューの順番のまま）
+            for segment in job.segments:
+                stream = tts.synthesize_stream(segment)
+                if stream is not None:
+                    job._streams.append(stream)
+                    self.player.enqueue_stream(stream, priority, deadline, trace=trace)
+                job._segment_ready()
+            return job
+
+        futures = [self._submit(segment, tts) for segment in job.segments]
+        with self._lock:
+            self._lanes[priority].extend(
+                (job, f, segment, deadline, tts) for f, segment in zip(futures, job.segments)
+            )
+        for future in futures:
+            future.add_done_callback(self._enqueue_ready)
+        return job
+
+    def _submit(self, segment: str, tts=None) -> Future:
+        """1文の合成を投入する（非同期 API がないエンジンはここで合成する）"""
+        tts = tts or self.tts
+        if hasattr(tts, "synthesize_audio_async"):
+            return tts.synthesize_audio_async(segment)
+        future = Future()
+        try:
+            if hasattr(tts, "synthesize_audio"):
+                future.set_result(tts.synthesize_audio(segment))
+            else:
+                future.set_result(tts.synthesize(segment))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def _enqueue_ready(self, _=None):
+        """合成が終わった文を、先頭から順番を保って再生キューへ入れる"""
+        with self._lock:
+            for priority, pending in self._lanes.items():
+                while pending and pending[0][1].done():
+                    job, future, _, deadline, _ = pending.popleft()
+                    try:
+                        audio = future.result()
+                    except Exception as e:
+                        print(f"[SentencePipeline] TTS エラー: {e}")
+                        audio = None
+                    if audio:
+                        if job.trace is not None:
+                            job.trace.mark("tts_ready")
+                        self.player.enqueue(audio, priority, deadline, trace=job.trace)
+                    job._segment_ready()
+            # 差し替えたエンジンは、合成待ちの文がなくなったら片付ける
+            drained = [tts for tts in self._retired if not self._in_use(tts)]
+            self._retired = [tts for tts in self._retired if tts not in drained]
+        for tts in drained:
+            tts.cleanup()
+
+    @property
+    def pending_seconds(self) -> float:
+        """合成中（まだ再生キューに入っていない）文の読み上げ時間の見積もり（秒）"""
+        with self._lock:
+            texts = [entry[2] for pending in self._lanes.values() for entry in pending]
+        return sum(estimate_speech_seconds(t) for t in texts)
+
+    def synthesize(self, text: str):
+        """1つの音声として合成して返す（分割しない。ファイル API しかないエンジンはパス）"""
+        return self._submit(text).result()
@@ -3,14 +3,28 @@ VOICEVOX TTS モジュール
 ローカルで起動中の VOICEVOX エンジン (http://localhost:50021) を使って
 日本語テキストを音声に変換する
 
+  - keep-alive の接続プール（requests.Session）を使い回す
+  - audio_query の結果を (テキスト, 話者) ごとにキャッシュする
+  - 長いテキストは文に分けて並行に合成し、順番どおりの Future を返す
+    （1文目の再生中に後続の文を合成できる）
+
 事前に VOICEVOX アプリを起動しておく必要がある。
 """
 
+import copy
 import json
 import os
 import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 
 import requests
+from requests.adapters import HTTPAdapter
+
+from tts_cache import TTSCache
+from audio_decode import AudioClip
+from segment_stitcher import split_sentences
 
 # デフォルトの話者一覧（VOICEVOX エンジンから取得できない場合のフォールバック）
 DEFAULT_SPEAKERS = {
@@ -46,16 +60,33 @@ DEFAULT_SPEAKERS = {
 class VoicevoxTTS:
     """VOICEVOX エンジンを使った日本語音声合成"""
 
-    def __init__(self, speaker_id: int = 3, host: str = "http://localhost:50021"):
+    def __init__(self, speaker_id: int = 3, host: str = "http://localhost:50021", cache: TTSCache = None,
+                 max_workers: int = 3, query_cache_size: int = 256):
         """
         Args:
             speaker_id: 話者ID（デフォルト: 3 = ずんだもん ノーマル）
             host: VOICEVOX エンジンの URL
+            cache: 合成済み音声のキャッシュ（None ならこのエンジン専用のメモリキャッシュ）
+            max_workers: 同時に合成する文の数（= 接続プールのサイズ）
+            query_cache_size: キャッシュする audio_query の件数
         """
         self.speaker_id = speaker_id
         self.host = host
-        self._temp_dir = tempfile.mkdtemp(prefix="voice_bridge_vv_")
+        self._temp_dir = None  # ファイル出力（フォールバック）を使うときだけ作成
         self._counter = 0
+        self.cache = cache if cache is not None else TTSCache()
+
+        # 接続プールとスレッドプールは最初に使うときに作る（cleanup() 後も作り直して使える）
+        self._max_workers = max_workers
+        self._session = None
+        self._executor = None
+        self._lock = threading.Lock()
+
+        self.speed_scale = 1.0  # 話速（audio_query の speedScale）
+
+        self._queries: OrderedDict = OrderedDict()  # (text, speaker) → audio_query（LRU）
+        self._query_cache_size = query_cache_size
+        self._query_lock = threading.Lock()
 
     @staticmethod
     def fetch_speakers(host: str = "http://localhost:50021") -> dict[str, int]:
@@ -94,56 +125,128 @@ class VoicevoxTTS:
         except Exception:
             return False
 
-    def synthesize(self, text: str) -> str | None:
+    def _get_session(self) -> requests.Session:
+        """keep-alive で接続を使い回すセッション（並行合成の分だけプールを確保）"""
+        with self._lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self._max_workers)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._session = session
+            return self._session
+
+    def _audio_query(self, text: str, speaker_id: int) -> dict:
+        """audio_query を取得（同じテキスト・話者ならキャッシュを返す。呼び出し側で変更してよいコピー）"""
+        key = (text, speaker_id)
+        with self._query_lock:
+            query = self._queries.get(key)
+            if query is not None:
+                self._queries.move_to_end(key)
+                return copy.deepcopy(query)
+
+        resp = self._get_session().post(
+            f"{self.host}/audio_query",
+            params={"text": text, "speaker": speaker_id},
+            timeout=10,
+        )
+        resp.raise_for_status()
+        query = resp.json()
+
+        with self._query_lock:
+            self._queries[key] = query
+            while len(self._queries) > self._query_cache_size:
+                self._queries.popitem(last=False)
+        return copy.deepcopy(query)
+
+    def synthesize_audio(self, text: str) -> AudioClip | None:
         """
-        テキストを音声ファイル（wav）に変換する
+        テキストをメモリ上の音声（wav）に変換する（一時ファイルを使わない）
 
         Args:
             text: 日本語テキスト
 
         Returns:
-            生成された wav ファイルのパス。エラー時は None
+            AudioClip。エラー時は None
         """
         if not text or not text.strip():
             return None
+        return self._synthesize_clip(text.strip(), self.speaker_id, self.speed_scale)
 
-        self._counter += 1
+    def synthesize_audio_async(self, text: str) -> Future:
+        """synthesize_audio() をスレッドプールで実行する（待たずに Future を返す）"""
+        if not text or not text.strip():
+            future = Future()
+            future.set_result(None)
+            return future
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="voicevox")
+            return self._executor.submit(self._synthesize_clip, text.strip(), self.speaker_id, self.speed_scale)
 
-        # 一時ディレクトリが消えていたら再作成
-        if not os.path.exists(self._temp_dir):
-            self._temp_dir = tempfile.mkdtemp(prefix="voice_bridge_vv_")
+    def synthesize_sentences(self, text: str) -> list[Future]:
+        """
+        テキストを文に分けて並行に合成する
 
-        output_path = os.path.join(self._temp_dir, f"vv_{self._counter:06d}.wav")
+        Returns:
+            文の順番どおりの Future のリスト（結果は AudioClip or None）。
+            先頭から順に result() を待って再生すれば、1文目の再生中に後続の文が合成される
+        """
+        return [self.synthesize_audio_async(sentence) for sentence in split_sentences(text.strip())]
+
+    def _synthesize_clip(self, text: str, speaker_id: int, speed_scale: float = 1.0) -> AudioClip | None:
+        # 同じ話者・話速・テキストで合成済みなら VOICEVOX を呼ばない
+        key = TTSCache.make_key("voicevox", speaker_id, speed_scale, 1.0, text)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return AudioClip(data=cached[0], codec=cached[1], text=text)
 
         try:
-            # 1. audio_query: 読み上げクエリを作成
-            resp = requests.post(
-                f"{self.host}/audio_query",
-                params={"text": text.strip(), "speaker": self.speaker_id},
-                timeout=10,
-            )
-            resp.raise_for_status()
-            query = resp.json()
+            # 1. audio_query: 読み上げクエリを作成（キャッシュあり）
+            query = self._audio_query(text, speaker_id)
+            query["speedScale"] = speed_scale
 
             # 2. synthesis: 音声合成
-            resp = requests.post(
+            resp = self._get_session().post(
                 f"{self.host}/synthesis",
-                params={"speaker": self.speaker_id},
+                params={"speaker": speaker_id},
                 json=query,
                 timeout=30,
             )
             resp.raise_for_status()
+        except Exception as e:
+            print(f"[VoicevoxTTS] 音声合成エラー: {e}")
+            return None
 
-            # 3. WAV ファイルとして保存
-            with open(output_path, "wb") as f:
-                f.write(resp.content)
+        self.cache.put(key, resp.content, "wav")
+        return AudioClip(data=resp.content, codec="wav", text=text)
 
-            return output_path
+    def synthesize(self, text: str) -> str | None:
+        """
+        テキストを音声ファイル（wav）に変換する
+        ファイルが必要な場合のフォールバック。通常は synthesize_audio() を使う
 
-        except Exception as e:
-            print(f"[VoicevoxTTS] 音声合成エラー: {e}")
+        Args:
+            text: 日本語テキスト
+
+        Returns:
+            生成された wav ファイルのパス。エラー時は None
+        """
+        clip = self.synthesize_audio(text)
+        if clip is None:
             return None
 
+        self._counter += 1
+
+        # 一時ディレクトリが未作成・消えていたら作成
+        if self._temp_dir is None or not os.path.exists(self._temp_dir):
+            self._temp_dir = tempfile.mkdtemp(prefix="voice_bridge_vv_")
+
+        output_path = os.path.join(self._temp_dir, f"vv_{self._counter:06d}.wav")
+        with open(output_path, "wb") as f:
+            f.write(clip.data)
+        return output_path
+
     def set_language(self, language: str, voice: str = None) -> bool:
         """言語を変更（VOICEVOX は日本語のみ対応）"""
         if language == "ja":
@@ -151,15 +254,26 @@ class VoicevoxTTS:
         print(f"[VoicevoxTTS] 日本語以外 ({language}) は非対応")
         return False
 
+    def set_speed_scale(self, speed_scale: float):
+        """話速を変更（1.0 が標準）"""
+        self.speed_scale = round(speed_scale, 2)
+
     def set_speaker(self, speaker_id: int):
         """話者を変更"""
         self.speaker_id = speaker_id
         print(f"[VoicevoxTTS] 話者を変更: speaker_id={speaker_id}")
 
     def cleanup(self):
-        """一時ファイルを削除"""
+        """接続・スレッドプールを閉じ、一時ファイルを削除（再度合成すれば作り直す）"""
         import shutil
-        if os.path.exists(self._temp_dir):
+        with self._lock:
+            executor, self._executor = self._executor, None
+            session, self._session = self._session, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        if session is not None:
+            session.close()
+        if self._temp_dir and os.path.exists(self._temp_dir):
             shutil.rmtree(self._temp_dir, ignore_errors=True)
             print(f"[VoicevoxTTS] 一時ファイルを削除: {self._temp_dir}")
 